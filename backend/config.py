@@ -48,6 +48,7 @@ class Settings(BaseSettings):
         FIREBASE_SERVICE_ACCOUNT_KEY_PATH: Ruta al archivo JSON de credenciales de Firebase
         FIREBASE_STORAGE_BUCKET: Nombre del bucket de Firebase Storage
         GEMINI_API_KEY: Clave de API para Google Gemini AI
+        LLM_PROVIDER: Proveedor de IA activo (gemini o fake)
         MEILISEARCH_HOST: URL del servidor Meilisearch
         MEILISEARCH_MASTER_KEY: Clave maestra de Meilisearch (opcional)
         SECRET_KEY: Clave secreta para JWT y otras funciones de seguridad
@@ -75,12 +76,109 @@ class Settings(BaseSettings):
     )
 
     # ===== CONFIGURACIÓN DE GOOGLE GEMINI AI =====
-    GEMINI_API_KEY: str = Field(
-        ...,  # Campo requerido
+    GEMINI_API_KEY: str | None = Field(
+        None,  # Requerido solo con LLM_PROVIDER=gemini
         description="Clave de API de Google Gemini para análisis de documentos con IA",
         min_length=20  # Validación mínima de longitud
     )
 
+    LLM_PROVIDER: str = Field(
+        "gemini",
+        description="Proveedor de IA: gemini (producción) o fake (servidor local para pruebas de carga)",
+        pattern=r"^(gemini|fake)$"
+    )
+
+    LLM_MODEL: str = Field(
+        "gemini-1.5-flash-latest",
+        description="Modelo que usa el proveedor de IA"
+    )
+
+    FAKE_LLM_URL: str = Field(
+        "http://127.0.0.1:8765",
+        description="URL del servidor de IA falso (python -m services.fake_llm_server)"
+    )
+
+    AI_ENRICHMENT_MODE: str = Field(
+        "sync",
+        description=(
+            "Modo de enriquecimiento con IA: sync (esperar a Gemini), provisional "
+            "(responder con el extractor local y completar con Gemini en segundo plano) "
+            "u off (solo extractor local, para importaciones masivas)"
+        ),
+        pattern=r"^(sync|provisional|off)$"
+    )
+
+    # ===== MICRO-BATCHING DE DOCUMENTOS PEQUEÑOS =====
+    GEMINI_BATCH_ENABLED: bool = Field(
+        False,
+        description="Agrupa documentos pequeños en un único prompt a Gemini"
+    )
+
+    GEMINI_BATCH_WINDOW_MS: int = Field(
+        250,
+        description="Tiempo máximo (ms) que un documento espera a que se complete su lote",
+        ge=0
+    )
+
+    GEMINI_BATCH_MAX_SIZE: int = Field(
+        8,
+        description="Número máximo de documentos por lote",
+        ge=1
+    )
+
+    GEMINI_BATCH_CHAR_BUDGET: int = Field(
+        12000,
+        description="Presupuesto total de caracteres de texto por lote",
+        ge=1000
+    )
+
+    GEMINI_BATCH_SMALL_DOC_CHARS: int = Field(
+        3000,
+        description="Tamaño máximo (caracteres de texto extraído) para que un documento se agrupe",
+        ge=1
+    )
+
+    # ===== PLAZOS Y HEDGING DE LLAMADAS A IA =====
+    UPLOAD_DEADLINE_SECONDS: float = Field(
+        90.0,
+        description=(
+            "Plazo total (s) de una subida; la llamada a IA recibe el tiempo restante. "
+            "El cliente puede acortarlo con la cabecera X-Request-Timeout"
+        ),
+        gt=0
+    )
+
+    AI_MIN_CALL_BUDGET_SECONDS: float = Field(
+        2.0,
+        description="Presupuesto mínimo (s) para intentar la llamada a IA; con menos se usa el extractor local",
+        ge=0
+    )
+
+    AI_HEDGING_ENABLED: bool = Field(
+        False,
+        description="Lanza una segunda llamada a IA si la primera supera el p95 de latencia y usa la primera respuesta"
+    )
+
+    AI_HEDGE_PERCENTILE: float = Field(
+        0.95,
+        description="Percentil de latencia observada tras el que se lanza la llamada de respaldo",
+        gt=0,
+        le=1
+    )
+
+    AI_HEDGE_MIN_DELAY_MS: int = Field(
+        1000,
+        description="Retardo mínimo (ms) antes de lanzar la llamada de respaldo (y el usado sin historial)",
+        ge=0
+    )
+
+    AI_HEDGE_MAX_RATIO: float = Field(
+        0.05,
+        description="Fracción máxima de llamadas a IA que pueden duplicarse (acota el coste)",
+        ge=0,
+        le=1
+    )
+
     # ===== CONFIGURACIÓN DE MEILISEARCH =====
     MEILISEARCH_HOST: str = Field(
         ...,  # Campo requerido
@@ -94,6 +192,287 @@ class Settings(BaseSettings):
         min_length=16  # Si se proporciona, debe tener al menos 16 caracteres
     )
 
+    MEILISEARCH_MAX_TOTAL_HITS: int = Field(
+        1000,
+        description="Resultados máximos alcanzables con paginación por offset (pagination.maxTotalHits)",
+        ge=1
+    )
+
+    MEILISEARCH_SYNONYMS_FILE: str | None = Field(
+        None,
+        description="JSON (relativo a backend/) con grupos de sinónimos que sustituye al diccionario por defecto"
+    )
+
+    MEILISEARCH_POOL_MAX_CONNECTIONS: int = Field(
+        100,
+        description="Conexiones simultáneas máximas del cliente asíncrono de búsqueda",
+        ge=1
+    )
+
+    MEILISEARCH_POOL_MAX_KEEPALIVE: int = Field(
+        20,
+        description="Conexiones keep-alive inactivas que conserva el pool de búsqueda",
+        ge=0
+    )
+
+    MEILISEARCH_CONNECT_TIMEOUT_MS: int = Field(
+        2000,
+        description="Timeout (ms) al abrir una conexión con Meilisearch desde la ruta de búsqueda",
+        ge=1
+    )
+
+    MEILISEARCH_SEARCH_TIMEOUT_MS: int = Field(
+        5000,
+        description="Timeout (ms) de una búsqueda en Meilisearch (incluida la espera de conexión del pool)",
+        ge=1
+    )
+
+    SEARCH_CACHE_ENABLED: bool = Field(
+        True,
+        description="Cachea en memoria los resultados de búsqueda (se invalidan con cada escritura confirmada)"
+    )
+
+    SEARCH_CACHE_MAX_ENTRIES: int = Field(
+        1024,
+        description="Número máximo de búsquedas cacheadas (expulsión LRU)",
+        ge=1
+    )
+
+    SEARCH_CACHE_TTL_SECONDS: float = Field(
+        30.0,
+        description="Tiempo máximo (s) que se sirve un resultado cacheado",
+        gt=0
+    )
+
+    SEARCH_CROP_ATTRIBUTES: str = Field(
+        "summary",
+        description="Atributos (separados por comas) que la búsqueda recorta alrededor de los términos encontrados"
+    )
+
+    SEARCH_CROP_LENGTH: int = Field(
+        24,
+        description="Palabras de cada fragmento recortado (cropLength de Meilisearch)",
+        ge=1,
+        le=200
+    )
+
+    SEARCH_CROP_MARKER: str = Field(
+        "…",
+        description="Marca que indica que el fragmento recortado continúa"
+    )
+
+    INDEX_TASK_POLL_INTERVAL_MS: int = Field(
+        500,
+        description="Intervalo (ms) entre consultas del estado de las tareas de indexación pendientes",
+        ge=50
+    )
+
+    INDEX_TASK_POLL_BATCH: int = Field(
+        100,
+        description="Máximo de tareas consultadas en cada petición a la API de tareas",
+        ge=1,
+        le=1000
+    )
+
+    INDEX_TASK_MAX_RETRIES: int = Field(
+        3,
+        description="Reintentos automáticos de una escritura fallida en Meilisearch",
+        ge=0
+    )
+
+    INDEX_WAIT_TIMEOUT_MS: int = Field(
+        5000,
+        description="Espera máxima (ms) de las escrituras con wait=True (lectura de lo escrito)",
+        ge=100
+    )
+
+    INDEX_WRITER_MAX_BATCH: int = Field(
+        500,
+        description="Operaciones pendientes que disparan el envío inmediato de un lote a Meilisearch",
+        ge=1
+    )
+
+    INDEX_WRITER_FLUSH_INTERVAL_MS: int = Field(
+        1000,
+        description="Tiempo máximo (ms) que una escritura espera en el buffer antes de enviarse",
+        ge=10
+    )
+
+    INDEX_WRITER_SPOOL_PATH: str = Field(
+        "../meilisearch-data/index_writer_spool.jsonl",
+        description="Fichero (relativo a backend/) donde se guardan las escrituras pendientes al cerrar"
+    )
+
+    REINDEX_BATCH_SIZE: int = Field(
+        1000,
+        description="Documentos por lote al cargar el índice sombra durante una reconstrucción",
+        ge=1
+    )
+
+    REINDEX_TASK_TIMEOUT_MS: int = Field(
+        300000,
+        description="Espera máxima (ms) de cada tarea de Meilisearch durante una reconstrucción",
+        ge=1000
+    )
+
+    # ===== PARTICIONES DEL ÍNDICE POR AÑO =====
+    INDEX_PARTITIONING_ENABLED: bool = Field(
+        False,
+        description="Un índice por año de la fecha del documento (documents_2024, documents_undated...); tras activarlo, reconstruir el índice"
+    )
+
+    INDEX_PARTITION_REFRESH_SECONDS: float = Field(
+        30.0,
+        description="Segundos entre relecturas de la lista de particiones (las creadas por otros workers)",
+        gt=0
+    )
+
+    # ===== MOTOR DE BÚSQUEDA DE RESPALDO =====
+    SEARCH_ENGINE: str = Field(
+        "meilisearch",
+        description="Motor de búsqueda: meilisearch (con respaldo automático) o sqlite (solo el motor embebido)",
+        pattern="^(meilisearch|sqlite)$"
+    )
+
+    MEILISEARCH_CIRCUIT_FAILURE_THRESHOLD: int = Field(
+        5,
+        description="Fallos consecutivos de Meilisearch que abren el circuito y desvían las búsquedas al respaldo",
+        ge=1
+    )
+
+    MEILISEARCH_CIRCUIT_RESET_SECONDS: float = Field(
+        30.0,
+        description="Segundos con el circuito abierto antes de volver a probar Meilisearch",
+        gt=0
+    )
+
+    FALLBACK_SEARCH_ENABLED: bool = Field(
+        True,
+        description="Atender las búsquedas con SQLite FTS5 cuando Meilisearch no está disponible"
+    )
+
+    FALLBACK_SEARCH_DB_PATH: str = Field(
+        "../meilisearch-data/fallback_search.sqlite3",
+        description="Base de datos SQLite (relativa a backend/) del motor de respaldo"
+    )
+
+    FALLBACK_SEARCH_SYNC_INTERVAL_SECONDS: float = Field(
+        10.0,
+        description="Segundos entre sincronizaciones del motor de respaldo con el almacén de metadatos",
+        gt=0
+    )
+
+    # ===== BÚSQUEDA HÍBRIDA (VECTORES) =====
+    HYBRID_SEARCH_ENABLED: bool = Field(
+        False,
+        description="Indexa un vector por documento y combina la búsqueda por palabras con la semántica"
+    )
+
+    HYBRID_SEMANTIC_RATIO: float = Field(
+        0.5,
+        description="Peso de la puntuación semántica en la búsqueda híbrida (0: solo palabras, 1: solo vectores)",
+        ge=0.0,
+        le=1.0
+    )
+
+    EMBEDDER: str = Field(
+        "hashing",
+        description="Embedder: hashing (determinista, sin dependencias) o sentence_transformers (modelo local)",
+        pattern="^(hashing|sentence_transformers)$"
+    )
+
+    EMBEDDING_MODEL: str = Field(
+        "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+        description="Modelo local del embedder sentence_transformers"
+    )
+
+    EMBEDDING_DIMENSIONS: int = Field(
+        384,
+        description="Dimensiones de los vectores (deben coincidir con las del modelo)",
+        ge=8,
+        le=4096
+    )
+
+    EMBEDDING_WORKERS: int = Field(
+        2,
+        description="Procesos del pool que calcula los embeddings (0: en el proceso de la aplicación)",
+        ge=0
+    )
+
+    EMBEDDING_BATCH_SIZE: int = Field(
+        64,
+        description="Textos por lote enviado al pool de embeddings",
+        ge=1
+    )
+
+    # ===== DOCUMENTOS SIMILARES (MINHASH/LSH) =====
+    SIMILAR_MAX_NEIGHBORS: int = Field(
+        10,
+        description="Vecinos precalculados que se guardan por documento (acota la memoria por documento)",
+        ge=1,
+        le=100
+    )
+
+    SIMILAR_MIN_SCORE: float = Field(
+        0.2,
+        description="Similitud de Jaccard estimada mínima para considerar dos documentos vecinos",
+        ge=0.0,
+        le=1.0
+    )
+
+    MINHASH_PERMUTATIONS: int = Field(
+        64,
+        description="Valores de la firma MinHash de cada documento",
+        ge=8,
+        le=512
+    )
+
+    MINHASH_BANDS: int = Field(
+        16,
+        description="Bandas LSH (deben dividir a MINHASH_PERMUTATIONS; más bandas encuentran vecinos menos parecidos)",
+        ge=1
+    )
+
+    # ===== DETECCIÓN DE CASI DUPLICADOS =====
+    NEAR_DUPLICATE_DETECTION_ENABLED: bool = Field(
+        True,
+        description="Comparar el texto de cada subida con los documentos ya subidos (MinHash/LSH)"
+    )
+
+    NEAR_DUPLICATE_THRESHOLD: float = Field(
+        0.8,
+        description="Similitud estimada del texto a partir de la cual un documento es casi duplicado de otro",
+        ge=0.5,
+        le=1.0
+    )
+
+    NEAR_DUPLICATE_REUSE_METADATA: bool = Field(
+        False,
+        description="Reutilizar los metadatos del original en los casi duplicados en lugar de llamar a la IA"
+    )
+
+    NEAR_DUPLICATE_DB_PATH: str = Field(
+        "../meilisearch-data/near_duplicates.sqlite3",
+        description="Base de datos SQLite (relativa a backend/) con las firmas de texto de los documentos"
+    )
+
+    # ===== ETIQUETAS CANÓNICAS DE PALABRAS CLAVE =====
+    KEYWORD_DICTIONARY_PATH: str = Field(
+        "../meilisearch-data/keyword_tags.json",
+        description="Diccionario (relativo a backend/) con la forma de mostrar de cada etiqueta y los alias manuales"
+    )
+
+    # ===== CONTROL DE ACCESO EN LAS BÚSQUEDAS =====
+    SEARCH_ACCESS_CONTROL_ENABLED: bool = Field(
+        False,
+        description="Exigir token en búsquedas y subidas y limitar cada usuario a sus documentos y los de su departamento"
+    )
+
+    SEARCH_SHARE_UNOWNED_DOCUMENTS: bool = Field(
+        True,
+        description="Los documentos sin propietario (anteriores al control de acceso) son visibles para todos"
+    )
+
     # ===== CONFIGURACIÓN DE SEGURIDAD =====
     SECRET_KEY: str = Field(
         ...,  # Campo requerido
@@ -160,6 +539,10 @@ def validar_configuracion():
     if not settings.FIREBASE_STORAGE_BUCKET.endswith('.appspot.com'):
         errores.append("El bucket de Firebase Storage debe terminar en '.appspot.com'")
     
+    # Validar clave de Gemini si es el proveedor activo
+    if settings.LLM_PROVIDER == "gemini" and not settings.GEMINI_API_KEY:
+        errores.append("GEMINI_API_KEY es obligatoria cuando LLM_PROVIDER=gemini")
+    
     # Validar formato de la URL de Meilisearch
     if not settings.MEILISEARCH_HOST.startswith(('http://', 'https://')):
         errores.append("MEILISEARCH_HOST debe ser una URL completa (http:// o https://)")
@@ -197,6 +580,7 @@ if __name__ == "__main__":
         print(f"   • Archivo de credenciales Firebase: {settings.FIREBASE_SERVICE_ACCOUNT_KEY_PATH}")
         print(f"   • Bucket de Storage: {settings.FIREBASE_STORAGE_BUCKET}")
         print(f"   • Clave Gemini API: {settings.GEMINI_API_KEY[:8]}..." if settings.GEMINI_API_KEY else "   • Clave Gemini API: NO CONFIGURADA")
+        print(f"   • Proveedor de IA: {settings.LLM_PROVIDER} ({settings.LLM_MODEL})")
         print(f"   • Host Meilisearch: {settings.MEILISEARCH_HOST}")
         print(f"   • Clave Meilisearch: {'✅ Configurada' if settings.MEILISEARCH_MASTER_KEY else '⚠️  No configurada (opcional)'}")
         print(f"   • Clave secreta: {'✅ Configurada' if settings.SECRET_KEY else '❌ No configurada'}")
@@ -221,6 +605,7 @@ FIREBASE_STORAGE_BUCKET=tu-proyecto.appspot.com
 
 # Google Gemini AI
 GEMINI_API_KEY=tu-clave-de-gemini-aqui
+LLM_PROVIDER=gemini  # fake para pruebas de carga sin red
 
 # Meilisearch Configuration
 MEILISEARCH_HOST=http://localhost:7700
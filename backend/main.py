@@ -10,8 +10,8 @@ búsquedas rápidas y tolerantes a errores tipográficos.
 """
 
 # backend/main.py
-from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, status, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
@@ -21,8 +21,17 @@ from config import settings
 from services.firebase_service import (
     initialize_firebase, get_firestore_client, get_auth_client
 )
-from services.meilisearch_service import initialize_meilisearch
+from services.meilisearch_service import initialize_meilisearch, task_tracker
+from services.index_writer import index_writer
+from services.meilisearch_async import async_client as meilisearch_async_client, meilisearch_circuit
+from services.fallback_search import fallback_search
+from services.keyword_tags import keyword_dictionary
+from services.near_duplicates import near_duplicate_index
+from services.similarity_index import similarity_index
+from services.suggest_index import suggest_index
+from services.embeddings import embedding_pool
 from utils.audit_logger import log_event
+from utils.metrics import metrics
 from routes import auth_routes, document_routes, audit_routes, user_routes
 
 # ==================================================================================
@@ -80,10 +89,32 @@ async def lifespan(app: FastAPI):
         # print("✅ Meilisearch inicializado correctamente")
         
     except Exception as e:
-        # En caso de error, registra el problema pero permite que la app continúe
+        # En caso de error, registra el problema pero permite que la app continúe:
+        # las búsquedas pasan al motor de respaldo hasta que Meilisearch responda
         print(f"❌ ERROR: No se pudo inicializar Meilisearch: {e}")
+        meilisearch_circuit.trip()
         # Descomenta la siguiente línea para forzar el cierre en caso de error
         # raise
+    
+    # El rastreador de tareas y el escritor agrupado arrancan siempre: si Meilisearch
+    # no estaba disponible, las escrituras fallidas quedan registradas y se reintentan.
+    # El escritor reenvía además las escrituras guardadas en el spool al cerrar.
+    task_tracker.start()
+    index_writer.start()
+    
+    # Motor de búsqueda de respaldo (SQLite FTS5), sincronizado con el almacén de metadatos
+    if settings.FALLBACK_SEARCH_ENABLED or settings.SEARCH_ENGINE == "sqlite":
+        fallback_search.start()
+    
+    # Índice de autocompletado: se carga en segundo plano (mientras tanto responde Meilisearch)
+    suggest_index.start()
+    
+    # Tabla de documentos similares (MinHash/LSH): también se carga en segundo plano
+    similarity_index.start()
+    
+    # Pool de procesos de embeddings (búsqueda híbrida): arrancado antes de la primera ingesta
+    if settings.HYBRID_SEARCH_ENABLED:
+        await asyncio.to_thread(embedding_pool.start)
 
     # 3. Creación de usuario administrador inicial (SOLO EN DESARROLLO)
     if settings.APP_ENV == "development":
@@ -96,9 +127,17 @@ async def lifespan(app: FastAPI):
     # Mensaje de depuración - comentado para producción
     # print("🔄 Cerrando la aplicación backend...")
     
-    # Aquí se pueden añadir tareas de limpieza si son necesarias
-    # Por ejemplo: cerrar conexiones a bases de datos, limpiar archivos temporales, etc.
-    pass
+    # Vaciar el escritor agrupado y detener el rastreador de tareas de
+    # Meilisearch (última consulta); las escrituras sin confirmar se guardan
+    # en el spool
+    index_writer.stop()
+    fallback_search.stop()
+    near_duplicate_index.close()
+    keyword_dictionary.flush()
+    embedding_pool.stop()
+    
+    # Cerrar el pool de conexiones del cliente asíncrono de búsqueda
+    await meilisearch_async_client.aclose()
 
 
 async def _crear_usuario_admin_inicial():
@@ -310,6 +349,29 @@ async def health_check():
     }
 
 
+@app.get(
+    "/metrics",
+    summary="Métricas de la aplicación",
+    description="Métricas internas en formato de texto de Prometheus (o JSON con ?format=json)",
+    tags=["🏠 General"]
+)
+async def get_metrics(
+    format: str = Query(default="prometheus", pattern=r"^(prometheus|json)$", description="Formato de salida")
+):
+    """
+    Endpoint con las métricas internas del backend.
+    
+    Incluye, entre otras, las métricas de las llamadas a la IA agregadas
+    por modelo (latencia, tokens, truncado de texto y estrategia de parseo).
+    
+    Returns:
+        PlainTextResponse | dict: Métricas en el formato solicitado
+    """
+    if format == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(metrics.render_prometheus())
+
+
 # ==================================================================================
 #                           MANEJO GLOBAL DE ERRORES
 # ==================================================================================
@@ -9,6 +9,8 @@ Modelos incluidos:
 - DocumentMetadata: Metadatos completos de un documento procesado
 - DocumentSearchResult: Resultado de búsqueda con información destacada
 - DocumentUploadResponse: Respuesta del proceso de subida
+- DocumentSearchRequest: Búsqueda avanzada con filtros, ordenación y facetas
+- MultiSearchRequest: Varias búsquedas en una sola petición
 
 Características de Pydantic:
 - Validación automática de tipos de datos
@@ -47,9 +49,16 @@ class DocumentMetadata(BaseModel):
         title: Título extraído por IA o derivado del nombre de archivo
         summary: Resumen del contenido generado por IA
         keywords: Lista de palabras clave extraídas por IA
+        keyword_tags: Etiquetas canónicas de las palabras clave (facetas y filtros)
         date: Fecha del documento (extraída por IA o fecha de procesamiento)
+        date_ts, date_year, date_month, date_known: Fecha normalizada para filtros y ordenación
         storage_path: Ruta del archivo en Cloud Storage
         media_type: Tipo MIME del archivo
+        enrichment_status: Origen de los metadatos (IA, extractor local o provisional)
+        duplicate_of: Documento original si este es un casi duplicado
+        duplicate_score: Similitud estimada con el original
+        owner_uid: Usuario que subió el documento
+        department: Departamento del propietario
     """
     
     # ===== IDENTIFICACIÓN DEL DOCUMENTO =====
@@ -105,18 +114,86 @@ class DocumentMetadata(BaseModel):
         example=["contrato", "servicios", "legal", "términos", "condiciones"]
     )
     
+    keyword_tags: Optional[List[str]] = Field(
+        default=None,
+        description="Palabras clave en forma canónica (minúsculas, sin tildes, en singular) para facetas y filtros",
+        example=["contrato", "servicio", "legal", "termino", "condicion"]
+    )
+    
     date: str = Field(
         ...,
         description="Fecha del documento en formato YYYY-MM-DD (extraída por IA)",
         example="2024-06-05"
     )
     
+    # ===== FECHA NORMALIZADA (FILTROS Y ORDENACIÓN) =====
+    date_ts: Optional[int] = Field(
+        default=None,
+        description="Fecha del documento en milisegundos desde epoch (UTC); nula si no se reconoció",
+        example=1717545600000
+    )
+    
+    date_year: Optional[int] = Field(
+        default=None,
+        description="Año de la fecha del documento (faceta)",
+        example=2024
+    )
+    
+    date_month: Optional[int] = Field(
+        default=None,
+        description="Mes de la fecha del documento, 1-12 (faceta)",
+        ge=1,
+        le=12,
+        example=6
+    )
+    
+    date_known: Optional[bool] = Field(
+        default=None,
+        description="False si la fecha extraída no es una fecha reconocible ('Fecha no encontrada', etc.)",
+        example=True
+    )
+    
     # ===== INFORMACIÓN DE ALMACENAMIENTO =====
     storage_path: str = Field(
         ...,
         description="Ruta del archivo en Cloud Storage",
         example="documents/2024/06/05/contrato_empresa_2024.pdf"
     )
+    
+    # ===== ESTADO DEL ENRIQUECIMIENTO =====
+    enrichment_status: Optional[str] = Field(
+        default=None,
+        description="Origen de los metadatos: complete (Gemini), provisional, local, fallback o duplicate (copiados del original)",
+        example="complete"
+    )
+    
+    # ===== CASI DUPLICADOS =====
+    duplicate_of: Optional[str] = Field(
+        default=None,
+        description="ID del documento del que este es un casi duplicado (mismo texto salvo pequeñas diferencias)",
+        example="informe_anual_2024"
+    )
+    
+    duplicate_score: Optional[float] = Field(
+        default=None,
+        description="Similitud estimada del texto con el original",
+        ge=0.0,
+        le=1.0,
+        example=0.93
+    )
+    
+    # ===== PROPIEDAD (CONTROL DE ACCESO) =====
+    owner_uid: Optional[str] = Field(
+        default=None,
+        description="UID del usuario que subió el documento",
+        example="abc123xyz789"
+    )
+    
+    department: Optional[str] = Field(
+        default=None,
+        description="Departamento del propietario (sus miembros también ven el documento)",
+        example="legal"
+    )
 
     # ===== CONFIGURACIÓN DE PYDANTIC V2 =====
     model_config = {
@@ -243,6 +320,13 @@ class DocumentSearchRequest(BaseModel):
         offset: Número de resultados a omitir (paginación)
         filters: Filtros en formato Meilisearch
         sort: Campos de ordenación
+        facets: Atributos de los que devolver la distribución de valores
+        pagination: Modo de paginación (offset o cursor)
+        cursor: Cursor de la página siguiente (paginación por cursor)
+        crop_length: Palabras de cada fragmento recortado
+        crop_attributes: Atributos a recortar alrededor de los términos encontrados
+        hit_format: Formato de cada resultado (full o compact)
+        semantic_ratio: Peso semántico de la búsqueda híbrida (0: solo palabras)
     """
     
     query: str = Field(
@@ -276,7 +360,75 @@ class DocumentSearchRequest(BaseModel):
     sort: Optional[List[str]] = Field(
         default=None,
         description="Lista de campos de ordenación",
-        example=["date:desc", "title:asc"]
+        example=["date_ts:desc", "title:asc"]
+    )
+    
+    facets: Optional[List[str]] = Field(
+        default=None,
+        description="Facetas a calcular (por defecto file_extension, keyword_tags y date_year; lista vacía para ninguna)",
+        example=["file_extension", "keyword_tags"]
+    )
+    
+    pagination: str = Field(
+        "offset",
+        description="Paginación por offset o por cursor (listados ordenados con query vacía; solo POST /search)",
+        pattern="^(offset|cursor)$",
+        example="cursor"
+    )
+    
+    cursor: Optional[str] = Field(
+        default=None,
+        description="Valor de nextCursor de la página anterior (implica paginación por cursor)",
+        max_length=8192
+    )
+    
+    crop_length: Optional[int] = Field(
+        default=None,
+        description="Palabras de cada fragmento recortado (por defecto SEARCH_CROP_LENGTH)",
+        ge=1,
+        le=200,
+        example=20
+    )
+    
+    crop_attributes: Optional[List[str]] = Field(
+        default=None,
+        description="Atributos a recortar alrededor de los términos encontrados (por defecto SEARCH_CROP_ATTRIBUTES)",
+        example=["summary"]
+    )
+    
+    hit_format: str = Field(
+        "full",
+        description="full: documento completo con _formatted; compact: solo id, título, fragmento y puntuación",
+        pattern="^(full|compact)$",
+        example="compact"
+    )
+    
+    semantic_ratio: Optional[float] = Field(
+        default=None,
+        description="Peso semántico de la búsqueda híbrida (por defecto HYBRID_SEMANTIC_RATIO; requiere HYBRID_SEARCH_ENABLED)",
+        ge=0.0,
+        le=1.0,
+        example=0.7
+    )
+
+
+class MultiSearchRequest(BaseModel):
+    """
+    Modelo para ejecutar varias búsquedas en una sola petición.
+    
+    Attributes:
+        queries: Búsquedas a ejecutar (mismo formato que DocumentSearchRequest)
+    """
+    
+    queries: List[DocumentSearchRequest] = Field(
+        ...,
+        description="Búsquedas a ejecutar en un único viaje a Meilisearch",
+        min_length=1,
+        max_length=20,  # Máximo 20 búsquedas por petición
+        example=[
+            {"query": "", "sort": ["created_at:desc"], "limit": 5, "facets": []},
+            {"query": "contrato", "filters": "file_extension = .pdf"}
+        ]
     )
 
 
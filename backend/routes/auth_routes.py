@@ -26,9 +26,11 @@ Dependencias:
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from typing import Annotated
+from typing import Annotated, Optional
 from pydantic import BaseModel
 
+from config import settings
+
 # Importaciones de servicios locales
 from services.auth_service import (
     register_user,
@@ -52,6 +54,14 @@ oauth2_scheme = OAuth2PasswordBearer(
     description="Token JWT de Firebase Authentication"
 )
 
+# Variante sin error automático: el token es opcional mientras el control de
+# acceso a documentos (SEARCH_ACCESS_CONTROL_ENABLED) esté desactivado
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl="auth/login",
+    description="Token JWT de Firebase Authentication",
+    auto_error=False
+)
+
 
 # ==================================================================================
 #                           DEPENDENCIAS DE AUTENTICACIÓN
@@ -159,6 +169,56 @@ async def get_current_admin_user(
     return current_user
 
 
+async def get_optional_user(
+    token: Annotated[Optional[str], Depends(optional_oauth2_scheme)]
+) -> Optional[TokenData]:
+    """
+    Dependencia para endpoints de documentos que funcionan con o sin sesión.
+    
+    Con SEARCH_ACCESS_CONTROL_ENABLED el token es obligatorio (las búsquedas
+    se limitan a los documentos del usuario). Sin él, se verifica si se
+    envía (para marcar el propietario de las subidas) y, si no, el
+    endpoint se ejecuta sin usuario.
+    
+    Args:
+        token: Token JWT del header Authorization, si lo hay
+        
+    Returns:
+        Optional[TokenData]: Usuario autenticado, o None si no hay token
+        
+    Raises:
+        HTTPException 401: Si el control de acceso está activo y no hay token,
+                           o si el token es inválido
+    """
+    if token is None:
+        if settings.SEARCH_ACCESS_CONTROL_ENABLED:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Se requiere autenticación para acceder a los documentos.",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return None
+    return await get_current_user(token)
+
+
+async def get_search_user(
+    token: Annotated[Optional[str], Depends(optional_oauth2_scheme)]
+) -> Optional[TokenData]:
+    """
+    Dependencia de los endpoints de búsqueda: el usuario cuyo filtro de
+    acceso se aplica (services.access_control).
+    
+    Con el control de acceso desactivado no verifica ningún token (las
+    búsquedas no dependen del usuario) y devuelve None.
+    
+    Raises:
+        HTTPException 401: Si el control de acceso está activo y el token falta o es inválido
+    """
+    if not settings.SEARCH_ACCESS_CONTROL_ENABLED:
+        return None
+    return await get_optional_user(token)
+
+
 # ==================================================================================
 #                           ENDPOINTS DE AUTENTICACIÓN
 # ==================================================================================
@@ -13,17 +13,27 @@ de documentos en el sistema. Proporciona una API REST completa para:
 Endpoints disponibles:
 - POST /upload: Sube un documento y extrae metadatos automáticamente
 - GET /search: Búsqueda inteligente de documentos por contenido
+- POST /search: Búsqueda avanzada con filtros, ordenación y facetas
+- POST /multi-search: Varias búsquedas en una sola petición
+- GET /suggest: Sugerencias de autocompletado (títulos y palabras clave)
+- GET /{document_id}/similar: Documentos similares precalculados (MinHash/LSH)
 - GET /download/{file_stem}: Descarga directa por ID de documento
 - GET /download_by_path: Descarga por ruta completa en storage
 - GET /list: Lista todos los documentos disponibles
 - GET /storage: Explora archivos en Firebase Storage
+- GET /index/tasks: Estado de las tareas de indexación (administradores)
+- POST /index/tasks/retry: Reintenta escrituras fallidas en Meilisearch (administradores)
+- POST /index/rebuild: Reconstruye el índice sin cortar las búsquedas (administradores)
+- GET /index/rebuild: Progreso de la reconstrucción del índice (administradores)
+- POST /index/backfill: Calcula campos derivados en documentos existentes (administradores)
+- GET /index/backfill: Progreso del backfill de metadatos (administradores)
 
 Flujo de procesamiento de documentos:
 1. Recepción del archivo por HTTP multipart
 2. Subida a Firebase Storage con organización por fechas
 3. Extracción de metadatos con Gemini AI
 4. Persistencia local de metadatos en JSON
-5. Indexado en Meilisearch para búsquedas
+5. Encolado en Meilisearch para búsquedas (escritura agrupada, confirmada en segundo plano)
 6. Respuesta con metadatos completos al cliente
 
 Características de seguridad:
@@ -36,24 +46,40 @@ Características de seguridad:
 """
 
 import os
-import json
+import time
 import uuid
 import mimetypes
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+from datetime import datetime, timezone
+from typing import Annotated, Dict, List, Any, Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Query, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, status, Query, Depends, BackgroundTasks, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 
 # Servicios internos
 from services.firebase_service import upload_file_to_storage, download_file_from_storage, list_files_in_storage
-from services.meilisearch_service import add_documents, search_documents
-from services.gemini_service import extract_metadata, is_supported_file, estimate_processing_time
+from services.meilisearch_service import SEARCH_FACETS, date_fields, task_tracker
+from services.meilisearch_async import (
+    multi_search_documents_async, search_documents_async, search_documents_cursor_async, suggest_documents_async
+)
+from services.access_control import access_filter, can_access, owner_fields, scope_filters
+from services.index_writer import index_writer
+from services.index_rebuild import index_rebuild
+from services.keyword_tags import keyword_dictionary, keyword_fields
+from services.metadata_backfill import metadata_backfill
+from services.near_duplicates import near_duplicate_index
+from services.similarity_index import similarity_index
+from services.suggest_index import suggest_index
+from services.metadata_store import LOCAL_METADATA_DIR, iter_metadata, list_metadata, load_metadata, save_metadata
+from services.gemini_service import extract_metadata, extract_text, is_supported_file, estimate_processing_time
 
 # Modelos y utilidades
-from models.document_model import DocumentMetadata
+from config import settings
+from models.document_model import DocumentMetadata, DocumentSearchRequest, MultiSearchRequest
 from utils.audit_logger import log_event
+from routes.auth_routes import get_current_admin_user, get_optional_user, get_search_user
+from services.auth_service import TokenData
 
 
 # ==================================================================================
@@ -78,10 +104,6 @@ router = APIRouter(
 # Directorio raíz del backend
 ROOT_DIR = Path(__file__).resolve().parents[1]  # .../backend
 
-# Directorio para almacenar metadatos localmente (backup y cache)
-LOCAL_METADATA_DIR = ROOT_DIR / ".." / "meilisearch-data" / "indexes" / "documents"
-LOCAL_METADATA_DIR.mkdir(parents=True, exist_ok=True)
-
 # Configuraciones de archivos
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB máximo
 ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.pptx', '.xlsx', '.txt', '.md'}
@@ -130,10 +152,10 @@ def _validate_uploaded_file(file: UploadFile) -> None:
 
 def _save_metadata_locally(metadata: Dict[str, Any], filename: str) -> Path:
     """
-    Guarda los metadatos del documento en el sistema de archivos local.
+    Guarda los metadatos del documento en el almacén local (services.metadata_store).
     
-    Esto sirve como backup y para consultas rápidas sin depender
-    de servicios externos.
+    Esto sirve como backup, para consultas rápidas sin depender de
+    servicios externos y como origen de las reconstrucciones del índice.
     
     Args:
         metadata: Metadatos extraídos del documento
@@ -142,18 +164,7 @@ def _save_metadata_locally(metadata: Dict[str, Any], filename: str) -> Path:
     Returns:
         Path: Ruta donde se guardaron los metadatos
     """
-    # Crear nombre del archivo JSON basado en el archivo original
-    json_filename = f"{Path(filename).stem}.json"
-    json_path = LOCAL_METADATA_DIR / json_filename
-    
-    # Guardar metadatos con formato legible
-    with open(json_path, "w", encoding="utf-8") as file:
-        json.dump(metadata, file, ensure_ascii=False, indent=2)
-    
-    # Mensaje de depuración - comentado para producción
-    # print(f"📁 Metadatos guardados en: {json_path.relative_to(ROOT_DIR.parent)}")
-    
-    return json_path
+    return save_metadata(metadata, filename)
 
 
 def _generate_unique_filename(original_filename: str) -> str:
@@ -173,12 +184,127 @@ def _generate_unique_filename(original_filename: str) -> str:
     return f"{path.stem}_{timestamp}_{unique_id}{path.suffix}"
 
 
+def _reuse_duplicate_metadata(original: Dict[str, Any], file_bytes: bytes, filename: str, text_content: str) -> Dict[str, Any]:
+    """
+    Metadatos de un casi duplicado copiados del original, sin llamada a IA.
+    
+    Los campos del archivo (ID, nombre, tamaño) son los del nuevo documento;
+    título, resumen, palabras clave y fecha, los del original.
+    
+    Args:
+        original: Metadatos guardados del documento original
+        file_bytes: Contenido del archivo subido
+        filename: Nombre original del archivo subido
+        text_content: Texto extraído del archivo subido
+        
+    Returns:
+        Dict[str, Any]: Metadatos con el formato de extract_metadata
+    """
+    path = Path(filename)
+    return {
+        "id": path.stem,
+        "filename": filename,
+        "file_extension": path.suffix.lower(),
+        "file_size_bytes": len(file_bytes),
+        "title": original["title"],
+        "summary": original["summary"],
+        "keywords": original["keywords"],
+        "date": original["date"],
+        "processing_timestamp": datetime.now().isoformat() + "Z",
+        "ai_model": original.get("ai_model"),
+        "enrichment_status": "duplicate",
+        "text_length": len(text_content)
+    }
+
+
+def _with_facet_labels(search_results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Añade facetLabels con la forma de mostrar de las etiquetas canónicas
+    que aparecen en facetDistribution (ej: "evaluacion" -> "evaluación").
+    """
+    tags = (search_results.get("facetDistribution") or {}).get("keyword_tags")
+    if not tags:
+        return search_results
+    return {**search_results, "facetLabels": {"keyword_tags": keyword_dictionary.labels(tags)}}
+
+
+def _storage_path_visible(user: Optional[TokenData], path: str) -> bool:
+    """
+    Si el usuario puede descargar un archivo por su ruta en Storage: con el
+    control de acceso activo la ruta debe ser la de un documento que pueda
+    ver (solo entonces se recorre el almacén de metadatos).
+    """
+    if not settings.SEARCH_ACCESS_CONTROL_ENABLED or (user is not None and user.is_admin):
+        return True
+    metadata = next((document for document in iter_metadata() if document.get("storage_path") == path), None)
+    return metadata is not None and can_access(user, metadata)
+
+
+def _enrich_document_with_ai(file_bytes: bytes, filename: str, provisional_metadata: Dict[str, Any]) -> None:
+    """
+    Completa con Gemini AI un documento indexado con metadatos provisionales.
+    
+    Se ejecuta como tarea en segundo plano después de responder al cliente
+    (modo de enriquecimiento "provisional"). Sustituye los campos generados
+    por el extractor local, actualiza la copia local y reindexa el documento.
+    
+    Args:
+        file_bytes: Contenido del archivo
+        filename: Nombre original del archivo
+        provisional_metadata: Metadatos completos guardados durante la subida
+    """
+    try:
+        ai_metadata = extract_metadata(file_bytes, filename, use_ai=True)
+        
+        enriched_metadata = {
+            **provisional_metadata,
+            "title": ai_metadata["title"],
+            "summary": ai_metadata["summary"],
+            "keywords": ai_metadata["keywords"],
+            **keyword_fields(ai_metadata["keywords"]),
+            "date": ai_metadata["date"],
+            **date_fields(ai_metadata["date"]),
+            "ai_model": ai_metadata.get("ai_model"),
+            "enrichment_status": ai_metadata.get("enrichment_status", "complete"),
+            "processing_timestamp": ai_metadata.get("processing_timestamp"),
+        }
+        
+        _save_metadata_locally(enriched_metadata, filename)
+        index_writer.upsert(enriched_metadata)
+        
+        log_event('system', 'DOCUMENT_AI_ENRICHED', {
+            'filename': filename,
+            'enrichment_status': enriched_metadata["enrichment_status"]
+        })
+        
+    except Exception as e:
+        log_event('system', 'DOCUMENT_AI_ENRICHMENT_ERROR', {
+            'filename': filename,
+            'error': str(e),
+            'error_type': type(e).__name__
+        }, severity="WARNING")
+
+
 # ==================================================================================
 #                           ENDPOINTS DE SUBIDA DE DOCUMENTOS
 # ==================================================================================
 
 @router.post("/upload", response_model=DocumentMetadata)
-async def upload_document(file: UploadFile = File(...)) -> DocumentMetadata:
+async def upload_document(
+    background_tasks: BackgroundTasks,
+    current_user: Annotated[Optional[TokenData], Depends(get_optional_user)],
+    file: UploadFile = File(...),
+    enrichment: Optional[str] = Query(
+        default=None,
+        pattern=r"^(sync|provisional|off)$",
+        description="Modo de enriquecimiento con IA (por defecto AI_ENRICHMENT_MODE)"
+    ),
+    x_request_timeout: Optional[float] = Header(
+        default=None,
+        gt=0,
+        description="Tiempo máximo (s) que el cliente esperará la respuesta; acota UPLOAD_DEADLINE_SECONDS"
+    )
+) -> DocumentMetadata:
     """
     Sube un documento y extrae automáticamente sus metadatos.
     
@@ -186,13 +312,36 @@ async def upload_document(file: UploadFile = File(...)) -> DocumentMetadata:
     1. Valida el archivo subido
     2. Lee el contenido del archivo
     3. Sube el archivo a Firebase Storage
-    4. Extrae metadatos usando Gemini AI
+    4. Extrae metadatos usando Gemini AI (o el extractor local, según el modo)
     5. Guarda metadatos localmente (backup)
     6. Indexa el documento en Meilisearch
     7. Registra la operación en logs de auditoría
     
+    Modos de enriquecimiento:
+    - sync: espera a Gemini antes de responder
+    - provisional: responde con metadatos del extractor local y completa
+      con Gemini en segundo plano
+    - off: solo extractor local (importaciones masivas sin IA)
+    
+    Antes de la IA se busca un casi duplicado por el texto extraído
+    (services.near_duplicates): si lo hay, el documento se enlaza al
+    original (duplicate_of) y, con NEAR_DUPLICATE_REUSE_METADATA, reutiliza
+    sus metadatos sin llamar a la IA (enrichment_status "duplicate").
+    
+    Si la petición trae token, el documento queda marcado con el usuario
+    (owner_uid) y su departamento, que limitan quién lo encuentra cuando
+    SEARCH_ACCESS_CONTROL_ENABLED está activo.
+    
+    Cada subida tiene un plazo (UPLOAD_DEADLINE_SECONDS o X-Request-Timeout,
+    el menor) que empieza a contar al recibir la petición. La llamada a IA
+    recibe solo el tiempo restante; si vence, se responde con los metadatos
+    del extractor local (enrichment_status "fallback").
+    
     Args:
+        current_user: Usuario autenticado (opcional sin control de acceso)
         file: Archivo a subir (PDF, DOCX, PPTX, XLSX, TXT, MD)
+        enrichment: Modo de enriquecimiento para esta subida
+        x_request_timeout: Timeout del cliente en segundos (cabecera X-Request-Timeout)
         
     Returns:
         DocumentMetadata: Metadatos completos del documento procesado
@@ -212,6 +361,12 @@ async def upload_document(file: UploadFile = File(...)) -> DocumentMetadata:
             body: formData
         })
     """
+    # El plazo cuenta desde la llamada al endpoint (lectura y Storage incluidos)
+    deadline = time.monotonic() + min(
+        settings.UPLOAD_DEADLINE_SECONDS,
+        x_request_timeout or settings.UPLOAD_DEADLINE_SECONDS
+    )
+    
     try:
         # ===== VALIDACIÓN INICIAL DEL ARCHIVO =====
         _validate_uploaded_file(file)
@@ -251,35 +406,88 @@ async def upload_document(file: UploadFile = File(...)) -> DocumentMetadata:
         # Subir archivo a Firebase Storage con organización por fechas
         storage_path = upload_file_to_storage(file_bytes, unique_filename, content_type)
         
+        # ===== DETECCIÓN DE CASI DUPLICADOS =====
+        # Se compara el texto extraído (no los bytes): un nuevo escaneo o una
+        # nueva exportación del mismo documento también cuenta
+        text_content = await run_in_threadpool(extract_text, file_bytes, file.filename)
+        signature, duplicate = None, None
+        if settings.NEAR_DUPLICATE_DETECTION_ENABLED:
+            signature, duplicate = await run_in_threadpool(
+                near_duplicate_index.check, text_content, Path(file.filename).stem
+            )
+        duplicate_metadata = load_metadata(duplicate["id"]) if duplicate else None
+        if duplicate and not (duplicate_metadata and can_access(current_user, duplicate_metadata)):
+            # Copia de un documento que el usuario no puede ver: no se enlaza ni se reutiliza
+            duplicate, duplicate_metadata = None, None
+        original = duplicate_metadata if settings.NEAR_DUPLICATE_REUSE_METADATA else None
+        
         # ===== EXTRACCIÓN DE METADATOS CON GEMINI AI =====
-        # Extraer metadatos usando IA
-        extracted_metadata = extract_metadata(file_bytes, file.filename)
+        enrichment_mode = enrichment or settings.AI_ENRICHMENT_MODE
+        
+        if original is not None:
+            # Casi duplicado con metadatos reutilizables: sin llamada a IA
+            extracted_metadata = _reuse_duplicate_metadata(original, file_bytes, file.filename, text_content)
+            enrichment_mode = "duplicate"
+        else:
+            # Extraer metadatos (en un hilo: la llamada es bloqueante y,
+            # con micro-batching activo, espera a que se complete su lote)
+            extracted_metadata = await run_in_threadpool(
+                extract_metadata, file_bytes, file.filename, enrichment_mode == "sync", deadline, text_content
+            )
+            if enrichment_mode == "provisional":
+                extracted_metadata["enrichment_status"] = "provisional"
+        
+        if duplicate:
+            extracted_metadata["duplicate_of"] = duplicate["id"]
+            extracted_metadata["duplicate_score"] = duplicate["score"]
+            log_event('system', 'DOCUMENT_NEAR_DUPLICATE', {
+                'filename': file.filename,
+                'duplicate_of': duplicate["id"],
+                'score': duplicate["score"],
+                'metadata_reused': original is not None
+            })
         
         # Enriquecer metadatos con información adicional
+        created_at = datetime.now(timezone.utc)
         complete_metadata = {
             **extracted_metadata,  # Metadatos de Gemini
+            **date_fields(extracted_metadata.get("date")),  # Fecha tipada para rangos y ordenación
+            **keyword_fields(extracted_metadata.get("keywords")),  # Etiquetas canónicas para facetas
+            "created_at": created_at.isoformat().replace("+00:00", "Z"),
+            "created_at_ts": int(created_at.timestamp() * 1000),  # Clave numérica para paginación por cursor
             "storage_path": storage_path,
             "media_type": content_type,
             "original_filename": file.filename,
             "unique_filename": unique_filename,
             "upload_timestamp": datetime.now().isoformat() + "Z",
             "file_hash": str(hash(file_bytes)),  # Hash simple para verificación
-            "processing_time_estimate": estimated_time
+            "processing_time_estimate": estimated_time,
+            **owner_fields(current_user)  # Propietario y departamento (control de acceso)
         }
         
         # ===== PERSISTENCIA LOCAL DE METADATOS =====
+        # Sin versión anterior (un nombre nuevo), el documento no puede estar
+        # ya indexado en otra partición: el escritor no lo busca
+        is_new_document = load_metadata(complete_metadata["id"]) is None
+        
         # Guardar metadatos localmente como backup
         metadata_path = _save_metadata_locally(complete_metadata, file.filename)
         
         # ===== INDEXADO EN MEILISEARCH =====
-        # Indexar documento para búsquedas
-        try:
-            add_documents([complete_metadata])
-            # print(f"🔍 Documento indexado en Meilisearch: {file.filename}")
-        except Exception as e:
-            # No fallar si Meilisearch no está disponible, pero registrar el error
-            # print(f"⚠️  Error indexando en Meilisearch: {e}")
-            pass
+        # Encolar el documento en el escritor agrupado: se envía a Meilisearch
+        # junto con otras subidas (por tamaño de lote o por intervalo) y el
+        # rastreador de tareas confirma la indexación o la reintenta. Los
+        # listeners de escritura (firma MinHash de similares, índice de
+        # sugerencias...) se ejecutan aquí mismo: fuera del event loop
+        await run_in_threadpool(index_writer.upsert, complete_metadata, new=is_new_document)
+        
+        # Firma del texto para detectar futuras copias de este documento
+        if signature is not None:
+            await run_in_threadpool(near_duplicate_index.add, complete_metadata["id"], signature)
+        
+        # ===== ENRIQUECIMIENTO DIFERIDO CON IA =====
+        if enrichment_mode == "provisional":
+            background_tasks.add_task(_enrich_document_with_ai, file_bytes, file.filename, complete_metadata)
         
         # ===== REGISTRO DE AUDITORÍA =====
         log_event('system', 'DOCUMENT_UPLOADED', {
@@ -287,7 +495,8 @@ async def upload_document(file: UploadFile = File(...)) -> DocumentMetadata:
             'storage_path': storage_path,
             'file_size': len(file_bytes),
             'content_type': content_type,
-            'processing_status': 'success'
+            'processing_status': 'success',
+            'enrichment_mode': enrichment_mode
         })
         
         # ===== RESPUESTA EXITOSA =====
@@ -322,9 +531,12 @@ async def upload_document(file: UploadFile = File(...)) -> DocumentMetadata:
 
 @router.get("/search")
 async def search_documents_endpoint(
+    current_user: Annotated[Optional[TokenData], Depends(get_search_user)],
     query: str = Query(..., description="Términos de búsqueda", min_length=1),
     limit: int = Query(default=20, ge=1, le=100, description="Número máximo de resultados"),
-    offset: int = Query(default=0, ge=0, description="Número de resultados a omitir")
+    offset: int = Query(default=0, ge=0, description="Número de resultados a omitir"),
+    crop_length: Optional[int] = Query(default=None, ge=1, le=200, description="Palabras de cada fragmento recortado"),
+    hit_format: str = Query(default="full", pattern="^(full|compact)$", description="Formato de cada resultado (full o compact)")
 ) -> Dict[str, Any]:
     """
     Busca documentos por contenido usando búsqueda semántica.
@@ -337,15 +549,18 @@ async def search_documents_endpoint(
     - Filtros y facetas
     
     Args:
+        current_user: Usuario cuyo filtro de acceso se aplica (con control de acceso)
         query: Términos de búsqueda (requerido)
         limit: Máximo número de resultados a devolver (1-100)
         offset: Número de resultados a omitir para paginación
+        crop_length: Palabras de cada fragmento recortado (por defecto SEARCH_CROP_LENGTH)
+        hit_format: "compact" devuelve solo id, título, fragmento y puntuación
         
     Returns:
         Dict[str, Any]: Resultados de búsqueda con metadatos y estadísticas
         
     Example:
-        GET /api/documents/search?query=contrato&limit=10&offset=0
+        GET /api/documents/search?query=contrato&limit=10&offset=0&hit_format=compact
     """
     try:
         # Validar parámetros de entrada
@@ -355,11 +570,14 @@ async def search_documents_endpoint(
                 detail="La consulta de búsqueda no puede estar vacía"
             )
         
-        # Realizar búsqueda en Meilisearch
-        search_results = search_documents(
+        # Realizar búsqueda en Meilisearch (cliente asíncrono: no bloquea el event loop)
+        search_results = await search_documents_async(
             query=query.strip(),
             limit=limit,
-            offset=offset
+            offset=offset,
+            filters=access_filter(current_user),
+            crop_length=crop_length,
+            compact=hit_format == "compact"
         )
         
         # Registrar búsqueda en auditoría
@@ -386,20 +604,316 @@ async def search_documents_endpoint(
         )
 
 
+@router.post("/search")
+async def search_documents_advanced_endpoint(
+    request: DocumentSearchRequest,
+    current_user: Annotated[Optional[TokenData], Depends(get_search_user)]
+) -> Dict[str, Any]:
+    """
+    Búsqueda avanzada: filtros, ordenación y facetas resueltos por Meilisearch.
+    
+    El filtrado se hace en el motor, no en el navegador: los filtros se
+    validan contra filterableAttributes y la ordenación contra
+    sortableAttributes antes de enviarse. La respuesta incluye
+    facetDistribution (por defecto de file_extension, keyword_tags y
+    date_year) para construir los filtros de la interfaz; facetLabels da la
+    forma de mostrar de cada etiqueta canónica.
+    
+    Con pagination="cursor" los listados ordenados se recorren con cursores
+    opacos (nextCursor) en lugar de offset: cada página cuesta lo mismo sea
+    cual sea su profundidad y no hay límite de maxTotalHits. Solo con query
+    vacía y sin semantic_ratio (con texto el orden es por relevancia).
+    
+    Los resúmenes se devuelven recortados alrededor de los términos
+    encontrados (crop_length). Con hit_format="compact" cada resultado se
+    reduce a id, título, fragmento y puntuación, para enlaces lentos.
+    
+    Con la búsqueda híbrida activa, semantic_ratio combina la puntuación por
+    palabras con la semántica (vectores de services.embeddings), de modo que
+    se encuentran conceptos que no aparecen literalmente en el documento.
+    
+    Con el control de acceso activo, los filtros se combinan con el del
+    usuario (services.access_control): el motor solo ve sus documentos, así
+    que la paginación y las facetas siguen siendo exactas.
+    
+    Args:
+        request: Consulta, paginación, filtros, ordenación, facetas y formato
+        current_user: Usuario cuyo filtro de acceso se aplica (con control de acceso)
+        
+    Returns:
+        Dict[str, Any]: Resultados de Meilisearch con facetDistribution y facetLabels
+        
+    Example:
+        POST /api/documents/search
+        {"query": "contrato", "filters": "file_extension = .pdf", "sort": ["date_ts:desc"]}
+        
+        POST /api/documents/search
+        {"query": "", "pagination": "cursor", "sort": ["created_at_ts:desc"], "cursor": "<nextCursor>"}
+        
+        POST /api/documents/search
+        {"query": "presupuesto", "hit_format": "compact", "crop_length": 16}
+        
+        POST /api/documents/search
+        {"query": "acuerdo de confidencialidad", "semantic_ratio": 0.7}
+    """
+    facets = request.facets if request.facets is not None else SEARCH_FACETS
+    use_cursor = request.pagination == "cursor" or request.cursor is not None
+    
+    if use_cursor and request.offset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La paginación por cursor no admite offset"
+        )
+    
+    try:
+        filters = scope_filters(current_user, request.filters)
+        
+        if use_cursor:
+            # Listado ordenado: cada página continúa tras la anterior (coste constante)
+            search_results = await search_documents_cursor_async(
+                query=request.query.strip(),
+                limit=request.limit,
+                filters=filters,
+                sort=request.sort,
+                cursor=request.cursor,
+                facets=facets,
+                crop_length=request.crop_length,
+                crop_attributes=request.crop_attributes,
+                compact=request.hit_format == "compact",
+                semantic_ratio=request.semantic_ratio
+            )
+        else:
+            search_results = await search_documents_async(
+                query=request.query.strip(),
+                limit=request.limit,
+                offset=request.offset,
+                filters=filters,
+                sort=request.sort,
+                facets=facets,
+                crop_length=request.crop_length,
+                crop_attributes=request.crop_attributes,
+                compact=request.hit_format == "compact",
+                semantic_ratio=request.semantic_ratio
+            )
+    except ValueError as e:
+        # Filtro, ordenación o faceta no válidos para el índice
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        log_event('system', 'SEARCH_ERROR', {
+            'query': request.query,
+            'filters': request.filters,
+            'error': str(e),
+            'error_type': type(e).__name__
+        })
+        
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error realizando búsqueda: {str(e)}"
+        )
+    
+    log_event('system', 'DOCUMENT_SEARCH', {
+        'query': request.query,
+        'filters': request.filters,
+        'sort': request.sort,
+        'results_count': len(search_results.get('hits', [])),
+        'limit': request.limit,
+        'offset': request.offset
+    })
+    
+    return _with_facet_labels(search_results)
+
+
+@router.post("/multi-search")
+async def multi_search_documents_endpoint(
+    request: MultiSearchRequest,
+    current_user: Annotated[Optional[TokenData], Depends(get_search_user)]
+) -> Dict[str, Any]:
+    """
+    Ejecuta varias búsquedas en un único viaje a Meilisearch.
+    
+    Pensado para las vistas que lanzan varias consultas al cargar
+    (documentos recientes, conteos por tipo, paneles de palabras clave).
+    Cada búsqueda se valida y responde por separado: un filtro inválido en
+    una de ellas no impide obtener el resto.
+    
+    Args:
+        request: Lista de búsquedas (mismo formato que POST /search)
+        current_user: Usuario cuyo filtro de acceso se aplica a cada búsqueda
+        
+    Returns:
+        Dict[str, Any]: {"results": [...]} con un elemento por búsqueda, en
+        el mismo orden, que contiene "result" o "error"
+        
+    Example:
+        POST /api/documents/multi-search
+        {"queries": [{"query": "", "sort": ["created_at:desc"], "limit": 5},
+                     {"query": "contrato", "filters": "file_extension = .pdf"}]}
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(request.queries)
+    searches: List[Dict[str, Any]] = []
+    positions: List[int] = []  # Posición en la petición de cada búsqueda enviada
+    
+    for position, search in enumerate(request.queries):
+        try:
+            filters = scope_filters(current_user, search.filters)
+        except ValueError as e:
+            # Sin filtro de acceso válido la búsqueda no se envía (nunca sin restringir)
+            results[position] = {"index": position, "error": str(e)}
+            continue
+        positions.append(position)
+        searches.append({
+            "query": search.query.strip(),
+            "limit": search.limit,
+            "offset": search.offset,
+            "filters": filters,
+            "sort": search.sort,
+            "facets": search.facets if search.facets is not None else SEARCH_FACETS,
+            "crop_length": search.crop_length,
+            "crop_attributes": search.crop_attributes,
+            "compact": search.hit_format == "compact",
+            "semantic_ratio": search.semantic_ratio
+        })
+    
+    for position, result in zip(positions, await multi_search_documents_async(searches) if searches else []):
+        results[position] = {**result, "index": position}
+    
+    log_event('system', 'DOCUMENT_MULTI_SEARCH', {
+        'queries': [search.query.strip() for search in request.queries],
+        'failed_queries': sum(1 for result in results if "error" in result)
+    })
+    
+    return {"results": [{**result, "result": _with_facet_labels(result["result"])} if "result" in result else result
+                        for result in results]}
+
+
+@router.get("/suggest")
+async def suggest_documents_endpoint(
+    current_user: Annotated[Optional[TokenData], Depends(get_search_user)],
+    q: str = Query(..., description="Texto escrito hasta ahora", min_length=1, max_length=200),
+    limit: int = Query(default=8, ge=1, le=20, description="Número máximo de sugerencias")
+) -> Dict[str, Any]:
+    """
+    Sugerencias de autocompletado mientras se escribe.
+    
+    Responde desde el índice de prefijos en memoria (services.suggest_index)
+    sobre títulos y palabras clave, sin resaltado ni facetas. Si el índice
+    aún se está cargando o no encuentra nada, usa una búsqueda por prefijo
+    en Meilisearch con atributos mínimos. No se registra en auditoría (una
+    petición por pulsación de tecla).
+    
+    El índice de prefijos contiene los títulos de todos los usuarios: con el
+    control de acceso activo, los usuarios que no son administradores
+    reciben solo la búsqueda por prefijo con su filtro de acceso.
+    
+    Args:
+        current_user: Usuario cuyo filtro de acceso se aplica (con control de acceso)
+        q: Prefijo a completar
+        limit: Máximo de sugerencias (1-20)
+        
+    Returns:
+        Dict[str, Any]: {"query", "suggestions": [{"text", "type", "count"}], "source"}
+        
+    Example:
+        GET /api/documents/suggest?q=contr&limit=5
+    """
+    started = time.perf_counter()
+    restriction = access_filter(current_user)
+    suggestions = suggest_index.suggest(q, limit) if suggest_index.ready and restriction is None else []
+    source = "index"
+    
+    if not suggestions:
+        suggestions = await suggest_documents_async(q.strip(), limit, filters=restriction)
+        source = "meilisearch"
+    
+    return {
+        "query": q,
+        "suggestions": suggestions,
+        "source": source,
+        "processingTimeMs": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+
+@router.get("/{document_id}/similar")
+async def similar_documents_endpoint(
+    document_id: str,
+    current_user: Annotated[Optional[TokenData], Depends(get_search_user)],
+    limit: int = Query(default=5, ge=1, le=settings.SIMILAR_MAX_NEIGHBORS, description="Número máximo de documentos similares")
+) -> Dict[str, Any]:
+    """
+    Documentos similares a uno dado ("más como este").
+    
+    Responde desde la tabla de vecinos precalculada (services.similarity_index),
+    que se mantiene al día con cada alta o baja; no lanza búsquedas. Con el
+    control de acceso activo se omiten los vecinos que el usuario no puede ver.
+    
+    Args:
+        document_id: ID del documento (nombre sin extensión)
+        current_user: Usuario cuyo acceso se comprueba (con control de acceso)
+        limit: Máximo de documentos similares
+        
+    Returns:
+        Dict[str, Any]: {"id", "similar": [{"id", "title", "filename", "file_extension", "score"}]}
+        
+    Raises:
+        HTTPException: 404 si el documento no existe, 503 si la tabla aún se está cargando
+        
+    Example:
+        GET /api/documents/doc_123/similar?limit=5
+    """
+    started = time.perf_counter()
+    card = similarity_index.card(document_id)
+    if card is not None and not can_access(current_user, card):
+        card = None  # Documento de otro usuario: como si no existiera
+    similar = None
+    if card is not None:
+        similar = similarity_index.neighbors(
+            document_id, limit, visible=lambda neighbor: can_access(current_user, neighbor)
+        )
+    
+    if similar is None:
+        if not similarity_index.ready:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="La tabla de documentos similares se está cargando"
+            )
+        metadata = load_metadata(document_id)
+        if metadata is None or not can_access(current_user, metadata):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Documento '{document_id}' no encontrado"
+            )
+        # Documento sin título, resumen ni palabras clave: no tiene vecinos
+        similar = []
+    
+    return {
+        "id": document_id,
+        "similar": similar,
+        "processingTimeMs": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+
 # ==================================================================================
 #                           ENDPOINTS DE DESCARGA DE DOCUMENTOS
 # ==================================================================================
 
 @router.get("/download/{file_stem}")
-async def download_document(file_stem: str) -> StreamingResponse:
+async def download_document(
+    file_stem: str,
+    current_user: Annotated[Optional[TokenData], Depends(get_search_user)]
+) -> StreamingResponse:
     """
     Descarga un documento por su ID (nombre sin extensión).
     
     Busca los metadatos del documento localmente y descarga
-    el archivo desde Firebase Storage.
+    el archivo desde Firebase Storage. Con el control de acceso activo, un
+    documento que el usuario no puede ver responde como si no existiera.
     
     Args:
         file_stem: ID del documento (nombre sin extensión)
+        current_user: Usuario cuyo acceso se comprueba (con control de acceso)
         
     Returns:
         StreamingResponse: Archivo para descarga con headers apropiados
@@ -409,19 +923,15 @@ async def download_document(file_stem: str) -> StreamingResponse:
         HTTPException 500: Si hay errores durante la descarga
     """
     try:
-        # Buscar metadatos del documento
-        metadata_path = LOCAL_METADATA_DIR / f"{file_stem}.json"
+        # Buscar y cargar metadatos del documento
+        metadata = load_metadata(file_stem)
         
-        if not metadata_path.exists():
+        if metadata is None or not can_access(current_user, metadata):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Documento '{file_stem}' no encontrado"
             )
         
-        # Cargar metadatos del documento
-        with open(metadata_path, "r", encoding="utf-8") as file:
-            metadata = json.load(file)
-        
         # Descargar archivo desde Firebase Storage
         file_bytes = download_file_from_storage(metadata["storage_path"])
         
@@ -462,6 +972,7 @@ async def download_document(file_stem: str) -> StreamingResponse:
 
 @router.get("/download_by_path")
 async def download_by_storage_path(
+    current_user: Annotated[Optional[TokenData], Depends(get_search_user)],
     path: str = Query(..., description="Ruta completa del archivo en Firebase Storage")
 ) -> StreamingResponse:
     """
@@ -469,8 +980,11 @@ async def download_by_storage_path(
     
     Este endpoint permite descargar archivos cuando se conoce
     la ruta exacta en el storage, útil para integraciones externas.
+    Con el control de acceso activo solo se sirven rutas de documentos que
+    el usuario puede ver (el resto responde 404).
     
     Args:
+        current_user: Usuario cuyo acceso se comprueba (con control de acceso)
         path: Ruta completa del archivo en Storage (ej: "documents/2024/01/file.pdf")
         
     Returns:
@@ -495,6 +1009,12 @@ async def download_by_storage_path(
                 detail="Ruta de archivo no válida"
             )
         
+        if not _storage_path_visible(current_user, path):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Archivo no encontrado"
+            )
+        
         # Descargar archivo desde Firebase Storage
         file_bytes = download_file_from_storage(path)
         
@@ -537,36 +1057,25 @@ async def download_by_storage_path(
 # ==================================================================================
 
 @router.get("/list")
-async def list_all_documents() -> Dict[str, List[Dict[str, Any]]]:
+async def list_all_documents(
+    current_user: Annotated[Optional[TokenData], Depends(get_search_user)]
+) -> Dict[str, List[Dict[str, Any]]]:
     """
     Lista todos los documentos disponibles con sus metadatos.
     
     Carga todos los documentos desde el almacenamiento local
-    de metadatos y devuelve una lista completa.
+    de metadatos y devuelve una lista completa. Con el control de acceso
+    activo solo incluye los documentos que el usuario puede ver.
+    
+    Args:
+        current_user: Usuario cuyo acceso se comprueba (con control de acceso)
     
     Returns:
         Dict[str, List[Dict]]: Lista de documentos con metadatos
     """
     try:
-        documents = []
-        
-        # Iterar sobre todos los archivos JSON de metadatos
-        if LOCAL_METADATA_DIR.exists():
-            for json_file in LOCAL_METADATA_DIR.glob("*.json"):
-                try:
-                    with open(json_file, "r", encoding="utf-8") as file:
-                        metadata = json.load(file)
-                        documents.append(metadata)
-                except Exception as e:
-                    # Omitir archivos JSON corruptos
-                    # print(f"⚠️  Error leyendo {json_file}: {e}")
-                    continue
-        
-        # Ordenar documentos por fecha de subida (más recientes primero)
-        documents.sort(
-            key=lambda doc: doc.get("upload_timestamp", doc.get("processing_timestamp", "")),
-            reverse=True
-        )
+        # Cargar todos los metadatos (omite JSON corruptos), más recientes primero
+        documents = [document for document in list_metadata() if can_access(current_user, document)]
         
         # Registrar listado en auditoría
         log_event('system', 'DOCUMENTS_LISTED', {
@@ -648,19 +1157,12 @@ async def get_documents_statistics() -> Dict[str, Any]:
         file_types = {}
         
         # Analizar documentos locales
-        if LOCAL_METADATA_DIR.exists():
-            for json_file in LOCAL_METADATA_DIR.glob("*.json"):
-                try:
-                    with open(json_file, "r", encoding="utf-8") as file:
-                        metadata = json.load(file)
-                        total_documents += 1
-                        total_size += metadata.get("file_size_bytes", 0)
-                        
-                        file_ext = metadata.get("file_extension", "unknown")
-                        file_types[file_ext] = file_types.get(file_ext, 0) + 1
-                        
-                except:
-                    continue
+        for metadata in iter_metadata():
+            total_documents += 1
+            total_size += metadata.get("file_size_bytes", 0)
+            
+            file_ext = metadata.get("file_extension", "unknown")
+            file_types[file_ext] = file_types.get(file_ext, 0) + 1
         
         stats = {
             "total_documents": total_documents,
@@ -679,3 +1181,150 @@ async def get_documents_statistics() -> Dict[str, Any]:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error obteniendo estadísticas: {str(e)}"
         )
+
+
+# ==================================================================================
+#                           ENDPOINTS DE ADMINISTRACIÓN DEL ÍNDICE
+# ==================================================================================
+
+@router.get("/index/tasks")
+async def get_index_tasks_status(
+    current_admin: Annotated[TokenData, Depends(get_current_admin_user)]
+) -> Dict[str, Any]:
+    """
+    Estado del rastreador de tareas de indexación (solo administradores).
+    
+    Returns:
+        Dict[str, Any]: Escrituras en el buffer, tareas pendientes, retraso
+                       de indexación y escrituras fallidas pendientes de reintento
+    """
+    return {**task_tracker.status(), "buffered_operations": index_writer.pending_count()}
+
+
+@router.post("/index/tasks/retry")
+async def retry_failed_index_tasks(
+    current_admin: Annotated[TokenData, Depends(get_current_admin_user)],
+    force: bool = Query(default=False, description="Reintentar también las que agotaron los reintentos automáticos")
+) -> Dict[str, Any]:
+    """
+    Vuelve a encolar las escrituras fallidas en Meilisearch (solo administradores).
+    
+    Returns:
+        Dict[str, Any]: Número de operaciones reenviadas
+    """
+    try:
+        retried = await run_in_threadpool(task_tracker.retry_failed, force)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Error reintentando tareas de indexación: {str(e)}"
+        )
+    
+    log_event(current_admin.uid, 'INDEX_TASKS_RETRIED', {'retried': retried, 'force': force})
+    return {"retried": retried}
+
+
+@router.post("/index/rebuild", status_code=status.HTTP_202_ACCEPTED)
+async def start_index_rebuild(
+    current_admin: Annotated[TokenData, Depends(get_current_admin_user)],
+    partition: Optional[str] = Query(
+        None,
+        description="Partición a reconstruir ('2024', 'undated') con INDEX_PARTITIONING_ENABLED; por defecto todas"
+    )
+) -> Dict[str, Any]:
+    """
+    Reconstruye el índice de búsqueda sin cortar las búsquedas (solo administradores).
+    
+    Carga un índice sombra desde el almacén local de metadatos, verifica el
+    número de documentos y lo intercambia atómicamente con el actual. La
+    reconstrucción se ejecuta en segundo plano; su avance se consulta en
+    GET /index/rebuild.
+    
+    Con particiones por año cada partición se reconstruye por separado
+    (todas, o solo la indicada en partition).
+    
+    Returns:
+        Dict[str, Any]: Progreso inicial de la reconstrucción
+        
+    Raises:
+        HTTPException 400: Si la partición no es válida o no hay particiones activas
+        HTTPException 409: Si ya hay una reconstrucción en curso
+    """
+    try:
+        progress = index_rebuild.start(requested_by=current_admin.uid, partition=partition)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    
+    log_event(current_admin.uid, 'INDEX_REBUILD_STARTED', {'started_at': progress.get('started_at'), 'partition': partition})
+    return progress
+
+
+@router.get("/index/rebuild")
+async def get_index_rebuild_progress(
+    current_admin: Annotated[TokenData, Depends(get_current_admin_user)]
+) -> Dict[str, Any]:
+    """
+    Progreso de la reconstrucción del índice en curso o de la última (solo administradores).
+    
+    Returns:
+        Dict[str, Any]: Fase, documentos cargados y verificados, duración y error si lo hubo
+    """
+    return index_rebuild.progress()
+
+
+@router.post("/index/backfill", status_code=status.HTTP_202_ACCEPTED)
+async def start_metadata_backfill(
+    current_admin: Annotated[TokenData, Depends(get_current_admin_user)],
+    transform: Annotated[Optional[List[str]], Query(description="Transformaciones a aplicar (por defecto todas)")] = None
+) -> Dict[str, Any]:
+    """
+    Calcula los campos derivados en los documentos ya indexados (solo administradores).
+    
+    Recorre el almacén local de metadatos, aplica las transformaciones
+    registradas (por ejemplo, la fecha tipada date_ts / date_year) y reencola
+    en el índice los documentos que cambian. Se ejecuta en segundo plano; su
+    avance se consulta en GET /index/backfill.
+    
+    Returns:
+        Dict[str, Any]: Progreso inicial del backfill
+        
+    Raises:
+        HTTPException 400: Si alguna transformación no existe
+        HTTPException 409: Si ya hay un backfill en curso
+    """
+    try:
+        progress = metadata_backfill.start(requested_by=current_admin.uid, names=transform)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    
+    log_event(current_admin.uid, 'METADATA_BACKFILL_STARTED', {'transforms': progress.get('transforms')})
+    return progress
+
+
+@router.get("/index/backfill")
+async def get_metadata_backfill_progress(
+    current_admin: Annotated[TokenData, Depends(get_current_admin_user)]
+) -> Dict[str, Any]:
+    """
+    Progreso del backfill de metadatos en curso o del último (solo administradores).
+    
+    Returns:
+        Dict[str, Any]: Fase, documentos revisados, actualizados y con error, y duración
+    """
+    return metadata_backfill.progress()
@@ -0,0 +1,114 @@
+"""
+Control de Acceso a Documentos - Filtros por Usuario en el Motor de Búsqueda
+
+Todos los documentos están en un único índice. Para que cada usuario solo
+encuentre los suyos (y los de su departamento) no se filtran los resultados
+en Python, lo que rompería la paginación y los conteos de facetas: la
+restricción se añade como filtro a la propia búsqueda y la resuelve el motor
+(Meilisearch o el respaldo SQLite).
+
+- Cada documento se marca al subirse con owner_uid y department (claim
+  "department" del token de Firebase), ambos en filterableAttributes
+- Con SEARCH_ACCESS_CONTROL_ENABLED las búsquedas de un usuario que no es
+  administrador llevan el filtro
+  owner_uid = "<uid>" OR department = "<departamento>" [OR owner_uid NOT EXISTS]
+- El filtro se construye una vez por usuario y se reutiliza (caché LRU):
+  autorizar una búsqueda no cuesta nada en tiempo de consulta
+- Los documentos sin propietario (subidos antes de activar el control) son
+  visibles para todos si SEARCH_SHARE_UNOWNED_DOCUMENTS
+
+Uso:
+    from services.access_control import scope_filters
+
+    filters = scope_filters(current_user, "file_extension = .pdf")
+    # '(owner_uid = "abc123" OR ...) AND (file_extension = .pdf)'
+
+
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from config import settings
+from services.auth_service import TokenData
+from services.meilisearch_service import validate_filter_expression
+
+# ==================================================================================
+#                           FILTROS POR USUARIO
+# ==================================================================================
+
+def _quote(value: str) -> str:
+    """Valor de filtro entre comillas (escapando comillas y barras)."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+@lru_cache(maxsize=4096)
+def _access_filter(uid: str, department: Optional[str], share_unowned: bool) -> str:
+    conditions = [f"owner_uid = {_quote(uid)}"]
+    if department:
+        conditions.append(f"department = {_quote(department)}")
+    if share_unowned:
+        conditions.append("owner_uid NOT EXISTS")
+    return " OR ".join(conditions)
+
+
+def access_filter(user: Optional[TokenData]) -> Optional[str]:
+    """
+    Filtro que restringe las búsquedas a los documentos visibles por el usuario.
+
+    Returns:
+        Optional[str]: Expresión de filtro, o None si no hay que restringir
+                       (control desactivado o administrador)
+
+    Raises:
+        RuntimeError: Si el control está activo y no hay usuario
+    """
+    if not settings.SEARCH_ACCESS_CONTROL_ENABLED or (user is not None and user.is_admin):
+        return None
+    if user is None:
+        # Las rutas exigen token con el control activo (get_optional_user)
+        raise RuntimeError("Control de acceso activo sin usuario autenticado")
+    return _access_filter(user.uid, user.department, settings.SEARCH_SHARE_UNOWNED_DOCUMENTS)
+
+
+def scope_filters(user: Optional[TokenData], filters: Optional[str]) -> Optional[str]:
+    """
+    Combina los filtros de la petición con el filtro de acceso del usuario.
+
+    El filtro de la petición se valida antes de combinarlo: una expresión
+    válida tiene los paréntesis equilibrados, así que no puede salir del
+    paréntesis que la envuelve y anular la restricción.
+
+    Raises:
+        ValueError: Si el filtro de la petición no es válido
+        RuntimeError: Si el control está activo y no hay usuario
+    """
+    restriction = access_filter(user)
+    filters = validate_filter_expression(filters)
+    if restriction is None:
+        return filters
+    if filters is None:
+        return restriction
+    return f"({restriction}) AND ({filters})"
+
+
+def can_access(user: Optional[TokenData], document: Dict[str, Any]) -> bool:
+    """Mismo criterio que access_filter, evaluado sobre los metadatos de un documento."""
+    if not settings.SEARCH_ACCESS_CONTROL_ENABLED or (user is not None and user.is_admin):
+        return True
+    owner = document.get("owner_uid")
+    if owner is None:
+        return settings.SEARCH_SHARE_UNOWNED_DOCUMENTS
+    if user is None:
+        return False
+    return owner == user.uid or (user.department is not None and document.get("department") == user.department)
+
+
+def owner_fields(user: Optional[TokenData]) -> Dict[str, Any]:
+    """Campos de propiedad con los que se marca un documento subido por el usuario."""
+    if user is None:
+        return {}
+    fields = {"owner_uid": user.uid}
+    if user.department:
+        fields["department"] = user.department
+    return fields
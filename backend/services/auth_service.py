@@ -115,6 +115,7 @@ class TokenData(BaseModel):
         is_admin: Indica si el usuario tiene privilegios de administrador
         email_verified: Indica si el email ha sido verificado
         name: Nombre para mostrar del usuario (si está disponible)
+        department: Departamento del usuario (custom claim, si está asignado)
     """
     
     uid: str = Field(
@@ -144,6 +145,12 @@ class TokenData(BaseModel):
         description="Nombre para mostrar del usuario",
         example="Juan Pérez"
     )
+    
+    department: Optional[str] = Field(
+        default=None,
+        description="Departamento del usuario (custom claim 'department'); comparte sus documentos",
+        example="legal"
+    )
 
 
 # ==================================================================================
@@ -332,6 +339,7 @@ async def verify_id_token(id_token: str) -> TokenData:
         # ===== EXTRAER CUSTOM CLAIMS (ROLES) =====
         # Los custom claims están en el nivel raíz del token decodificado
         is_admin = decoded_token.get("admin", False)
+        department = decoded_token.get("department", None)
         
         # ===== ACTUALIZAR ÚLTIMO LOGIN EN FIRESTORE (OPCIONAL) =====
         # Descomenta si quieres trackear el último login
@@ -349,7 +357,8 @@ async def verify_id_token(id_token: str) -> TokenData:
             email=email,
             is_admin=is_admin,
             email_verified=email_verified,
-            name=name
+            name=name,
+            department=department
         )
         
         # Mensaje de depuración - comentado para producción
@@ -0,0 +1,334 @@
+"""
+Embeddings de Documentos - Vectores para la Búsqueda Híbrida
+
+Los usuarios buscan conceptos ("acuerdo de confidencialidad") que no
+coinciden literalmente con las palabras del documento. Con
+HYBRID_SEARCH_ENABLED cada documento se indexa con un vector en el campo
+_vectors de Meilisearch (embedder "userProvided") y las búsquedas combinan
+la puntuación por palabras con la semántica (semanticRatio).
+
+El embedder es intercambiable (EMBEDDER), igual que los proveedores de IA:
+
+- hashing: determinista y sin dependencias; proyecta palabras y trigramas
+  de caracteres (sin tildes ni palabras vacías) sobre EMBEDDING_DIMENSIONS
+  posiciones. Acerca variantes de una misma palabra (confidencial /
+  confidencialidad), no sinónimos. Para pruebas y despliegues solo con CPU
+- sentence_transformers: modelo local de sentence-transformers
+  (EMBEDDING_MODEL); la dependencia solo se importa si se usa
+
+El cálculo es CPU intensivo, así que se hace en un pool de procesos
+(EMBEDDING_WORKERS) y por lotes (EMBEDDING_BATCH_SIZE): la ingesta no
+compite con el event loop ni con el GIL de los hilos de la aplicación.
+
+Uso:
+    from services.embeddings import embedding_pool
+
+    vectors = embedding_pool.embed(["texto 1", "texto 2"])   # Ingesta (por lotes)
+    vector = await embedding_pool.embed_query("confidencialidad")
+
+Benchmark (documentos/s en línea frente al pool de procesos):
+    python -m services.embeddings --documents 5000 --workers 4
+
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import math
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from services.local_extractor import SPANISH_STOP_WORDS, fold_accents
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           CONFIGURACIÓN
+# ==================================================================================
+
+# Nombre del embedder en la configuración del índice y en el campo _vectors
+EMBEDDER_NAME = "default"
+
+# Peso de los trigramas de caracteres frente a la palabra completa (embedder hashing)
+_CHAR_NGRAM_WEIGHT = 0.5
+
+
+_STOP_WORDS = {fold_accents(word.lower()) for word in SPANISH_STOP_WORDS}
+
+
+def document_embedding_text(document: Dict[str, Any]) -> str:
+    """Texto de un documento que se convierte en vector: título, palabras clave y resumen."""
+    keywords = document.get("keywords") or []
+    if isinstance(keywords, list):
+        keywords = ", ".join(str(keyword) for keyword in keywords)
+    return "\n".join(str(part) for part in (document.get("title"), keywords, document.get("summary")) if part)
+
+
+# ==================================================================================
+#                           EMBEDDERS
+# ==================================================================================
+
+class Embedder:
+    """
+    Interfaz mínima de un embedder.
+
+    Attributes:
+        name: Identificador del embedder ("hashing", "sentence_transformers")
+        dimensions: Tamaño de los vectores
+    """
+
+    name: str = "base"
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Convierte una lista de textos en vectores normalizados (norma 1).
+
+        Raises:
+            RuntimeError: Si el embedder no puede calcular los vectores
+        """
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """
+    Embedder determinista por hashing de características (feature hashing).
+
+    Cada palabra y cada trigrama de caracteres suma ±peso en la posición que
+    indica su hash (blake2b, estable entre procesos y ejecuciones).
+    """
+
+    name = "hashing"
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in re.findall(r"\w+", fold_accents(text.lower())):
+            if token in _STOP_WORDS or len(token) < 2:
+                continue
+            bounded = f"^{token}$"
+            features = [(f"w:{token}", 1.0)] + [
+                (f"c:{bounded[i:i + 3]}", _CHAR_NGRAM_WEIGHT) for i in range(len(bounded) - 2)
+            ]
+            for feature, weight in features:
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+                vector[digest % self.dimensions] += weight if digest >> 63 else -weight
+
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """
+    Modelo local de sentence-transformers (se carga en el primer uso).
+
+    EMBEDDING_DIMENSIONS debe coincidir con la dimensión del modelo.
+    """
+
+    name = "sentence_transformers"
+
+    def __init__(self, dimensions: int, model_name: str):
+        super().__init__(dimensions)
+        self.model_name = model_name
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            try:
+                # Importación diferida: dependencia opcional
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise RuntimeError(
+                    "EMBEDDER=sentence_transformers requiere el paquete sentence-transformers"
+                ) from e
+            model = SentenceTransformer(self.model_name)
+            if model.get_sentence_embedding_dimension() != self.dimensions:
+                raise RuntimeError(
+                    f"El modelo '{self.model_name}' genera vectores de "
+                    f"{model.get_sentence_embedding_dimension()} dimensiones y "
+                    f"EMBEDDING_DIMENSIONS es {self.dimensions}"
+                )
+            self._model = model
+        return self._model
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._get_model().encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return [vector.tolist() for vector in vectors]
+
+
+def create_embedder(name: str) -> Embedder:
+    """
+    Crea un embedder por nombre usando la configuración de la aplicación.
+
+    Raises:
+        ValueError: Si el embedder no existe
+    """
+    if name == "hashing":
+        return HashingEmbedder(settings.EMBEDDING_DIMENSIONS)
+    if name == "sentence_transformers":
+        return SentenceTransformerEmbedder(settings.EMBEDDING_DIMENSIONS, settings.EMBEDDING_MODEL)
+    raise ValueError(f"Embedder desconocido: {name}")
+
+
+# Embedder del proceso actual (cada proceso del pool crea el suyo)
+_embedder: Optional[Embedder] = None
+
+
+def get_embedder() -> Embedder:
+    """Embedder activo (EMBEDDER) del proceso actual, creado en el primer uso."""
+    global _embedder
+    if _embedder is None:
+        _embedder = create_embedder(settings.EMBEDDER)
+    return _embedder
+
+
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    """Punto de entrada de los procesos del pool."""
+    return get_embedder().embed(texts)
+
+
+# ==================================================================================
+#                           POOL DE PROCESOS
+# ==================================================================================
+
+class EmbeddingPool:
+    """
+    Cálculo de embeddings por lotes en un pool de procesos.
+
+    Args:
+        workers: Procesos del pool (0 calcula en el proceso actual)
+        batch_size: Textos por tarea enviada al pool
+    """
+
+    def __init__(self, workers: int, batch_size: int):
+        self._workers = workers
+        self._batch_size = batch_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # spawn: la aplicación ya tiene hilos en marcha y fork no es seguro con ellos
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def start(self) -> None:
+        """Arranca los procesos del pool (cada uno carga su embedder) antes de la primera ingesta."""
+        executor = self._get_executor()
+        if executor is not None:
+            list(executor.map(_embed_batch, [["arranque"]] * self._workers))
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Vectores de una lista de textos (ingesta). Bloquea hasta tenerlos todos.
+
+        Raises:
+            RuntimeError: Si el embedder falla
+        """
+        if not texts:
+            return []
+
+        started = time.perf_counter()
+        batches = [texts[i:i + self._batch_size] for i in range(0, len(texts), self._batch_size)]
+        executor = self._get_executor()
+        try:
+            if executor is None:
+                results = [_embed_batch(batch) for batch in batches]
+            else:
+                results = list(executor.map(_embed_batch, batches))
+        except RuntimeError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Error calculando embeddings: {type(e).__name__}: {e}") from e
+
+        metrics.counter("embeddings_computed_total", kind="document").inc(len(texts))
+        metrics.histogram("embedding_batch_seconds").observe(time.perf_counter() - started)
+        return [vector for batch in results for vector in batch]
+
+    async def embed_query(self, text: str) -> List[float]:
+        """Vector de una consulta sin bloquear el event loop."""
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        if executor is None:
+            vectors = await loop.run_in_executor(None, _embed_batch, [text])
+        else:
+            vectors = await loop.run_in_executor(executor, _embed_batch, [text])
+        metrics.counter("embeddings_computed_total", kind="query").inc()
+        return vectors[0]
+
+    def stop(self) -> None:
+        """Detiene los procesos del pool (se vuelven a crear si hace falta)."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+# ==================================================================================
+#                           INSTANCIA GLOBAL
+# ==================================================================================
+
+# Se arranca y detiene en el lifespan de main.py
+embedding_pool = EmbeddingPool(
+    workers=settings.EMBEDDING_WORKERS,
+    batch_size=settings.EMBEDDING_BATCH_SIZE,
+)
+
+
+# ==================================================================================
+#                           BENCHMARK
+# ==================================================================================
+
+def run_embedding_benchmark(documents: int, workers: int, batch_size: int) -> Dict[str, float]:
+    """Documentos por segundo: un documento por llamada en línea frente al pool por lotes."""
+    from services.meilisearch_service import build_synthetic_corpus
+
+    texts = [document_embedding_text(document) for document in build_synthetic_corpus(documents)]
+
+    inline = EmbeddingPool(workers=0, batch_size=1)
+    start = time.perf_counter()
+    for text in texts:
+        inline.embed([text])
+    inline_rate = len(texts) / (time.perf_counter() - start)
+
+    pooled = EmbeddingPool(workers=workers, batch_size=batch_size)
+    pooled.start()  # Arranque de los procesos fuera de la medida
+    start = time.perf_counter()
+    pooled.embed(texts)
+    pooled_rate = len(texts) / (time.perf_counter() - start)
+    pooled.stop()
+
+    return {"inline_docs_per_second": inline_rate, "pooled_docs_per_second": pooled_rate}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark del cálculo de embeddings")
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=max(1, settings.EMBEDDING_WORKERS))
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    args = parser.parse_args()
+
+    print(f"🔍 {args.documents} documentos con el embedder '{settings.EMBEDDER}' "
+          f"({settings.EMBEDDING_DIMENSIONS} dimensiones)")
+    results = run_embedding_benchmark(args.documents, args.workers, args.batch_size)
+    print(f"   • En línea, uno a uno: {results['inline_docs_per_second']:.1f} docs/s")
+    print(f"   • Pool de {args.workers} procesos, lotes de {args.batch_size}: "
+          f"{results['pooled_docs_per_second']:.1f} docs/s")
@@ -0,0 +1,313 @@
+"""
+Servidor de IA Falso - Backend Local y Determinista para Pruebas de Carga
+
+Este módulo implementa un servidor HTTP mínimo que imita a Gemini para que
+la ruta de subida pueda probarse y medirse sin red ni clave de API. Lo usa
+el proveedor "fake" de services.llm_providers (LLM_PROVIDER=fake).
+
+Características:
+- Latencia configurable con distribución log-normal (mediana y sigma)
+- Tasa de errores configurable (respuestas HTTP 503)
+- Fracción configurable de respuestas envueltas en bloques ```json
+- Salida JSON determinista: los metadatos se calculan con el extractor
+  local a partir del texto del prompt, tanto para prompts individuales
+  como para lotes (micro-batching)
+
+La aleatoriedad (latencia y errores) depende solo de la semilla, del prompt
+y de cuántas veces se ha recibido ese prompt, así que una misma ejecución
+es reproducible aunque las peticiones lleguen en distinto orden.
+
+Uso:
+    python -m services.fake_llm_server --port 8765 --latency-ms 800 --error-rate 0.02
+    python -m services.fake_llm_server --bench 500 --concurrency 16
+
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from services.local_extractor import extract_local_metadata
+
+# ==================================================================================
+#                           CONFIGURACIÓN POR DEFECTO
+# ==================================================================================
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Marcadores de los prompts de gemini_service
+_SINGLE_DOCUMENT_MARKER = "DOCUMENTO A ANALIZAR:"
+_BATCH_DOCUMENT_RE = re.compile(
+    r"=== DOCUMENTO (\d+) ===\n(.*?)\n=== FIN DOCUMENTO \1 ===",
+    re.DOTALL,
+)
+
+
+class FakeLLMConfig:
+    """
+    Parámetros de comportamiento del servidor falso.
+
+    Attributes:
+        latency_median_ms: Mediana de la latencia simulada
+        latency_sigma: Dispersión log-normal (0 = latencia fija)
+        error_rate: Probabilidad de responder con HTTP 503
+        fence_rate: Probabilidad de envolver la respuesta en ```json
+        seed: Semilla de la aleatoriedad determinista
+    """
+
+    def __init__(
+        self,
+        latency_median_ms: float = 800.0,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        fence_rate: float = 0.0,
+        seed: int = 42,
+    ):
+        self.latency_median_ms = latency_median_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.fence_rate = fence_rate
+        self.seed = seed
+
+
+# ==================================================================================
+#                           GENERACIÓN DE RESPUESTAS
+# ==================================================================================
+
+def build_fake_response(prompt: str) -> str:
+    """
+    Calcula la respuesta determinista para un prompt de gemini_service.
+
+    Args:
+        prompt: Prompt individual o de lote
+
+    Returns:
+        str: Objeto JSON (prompt individual) o array JSON (lote)
+    """
+    batch_documents = _BATCH_DOCUMENT_RE.findall(prompt)
+    if batch_documents:
+        items: List[Dict[str, Any]] = []
+        for index, text in batch_documents:
+            items.append({"index": int(index), **extract_local_metadata(text)})
+        return json.dumps(items, ensure_ascii=False)
+
+    _, _, document_text = prompt.partition(_SINGLE_DOCUMENT_MARKER)
+    return json.dumps(extract_local_metadata(document_text or prompt), ensure_ascii=False)
+
+
+class _FakeLLMHandler(BaseHTTPRequestHandler):
+    """Manejador HTTP del endpoint POST /generate."""
+
+    server: "FakeLLMServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        if self.path != "/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        prompt = payload.get("prompt", "")
+
+        rng = self.server.request_rng(prompt)
+        config = self.server.config
+
+        # Latencia log-normal alrededor de la mediana configurada
+        latency_ms = config.latency_median_ms
+        if config.latency_sigma > 0:
+            latency_ms *= rng.lognormvariate(0.0, config.latency_sigma)
+        time.sleep(latency_ms / 1000)
+
+        if rng.random() < config.error_rate:
+            self._send_json(503, {"error": "simulated upstream error"})
+            return
+
+        text = build_fake_response(prompt)
+        if rng.random() < config.fence_rate:
+            text = f"```json\n{text}\n```"
+
+        self._send_json(200, {
+            "text": text,
+            "usage": {
+                # Aproximación habitual: ~4 caracteres por token
+                "prompt_tokens": len(prompt) // 4,
+                "output_tokens": len(text) // 4,
+            },
+        })
+
+    def _send_json(self, status_code: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Silenciar el log por petición durante las pruebas de carga
+        pass
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP multihilo con la configuración del backend falso.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, config: FakeLLMConfig):
+        super().__init__((host, port), _FakeLLMHandler)
+        self.config = config
+        self._seen_prompts: Counter = Counter()
+        self._seen_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def request_rng(self, prompt: str) -> random.Random:
+        """
+        Generador aleatorio determinista para una petición.
+
+        Se siembra con la semilla global, el hash del prompt y el número de
+        veces que ya se ha visto ese prompt (para que un reintento pueda
+        tener un resultado distinto al intento original).
+        """
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._seen_lock:
+            attempt = self._seen_prompts[digest]
+            self._seen_prompts[digest] += 1
+        return random.Random(f"{self.config.seed}:{digest}:{attempt}")
+
+
+def start_fake_server(
+    config: Optional[FakeLLMConfig] = None,
+    host: str = DEFAULT_HOST,
+    port: int = 0,
+) -> FakeLLMServer:
+    """
+    Arranca el servidor falso en un hilo de fondo.
+
+    Args:
+        config: Comportamiento simulado (por defecto FakeLLMConfig())
+        host: Interfaz de escucha
+        port: Puerto (0 = puerto libre elegido por el sistema)
+
+    Returns:
+        FakeLLMServer: Servidor en ejecución (usar .url y .shutdown())
+    """
+    server = FakeLLMServer(host, port, config or FakeLLMConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ==================================================================================
+#                           BENCHMARK DE EXTRACCIÓN
+# ==================================================================================
+
+def run_extraction_benchmark(server: FakeLLMServer, documents: int, concurrency: int) -> Dict[str, float]:
+    """
+    Mide el rendimiento de extract_metadata contra el servidor falso.
+
+    Ejecuta el mismo camino que la subida (extracción de texto, micro-batching
+    si está activo, llamada al proveedor y parseo) con documentos sintéticos.
+
+    Args:
+        server: Servidor falso en ejecución
+        documents: Número de documentos a procesar
+        concurrency: Número de subidas simultáneas
+
+    Returns:
+        Dict[str, float]: docs/s, latencias p50/p95 (ms) y tiempo total (s)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Importación diferida: requiere la configuración de la aplicación
+    from services import gemini_service
+    from services.llm_providers import FakeLLMProvider, set_llm_provider
+
+    set_llm_provider(FakeLLMProvider("fake-llm", server.url))
+
+    rng = random.Random(7)
+    words = ["contrato", "informe", "servicios", "pago", "factura", "proyecto", "cliente",
+             "acuerdo", "auditoría", "presupuesto", "de", "la", "el", "para", "con"]
+    corpus = [
+        (f"# Documento {i}\n{rng.randint(1, 28)} de mayo de 2024\n"
+         + " ".join(rng.choice(words) for _ in range(rng.randint(100, 600)))).encode("utf-8")
+        for i in range(documents)
+    ]
+
+    latencies: List[float] = []
+
+    def _process(item):
+        index, file_bytes = item
+        start = time.perf_counter()
+        gemini_service.extract_metadata(file_bytes, f"bench_{index}.txt")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_process, enumerate(corpus)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "docs_per_second": documents / elapsed,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "elapsed_s": elapsed,
+    }
+
+
+# ==================================================================================
+#                           PUNTO DE ENTRADA
+# ==================================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de IA falso para pruebas de carga")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Mediana de latencia simulada")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Sigma log-normal (0 = fija)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 503")
+    parser.add_argument("--fence-rate", type=float, default=0.0, help="Fracción de respuestas en ```json")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bench", type=int, default=0, help="Ejecutar benchmark con N documentos")
+    parser.add_argument("--concurrency", type=int, default=8, help="Subidas simultáneas del benchmark")
+    args = parser.parse_args()
+
+    fake_config = FakeLLMConfig(
+        latency_median_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        fence_rate=args.fence_rate,
+        seed=args.seed,
+    )
+
+    if args.bench:
+        fake_server = start_fake_server(fake_config, args.host, 0)
+        print(f"🤖 Servidor falso en {fake_server.url} — {args.bench} documentos, concurrencia {args.concurrency}")
+        results = run_extraction_benchmark(fake_server, args.bench, args.concurrency)
+        print(f"⏱️  {results['docs_per_second']:.1f} docs/s | p50 {results['p50_ms']:.0f} ms | "
+              f"p95 {results['p95_ms']:.0f} ms | total {results['elapsed_s']:.1f} s")
+        fake_server.shutdown()
+    else:
+        fake_server = FakeLLMServer(args.host, args.port, fake_config)
+        print(f"🤖 Servidor de IA falso escuchando en {fake_server.url}/generate")
+        try:
+            fake_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
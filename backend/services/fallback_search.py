@@ -0,0 +1,468 @@
+"""
+Motor de Búsqueda de Respaldo - SQLite FTS5 sobre el Almacén de Metadatos
+
+Si Meilisearch no arranca o deja de responder, todas las búsquedas fallaban
+con un 500. Este módulo mantiene un índice de texto completo en SQLite
+(FTS5, incluido en la biblioteca estándar de Python) construido de forma
+incremental a partir del almacén local de metadatos (services.metadata_store):
+
+- Sincronización incremental por fecha de modificación de cada JSON
+- Misma forma de respuesta que Meilisearch: hits (con _formatted y <mark>),
+  estimatedTotalHits, limit, offset, processingTimeMs y facetDistribution
+- Mismos filtros, ordenación y facetas (se validan con meilisearch_service)
+- Las respuestas llevan "degraded": true para que la interfaz pueda avisar
+
+La capa de búsqueda (services.meilisearch_async) lo usa automáticamente
+cuando el circuito de Meilisearch está abierto, y siempre con
+SEARCH_ENGINE=sqlite (pruebas y despliegues pequeños sin Meilisearch).
+
+Benchmark (mismo corpus en ambos motores):
+    python -m services.fallback_search --documents 2000 --meilisearch
+
+
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import BASE_DIR, settings
+from services.local_extractor import SPANISH_STOP_WORDS
+from services.meilisearch_service import (
+    INDEX_CONFIG,
+    parse_filter_expression,
+    to_index_document,
+    validate_crop_attributes,
+    validate_facets,
+    validate_sort,
+)
+from services.metadata_store import iter_metadata_entries
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           CONFIGURACIÓN
+# ==================================================================================
+
+# Columnas de texto del índice FTS5 y su peso en bm25 (como searchableAttributes)
+_FTS_COLUMNS = ["title", "summary", "keywords", "filename"]
+_FTS_WEIGHTS = (10.0, 3.0, 5.0, 2.0)
+
+# Columnas que se devuelven resaltadas o recortadas en _formatted (las de texto;
+# keywords es una lista y se devuelve tal cual)
+_FORMATTED_COLUMNS = ["title", "summary", "filename"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    stem TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, summary, keywords, filename,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+# ==================================================================================
+#                           EVALUACIÓN DE FILTROS
+# ==================================================================================
+
+def _as_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _field_values(document: Dict[str, Any], attribute: str) -> List[Any]:
+    value = document.get(attribute)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _equals(field_value: Any, value: str) -> bool:
+    number, expected = _as_number(field_value), _as_number(value)
+    if number is not None and expected is not None:
+        return number == expected
+    return str(field_value).lower() == value.lower()
+
+
+def _compare(field_value: Any, operator: str, value: str) -> bool:
+    left, right = _as_number(field_value), _as_number(value)
+    if left is None or right is None:
+        left, right = str(field_value), value
+    return {
+        ">": left > right,
+        ">=": left >= right,
+        "<": left < right,
+        "<=": left <= right,
+    }[operator]
+
+
+def matches_filter(node: Optional[tuple], document: Dict[str, Any]) -> bool:
+    """
+    Evalúa sobre un documento el árbol de parse_filter_expression.
+
+    Sigue la semántica de Meilisearch: en los campos lista basta con que un
+    elemento cumpla la condición y la igualdad de texto no distingue mayúsculas.
+    """
+    if node is None:
+        return True
+
+    kind = node[0]
+    if kind == "or":
+        return any(matches_filter(child, document) for child in node[1])
+    if kind == "and":
+        return all(matches_filter(child, document) for child in node[1])
+    if kind == "not":
+        return not matches_filter(node[1], document)
+    if kind == "exists":
+        return node[1] in document
+    if kind == "is":
+        value = document.get(node[1])
+        if node[2] == "NULL":
+            return node[1] in document and value is None
+        return node[1] in document and value in ("", [], {})
+
+    values = _field_values(document, node[1])
+    if kind == "in":
+        return any(_equals(value, expected) for value in values for expected in node[2])
+    if kind == "range":
+        return any(_compare(value, ">=", node[2]) and _compare(value, "<=", node[3]) for value in values)
+
+    operator, expected = node[2], node[3]
+    if operator == "=":
+        return any(_equals(value, expected) for value in values)
+    if operator == "!=":
+        return not any(_equals(value, expected) for value in values)
+    return any(_compare(value, operator, expected) for value in values)
+
+
+# ==================================================================================
+#                           MOTOR DE RESPALDO
+# ==================================================================================
+
+class FallbackSearchEngine:
+    """
+    Índice SQLite FTS5 sincronizado con el almacén local de metadatos.
+
+    Args:
+        db_path: Fichero de la base de datos (":memory:" para pruebas)
+        sync_interval: Segundos entre sincronizaciones en segundo plano
+    """
+
+    def __init__(self, db_path: str, sync_interval: float):
+        self._db_path = db_path
+        self._sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._synced_at: Optional[float] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        metrics.gauge("fallback_search_documents").set_function(self.document_count)
+
+    def _get_conn(self) -> sqlite3.Connection:
+        # Una única conexión compartida; los accesos se serializan con self._lock
+        if self._conn is None:
+            if self._db_path != ":memory:":
+                os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self._db_path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def document_count(self) -> int:
+        if self._conn is None:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    # ===== CARGA =====
+
+    def _upsert(self, conn: sqlite3.Connection, stem: str, mtime: float, metadata: Dict[str, Any]) -> None:
+        document = to_index_document(metadata)
+        row = conn.execute("SELECT rowid FROM documents WHERE stem = ?", (stem,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (row[0],))
+            conn.execute("UPDATE documents SET mtime = ?, data = ? WHERE rowid = ?",
+                         (mtime, json.dumps(document, ensure_ascii=False), row[0]))
+            rowid = row[0]
+        else:
+            rowid = conn.execute("INSERT INTO documents (stem, mtime, data) VALUES (?, ?, ?)",
+                                 (stem, mtime, json.dumps(document, ensure_ascii=False))).lastrowid
+        keywords = document.get("keywords") or []
+        conn.execute(
+            "INSERT INTO documents_fts (rowid, title, summary, keywords, filename) VALUES (?, ?, ?, ?, ?)",
+            (rowid, document.get("title", ""), document.get("summary", ""),
+             " ".join(keywords) if isinstance(keywords, list) else str(keywords), document.get("filename", "")),
+        )
+
+    def index_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """Carga documentos directamente (sin pasar por el almacén), para pruebas y benchmarks."""
+        with self._lock:
+            conn = self._get_conn()
+            with conn:
+                for document in documents:
+                    self._upsert(conn, str(document["id"]), time.time(), document)
+
+    def sync(self) -> Dict[str, int]:
+        """
+        Sincroniza el índice con el almacén de metadatos.
+
+        Solo reescribe los documentos cuyo JSON cambió desde la última
+        sincronización y elimina los que ya no existen.
+
+        Returns:
+            Dict[str, int]: Documentos actualizados y eliminados
+        """
+        with self._lock:
+            conn = self._get_conn()
+            known = dict(conn.execute("SELECT stem, mtime FROM documents"))
+            updated = 0
+            seen = set()
+            with conn:
+                for stem, mtime, metadata in iter_metadata_entries():
+                    seen.add(stem)
+                    if known.get(stem) == mtime or not metadata.get("id"):
+                        continue
+                    self._upsert(conn, stem, mtime, metadata)
+                    updated += 1
+
+                removed = [stem for stem in known if stem not in seen]
+                for stem in removed:
+                    rowid = conn.execute("SELECT rowid FROM documents WHERE stem = ?", (stem,)).fetchone()[0]
+                    conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (rowid,))
+                    conn.execute("DELETE FROM documents WHERE rowid = ?", (rowid,))
+
+            self._synced_at = time.time()
+
+        metrics.counter("fallback_search_synced_documents_total").inc(updated + len(removed))
+        return {"updated": updated, "removed": len(removed)}
+
+    # ===== BÚSQUEDA =====
+
+    @staticmethod
+    def _match_expression(query: str) -> Optional[str]:
+        """Consulta FTS5: términos sin palabras vacías, unidos con OR; el último como prefijo."""
+        terms = [term for term in re.findall(r"\w+", query.lower()) if term not in SPANISH_STOP_WORDS]
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        return " OR ".join(quoted)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        filters: Optional[str] = None,
+        sort: Optional[List[str]] = None,
+        facets: Optional[List[str]] = None,
+        crop_length: Optional[int] = None,
+        crop_attributes: Optional[List[str]] = None,
+        ranking_score: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Búsqueda con la misma interfaz y forma de respuesta que search_documents_async.
+
+        Los atributos recortados usan snippet() de FTS5 (como mucho 64
+        palabras) y, con ranking_score, cada resultado lleva _rankingScore
+        (bm25 relativo al mejor resultado, entre 0 y 1).
+
+        Raises:
+            ValueError: Si los filtros, la ordenación o las facetas son inválidos
+        """
+        started = time.perf_counter()
+        filter_tree = parse_filter_expression(filters)
+        sort = validate_sort(sort)
+        facets = validate_facets(facets)
+        crop_attributes = validate_crop_attributes(crop_attributes)
+        crop_length = min(crop_length or settings.SEARCH_CROP_LENGTH, 64)
+
+        if self._synced_at is None:
+            self.sync()
+
+        match = self._match_expression(query)
+        with self._lock:
+            conn = self._get_conn()
+            if match:
+                # Resaltado completo o fragmento recortado de cada columna de texto
+                cropped = [column for column in _FORMATTED_COLUMNS if column in crop_attributes]
+                formatted_columns = [
+                    f"snippet(documents_fts, {_FTS_COLUMNS.index(column)}, '<mark>', '</mark>', ?, {crop_length})"
+                    if column in cropped else f"highlight(documents_fts, {_FTS_COLUMNS.index(column)}, '<mark>', '</mark>')"
+                    for column in _FORMATTED_COLUMNS
+                ]
+                rows = conn.execute(
+                    f"SELECT d.data, bm25(documents_fts, {', '.join(map(str, _FTS_WEIGHTS))}) AS rank, "
+                    f"{', '.join(formatted_columns)} "
+                    "FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid "
+                    "WHERE documents_fts MATCH ? ORDER BY rank",
+                    [settings.SEARCH_CROP_MARKER] * len(cropped) + [match],
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    f"SELECT data, NULL{', NULL' * len(_FORMATTED_COLUMNS)} FROM documents ORDER BY rowid"
+                ).fetchall()
+
+        displayed = INDEX_CONFIG["displayedAttributes"]
+        best_rank = rows[0][1] if rows and rows[0][1] else None
+        hits = []
+        for data, rank, *formatted_values in rows:
+            document = json.loads(data)
+            if not matches_filter(filter_tree, document):
+                continue
+            hit = {field: document[field] for field in displayed if field in document}
+            hit["_formatted"] = {**hit}
+            for column, value in zip(_FORMATTED_COLUMNS, formatted_values):
+                if column in hit:
+                    hit["_formatted"][column] = value or hit[column]
+            if ranking_score:
+                hit["_rankingScore"] = round(rank / best_rank, 4) if best_rank else 1.0
+            hits.append(hit)
+
+        # Ordenación estable de atrás hacia delante; los documentos sin el campo van al final
+        for criterion in reversed(sort or []):
+            field, _, direction = criterion.partition(":")
+            present = [hit for hit in hits if hit.get(field) is not None]
+            missing = [hit for hit in hits if hit.get(field) is None]
+            present.sort(key=lambda hit: hit[field], reverse=direction == "desc")
+            hits = present + missing
+
+        response: Dict[str, Any] = {
+            "hits": hits[offset:offset + limit],
+            "query": query,
+            "limit": limit,
+            "offset": offset,
+            "estimatedTotalHits": len(hits),
+            "degraded": True,
+        }
+        if facets:
+            distribution: Dict[str, Dict[str, int]] = {facet: {} for facet in facets}
+            for hit in hits:
+                for facet in facets:
+                    for value in _field_values(hit, facet):
+                        distribution[facet][str(value)] = distribution[facet].get(str(value), 0) + 1
+            response["facetDistribution"] = distribution
+
+        response["processingTimeMs"] = int((time.perf_counter() - started) * 1000)
+        metrics.counter("fallback_search_queries_total").inc()
+        return response
+
+    # ===== CICLO DE VIDA =====
+
+    def start(self) -> None:
+        """Arranca el hilo de sincronización periódica (idempotente)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="fallback-search-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                metrics.counter("fallback_search_sync_errors_total", reason=type(e).__name__).inc()
+            self._stop_event.wait(self._sync_interval)
+
+
+# ==================================================================================
+#                           INSTANCIA GLOBAL
+# ==================================================================================
+
+# Se arranca y detiene en el lifespan de main.py
+fallback_search = FallbackSearchEngine(
+    db_path=os.path.join(BASE_DIR, settings.FALLBACK_SEARCH_DB_PATH),
+    sync_interval=settings.FALLBACK_SEARCH_SYNC_INTERVAL_SECONDS,
+)
+
+
+# ==================================================================================
+#                           BENCHMARK DE MOTORES
+# ==================================================================================
+
+def run_engine_benchmark(documents: int, queries: int, with_meilisearch: bool) -> Dict[str, Dict[str, float]]:
+    """
+    Indexa el mismo corpus sintético en SQLite FTS5 (y opcionalmente en
+    Meilisearch) y mide el tiempo de carga y la latencia p50/p95 de búsqueda.
+    """
+    from services.meilisearch_service import (
+        INDEX_NAME,
+        build_search_options,
+        build_synthetic_corpus,
+        get_client,
+        initialize_meilisearch,
+    )
+
+    corpus = build_synthetic_corpus(documents)
+    query_texts = ["contrato de servicios", "el informe anual de la facultad", "presupuesto para el proyecto",
+                   "acta de la reunión del consejo", "beca de investigación", "reglamento de evaluación"]
+
+    def _latencies(search) -> Dict[str, float]:
+        samples = []
+        for i in range(queries):
+            start = time.perf_counter()
+            search(query_texts[i % len(query_texts)])
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        return {"p50_ms": samples[len(samples) // 2], "p95_ms": samples[int(len(samples) * 0.95) - 1]}
+
+    results: Dict[str, Dict[str, float]] = {}
+
+    engine = FallbackSearchEngine(":memory:", sync_interval=3600)
+    start = time.perf_counter()
+    engine.index_documents(corpus)
+    engine._synced_at = time.time()  # Corpus cargado a mano: no sincronizar con el almacén
+    results["sqlite"] = {"load_s": time.perf_counter() - start,
+                         **_latencies(lambda query: engine.search(query, facets=["file_extension"]))}
+
+    if with_meilisearch:
+        initialize_meilisearch()
+        client = get_client()
+        index_uid = f"{INDEX_NAME}_bench_engines"
+        client.wait_for_task(client.delete_index(index_uid).task_uid)
+        client.wait_for_task(client.create_index(index_uid, {"primaryKey": "id"}).task_uid)
+        index = client.index(index_uid)
+        client.wait_for_task(index.update_settings(
+            {key: value for key, value in INDEX_CONFIG.items() if key != "primaryKey"}).task_uid, timeout_in_ms=120000)
+        start = time.perf_counter()
+        client.wait_for_task(index.add_documents([to_index_document(d) for d in corpus]).task_uid,
+                             timeout_in_ms=600000)
+        options = build_search_options(limit=20, facets=["file_extension"])
+        results["meilisearch"] = {"load_s": time.perf_counter() - start,
+                                  **_latencies(lambda query: index.search(query, dict(options)))}
+        client.wait_for_task(client.delete_index(index_uid).task_uid)
+
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Motor de respaldo (SQLite FTS5) frente a Meilisearch")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--meilisearch", action="store_true", help="Comparar también con MEILISEARCH_HOST")
+    args = parser.parse_args()
+
+    print(f"🔍 {args.documents} documentos, {args.queries} búsquedas")
+    for engine_name, measures in run_engine_benchmark(args.documents, args.queries, args.meilisearch).items():
+        print(f"   • {engine_name:12} carga: {measures['load_s']:.2f} s | "
+              f"p50: {measures['p50_ms']:.2f} ms | p95: {measures['p95_ms']:.2f} ms")
@@ -23,6 +23,11 @@ Características principales:
 - Parseo robusto de respuestas JSON de Gemini
 - Manejo de errores y fallbacks inteligentes
 - Configuración de timeouts para documentos grandes
+- Proveedor de IA intercambiable (Gemini o servidor local falso)
+- Micro-batching opcional de documentos pequeños en un único prompt
+- Extractor local heurístico como fallback y modo sin IA
+- Métricas por modelo: latencia, tokens, truncado y estrategia de parseo
+- Plazos por subida propagados a la llamada de IA y hedging opcional
 
 
 """
@@ -33,9 +38,12 @@ import io
 import json
 import mimetypes
 import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Callable, Optional, Any
+from typing import Dict, Callable, Optional, Any, List, Tuple
 
 # Bibliotecas para extracción de texto
 import pdfplumber
@@ -43,23 +51,20 @@ from docx import Document as DocxDocument
 from pptx import Presentation
 import openpyxl
 
-# Cliente de Google Gemini AI
-from google.generativeai import GenerativeModel, configure
-
 from config import settings
+from services.llm_providers import LLMProvider, LLMResponse, get_llm_provider
+from services.local_extractor import extract_local_metadata, LOCAL_MODEL_NAME
+from utils.metrics import metrics, RATIO_BUCKETS
 
 # ==================================================================================
 #                           CONFIGURACIÓN DE GEMINI AI
 # ==================================================================================
 
-# Configurar la API de Gemini con la clave desde configuración
-configure(api_key=settings.GEMINI_API_KEY)
-
-# Crear instancia del modelo Gemini más reciente y capaz
-_GEMINI = GenerativeModel("gemini-1.5-flash-latest")
+# El cliente del modelo lo gestiona el proveedor activo (services.llm_providers),
+# que se crea en la primera llamada según LLM_PROVIDER
 
 # Configuraciones de la API
-API_TIMEOUT = 120  # Timeout en segundos para requests largos
+API_TIMEOUT = 120  # Timeout máximo en segundos por llamada (se acota al plazo de la subida)
 MAX_TEXT_LENGTH = 8000  # Máximo de caracteres a enviar a Gemini
 MAX_SUMMARY_WORDS = 150  # Máximo de palabras en el resumen
 MAX_KEYWORDS = 10  # Máximo número de palabras clave
@@ -288,6 +293,201 @@ def _extract_text_content(file_bytes: bytes, file_extension: str) -> str:
         return "Contenido no extraíble - archivo binario o corrupto"
 
 
+# ==================================================================================
+#                           PLAZOS Y HEDGING DE LLAMADAS A IA
+# ==================================================================================
+
+# Muestras mínimas de latencia antes de usar el percentil observado para el hedging
+_HEDGE_MIN_SAMPLES = 20
+
+# Pool de hilos para las llamadas con hedging (primaria y de respaldo)
+_AI_CALL_POOL = ThreadPoolExecutor(max_workers=64, thread_name_prefix="ai-call")
+
+
+class AIDeadlineExceeded(RuntimeError):
+    """El plazo de la subida no deja presupuesto para (seguir esperando) la llamada a IA."""
+
+
+def _call_budget(deadline: Optional[float]) -> float:
+    """
+    Calcula el timeout de una llamada a IA a partir del plazo de la subida.
+    
+    Args:
+        deadline: Instante límite en segundos de time.monotonic(), o None si no hay plazo
+        
+    Returns:
+        float: Segundos disponibles, como máximo API_TIMEOUT
+        
+    Raises:
+        AIDeadlineExceeded: Si quedan menos de AI_MIN_CALL_BUDGET_SECONDS
+    """
+    if deadline is None:
+        return API_TIMEOUT
+    
+    remaining = deadline - time.monotonic()
+    if remaining <= 0 or remaining < settings.AI_MIN_CALL_BUDGET_SECONDS:
+        metrics.counter("ai_deadline_exceeded_total").inc()
+        raise AIDeadlineExceeded(f"Plazo de la subida agotado ({max(remaining, 0):.2f} s restantes)")
+    return min(API_TIMEOUT, remaining)
+
+
+class _HedgeBudget:
+    """
+    Limita la fracción de llamadas que se duplican a AI_HEDGE_MAX_RATIO.
+    
+    Los contadores se reducen a la mitad periódicamente para que el límite
+    refleje el tráfico reciente y no todo el historial del proceso.
+    """
+    
+    _DECAY_EVERY = 1000
+    
+    def __init__(self, max_ratio: float):
+        self._max_ratio = max_ratio
+        self._calls = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+    
+    def record_call(self) -> None:
+        with self._lock:
+            self._calls += 1
+            if self._calls >= self._DECAY_EVERY:
+                self._calls //= 2
+                self._hedges //= 2
+    
+    def try_acquire(self) -> bool:
+        """Reserva un hedge si no se supera el ratio máximo."""
+        with self._lock:
+            if self._hedges + 1 > self._max_ratio * self._calls:
+                return False
+            self._hedges += 1
+            return True
+
+
+_HEDGE_BUDGET = _HedgeBudget(settings.AI_HEDGE_MAX_RATIO)
+
+
+def _hedge_delay(model: str, kind: str) -> float:
+    """
+    Retardo antes de lanzar la llamada de respaldo.
+    
+    Usa el percentil AI_HEDGE_PERCENTILE de la latencia observada para el
+    modelo y tipo de llamada, con AI_HEDGE_MIN_DELAY_MS como mínimo.
+    """
+    min_delay = settings.AI_HEDGE_MIN_DELAY_MS / 1000
+    histogram = metrics.histogram("ai_call_latency_seconds", model=model, kind=kind)
+    if histogram.count < _HEDGE_MIN_SAMPLES:
+        return min_delay
+    return max(min_delay, histogram.percentile(settings.AI_HEDGE_PERCENTILE) or 0.0)
+
+
+def _timed_generate(provider: LLMProvider, prompt: str, timeout: float, kind: str) -> LLMResponse:
+    """
+    Realiza un intento de llamada al proveedor registrando sus métricas.
+    
+    Cada intento (también los de respaldo) registra su propia latencia,
+    de modo que el percentil usado para el hedging refleja al proveedor.
+    """
+    model = provider.model_name
+    
+    start = time.perf_counter()
+    try:
+        response = provider.generate(prompt, timeout=timeout)
+    except Exception as e:
+        metrics.counter("ai_calls_total", model=model, kind=kind, outcome="error").inc()
+        metrics.counter("ai_call_errors_total", model=model, reason=type(e).__name__).inc()
+        raise
+    
+    metrics.histogram("ai_call_latency_seconds", model=model, kind=kind).observe(time.perf_counter() - start)
+    metrics.counter("ai_calls_total", model=model, kind=kind, outcome="ok").inc()
+    if response.prompt_tokens is not None:
+        metrics.counter("ai_prompt_tokens_total", model=model).inc(response.prompt_tokens)
+    if response.output_tokens is not None:
+        metrics.counter("ai_output_tokens_total", model=model).inc(response.output_tokens)
+    
+    return response
+
+
+def _generate_hedged(provider: LLMProvider, prompt: str, timeout: float, kind: str) -> str:
+    """
+    Llamada con hedging: si la primaria tarda más que el p95 observado, lanza
+    una segunda llamada idéntica y devuelve la primera respuesta correcta.
+    
+    La llamada perdedora no se cancela (el SDK no lo permite); termina en
+    segundo plano acotada por su propio timeout.
+    """
+    model = provider.model_name
+    _HEDGE_BUDGET.record_call()
+    
+    end = time.monotonic() + timeout
+    primary = _AI_CALL_POOL.submit(_timed_generate, provider, prompt, timeout, kind)
+    
+    done, _ = wait([primary], timeout=min(_hedge_delay(model, kind), timeout))
+    if done:
+        return primary.result().text
+    
+    remaining = end - time.monotonic()
+    if remaining < settings.AI_MIN_CALL_BUDGET_SECONDS or not _HEDGE_BUDGET.try_acquire():
+        # Sin presupuesto (de tiempo o de coste) para duplicar: esperar a la primaria
+        done, _ = wait([primary], timeout=max(remaining, 0))
+        if not done:
+            raise AIDeadlineExceeded(f"La llamada a IA no respondió en {timeout:.1f} s")
+        return primary.result().text
+    
+    metrics.counter("ai_hedged_calls_total", model=model, kind=kind).inc()
+    hedge = _AI_CALL_POOL.submit(_timed_generate, provider, prompt, remaining, kind)
+    
+    pending = {primary: "primary", hedge: "hedge"}
+    first_error: Optional[Exception] = None
+    while pending:
+        done, _ = wait(list(pending), timeout=max(end - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            winner = pending.pop(future)
+            try:
+                response = future.result()
+            except Exception as e:
+                first_error = first_error or e
+                continue
+            metrics.counter("ai_hedge_wins_total", model=model, kind=kind, winner=winner).inc()
+            return response.text
+    
+    if first_error is not None and not pending:
+        raise first_error
+    raise AIDeadlineExceeded(f"La llamada a IA no respondió en {timeout:.1f} s")
+
+
+def _generate_content(prompt: str, kind: str = "single", deadline: Optional[float] = None) -> str:
+    """
+    Envía un prompt al proveedor de IA activo y devuelve el texto crudo.
+    
+    El timeout de la llamada es el presupuesto que queda hasta el plazo de
+    la subida (como máximo API_TIMEOUT). Con AI_HEDGING_ENABLED se lanza
+    una llamada de respaldo si la primaria supera el p95 de latencia.
+    
+    Registra por modelo la latencia, el consumo de tokens y los errores
+    de la llamada.
+    
+    Args:
+        prompt: Prompt completo a enviar
+        kind: Tipo de llamada para las métricas ("single" o "batch")
+        deadline: Instante límite (time.monotonic()) de la subida, o None
+        
+    Returns:
+        str: Texto de la respuesta del modelo
+        
+    Raises:
+        AIDeadlineExceeded: Si no queda presupuesto o el plazo vence esperando
+    """
+    provider = get_llm_provider()
+    timeout = _call_budget(deadline)
+    
+    if settings.AI_HEDGING_ENABLED:
+        return _generate_hedged(provider, prompt, timeout, kind)
+    
+    return _timed_generate(provider, prompt, timeout, kind).text
+
+
 # ==================================================================================
 #                           INTERACCIÓN CON GEMINI AI
 # ==================================================================================
@@ -334,77 +534,128 @@ DOCUMENTO A ANALIZAR:
 """
 
 
-def _parse_gemini_response(raw_response: str) -> Dict[str, Any]:
+def _extract_json_object(raw_response: str) -> Tuple[Optional[Dict[str, Any]], str]:
     """
-    Parsea la respuesta de Gemini con lógica robusta para extraer JSON.
+    Busca un objeto JSON en la respuesta de Gemini con varias estrategias.
     
     Maneja múltiples formatos de respuesta que Gemini puede generar:
     - JSON directo
     - JSON dentro de bloques de código markdown
     - JSON con texto adicional
-    - Respuestas malformadas
     
     Args:
         raw_response: Respuesta cruda de Gemini
         
     Returns:
-        Dict[str, Any]: Metadatos extraídos o valores por defecto en caso de error
+        Tuple[Optional[Dict[str, Any]], str]: Objeto encontrado (o None) y la
+        estrategia que funcionó ("direct", "markdown_fence", "brace_scan") o
+        el motivo del fallo ("empty_response", "no_json_object", "invalid_json")
     """
+    if not raw_response or not raw_response.strip():
+        return None, "empty_response"
+    
+    # 1. Intentar parsear como JSON directo
     try:
-        # 1. Intentar parsear como JSON directo
+        data = json.loads(raw_response.strip())
+        if isinstance(data, dict):
+            return data, "direct"
+    except json.JSONDecodeError:
+        pass
+    
+    # 2. Buscar JSON dentro de bloques de código markdown
+    json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', raw_response, re.DOTALL)
+    if json_match:
+        json_string = json_match.group(1).strip()
         try:
-            data = json.loads(raw_response.strip())
+            data = json.loads(json_string)
             if isinstance(data, dict):
-                return data
+                return data, "markdown_fence"
         except json.JSONDecodeError:
             pass
+    
+    # 3. Buscar JSON entre llaves en cualquier parte del texto
+    start_brace = raw_response.find('{')
+    end_brace = raw_response.rfind('}')
+    
+    if start_brace == -1 or end_brace == -1 or start_brace > end_brace:
+        return None, "no_json_object"
+    
+    json_string = raw_response[start_brace:end_brace + 1]
+    try:
+        data = json.loads(json_string)
+        if isinstance(data, dict):
+            return data, "brace_scan"
+    except json.JSONDecodeError:
+        pass
+    
+    return None, "invalid_json"
+
+
+def _record_input_metrics(text_content: str) -> None:
+    """
+    Registra cuánto texto del documento se descarta al truncarlo a MAX_TEXT_LENGTH.
+    
+    Args:
+        text_content: Texto completo del documento
+    """
+    model = get_llm_provider().model_name
+    text_length = len(text_content)
+    truncated_ratio = max(0.0, 1 - MAX_TEXT_LENGTH / text_length) if text_length else 0.0
+    
+    metrics.histogram("ai_input_truncation_ratio", buckets=RATIO_BUCKETS, model=model).observe(truncated_ratio)
+    if truncated_ratio > 0:
+        metrics.counter("ai_truncated_documents_total", model=model).inc()
+
+
+def _record_parse_result(kind: str, outcome: str, succeeded: bool) -> None:
+    """
+    Registra la estrategia de parseo usada o el motivo del fallo.
+    
+    Args:
+        kind: "single" o "batch"
+        outcome: Estrategia (si succeeded) o motivo del fallo
+        succeeded: Si se obtuvieron metadatos válidos
+    """
+    model = get_llm_provider().model_name
+    if succeeded:
+        metrics.counter("ai_parse_total", model=model, kind=kind, strategy=outcome).inc()
+    else:
+        metrics.counter("ai_parse_total", model=model, kind=kind, strategy="failed").inc()
+        metrics.counter("ai_parse_failures_total", model=model, kind=kind, reason=outcome).inc()
+
+
+def _normalize_ai_metadata(parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Valida y limpia los metadatos devueltos por la IA.
+    
+    Args:
+        parsed_data: Diccionario parseado de la respuesta del modelo
         
-        # 2. Buscar JSON dentro de bloques de código markdown
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', raw_response, re.DOTALL)
-        if json_match:
-            json_string = json_match.group(1).strip()
-            try:
-                data = json.loads(json_string)
-                if isinstance(data, dict):
-                    return data
-            except json.JSONDecodeError:
-                pass
-        
-        # 3. Buscar JSON entre llaves en cualquier parte del texto
-        start_brace = raw_response.find('{')
-        end_brace = raw_response.rfind('}')
-        
-        if start_brace != -1 and end_brace != -1 and start_brace < end_brace:
-            json_string = raw_response[start_brace:end_brace + 1]
-            try:
-                data = json.loads(json_string)
-                if isinstance(data, dict):
-                    return data
-            except json.JSONDecodeError:
-                pass
-        
-        # 4. Si nada funciona, devolver estructura por defecto
-        # print(f"⚠️  No se pudo parsear respuesta de Gemini: {raw_response[:200]}...")
-        
-        return {
-            "title": "Error de parseo - respuesta no válida",
-            "summary": "No se pudo extraer el resumen debido a un error de formato en la respuesta de IA.",
-            "keywords": [],
-            "date": "Fecha no encontrada"
-        }
-        
-    except Exception as e:
-        # print(f"❌ Error inesperado parseando respuesta: {e}")
+    Returns:
+        Dict[str, Any]: Metadatos con los cuatro campos garantizados
+    """
+    return {
+        "title": str(parsed_data.get("title", "Título no encontrado")).strip(),
+        "summary": str(parsed_data.get("summary", "Resumen no disponible")).strip(),
+        "keywords": parsed_data.get("keywords", []) if isinstance(parsed_data.get("keywords"), list) else [],
+        "date": str(parsed_data.get("date", "Fecha no encontrada")).strip(),
+    }
+
+
+def _local_fallback_metadata(text_content: str) -> Dict[str, Any]:
+    """
+    Metadatos del extractor local que se usan cuando el servicio de IA falla.
+    
+    Args:
+        text_content: Texto del documento
         
-        return {
-            "title": "Error inesperado",
-            "summary": "Error inesperado durante el análisis del documento.",
-            "keywords": [],
-            "date": "Fecha no encontrada"
-        }
+    Returns:
+        Dict[str, Any]: Metadatos heurísticos marcados como fallback
+    """
+    return {**extract_local_metadata(text_content), "enrichment_status": "fallback"}
 
 
-def _call_gemini_ai(text_content: str) -> Dict[str, Any]:
+def _call_gemini_ai(text_content: str, deadline: Optional[float] = None) -> Dict[str, Any]:
     """
     Realiza la llamada a Gemini AI para extraer metadatos del texto.
     
@@ -412,62 +663,324 @@ def _call_gemini_ai(text_content: str) -> Dict[str, Any]:
     1. Crea un prompt optimizado
     2. Envía el request con configuraciones de timeout
     3. Procesa la respuesta con parseo robusto
-    4. Maneja errores y proporciona fallbacks
+    4. Maneja errores usando el extractor local como fallback
     
     Args:
         text_content: Texto del documento a analizar
+        deadline: Instante límite (time.monotonic()) de la subida, o None
         
     Returns:
-        Dict[str, Any]: Metadatos extraídos por Gemini AI
+        Dict[str, Any]: Metadatos extraídos por Gemini AI (o heurísticos si falla)
     """
     try:
         # Crear prompt optimizado
         prompt = _create_analysis_prompt(text_content)
+        _record_input_metrics(text_content)
         
         # Mensaje de depuración - comentado para producción
         # print(f"🤖 Enviando a Gemini: {len(text_content)} caracteres")
         # print(f"📝 Preview: {text_content[:200]}...")
         
         # Realizar llamada a Gemini con timeout
-        response = _GEMINI.generate_content(
-            prompt,
-            request_options={"timeout": API_TIMEOUT}
-        )
-        
-        raw_text = response.text
+        raw_text = _generate_content(prompt, deadline=deadline)
         
         # Mensaje de depuración - comentado para producción
         # print(f"🤖 Respuesta de Gemini: {raw_text[:300]}...")
         
         # Parsear respuesta con lógica robusta
-        parsed_data = _parse_gemini_response(raw_text)
+        parsed_data, parse_outcome = _extract_json_object(raw_text)
+        _record_parse_result("single", parse_outcome, parsed_data is not None)
+        if parsed_data is None:
+            # Respuesta malformada: usar el extractor local
+            return _local_fallback_metadata(text_content)
         
         # Validar y limpiar datos extraídos
-        return {
-            "title": str(parsed_data.get("title", "Título no encontrado")).strip(),
-            "summary": str(parsed_data.get("summary", "Resumen no disponible")).strip(),
-            "keywords": parsed_data.get("keywords", []) if isinstance(parsed_data.get("keywords"), list) else [],
-            "date": str(parsed_data.get("date", "Fecha no encontrada")).strip(),
-        }
+        return _normalize_ai_metadata(parsed_data)
         
     except Exception as e:
-        # Manejar errores de API, timeout, etc.
+        # Manejar errores de API, timeout, plazo agotado, etc.
         # print(f"❌ Error llamando a Gemini AI: {e}")
         
-        # Fallback con metadatos básicos
-        return {
-            "title": "Error de procesamiento con IA",
-            "summary": "No se pudo generar el resumen debido a un error en el servicio de IA.",
-            "keywords": [],
-            "date": "Fecha no encontrada",
-        }
+        # Fallback con metadatos heurísticos locales
+        return _local_fallback_metadata(text_content)
+
+
+# ==================================================================================
+#                           MICRO-BATCHING DE DOCUMENTOS PEQUEÑOS
+# ==================================================================================
+
+def _create_batch_analysis_prompt(texts: List[str]) -> str:
+    """
+    Crea un prompt que analiza varios documentos cortos en una sola llamada.
+    
+    Cada documento se delimita con su índice y se pide a Gemini un array JSON
+    con un objeto de metadatos por documento, en el mismo orden.
+    
+    Args:
+        texts: Textos de los documentos a analizar
+        
+    Returns:
+        str: Prompt estructurado para Gemini
+    """
+    documents_block = "\n\n".join(
+        f"=== DOCUMENTO {index} ===\n{text[:MAX_TEXT_LENGTH]}\n=== FIN DOCUMENTO {index} ==="
+        for index, text in enumerate(texts)
+    )
+    
+    return f"""
+Eres un asistente experto en análisis y extracción de metadatos de documentos profesionales.
+
+TAREA: Analiza por separado cada uno de los {len(texts)} documentos siguientes y extrae sus metadatos.
+
+INSTRUCCIONES ESPECÍFICAS (para cada documento):
+1. "index": El número del documento tal como aparece en su encabezado.
+2. "title": Título principal o tema central del documento.
+3. "summary": Resumen conciso de máximo {MAX_SUMMARY_WORDS} palabras.
+4. "keywords": Entre 5 y {MAX_KEYWORDS} palabras clave relevantes.
+5. "date": Fecha más significativa en formato YYYY-MM-DD, o exactamente "Fecha no encontrada".
+
+FORMATO DE SALIDA:
+- Responde ÚNICAMENTE con un array JSON de {len(texts)} objetos, uno por documento y en el mismo orden
+- NO mezcles información entre documentos
+- NO incluyas bloques de código markdown (```json)
+- NO añadas texto explicativo antes o después del JSON
+
+DOCUMENTOS A ANALIZAR:
+{documents_block}
+"""
+
+
+def _parse_gemini_batch_response(
+    raw_response: str,
+    expected: int
+) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+    """
+    Parsea la respuesta de un lote y la demultiplexa por documento.
+    
+    No inventa valores por defecto: si el array no es válido o no cubre
+    todos los documentos devuelve None para que el lote se reprocese
+    documento a documento.
+    
+    Args:
+        raw_response: Respuesta cruda de Gemini
+        expected: Número de documentos enviados en el lote
+        
+    Returns:
+        Tuple[Optional[List[Dict[str, Any]]], str]: Metadatos en el orden de
+        entrada (o None) y la estrategia usada o el motivo del fallo
+    """
+    if not raw_response or not raw_response.strip():
+        return None, "empty_response"
+    
+    candidates = [("direct", raw_response.strip())]
+    
+    fence_match = re.search(r'```(?:json)?\s*(\[.*?\])\s*```', raw_response, re.DOTALL)
+    if fence_match:
+        candidates.append(("markdown_fence", fence_match.group(1).strip()))
+    
+    start_bracket = raw_response.find('[')
+    end_bracket = raw_response.rfind(']')
+    if start_bracket != -1 and end_bracket != -1 and start_bracket < end_bracket:
+        candidates.append(("bracket_scan", raw_response[start_bracket:end_bracket + 1]))
+    
+    failure_reason = "invalid_json"
+    for strategy, candidate in candidates:
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            continue
+        if len(data) != expected:
+            failure_reason = "count_mismatch"
+            continue
+        
+        # Reordenar por "index" si el modelo lo devolvió correctamente
+        indices = [item.get("index") for item in data]
+        if sorted(i for i in indices if isinstance(i, int)) == list(range(expected)):
+            data = sorted(data, key=lambda item: item["index"])
+        
+        return data, strategy
+    
+    return None, failure_reason
+
+
+def _call_gemini_ai_batch(texts: List[str], deadline: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Analiza varios documentos con una sola llamada a Gemini.
+    
+    Si la llamada falla o la respuesta no se puede demultiplexar, cada
+    documento se procesa individualmente con _call_gemini_ai.
+    
+    Args:
+        texts: Textos de los documentos del lote
+        deadline: Plazo más cercano de los documentos del lote, o None
+        
+    Returns:
+        List[Dict[str, Any]]: Metadatos por documento, en el orden de entrada
+    """
+    if len(texts) == 1:
+        return [_call_gemini_ai(texts[0], deadline)]
+    
+    try:
+        raw_text = _generate_content(_create_batch_analysis_prompt(texts), kind="batch", deadline=deadline)
+        parsed_items, parse_outcome = _parse_gemini_batch_response(raw_text, len(texts))
+        _record_parse_result("batch", parse_outcome, parsed_items is not None)
+    except Exception:
+        parsed_items = None
+    
+    if parsed_items is None:
+        # Respuesta malformada: fallback a llamadas individuales (cada una
+        # registra sus métricas de entrada)
+        return [_call_gemini_ai(text, deadline) for text in texts]
+    
+    for text in texts:
+        _record_input_metrics(text)
+    return [_normalize_ai_metadata(item) for item in parsed_items]
+
+
+class _AIBatcher:
+    """
+    Acumula documentos pequeños y los envía a Gemini en lotes.
+    
+    Un lote se despacha cuando se alcanza el número máximo de documentos,
+    cuando el siguiente documento excedería el presupuesto de caracteres,
+    o cuando vence la ventana de espera del primer documento del lote.
+    """
+    
+    def __init__(self, window_seconds: float, max_size: int, char_budget: int):
+        self._window_seconds = window_seconds
+        self._max_size = max_size
+        self._char_budget = char_budget
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, Optional[float], Future]] = []
+        self._pending_chars = 0
+        self._timer: Optional[threading.Timer] = None
+    
+    def submit(self, text_content: str, deadline: Optional[float] = None) -> Future:
+        """
+        Encola un documento y devuelve un Future con sus metadatos.
+        
+        El lote se envía con el plazo más cercano de sus documentos.
+        """
+        future: Future = Future()
+        ready_batches = []
+        
+        with self._lock:
+            if self._pending and self._pending_chars + len(text_content) > self._char_budget:
+                ready_batches.append(self._take_pending())
+            
+            self._pending.append((text_content, deadline, future))
+            self._pending_chars += len(text_content)
+            
+            if len(self._pending) >= self._max_size:
+                ready_batches.append(self._take_pending())
+            elif self._timer is None:
+                self._timer = threading.Timer(self._window_seconds, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        
+        for batch in ready_batches:
+            threading.Thread(target=self._run_batch, args=(batch,), daemon=True).start()
+        
+        return future
+    
+    def _take_pending(self) -> List[Tuple[str, Optional[float], Future]]:
+        """Extrae el lote pendiente. Debe llamarse con el lock adquirido."""
+        batch = self._pending
+        self._pending = []
+        self._pending_chars = 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+    
+    def _flush_on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            batch = self._take_pending() if self._pending else []
+        if batch:
+            self._run_batch(batch)
+    
+    @staticmethod
+    def _run_batch(batch: List[Tuple[str, Optional[float], Future]]) -> None:
+        texts = [text for text, _, _ in batch]
+        deadlines = [deadline for _, deadline, _ in batch if deadline is not None]
+        try:
+            results = _call_gemini_ai_batch(texts, min(deadlines) if deadlines else None)
+        except Exception:
+            results = [_local_fallback_metadata(text) for text in texts]
+        
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+# Instancia única del agrupador (solo se usa si GEMINI_BATCH_ENABLED)
+_BATCHER = _AIBatcher(
+    window_seconds=settings.GEMINI_BATCH_WINDOW_MS / 1000,
+    max_size=settings.GEMINI_BATCH_MAX_SIZE,
+    char_budget=settings.GEMINI_BATCH_CHAR_BUDGET,
+)
+
+
+def _analyze_text(text_content: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Analiza un texto con Gemini, agrupándolo en un lote si es pequeño.
+    
+    Args:
+        text_content: Texto del documento a analizar
+        deadline: Instante límite (time.monotonic()) de la subida, o None
+        
+    Returns:
+        Dict[str, Any]: Metadatos extraídos por Gemini AI (o heurísticos si vence el plazo)
+    """
+    if settings.GEMINI_BATCH_ENABLED and len(text_content) <= settings.GEMINI_BATCH_SMALL_DOC_CHARS:
+        future = _BATCHER.submit(text_content, deadline)
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        done, _ = wait([future], timeout=remaining)
+        if not done:
+            # El lote sigue en curso pero esta subida ya no puede esperar
+            metrics.counter("ai_deadline_exceeded_total").inc()
+            return _local_fallback_metadata(text_content)
+        return future.result()
+    
+    return _call_gemini_ai(text_content, deadline)
 
 
 # ==================================================================================
 #                           FUNCIÓN PRINCIPAL DE EXTRACCIÓN
 # ==================================================================================
 
-def extract_metadata(file_bytes: bytes, filename: str) -> Dict[str, Any]:
+def extract_text(file_bytes: bytes, filename: str) -> str:
+    """
+    Texto de un archivo según su extensión (nunca vacío: si no se extrae
+    nada, describe el archivo).
+    
+    Args:
+        file_bytes: Contenido completo del archivo en bytes
+        filename: Nombre original del archivo (determina el tipo)
+        
+    Returns:
+        str: Texto extraído
+    """
+    file_extension = Path(filename).suffix.lower()
+    text_content = _extract_text_content(file_bytes, file_extension)
+    
+    # Validar que se extrajo contenido útil
+    if not text_content.strip():
+        # print(f"⚠️  Advertencia: No se extrajo contenido de '{filename}'")
+        text_content = f"Archivo de tipo {file_extension} sin contenido extraíble. Nombre: {filename}"
+    return text_content
+
+
+def extract_metadata(
+    file_bytes: bytes,
+    filename: str,
+    use_ai: bool = True,
+    deadline: Optional[float] = None,
+    text_content: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Función principal que orquesta todo el proceso de extracción de metadatos.
     
@@ -482,6 +995,10 @@ def extract_metadata(file_bytes: bytes, filename: str) -> Dict[str, Any]:
     Args:
         file_bytes: Contenido completo del archivo en bytes
         filename: Nombre original del archivo (usado para determinar el tipo)
+        use_ai: Si es False se usa solo el extractor local (sin red)
+        deadline: Instante límite (time.monotonic()) de la subida; la llamada a IA
+                  recibe el tiempo restante y, si no queda, se usa el extractor local
+        text_content: Texto ya extraído con extract_text (evita extraerlo dos veces)
         
     Returns:
         Dict[str, Any]: Diccionario con metadatos extraídos compatible con DocumentMetadata:
@@ -509,15 +1026,18 @@ def extract_metadata(file_bytes: bytes, filename: str) -> Dict[str, Any]:
         # print(f"📄 Procesando: {filename} ({len(file_bytes)} bytes, tipo: {file_extension})")
         
         # ===== EXTRACCIÓN DE TEXTO =====
-        text_content = _extract_text_content(file_bytes, file_extension)
+        if text_content is None:
+            text_content = extract_text(file_bytes, filename)
         
-        # Validar que se extrajo contenido útil
-        if not text_content.strip():
-            # print(f"⚠️  Advertencia: No se extrajo contenido de '{filename}'")
-            text_content = f"Archivo de tipo {file_extension} sin contenido extraíble. Nombre: {filename}"
+        # ===== ANÁLISIS CON GEMINI AI (O EXTRACTOR LOCAL) =====
+        if use_ai:
+            ai_metadata = _analyze_text(text_content, deadline)
+            enrichment_status = ai_metadata.pop("enrichment_status", "complete")
+        else:
+            ai_metadata = extract_local_metadata(text_content)
+            enrichment_status = "local"
         
-        # ===== ANÁLISIS CON GEMINI AI =====
-        ai_metadata = _call_gemini_ai(text_content)
+        ai_model = get_llm_provider().model_name if enrichment_status == "complete" else LOCAL_MODEL_NAME
         
         # ===== ENSAMBLAJE DE METADATOS FINALES =====
         final_metadata = {
@@ -535,7 +1055,8 @@ def extract_metadata(file_bytes: bytes, filename: str) -> Dict[str, Any]:
             
             # Metadatos adicionales (opcionales)
             "processing_timestamp": datetime.now().isoformat() + "Z",
-            "ai_model": "gemini-1.5-flash-latest",
+            "ai_model": ai_model,
+            "enrichment_status": enrichment_status,
             "text_length": len(text_content)
         }
         
@@ -629,7 +1150,7 @@ if __name__ == "__main__":
     try:
         # Información de configuración
         print(f"📋 Extensiones soportadas: {get_supported_extensions()}")
-        print(f"🔧 Modelo configurado: gemini-1.5-flash-latest")
+        print(f"🔧 Proveedor configurado: {settings.LLM_PROVIDER} ({settings.LLM_MODEL})")
         print(f"⏱️  Timeout configurado: {API_TIMEOUT} segundos")
         print()
         
@@ -0,0 +1,426 @@
+"""
+Particiones del Índice por Año - Reparto de Escrituras y Búsquedas
+
+Con un único índice "documents", cada cambio de configuración y cada
+reconstrucción reindexa todo el corpus. Con INDEX_PARTITIONING_ENABLED los
+documentos se reparten en un índice por año de su fecha normalizada
+(date_year, ver meilisearch_service.date_fields):
+
+    documents_2023, documents_2024, documents_2025, ... y documents_undated
+    (documentos sin fecha reconocible)
+
+- Escritura: la partición se elige al escribir a partir de date_year; la
+  primera escritura de un año crea y configura su índice
+- Búsqueda: una consulta por partición en una sola petición multi-search;
+  los resultados se mezclan por la puntuación de ranking (_rankingScore) y,
+  a igualdad, por la ordenación pedida (en listados sin texto, por la
+  ordenación), y las facetas y los totales se suman
+- Poda: las particiones que un filtro sobre date_ts, date_year o date_known
+  descarta por completo no se consultan ("date_ts >= <1/1/2024> AND
+  date_ts < <1/4/2024>" solo busca en documents_2024)
+- Mantenimiento: la configuración se sincroniza y el índice se reconstruye
+  partición a partición (services.index_rebuild)
+
+Este módulo no depende de meilisearch_service: recibe el cliente y la
+función de configuración del índice al crear el registro, que vive en
+meilisearch_service (index_partitions).
+
+
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from functools import cmp_to_key
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           NOMBRES DE LAS PARTICIONES
+# ==================================================================================
+
+# Partición de los documentos sin fecha reconocible (date_known = false)
+UNDATED_PARTITION = "undated"
+
+# Campos de fecha que permiten podar particiones
+_DATE_FIELDS = {"date_ts", "date_year", "date_known"}
+
+# Resultado de evaluar un filtro sobre una partición entera
+_ALL, _SOME, _NONE = "all", "some", "none"
+
+
+def partition_key_for_year(year: Optional[int]) -> str:
+    """Clave de partición de un año (None: documentos sin fecha)."""
+    return UNDATED_PARTITION if year is None else str(int(year))
+
+
+def _year_bounds(year: int) -> tuple:
+    """Primer y último milisegundo (UTC) de un año, ambos incluidos."""
+    start = datetime(year, 1, 1, tzinfo=timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000) - 1
+
+
+# ==================================================================================
+#                           PODA POR FILTRO
+# ==================================================================================
+
+def _number(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _interval_match(low: float, high: float, operator: str, value: float) -> str:
+    """Cuántos valores de [low, high] cumplen "x <operador> value"."""
+    if operator in ("=", "!="):
+        if low == high == value:
+            matched = _ALL
+        elif low <= value <= high:
+            matched = _SOME
+        else:
+            matched = _NONE
+        return _negate(matched) if operator == "!=" else matched
+    test = {
+        ">": lambda x: x > value,
+        ">=": lambda x: x >= value,
+        "<": lambda x: x < value,
+        "<=": lambda x: x <= value,
+    }[operator]
+    # Las cuatro comparaciones son monótonas: basta con mirar los extremos
+    low_matches, high_matches = test(low), test(high)
+    if low_matches and high_matches:
+        return _ALL
+    return _SOME if low_matches or high_matches else _NONE
+
+
+def _negate(matched: str) -> str:
+    return {_ALL: _NONE, _NONE: _ALL}.get(matched, _SOME)
+
+
+def _combine(results: List[str], conjunction: bool) -> str:
+    if conjunction:
+        if _NONE in results:
+            return _NONE
+        return _ALL if all(result == _ALL for result in results) else _SOME
+    if _ALL in results:
+        return _ALL
+    return _NONE if all(result == _NONE for result in results) else _SOME
+
+
+def _date_condition(node: tuple, key: str) -> str:
+    """Evalúa una condición sobre date_ts, date_year o date_known en una partición."""
+    kind, attribute = node[0], node[1]
+    undated = key == UNDATED_PARTITION
+
+    if kind == "exists":
+        # Los tres campos se escriben siempre (nulos si no hay fecha)
+        return _ALL
+    if kind == "is":
+        if node[2] == "EMPTY":
+            return _NONE
+        return _ALL if undated and attribute != "date_known" else _NONE
+
+    if attribute == "date_known":
+        values = node[2] if kind == "in" else [node[3]] if kind == "cmp" else []
+        if kind == "range" or (kind == "cmp" and node[2] not in ("=", "!=")):
+            return _SOME
+        expected = {str(value).lower() for value in values}
+        known = "false" if undated else "true"
+        matched = _ALL if known in expected else _NONE
+        return _negate(matched) if kind == "cmp" and node[2] == "!=" else matched
+
+    if undated:
+        # date_ts y date_year son nulos: solo "!=" (NOT =) los incluye
+        return _ALL if kind == "cmp" and node[2] == "!=" else _NONE
+
+    year = int(key)
+    low, high = _year_bounds(year) if attribute == "date_ts" else (year, year)
+    if kind == "cmp":
+        value = _number(node[3])
+        return _SOME if value is None else _interval_match(low, high, node[2], value)
+    if kind == "range":
+        start, end = _number(node[2]), _number(node[3])
+        if start is None or end is None:
+            return _SOME
+        return _combine([_interval_match(low, high, ">=", start), _interval_match(low, high, "<=", end)], True)
+    if kind == "in":
+        values = [_number(value) for value in node[2]]
+        if None in values:
+            return _SOME
+        return _combine([_interval_match(low, high, "=", value) for value in values], False)
+    return _SOME
+
+
+def _match_partition(node: Optional[tuple], key: str) -> str:
+    if node is None:
+        return _ALL
+    kind = node[0]
+    if kind in ("and", "or"):
+        return _combine([_match_partition(child, key) for child in node[1]], kind == "and")
+    if kind == "not":
+        return _negate(_match_partition(node[1], key))
+    if node[1] in _DATE_FIELDS:
+        return _date_condition(node, key)
+    return _SOME
+
+
+def partition_may_match(filter_tree: Optional[tuple], key: str) -> bool:
+    """
+    Indica si algún documento de la partición puede cumplir el filtro.
+
+    Args:
+        filter_tree: Árbol de meilisearch_service.parse_filter_expression
+        key: Clave de la partición ("2024", "undated")
+
+    Returns:
+        bool: False solo si el filtro descarta la partición entera
+    """
+    return _match_partition(filter_tree, key) != _NONE
+
+
+# ==================================================================================
+#                           MEZCLA DE RESULTADOS
+# ==================================================================================
+
+def partition_search_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Opciones de la consulta a cada partición: los primeros offset + limit
+    resultados, con su puntuación para poder mezclarlos.
+    """
+    return {
+        **options,
+        "offset": 0,
+        "limit": options.get("offset", 0) + options.get("limit", 20),
+        "showRankingScore": True,
+    }
+
+
+def _compare_hits(criteria: List[tuple], relevance_first: bool) -> Callable[[Dict[str, Any], Dict[str, Any]], int]:
+    def compare_scores(a: Dict[str, Any], b: Dict[str, Any]) -> int:
+        left_score, right_score = a.get("_rankingScore") or 0.0, b.get("_rankingScore") or 0.0
+        return (left_score < right_score) - (left_score > right_score)
+
+    def compare(a: Dict[str, Any], b: Dict[str, Any]) -> int:
+        if relevance_first:
+            by_score = compare_scores(a, b)
+            if by_score:
+                return by_score
+        for field, descending in criteria:
+            left, right = a.get(field), b.get(field)
+            if left == right:
+                continue
+            # Como en Meilisearch, los documentos sin valor van al final en ambos sentidos
+            if left is None:
+                return 1
+            if right is None:
+                return -1
+            try:
+                less = left < right
+            except TypeError:
+                less = str(left) < str(right)
+            return (1 if less else -1) if descending else (-1 if less else 1)
+        return compare_scores(a, b)
+    return compare
+
+
+def empty_search_result(query: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Respuesta sin resultados (todas las particiones descartadas o ninguna creada)."""
+    result = {
+        "hits": [],
+        "query": query,
+        "processingTimeMs": 0,
+        "limit": options.get("limit", 20),
+        "offset": options.get("offset", 0),
+        "estimatedTotalHits": 0,
+    }
+    if options.get("facets"):
+        result["facetDistribution"] = {facet: {} for facet in options["facets"]}
+        result["facetStats"] = {}
+    return result
+
+
+def merge_partition_results(results: List[Dict[str, Any]], query: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Combina las respuestas de las particiones en una sola, con la forma de
+    una búsqueda en un único índice.
+
+    Con texto de búsqueda Meilisearch aplica las reglas de relevancia antes
+    que sort, así que los resultados de cada partición no vienen ordenados
+    por la clave de ordenación: los candidatos (offset + limit de cada
+    partición) se ordenan por _rankingScore y, a igualdad, por sort, como
+    en un único índice. Sin texto (listados) se ordenan por sort y, a
+    igualdad, por _rankingScore. Después se aplican offset y limit. Las
+    facetas y los totales se suman y facetStats toma el mínimo y el máximo.
+
+    Args:
+        results: Respuestas de cada partición (consultadas con partition_search_options)
+        query: Texto de búsqueda
+        options: Opciones de la búsqueda original (limit, offset, sort, facets...)
+    """
+    if not results:
+        return empty_search_result(query, options)
+
+    limit, offset = options.get("limit", 20), options.get("offset", 0)
+    criteria = [
+        (criterion.split(":", 1)[0], criterion.endswith(":desc"))
+        for criterion in options.get("sort") or []
+    ]
+    candidates = [hit for result in results for hit in result.get("hits", [])]
+    candidates.sort(key=cmp_to_key(_compare_hits(criteria, relevance_first=bool(query.strip()))))
+    hits = candidates[offset:offset + limit]
+    if not options.get("showRankingScore"):
+        hits = [{key: value for key, value in hit.items() if key != "_rankingScore"} for hit in hits]
+
+    response: Dict[str, Any] = {
+        "hits": hits,
+        "query": query,
+        "processingTimeMs": max(result.get("processingTimeMs", 0) for result in results),
+        "limit": limit,
+        "offset": offset,
+        "estimatedTotalHits": sum(result.get("estimatedTotalHits", 0) for result in results),
+    }
+    if any("semanticHitCount" in result for result in results):
+        response["semanticHitCount"] = sum(result.get("semanticHitCount", 0) for result in results)
+
+    if options.get("facets"):
+        distribution: Dict[str, Dict[str, int]] = {facet: {} for facet in options["facets"]}
+        stats: Dict[str, Dict[str, float]] = {}
+        for result in results:
+            for facet, counts in (result.get("facetDistribution") or {}).items():
+                merged_counts = distribution.setdefault(facet, {})
+                for value, count in counts.items():
+                    merged_counts[value] = merged_counts.get(value, 0) + count
+            for facet, bounds in (result.get("facetStats") or {}).items():
+                current = stats.setdefault(facet, dict(bounds))
+                current["min"] = min(current["min"], bounds["min"])
+                current["max"] = max(current["max"], bounds["max"])
+        # Meilisearch devuelve cada faceta ordenada por valor
+        response["facetDistribution"] = {facet: dict(sorted(counts.items())) for facet, counts in distribution.items()}
+        response["facetStats"] = stats
+    return response
+
+
+# ==================================================================================
+#                           REGISTRO DE PARTICIONES
+# ==================================================================================
+
+class IndexPartitions:
+    """
+    Particiones existentes en Meilisearch, con creación bajo demanda.
+
+    La lista se lee de Meilisearch (GET /indexes) y se vuelve a leer cada
+    refresh_interval segundos, de modo que un worker ve las particiones que
+    han creado los demás. Cada partición se configura la primera vez que se
+    ve: al arrancar se sincronizan los ajustes de todas, una a una, y una
+    partición creada implícitamente (reintento de una escritura) no queda
+    sin configurar.
+
+    Args:
+        base_index: Índice sin particionar ("documents"); las particiones se llaman <base>_<año>
+        client_getter: Función que devuelve el cliente de Meilisearch inicializado
+        configure: Función que sincroniza la configuración de un índice (_configurar_indice)
+        primary_key: Clave primaria de los índices nuevos
+        refresh_interval: Segundos entre relecturas de la lista de particiones
+    """
+
+    def __init__(
+        self,
+        base_index: str,
+        client_getter: Callable[[], Any],
+        configure: Callable[..., List[str]],
+        primary_key: str,
+        refresh_interval: float,
+    ):
+        self._base_index = base_index
+        self._client_getter = client_getter
+        self._configure = configure
+        self._primary_key = primary_key
+        self._refresh_interval = refresh_interval
+        self._pattern = re.compile(rf"^{re.escape(base_index)}_(\d{{4}}|{UNDATED_PARTITION})$")
+        self._lock = threading.Lock()
+        self._known: Set[str] = set()
+        self._configured: Set[str] = set()
+        self._refreshed_at: Optional[float] = None
+
+        metrics.gauge("index_partitions").set_function(lambda: len(self._known))
+
+    def index_uid(self, key: str) -> str:
+        """Índice de una partición ("2024" -> "documents_2024")."""
+        return f"{self._base_index}_{key}"
+
+    def key(self, index_uid: str) -> Optional[str]:
+        """Clave de partición de un índice, o None si no es una partición."""
+        match = self._pattern.match(index_uid)
+        return match.group(1) if match else None
+
+    def indexes(self) -> List[str]:
+        """Particiones conocidas, en orden."""
+        with self._lock:
+            return sorted(self._known)
+
+    def is_stale(self) -> bool:
+        refreshed_at = self._refreshed_at
+        return refreshed_at is None or time.monotonic() - refreshed_at >= self._refresh_interval
+
+    def refresh(self) -> List[str]:
+        """
+        Vuelve a leer de Meilisearch la lista de particiones.
+
+        Raises:
+            RuntimeError: Si Meilisearch no responde
+        """
+        response = self._client_getter().get_indexes({"limit": 1000})
+        entries = response.get("results", []) if isinstance(response, dict) else response
+        found = set()
+        for entry in entries:
+            uid = entry.get("uid", "") if isinstance(entry, dict) else getattr(entry, "uid", "")
+            if self.key(uid) is not None:
+                found.add(uid)
+        for uid in sorted(found - self._configured):
+            self._configure(uid)
+            self._configured.add(uid)
+        with self._lock:
+            self._known = found
+            self._refreshed_at = time.monotonic()
+        return sorted(found)
+
+    def ensure(self, key: str) -> str:
+        """
+        Índice de una partición, creándolo y configurándolo si no existe.
+
+        Raises:
+            RuntimeError: Si no se puede crear o configurar
+        """
+        uid = self.index_uid(key)
+        with self._lock:
+            if uid in self._known:
+                return uid
+            client = self._client_getter()
+            task = client.create_index(uid, {"primaryKey": self._primary_key})
+            status = client.wait_for_task(task.task_uid)
+            error = getattr(status, "error", None) or {}
+            if status.status != "succeeded" and error.get("code") != "index_already_exists":
+                raise RuntimeError(f"No se pudo crear la partición '{uid}': {error.get('message', status.status)}")
+            self._configure(uid, strict=True)
+            self._configured.add(uid)
+            self._known.add(uid)
+        metrics.counter("index_partitions_created_total").inc()
+        return uid
+
+    def select(self, filter_tree: Optional[tuple]) -> List[str]:
+        """
+        Particiones en las que puede haber resultados para un filtro.
+
+        Args:
+            filter_tree: Árbol del filtro ya validado (parse_filter_expression)
+        """
+        indexes = self.indexes()
+        selected = [uid for uid in indexes if partition_may_match(filter_tree, self.key(uid))]
+        metrics.counter("index_partitions_pruned_total").inc(len(indexes) - len(selected))
+        return selected
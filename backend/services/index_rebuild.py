@@ -0,0 +1,302 @@
+"""
+Reconstrucción del Índice sin Cortes - Índice Sombra e Intercambio Atómico
+
+reset_index() borra el índice "documents" y lo vuelve a crear: mientras se
+reconstruye, las búsquedas no devuelven nada. Este módulo reconstruye el
+índice en paralelo y lo sustituye de una sola vez:
+
+1. Crea el índice sombra (documents_next) con la INDEX_CONFIG actual
+2. Lo carga por lotes desde el almacén local de metadatos (services.metadata_store)
+3. Se pone al día con los documentos guardados durante la carga
+4. Verifica que el número de documentos coincide con el esperado
+5. Intercambia ambos índices con la API de swap de Meilisearch (atómico)
+6. Reenvía por services.index_writer las escrituras llegadas durante el
+   intercambio y borra el índice antiguo
+
+Las búsquedas siguen atendiéndose con el índice actual durante todo el
+proceso. Si algo falla antes del intercambio, el índice actual no se toca
+(el índice sombra se descarta en la siguiente reconstrucción).
+
+Con particiones por año (INDEX_PARTITIONING_ENABLED) cada partición se
+reconstruye por separado con su propio índice sombra (documents_2024_next),
+todas o solo una. Al activar las particiones hay que reconstruir para
+repartir los documentos; el índice sin particionar deja de usarse.
+
+Uso:
+    from services.index_rebuild import index_rebuild
+
+    index_rebuild.start(requested_by="admin_uid")
+    index_rebuild.start(requested_by="admin_uid", partition="2024")
+    index_rebuild.progress()   # fase, documentos cargados, errores...
+
+
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from meilisearch import Client
+
+from config import settings
+from services.meilisearch_service import (
+    INDEX_CONFIG,
+    INDEX_NAME,
+    SHADOW_INDEX_NAME,
+    _configurar_indice,
+    _get_initialized_client,
+    index_partitions,
+    partition_indexes,
+    partition_key,
+    prepare_index_documents,
+    task_tracker,
+)
+from services.index_writer import index_writer
+from services.metadata_store import iter_metadata
+from utils.audit_logger import log_event
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           RECONSTRUCCIÓN DEL ÍNDICE
+# ==================================================================================
+
+# Margen (segundos) al buscar documentos modificados durante la carga
+_CATCH_UP_MARGIN_SECONDS = 2.0
+
+
+class IndexRebuild:
+    """
+    Reconstrucción en segundo plano del índice principal mediante un índice sombra.
+
+    Args:
+        client_getter: Función que devuelve el cliente de Meilisearch inicializado
+        live_index: Índice que atiende las búsquedas
+        shadow_index: Índice en el que se reconstruye
+        batch_size: Documentos por lote de carga
+        task_timeout_ms: Espera máxima de cada tarea de Meilisearch
+    """
+
+    def __init__(
+        self,
+        client_getter: Callable[[], Client],
+        live_index: str,
+        shadow_index: str,
+        batch_size: int,
+        task_timeout_ms: int,
+    ):
+        self._client_getter = client_getter
+        self._live_index = live_index
+        self._shadow_index = shadow_index
+        self._batch_size = batch_size
+        self._task_timeout_ms = task_timeout_ms
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._progress: Dict[str, Any] = {"phase": "idle"}
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def progress(self) -> Dict[str, Any]:
+        """Estado de la reconstrucción en curso o de la última."""
+        with self._lock:
+            progress = dict(self._progress)
+        if progress.get("started_at_ts"):
+            end = progress.get("finished_at_ts") or time.time()
+            progress["elapsed_seconds"] = round(end - progress["started_at_ts"], 1)
+        progress["running"] = self.is_running()
+        return progress
+
+    def _update(self, **fields: Any) -> None:
+        with self._lock:
+            self._progress.update(fields)
+
+    def start(self, requested_by: Optional[str] = None, partition: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Lanza la reconstrucción en un hilo.
+
+        Args:
+            requested_by: Usuario que la solicita (auditoría)
+            partition: Partición a reconstruir ("2024", "undated"); por defecto todas
+
+        Returns:
+            Dict[str, Any]: Progreso inicial
+
+        Raises:
+            RuntimeError: Si ya hay una reconstrucción en curso
+            ValueError: Si se indica una partición sin particiones activas o con un nombre inválido
+        """
+        if partition is not None:
+            if not settings.INDEX_PARTITIONING_ENABLED:
+                raise ValueError("Las particiones del índice no están activas (INDEX_PARTITIONING_ENABLED)")
+            if index_partitions.key(index_partitions.index_uid(partition)) is None:
+                raise ValueError(f"Partición inválida: '{partition}' (un año de cuatro cifras o 'undated')")
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise RuntimeError("Ya hay una reconstrucción del índice en curso")
+            self._progress = {
+                "phase": "starting",
+                "requested_by": requested_by,
+                "started_at": datetime.now().isoformat() + "Z",
+                "started_at_ts": time.time(),
+                "total_documents": 0,
+                "loaded_documents": 0,
+                "caught_up_documents": 0,
+                "error": None,
+            }
+            if settings.INDEX_PARTITIONING_ENABLED:
+                self._progress.update(partition=partition, partitions=[], partitions_done=0)
+            self._thread = threading.Thread(target=self._run, args=(partition,), name="index-rebuild", daemon=True)
+            self._thread.start()
+        return self.progress()
+
+    # ===== PASOS =====
+
+    def _wait(self, client: Client, task_uid: int, description: str) -> None:
+        task = client.wait_for_task(task_uid, timeout_in_ms=self._task_timeout_ms)
+        if task.status != "succeeded":
+            error = task.error or {}
+            raise RuntimeError(f"{description}: tarea {task_uid} terminó en estado '{task.status}' "
+                               f"({error.get('message', 'sin detalle')})")
+
+    def _load(self, client: Client, index_uid: str, documents: List[Dict[str, Any]], counter: str) -> None:
+        """Carga documentos por lotes (con sus vectores si hay búsqueda híbrida) y espera a que se indexen."""
+        index = client.index(index_uid)
+        primary_key = INDEX_CONFIG["primaryKey"]
+        for start in range(0, len(documents), self._batch_size):
+            batch = prepare_index_documents(documents[start:start + self._batch_size])
+            task = index.add_documents(batch, primary_key=primary_key)
+            self._wait(client, task.task_uid, f"Carga de documentos en '{index_uid}'")
+            with self._lock:
+                self._progress[counter] += len(batch)
+
+    @staticmethod
+    def _documents_by_partition(
+        modified_since: Optional[float] = None
+    ) -> Dict[Optional[str], Dict[str, Dict[str, Any]]]:
+        """
+        Metadatos del almacén indexables (con id), deduplicados por id y
+        agrupados por partición (una sola lectura; clave None sin particiones).
+        """
+        groups: Dict[Optional[str], Dict[str, Dict[str, Any]]] = {}
+        for document in iter_metadata(modified_since):
+            if not document.get("id"):
+                continue
+            key = partition_key(document) if settings.INDEX_PARTITIONING_ENABLED else None
+            groups.setdefault(key, {})[str(document["id"])] = document
+        return groups
+
+    @staticmethod
+    def _partitions_to_rebuild(
+        partition: Optional[str],
+        stored: Dict[Optional[str], Dict[str, Dict[str, Any]]]
+    ) -> List[str]:
+        """Particiones a reconstruir: la indicada o las de los documentos del almacén más las ya creadas."""
+        if partition is not None:
+            return [partition]
+        keys = set(stored)
+        keys.update(index_partitions.key(index_uid) for index_uid in partition_indexes())
+        return sorted(keys)
+
+    def _rebuild(self, client: Client, live_index: str, shadow_index: str, started: float,
+                 documents: Dict[str, Dict[str, Any]], partition: Optional[str] = None) -> None:
+        """
+        Reconstruye un índice (el principal o una partición) en su índice sombra y los intercambia.
+
+        Args:
+            documents: Documentos del almacén de ese índice por id (leídos al empezar)
+        """
+        # 1. Índice sombra limpio con la configuración actual
+        self._update(phase="creating_shadow")
+        task = client.delete_index(shadow_index)
+        client.wait_for_task(task.task_uid, timeout_in_ms=self._task_timeout_ms)  # Puede no existir
+        task = client.create_index(shadow_index, {"primaryKey": INDEX_CONFIG["primaryKey"]})
+        self._wait(client, task.task_uid, f"Creación de '{shadow_index}'")
+        _configurar_indice(shadow_index, strict=True)
+
+        # 2. Carga completa desde el almacén de metadatos
+        documents = dict(documents)
+        with self._lock:
+            self._progress["phase"] = "loading"
+            self._progress["total_documents"] += len(documents)
+        self._load(client, shadow_index, list(documents.values()), "loaded_documents")
+
+        # 3. Documentos guardados mientras se cargaba
+        self._update(phase="catching_up")
+        catch_up_started = time.time()
+        recent = self._documents_by_partition(started - _CATCH_UP_MARGIN_SECONDS).get(partition, {})
+        self._load(client, shadow_index, list(recent.values()), "caught_up_documents")
+        documents.update(recent)
+
+        # 4. Verificación antes de tocar el índice que atiende las búsquedas
+        self._update(phase="verifying")
+        indexed = client.index(shadow_index).get_stats().number_of_documents
+        self._update(expected_documents=len(documents), indexed_documents=indexed)
+        if indexed != len(documents):
+            raise RuntimeError(
+                f"Verificación fallida: '{shadow_index}' tiene {indexed} documentos "
+                f"y se esperaban {len(documents)}"
+            )
+
+        # 5. Intercambio atómico: las búsquedas pasan a usar el índice nuevo
+        self._update(phase="swapping")
+        task = client.swap_indexes([{"indexes": [live_index, shadow_index]}])
+        self._wait(client, task.task_uid, "Intercambio de índices")
+        task_tracker.notify_commit()
+
+        # 6. Escrituras llegadas al índice antiguo durante el intercambio: se
+        # reenvían por el escritor del índice, con su seguimiento y reintentos
+        recent = self._documents_by_partition(catch_up_started - _CATCH_UP_MARGIN_SECONDS).get(partition, {})
+        for document in recent.values():
+            index_writer.upsert(document)
+        with self._lock:
+            self._progress["caught_up_documents"] += len(recent)
+
+        # El índice antiguo queda con el nombre del índice sombra
+        self._update(phase="cleaning_up")
+        task = client.delete_index(shadow_index)
+        self._wait(client, task.task_uid, "Eliminación del índice anterior")
+
+    def _run(self, partition: Optional[str] = None) -> None:
+        started = self._progress["started_at_ts"]
+        try:
+            client = self._client_getter()
+            stored = self._documents_by_partition()
+
+            if settings.INDEX_PARTITIONING_ENABLED:
+                keys = self._partitions_to_rebuild(partition, stored)
+                self._update(partitions=keys)
+                for done, key in enumerate(keys):
+                    # El intercambio necesita que la partición exista
+                    live_index = index_partitions.ensure(key)
+                    self._update(current_partition=key)
+                    self._rebuild(client, live_index, f"{live_index}_next", started,
+                                  stored.get(key, {}), partition=key)
+                    self._update(partitions_done=done + 1)
+            else:
+                self._rebuild(client, self._live_index, self._shadow_index, started, stored.get(None, {}))
+
+            self._update(phase="completed", finished_at_ts=time.time())
+            metrics.counter("index_rebuilds_total", result="completed").inc()
+            log_event(self._progress.get("requested_by"), 'INDEX_REBUILD_COMPLETED', self.progress())
+
+        except Exception as e:
+            self._update(phase="failed", error=str(e), finished_at_ts=time.time())
+            metrics.counter("index_rebuilds_total", result="failed").inc()
+            log_event(self._progress.get("requested_by"), 'INDEX_REBUILD_FAILED', self.progress(), severity="ERROR")
+
+
+# ==================================================================================
+#                           INSTANCIA GLOBAL
+# ==================================================================================
+
+index_rebuild = IndexRebuild(
+    client_getter=_get_initialized_client,
+    live_index=INDEX_NAME,
+    shadow_index=SHADOW_INDEX_NAME,
+    batch_size=settings.REINDEX_BATCH_SIZE,
+    task_timeout_ms=settings.REINDEX_TASK_TIMEOUT_MS,
+)
@@ -0,0 +1,519 @@
+"""
+Seguimiento de Tareas de Meilisearch - Indexación sin Bloqueo
+
+Meilisearch procesa las escrituras (altas, actualizaciones y bajas de
+documentos) como tareas asíncronas. En lugar de esperar cada tarea con
+wait_for_task, el servicio de búsqueda las encola y las registra aquí; un
+hilo de fondo consulta su estado en lotes mediante la API de tareas
+(GET /tasks?uids=...).
+
+Funcionalidades:
+- Seguimiento de tareas pendientes con su operación y documentos afectados
+- Consulta de estado en lotes a intervalos regulares
+- Registro de tareas fallidas (y de encolados fallidos) con su carga útil;
+  si se supera MAX_FAILED_TASKS la más antigua no se pierde: se entrega al
+  manejador de desbordamiento (el spool de services.index_writer), se
+  cuenta y se audita
+- Reintento automático con espera exponencial por tarea, un número máximo
+  de intentos y reintento manual; no se reenvía un documento que ya tiene
+  una escritura posterior (una actualización o un borrado más recientes)
+- Operaciones con manejador propio (set_operation_handler): se reintentan
+  llamando al manejador, que encola y registra sus propias escrituras (p.
+  ej. "relocate", el traslado de documentos entre particiones)
+- Métricas: retraso de indexación, tareas pendientes y fallidas, latencia
+- Avisos de commit: funciones que se llaman cuando una escritura ya es
+  visible en el índice (p. ej. para invalidar la caché de búsquedas)
+
+La instancia compartida (task_tracker) se crea en services.meilisearch_service.
+
+Ejemplo:
+    from services.meilisearch_service import task_tracker
+
+    task_tracker.track(task.task_uid, "add", documents)
+    task_tracker.indexing_lag_seconds()   # Antigüedad de la tarea pendiente más antigua
+
+
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from utils.audit_logger import log_event
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           CONFIGURACIÓN
+# ==================================================================================
+
+# Estados finales de una tarea de Meilisearch
+_FINAL_STATUSES = {"succeeded", "failed", "canceled"}
+
+# Máximo de tareas fallidas que se conservan en memoria (las que desbordan
+# pasan al manejador de desbordamiento)
+MAX_FAILED_TASKS = 500
+
+
+# ==================================================================================
+#                           REGISTROS DE TAREAS
+# ==================================================================================
+
+class TrackedTask:
+    """
+    Escritura encolada en Meilisearch pendiente de confirmación.
+
+    Attributes:
+        uid: Identificador de la tarea en Meilisearch (None si falló al encolar)
+        operation: "add" (alta/actualización), "delete" o una operación con manejador propio
+        payload: Documentos (add) o IDs (resto) necesarios para reintentar
+        attempts: Número de veces que se ha encolado la operación
+        index_uid: Índice de la operación (None: el del rastreador)
+        sequence: Orden de la escritura original (los reintentos conservan el suyo)
+        enqueued_at: Instante de encolado (time.monotonic())
+        error: Error de Meilisearch si la tarea falló
+    """
+
+    def __init__(self, uid: Optional[int], operation: str, payload: List[Any], attempts: int = 1,
+                 index_uid: Optional[str] = None, sequence: int = 0):
+        self.uid = uid
+        self.operation = operation
+        self.payload = payload
+        self.attempts = attempts
+        self.index_uid = index_uid
+        self.sequence = sequence
+        self.enqueued_at = time.monotonic()
+        self.enqueued_at_iso = datetime.now().isoformat() + "Z"
+        self.error: Optional[str] = None
+        self.failed_at: Optional[float] = None
+
+    @property
+    def document_ids(self) -> List[str]:
+        if self.operation == "add":
+            return [str(document.get("id")) for document in self.payload]
+        return [str(document_id) for document_id in self.payload]
+
+    def without(self, document_ids: set) -> List[Any]:
+        """Carga útil sin los documentos indicados."""
+        if self.operation == "add":
+            return [document for document in self.payload if str(document.get("id")) not in document_ids]
+        return [document_id for document_id in self.payload if str(document_id) not in document_ids]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "uid": self.uid,
+            "operation": self.operation,
+            "index": self.index_uid,
+            "document_ids": self.document_ids,
+            "attempts": self.attempts,
+            "enqueued_at": self.enqueued_at_iso,
+            "error": self.error,
+        }
+
+
+# ==================================================================================
+#                           RASTREADOR DE TAREAS
+# ==================================================================================
+
+class IndexTaskTracker:
+    """
+    Rastreador de tareas de escritura en un índice de Meilisearch.
+
+    Args:
+        client_getter: Función que devuelve el cliente de Meilisearch
+        index_name: Índice sobre el que se reintentan las operaciones que no indican otro
+        poll_interval: Segundos entre consultas de estado
+        poll_batch: Máximo de tareas consultadas por petición
+        max_retries: Reintentos automáticos por operación fallida
+    """
+
+    def __init__(
+        self,
+        client_getter: Callable[[], Any],
+        index_name: str,
+        poll_interval: float,
+        poll_batch: int,
+        max_retries: int,
+    ):
+        self._client_getter = client_getter
+        self._index_name = index_name
+        self._poll_interval = poll_interval
+        self._poll_batch = poll_batch
+        self._max_retries = max_retries
+
+        self._pending: Dict[int, TrackedTask] = {}
+        self._failed: Deque[TrackedTask] = deque()
+        self._overflow_handler: Optional[Callable[[List[TrackedTask]], None]] = None
+        self._operation_handlers: Dict[str, Callable[[List[Any], Optional[str]], None]] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._commit_listeners: List[Callable[[], None]] = []
+        # Última escritura de cada documento (índice, id) -> sequence, mientras
+        # haya alguna sin confirmar: un reintento no debe pisar una posterior
+        self._sequence = itertools.count(1)
+        self._latest_write: Dict[tuple, int] = {}
+
+        metrics.gauge("meilisearch_indexing_lag_seconds").set_function(self.indexing_lag_seconds)
+        metrics.gauge("meilisearch_pending_tasks").set_function(lambda: len(self._pending))
+        metrics.gauge("meilisearch_failed_tasks").set_function(lambda: len(self._failed))
+
+    # ===== REGISTRO DE TAREAS =====
+
+    def _keys(self, task: TrackedTask) -> List[tuple]:
+        index_uid = task.index_uid or self._index_name
+        return [(index_uid, document_id) for document_id in task.document_ids]
+
+    def _new_write(self, task: TrackedTask) -> TrackedTask:
+        """Asigna el orden a una escritura nueva y la registra como la última de sus documentos."""
+        with self._lock:
+            task.sequence = next(self._sequence)
+            for key in self._keys(task):
+                self._latest_write[key] = task.sequence
+        return task
+
+    def track(self, uid: int, operation: str, payload: List[Any], attempts: int = 1,
+              index_uid: Optional[str] = None, sequence: Optional[int] = None) -> None:
+        """
+        Registra una tarea recién encolada para seguir su estado.
+
+        Args:
+            uid: task_uid devuelto por Meilisearch
+            operation: "add" o "delete"
+            payload: Documentos o IDs de la operación (para reintentos)
+            attempts: Intento al que corresponde la tarea
+            index_uid: Índice de la tarea (particiones); por defecto el del rastreador
+            sequence: Orden de la escritura original (solo reintentos)
+        """
+        task = TrackedTask(uid, operation, payload, attempts, index_uid)
+        if sequence is None:
+            self._new_write(task)
+        else:
+            task.sequence = sequence
+        with self._lock:
+            self._pending[uid] = task
+        metrics.counter("meilisearch_tasks_enqueued_total", operation=operation).inc()
+
+    def record_enqueue_failure(self, operation: str, payload: List[Any], error: Exception,
+                               index_uid: Optional[str] = None) -> None:
+        """
+        Registra una operación que ni siquiera se pudo encolar (Meilisearch caído)
+        para que el reintento la vuelva a enviar.
+        """
+        task = self._new_write(TrackedTask(None, operation, payload, index_uid=index_uid))
+        self._mark_failed(task, f"{type(error).__name__}: {error}")
+
+    def _settle(self, task: TrackedTask) -> None:
+        """
+        Una escritura confirmada: las fallidas anteriores de sus documentos
+        quedan obsoletas y se descartan.
+        """
+        with self._lock:
+            settled = set()
+            for key in self._keys(task):
+                if self._latest_write.get(key) == task.sequence:
+                    del self._latest_write[key]
+                    settled.add(key[1])
+            if not settled:
+                return
+            index_uid = task.index_uid or self._index_name
+            for failed in list(self._failed):
+                if (failed.index_uid or self._index_name) != index_uid or failed.sequence > task.sequence:
+                    continue
+                failed.payload = failed.without(settled)
+                if not failed.payload:
+                    self._failed.remove(failed)
+
+    def _current_payload(self, task: TrackedTask) -> List[Any]:
+        """Carga útil de un reintento sin los documentos que ya tienen una escritura posterior."""
+        with self._lock:
+            superseded = {
+                key[1] for key in self._keys(task)
+                if self._latest_write.get(key, task.sequence) != task.sequence
+            }
+        if superseded:
+            metrics.counter("meilisearch_retries_superseded_total", operation=task.operation).inc(len(superseded))
+        return task.without(superseded) if superseded else task.payload
+
+    def set_overflow_handler(self, handler: Callable[[List[TrackedTask]], None]) -> None:
+        """
+        Registra la función que recibe las tareas fallidas que ya no caben en
+        memoria (más de MAX_FAILED_TASKS), para guardarlas de forma duradera.
+        """
+        self._overflow_handler = handler
+
+    def set_operation_handler(self, operation: str, handler: Callable[[List[Any], Optional[str]], None]) -> None:
+        """
+        Registra cómo reintentar una operación que no es un alta ni un
+        borrado simples: handler(payload, index_uid) la ejecuta de nuevo
+        (registrando aquí sus propias tareas) o lanza una excepción para que
+        vuelva a quedar como fallida.
+        """
+        self._operation_handlers[operation] = handler
+
+    def _mark_failed(self, task: TrackedTask, error: str) -> None:
+        task.error = error
+        task.failed_at = time.monotonic()
+        with self._lock:
+            self._failed.append(task)
+            evicted = []
+            while len(self._failed) > MAX_FAILED_TASKS:
+                evicted.append(self._failed.popleft())
+            for old in evicted:
+                self._forget(old)
+        metrics.counter("meilisearch_tasks_failed_total", operation=task.operation).inc()
+        if evicted:
+            self._overflow(evicted)
+
+    def _forget(self, task: TrackedTask) -> None:
+        """Deja de seguir las escrituras de una tarea. Debe llamarse con el lock adquirido."""
+        for key in self._keys(task):
+            if self._latest_write.get(key) == task.sequence:
+                del self._latest_write[key]
+
+    def _overflow(self, tasks: List[TrackedTask]) -> None:
+        """Entrega al manejador las fallidas que desbordan la memoria; nunca se descartan en silencio."""
+        metrics.counter("meilisearch_failed_tasks_evicted_total").inc(len(tasks))
+        handled = False
+        if self._overflow_handler is not None:
+            try:
+                self._overflow_handler(tasks)
+                handled = True
+            except Exception as e:
+                metrics.counter("meilisearch_failed_tasks_overflow_errors_total", reason=type(e).__name__).inc()
+        log_event('system', 'INDEX_FAILED_TASKS_EVICTED', {
+            'tasks': len(tasks),
+            'document_ids': [document_id for task in tasks for document_id in task.document_ids][:100],
+            'spooled': handled
+        }, severity="INFO" if handled else "ERROR")
+
+    def unconfirmed_indexes(self, document_ids: set, operation: str = "add") -> Dict[str, set]:
+        """
+        Índices con escrituras de esos documentos aún sin confirmar
+        (pendientes o fallidas a la espera de reintento).
+
+        Returns:
+            Dict[str, set]: id del documento -> índices
+        """
+        with self._lock:
+            tasks = list(self._pending.values()) + list(self._failed)
+        located: Dict[str, set] = {}
+        for task in tasks:
+            if task.operation != operation:
+                continue
+            for document_id in task.document_ids:
+                if document_id in document_ids:
+                    located.setdefault(document_id, set()).add(task.index_uid or self._index_name)
+        return located
+
+    # ===== AVISOS DE COMMIT =====
+
+    def add_commit_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Registra una función que se llama cada vez que una escritura termina
+        con éxito (los documentos ya son visibles en las búsquedas).
+        """
+        self._commit_listeners.append(listener)
+
+    def notify_commit(self) -> None:
+        """Avisa a los listeners de que el contenido del índice ha cambiado."""
+        for listener in self._commit_listeners:
+            try:
+                listener()
+            except Exception as e:
+                metrics.counter("meilisearch_commit_listener_errors_total", reason=type(e).__name__).inc()
+
+    # ===== CONSULTA DE ESTADO =====
+
+    def poll_once(self) -> int:
+        """
+        Consulta el estado de las tareas pendientes en lotes de poll_batch.
+
+        Returns:
+            int: Número de tareas que han llegado a un estado final
+        """
+        with self._lock:
+            uids = sorted(self._pending)
+
+        resolved = 0
+        committed = False
+        for start in range(0, len(uids), self._poll_batch):
+            chunk = uids[start:start + self._poll_batch]
+            response = self._client_getter().get_tasks({
+                "uids": ",".join(str(uid) for uid in chunk),
+                "limit": len(chunk),
+            })
+
+            # En orden de encolado: una fallida anterior se registra antes de que
+            # la confirmación de una escritura posterior la descarte
+            for task_status in sorted(response.results, key=lambda task_status: task_status.uid):
+                if task_status.status not in _FINAL_STATUSES:
+                    continue
+                with self._lock:
+                    task = self._pending.pop(task_status.uid, None)
+                if task is None:
+                    continue
+
+                resolved += 1
+                metrics.histogram("meilisearch_task_latency_seconds", operation=task.operation).observe(
+                    time.monotonic() - task.enqueued_at
+                )
+                metrics.counter(
+                    "meilisearch_tasks_total", operation=task.operation, status=task_status.status
+                ).inc()
+
+                if task_status.status == "succeeded":
+                    self._settle(task)
+                    committed = True
+                else:
+                    error = task_status.error or {}
+                    self._mark_failed(task, error.get("message") or task_status.status)
+
+        if committed:
+            self.notify_commit()
+        return resolved
+
+    def indexing_lag_seconds(self) -> float:
+        """
+        Antigüedad (s) de la tarea pendiente más antigua; 0 si no hay pendientes.
+        """
+        with self._lock:
+            if not self._pending:
+                return 0.0
+            oldest = min(task.enqueued_at for task in self._pending.values())
+        return time.monotonic() - oldest
+
+    # ===== REINTENTOS =====
+
+    def retry_failed(self, force: bool = False) -> int:
+        """
+        Vuelve a encolar las operaciones fallidas (sin esperar a su turno).
+
+        Args:
+            force: Reintentar también las que agotaron los reintentos automáticos
+
+        Returns:
+            int: Número de operaciones reenviadas
+        """
+        with self._lock:
+            retryable = [task for task in self._failed if force or task.attempts <= self._max_retries]
+            for task in retryable:
+                self._failed.remove(task)
+        return self._resend(retryable)
+
+    def _resend(self, tasks: List[TrackedTask]) -> int:
+        retried = 0
+        for task in tasks:
+            payload = self._current_payload(task)
+            if not payload:
+                # Todos sus documentos tienen ya una escritura posterior
+                continue
+            handler = self._operation_handlers.get(task.operation)
+            try:
+                if handler is not None:
+                    handler(payload, task.index_uid)
+                else:
+                    index = self._client_getter().index(task.index_uid or self._index_name)
+                    if task.operation == "add":
+                        task_info = index.add_documents(payload)
+                    else:
+                        task_info = index.delete_documents(payload)
+            except Exception as e:
+                task.payload = payload
+                task.attempts += 1
+                self._mark_failed(task, f"{type(e).__name__}: {e}")
+                continue
+
+            if handler is not None:
+                # El manejador ya registró las escrituras que encoló
+                task.payload = payload
+                self._settle(task)
+            else:
+                self.track(task_info.task_uid, task.operation, payload, attempts=task.attempts + 1,
+                           index_uid=task.index_uid, sequence=task.sequence)
+            metrics.counter("meilisearch_tasks_retried_total", operation=task.operation).inc()
+            retried += 1
+
+        return retried
+
+    def _retry_due(self) -> None:
+        """Reintenta las fallidas cuya espera exponencial (poll_interval * 2^intentos) ha vencido."""
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                task for task in self._failed
+                if task.attempts <= self._max_retries
+                and now - (task.failed_at or now) >= self._poll_interval * (2 ** task.attempts)
+            ]
+            for task in due:
+                self._failed.remove(task)
+        if due:
+            self._resend(due)
+
+    def drain(self) -> List[TrackedTask]:
+        """
+        Retira todas las escrituras sin confirmar (pendientes y fallidas),
+        en orden de escritura, para guardarlas al cerrar la aplicación.
+        """
+        with self._lock:
+            tasks = sorted(list(self._pending.values()) + list(self._failed), key=lambda task: task.sequence)
+            self._pending.clear()
+            self._failed.clear()
+            self._latest_write.clear()
+        return tasks
+
+    # ===== ESTADO =====
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Resumen del estado del rastreador (para el endpoint de administración).
+        """
+        with self._lock:
+            pending = len(self._pending)
+            failed = [task.to_dict() for task in self._failed]
+        return {
+            "pending_tasks": pending,
+            "indexing_lag_seconds": round(self.indexing_lag_seconds(), 3),
+            "failed_tasks": failed,
+            "max_retries": self._max_retries,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
+
+    # ===== CICLO DE VIDA =====
+
+    def start(self) -> None:
+        """Arranca el hilo de consulta (idempotente)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="meilisearch-task-tracker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo tras una última consulta de estado."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._poll_interval):
+            try:
+                if self._pending:
+                    self.poll_once()
+                if self._failed:
+                    self._retry_due()
+            except Exception as e:
+                # Meilisearch no disponible: se reintenta en la siguiente vuelta
+                metrics.counter("meilisearch_task_poll_errors_total", reason=type(e).__name__).inc()
+
+        try:
+            if self._pending:
+                self.poll_once()
+        except Exception:
+            pass
+
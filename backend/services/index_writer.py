@@ -0,0 +1,457 @@
+"""
+Escritor del Índice - Escrituras Agrupadas en Meilisearch
+
+Cada subida generaba una llamada add_documents con un único documento, es
+decir, una tarea de Meilisearch por documento. Meilisearch indexa mucho más
+rápido con cargas grandes, así que este módulo acumula las altas,
+actualizaciones y bajas en memoria y las envía agrupadas:
+
+- Una sola llamada add_documents con todas las altas/actualizaciones pendientes
+- Una sola llamada delete_documents con todas las bajas pendientes
+- Vaciado por tamaño (INDEX_WRITER_MAX_BATCH) o por intervalo
+  (INDEX_WRITER_FLUSH_INTERVAL_MS)
+- Deduplicación: varias escrituras del mismo id dentro de la ventana se
+  reducen a la última (una baja anula un alta pendiente y viceversa)
+- Vaciado al cerrar la aplicación; lo que no se pueda escribir se guarda en
+  un fichero de spool (JSONL) que se reenvía al arrancar
+- El spool recibe también las escrituras fallidas que desbordan el
+  rastreador de tareas; al arrancar vuelven al rastreador con su índice
+
+Los errores de escritura durante el funcionamiento normal los registra el
+rastreador de tareas (services.index_task_tracker) para su reintento.
+
+Uso:
+    from services.index_writer import index_writer
+
+    index_writer.upsert(metadata)          # Alta o actualización
+    index_writer.delete("documento_123")   # Baja
+    index_writer.flush(wait=True)          # Forzar escritura (lectura de lo escrito)
+
+Benchmark (requiere Meilisearch en MEILISEARCH_HOST):
+    python -m services.index_writer --documents 2000
+
+
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from config import BASE_DIR, settings
+from services.index_task_tracker import TrackedTask
+from services.meilisearch_service import add_documents, delete_documents, task_tracker
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           CONFIGURACIÓN
+# ==================================================================================
+
+# Buckets del histograma de tamaño de lote (documentos por escritura)
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+# ==================================================================================
+#                           ESCRITOR AGRUPADO
+# ==================================================================================
+
+class IndexWriter:
+    """
+    Buffer de escrituras en Meilisearch que se vacía por tamaño o intervalo.
+
+    Args:
+        add_fn: Función que escribe una lista de documentos (add_documents)
+        delete_fn: Función que elimina una lista de IDs (delete_documents)
+        max_batch: Operaciones pendientes que disparan un vaciado inmediato
+        flush_interval: Segundos máximos que una operación espera en el buffer
+        spool_path: Fichero donde se guardan las operaciones no escritas al cerrar
+    """
+
+    def __init__(
+        self,
+        add_fn: Callable[..., Any],
+        delete_fn: Callable[..., Any],
+        max_batch: int,
+        flush_interval: float,
+        spool_path: str,
+    ):
+        self._add_fn = add_fn
+        self._delete_fn = delete_fn
+        self._max_batch = max_batch
+        self._flush_interval = flush_interval
+        self._spool_path = spool_path
+
+        # Operaciones pendientes: la última escritura de cada id gana
+        self._adds: Dict[str, Dict[str, Any]] = {}
+        self._deletes: Set[str] = set()
+        # Altas de documentos que el índice aún no tiene (sin versión anterior)
+        self._new_ids: Set[str] = set()
+
+        self._lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        # Serializa los vaciados para que un lote más antiguo nunca llegue después
+        self._flush_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._write_listeners: List[Callable[[str, Any], None]] = []
+
+        metrics.gauge("index_writer_buffered_operations").set_function(self.pending_count)
+
+    # ===== OPERACIONES =====
+
+    def upsert(self, document: Dict[str, Any], new: bool = False) -> None:
+        """
+        Encola el alta o actualización de un documento completo.
+
+        Args:
+            document: Metadatos del documento (debe incluir 'id')
+            new: El documento no tenía versión anterior (primera subida): con
+                 particiones no hay que buscar copias suyas en otras
+        """
+        document_id = str(document["id"])
+        with self._lock:
+            pending = document_id in self._adds or document_id in self._deletes
+            if pending:
+                metrics.counter("index_writer_coalesced_total", operation="add").inc()
+            elif new:
+                self._new_ids.add(document_id)
+            self._deletes.discard(document_id)
+            self._adds[document_id] = document
+            size = len(self._adds) + len(self._deletes)
+        self._notify_write("upsert", document)
+        self._maybe_wake(size)
+
+    def delete(self, document_id: str) -> None:
+        """
+        Encola la baja de un documento.
+
+        Args:
+            document_id: ID del documento a eliminar
+        """
+        document_id = str(document_id)
+        with self._lock:
+            if document_id in self._adds or document_id in self._deletes:
+                metrics.counter("index_writer_coalesced_total", operation="delete").inc()
+            self._adds.pop(document_id, None)
+            self._new_ids.discard(document_id)
+            self._deletes.add(document_id)
+            size = len(self._adds) + len(self._deletes)
+        self._notify_write("delete", document_id)
+        self._maybe_wake(size)
+
+    def pending_count(self) -> int:
+        """Número de operaciones en el buffer."""
+        return len(self._adds) + len(self._deletes)
+
+    def add_write_listener(self, listener: Callable[[str, Any], None]) -> None:
+        """
+        Registra una función que recibe cada escritura encolada:
+        ("upsert", documento) o ("delete", id). Sirve para mantener al día
+        estructuras derivadas del índice (services.suggest_index) sin
+        esperar a que Meilisearch la confirme.
+
+        Los listeners se ejecutan en el hilo que encola la escritura: desde
+        código async, upsert() y delete() deben llamarse en un hilo
+        (run_in_threadpool).
+        """
+        self._write_listeners.append(listener)
+
+    def _notify_write(self, operation: str, payload: Any) -> None:
+        for listener in self._write_listeners:
+            try:
+                listener(operation, payload)
+            except Exception as e:
+                metrics.counter("index_writer_listener_errors_total", reason=type(e).__name__).inc()
+
+    def _maybe_wake(self, size: int) -> None:
+        if size >= self._max_batch:
+            self._wake_event.set()
+
+    # ===== VACIADO =====
+
+    def flush(self, wait: bool = False, reason: str = "manual") -> Dict[str, int]:
+        """
+        Escribe en Meilisearch todas las operaciones pendientes.
+
+        Args:
+            wait: Esperar a que Meilisearch aplique las escrituras
+            reason: Motivo del vaciado (para métricas)
+
+        Returns:
+            Dict[str, int]: Documentos añadidos y eliminados en este vaciado
+
+        Raises:
+            RuntimeError: Si Meilisearch rechaza la escritura (la operación
+                          queda registrada en el rastreador para reintento)
+        """
+        with self._flush_lock:
+            with self._lock:
+                adds, deletes, new_ids = self._adds, self._deletes, self._new_ids
+                self._adds, self._deletes, self._new_ids = {}, set(), set()
+
+            if not adds and not deletes:
+                return {"added": 0, "deleted": 0}
+
+            metrics.counter("index_writer_flushes_total", reason=reason).inc()
+            metrics.histogram("index_writer_batch_size", buckets=BATCH_SIZE_BUCKETS).observe(
+                len(adds) + len(deletes)
+            )
+
+            errors: List[Exception] = []
+            if adds:
+                try:
+                    self._add_fn(list(adds.values()), wait=wait, new_ids=new_ids)
+                except Exception as e:
+                    errors.append(e)
+            if deletes:
+                try:
+                    self._delete_fn(sorted(deletes), wait=wait)
+                except Exception as e:
+                    errors.append(e)
+            if errors:
+                raise errors[0]
+
+            return {"added": len(adds), "deleted": len(deletes)}
+
+    def _flush_quietly(self, reason: str) -> None:
+        try:
+            self.flush(reason=reason)
+        except Exception as e:
+            # El rastreador de tareas ya registró la operación para reintento
+            metrics.counter("index_writer_flush_errors_total", reason=type(e).__name__).inc()
+
+    # ===== SPOOL EN DISCO =====
+
+    def _spool(self, adds: List[Dict[str, Any]], deletes: List[str]) -> None:
+        """Añade operaciones no escritas al fichero de spool (una por línea)."""
+        self._append_spool(
+            [{"op": "add", "document": document} for document in adds]
+            + [{"op": "delete", "id": document_id} for document_id in deletes]
+        )
+
+    def spool_tasks(self, tasks: List[TrackedTask]) -> None:
+        """
+        Guarda en el spool escrituras fallidas del rastreador de tareas (con
+        su índice, para reintentarlas tal cual en el siguiente arranque).
+        """
+        self._append_spool([
+            {"op": "task", "operation": task.operation, "index": task.index_uid, "payload": task.payload}
+            for task in tasks
+        ])
+        metrics.counter("index_writer_spooled_tasks_total").inc(len(tasks))
+
+    def _append_spool(self, entries: List[Dict[str, Any]]) -> None:
+        if not entries:
+            return
+        with self._spool_lock:
+            os.makedirs(os.path.dirname(self._spool_path) or ".", exist_ok=True)
+            with open(self._spool_path, "a", encoding="utf-8") as spool_file:
+                for entry in entries:
+                    spool_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                spool_file.flush()
+                os.fsync(spool_file.fileno())
+
+    def _replay_spool(self) -> int:
+        """
+        Vuelve a encolar las operaciones guardadas en el spool, en orden: las
+        escrituras fallidas vuelven al rastreador de tareas y el resto al buffer.
+        """
+        with self._spool_lock:
+            if not os.path.exists(self._spool_path):
+                return 0
+            with open(self._spool_path, "r", encoding="utf-8") as spool_file:
+                entries = [json.loads(line) for line in spool_file if line.strip()]
+            os.remove(self._spool_path)
+
+        for entry in entries:
+            if entry["op"] == "task":
+                task_tracker.record_enqueue_failure(
+                    entry["operation"], entry["payload"], RuntimeError("Restaurada del spool"),
+                    index_uid=entry.get("index"),
+                )
+            elif entry["op"] == "add":
+                self.upsert(entry["document"])
+            else:
+                self.delete(entry["id"])
+        return len(entries)
+
+    # ===== CICLO DE VIDA =====
+
+    def start(self) -> None:
+        """Reenvía el spool pendiente y arranca el hilo de vaciado (idempotente)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        replayed = self._replay_spool()
+        if replayed:
+            metrics.counter("index_writer_spool_replayed_total").inc(replayed)
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="index-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """
+        Detiene el hilo y vacía el buffer; después detiene el rastreador de
+        tareas (última consulta de estado) y guarda en el spool todas las
+        escrituras aceptadas que no constan como aplicadas: las fallidas
+        (esperando reintento o sin reintentos), las aún sin confirmar y lo
+        que Meilisearch no acepte ahora. Todo se reenvía en el siguiente
+        arranque, las más antiguas primero.
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+        with self._flush_lock:
+            with self._lock:
+                adds, deletes, new_ids = list(self._adds.values()), sorted(self._deletes), self._new_ids
+                self._adds, self._deletes, self._new_ids = {}, set(), set()
+
+            unwritten_adds: List[Dict[str, Any]] = []
+            unwritten_deletes: List[str] = []
+            if adds:
+                try:
+                    self._add_fn(adds, wait=False, new_ids=new_ids)
+                except Exception:
+                    unwritten_adds = adds
+            if deletes:
+                try:
+                    self._delete_fn(deletes, wait=False)
+                except Exception:
+                    unwritten_deletes = deletes
+
+            # Una tarea pendiente que falle después del cierre ya no se
+            # reintentaría: se guarda también (reenviar una escritura aplicada
+            # es inocuo y, al arrancar, la más reciente de cada documento gana)
+            task_tracker.stop()
+            self.spool_tasks(task_tracker.drain())
+            if unwritten_adds or unwritten_deletes:
+                self._spool(unwritten_adds, unwritten_deletes)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            woken = self._wake_event.wait(self._flush_interval)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+            self._flush_quietly("size" if woken else "interval")
+
+
+# ==================================================================================
+#                           INSTANCIA GLOBAL
+# ==================================================================================
+
+# Se arranca y detiene en el lifespan de main.py
+index_writer = IndexWriter(
+    add_fn=add_documents,
+    delete_fn=delete_documents,
+    max_batch=settings.INDEX_WRITER_MAX_BATCH,
+    flush_interval=settings.INDEX_WRITER_FLUSH_INTERVAL_MS / 1000,
+    spool_path=os.path.join(BASE_DIR, settings.INDEX_WRITER_SPOOL_PATH),
+)
+
+# Las escrituras fallidas que no caben en memoria se guardan en el spool
+task_tracker.set_overflow_handler(index_writer.spool_tasks)
+
+
+# ==================================================================================
+#                           BENCHMARK DE INGESTA
+# ==================================================================================
+
+def run_ingestion_benchmark(documents: int, batch_size: int) -> Dict[str, float]:
+    """
+    Compara la ingesta documento a documento con la ingesta agrupada.
+
+    Usa un índice temporal para no tocar el índice real. En ambos casos el
+    tiempo incluye la espera hasta que Meilisearch termina de indexar.
+
+    Args:
+        documents: Número de documentos sintéticos
+        batch_size: Tamaño máximo de lote del escritor agrupado
+
+    Returns:
+        Dict[str, float]: docs/s de cada modo y el factor de mejora
+    """
+    import random
+
+    from services.meilisearch_service import get_client, initialize_meilisearch
+
+    initialize_meilisearch()
+    client = get_client()
+    words = ["contrato", "informe", "factura", "proyecto", "cliente", "acuerdo", "auditoría", "presupuesto"]
+    rng = random.Random(7)
+
+    def _corpus(prefix: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": f"{prefix}_{i}",
+                "title": f"Documento {i}",
+                "summary": " ".join(rng.choice(words) for _ in range(60)),
+                "keywords": rng.sample(words, 4),
+                "file_extension": ".txt",
+            }
+            for i in range(documents)
+        ]
+
+    def _measure(index_uid: str, ingest: Callable[[Any, List[Dict[str, Any]]], int]) -> float:
+        client.wait_for_task(client.create_index(index_uid, {"primaryKey": "id"}).task_uid)
+        try:
+            corpus = _corpus(index_uid)
+            start = time.perf_counter()
+            last_task_uid = ingest(client.index(index_uid), corpus)
+            client.wait_for_task(last_task_uid, timeout_in_ms=600_000, interval_in_ms=20)
+            return documents / (time.perf_counter() - start)
+        finally:
+            client.wait_for_task(client.delete_index(index_uid).task_uid)
+
+    def _one_by_one(index, corpus):
+        task_uid = None
+        for document in corpus:
+            task_uid = index.add_documents([document]).task_uid
+        return task_uid
+
+    def _batched(index, corpus):
+        task_uids: List[int] = []
+        writer = IndexWriter(
+            add_fn=lambda docs, wait=False, new_ids=None: task_uids.append(index.add_documents(docs).task_uid),
+            delete_fn=lambda ids, wait=False: task_uids.append(index.delete_documents(ids).task_uid),
+            max_batch=batch_size,
+            flush_interval=settings.INDEX_WRITER_FLUSH_INTERVAL_MS / 1000,
+            spool_path=os.devnull,
+        )
+        for document in corpus:
+            writer.upsert(document)
+            if writer.pending_count() >= batch_size:
+                writer.flush(reason="size")
+        writer.flush()
+        return task_uids[-1]
+
+    single_rate = _measure("bench_index_writer_single", _one_by_one)
+    batched_rate = _measure("bench_index_writer_batched", _batched)
+    return {
+        "single_docs_per_second": single_rate,
+        "batched_docs_per_second": batched_rate,
+        "speedup": batched_rate / single_rate,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark de ingesta en Meilisearch: 1 a 1 vs agrupada")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=settings.INDEX_WRITER_MAX_BATCH)
+    args = parser.parse_args()
+
+    print(f"🔍 Ingestando {args.documents} documentos en {settings.MEILISEARCH_HOST}...")
+    results = run_ingestion_benchmark(args.documents, args.batch_size)
+    print(f"   • Documento a documento: {results['single_docs_per_second']:.1f} docs/s")
+    print(f"   • Agrupada (lotes de {args.batch_size}): {results['batched_docs_per_second']:.1f} docs/s")
+    print(f"   • Mejora: x{results['speedup']:.1f}")
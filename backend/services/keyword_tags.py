@@ -0,0 +1,315 @@
+"""
+Etiquetas Canónicas de Palabras Clave - Facetas Compactas
+
+Las palabras clave de Gemini son texto libre: "Contrato", "contratos",
+"CONTRATO" y "contrato" son cuatro valores distintos de la faceta keywords,
+que crece sin control y obliga a filtrar con listas de variantes. Este módulo
+reduce cada palabra clave a una etiqueta canónica:
+
+- Minúsculas, sin tildes (la ñ se conserva) ni signos de puntuación
+- Plurales del español a singular ("contratos" -> "contrato",
+  "evaluaciones" -> "evaluacion", "leyes" -> "ley", "luces" -> "luz")
+- Alias manuales para fusionar sinónimos ("nda" -> "acuerdo confidencialidad")
+
+Las etiquetas se indexan en keyword_tags (filtrable y faceta por defecto) y
+las palabras clave originales siguen en keywords (búsqueda y visualización).
+Un diccionario persistido (KEYWORD_DICTIONARY_PATH) guarda la forma de
+mostrar de cada etiqueta, para que la interfaz enseñe "Evaluación" y no
+"evaluacion", y los alias, que se editan a mano en el mismo archivo:
+
+    {"tags": {"evaluacion": "evaluación", ...},
+     "aliases": {"nda": "acuerdo confidencialidad"}}
+
+Uso:
+    from services.keyword_tags import keyword_fields, keyword_dictionary
+
+    keyword_fields(["Contratos", "CONTRATO", "Evaluación"])
+    # {"keyword_tags": ["contrato", "evaluacion"]}
+    keyword_dictionary.labels(["contrato", "evaluacion"])
+    # {"contrato": "contrato", "evaluacion": "evaluación"}
+
+Benchmark (cardinalidad, tamaño de las facetas y coste de los filtros):
+    python -m services.keyword_tags --documents 20000
+
+
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import BASE_DIR, settings
+from services.local_extractor import fold_accents
+
+# ==================================================================================
+#                           NORMALIZACIÓN
+# ==================================================================================
+
+_NON_ALNUM = re.compile(r"[^0-9a-zñ]+")
+_VOWELS = set("aeiou")
+# Consonantes cuyo plural añade "-es" tras vocal (papel-es, accion-es, mujer-es, red-es, ley-es)
+_ES_PLURAL_CONSONANTS = set("lnrdy")
+# Palabras más cortas no se singularizan ("mes", "gas", "dos")
+_MIN_PLURAL_LENGTH = 4
+# Guardar el diccionario como mucho cada tantos segundos
+_SAVE_INTERVAL = 5.0
+
+
+def singularize(word: str) -> str:
+    """
+    Singular aproximado de una palabra en español (minúsculas y sin acentos).
+
+    Reglas deliberadamente conservadoras: ante la duda la palabra se deja
+    como está (los casos que no fusione se corrigen con alias).
+    """
+    if len(word) < _MIN_PLURAL_LENGTH or not word.endswith("s") or word.endswith(("is", "us")):
+        return word
+    if word.endswith("ces") and word[-4] in _VOWELS:
+        return word[:-3] + "z"                       # luces -> luz, jueces -> juez
+    if word.endswith("es") and word[-3] in _ES_PLURAL_CONSONANTS and word[-4] in _VOWELS:
+        return word[:-2]                             # acciones -> accion, leyes -> ley
+    if word[-2] in _VOWELS:
+        return word[:-1]                             # contratos -> contrato, clientes -> cliente
+    return word
+
+
+def canonical_form(keyword: str) -> Optional[str]:
+    """
+    Forma canónica de una palabra clave, sin alias.
+
+    Returns:
+        Optional[str]: Etiqueta canónica o None si no queda ninguna palabra
+
+    Example:
+        canonical_form("Evaluaciones Docentes")  # "evaluacion docente"
+    """
+    words = _NON_ALNUM.sub(" ", fold_accents(str(keyword).lower(), keep_enye=True)).split()
+    return " ".join(singularize(word) for word in words) or None
+
+
+def _display_rank(keyword: str, tag: str) -> tuple:
+    """
+    Orden de preferencia de las formas de mostrar de una etiqueta: la propia
+    etiqueta antes que un alias, en singular, no todo en mayúsculas, con
+    tildes y en minúsculas. No depende
+    del orden en que llegan los documentos, así que el resultado es el mismo
+    en la ingesta y en el backfill.
+    """
+    plain = _NON_ALNUM.sub(" ", fold_accents(keyword.lower(), keep_enye=True)).strip()
+    canonical = canonical_form(keyword)
+    return (
+        canonical != tag,
+        canonical != plain,
+        keyword.isupper(),
+        -sum(1 for char in keyword if ord(char) > 127),
+        keyword != keyword.lower(),
+        keyword,
+    )
+
+
+# ==================================================================================
+#                           DICCIONARIO PERSISTIDO
+# ==================================================================================
+
+class KeywordDictionary:
+    """
+    Etiquetas canónicas con su forma de mostrar y alias manuales, en un JSON.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._display: Dict[str, str] = {}
+        self._aliases: Dict[str, str] = {}
+        self._dirty = False
+        self._saved_at = 0.0
+        self.load()
+
+    def load(self) -> None:
+        """Carga el diccionario (uno ausente o ilegible se trata como vacío)."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        with self._lock:
+            self._display = dict(data.get("tags") or {})
+            # Los alias se escriben a mano: se normalizan ambos lados
+            self._aliases = {}
+            for alias, target in (data.get("aliases") or {}).items():
+                alias, target = canonical_form(alias), canonical_form(target)
+                if alias and target and alias != target:
+                    self._aliases[alias] = target
+            self._dirty = False
+
+    def tag(self, keyword: str) -> Optional[str]:
+        """Etiqueta canónica de una palabra clave, con alias."""
+        canonical = canonical_form(keyword)
+        return self._aliases.get(canonical, canonical) if canonical else None
+
+    def tags(self, keywords: Optional[Iterable[str]]) -> List[str]:
+        """Etiquetas de una lista de palabras clave, sin repetir y en su orden."""
+        return list(dict.fromkeys(tag for tag in map(self.tag, keywords or []) if tag))
+
+    def observe(self, keywords: Optional[Iterable[str]]) -> List[str]:
+        """
+        Etiquetas de una lista de palabras clave, registrando sus formas de
+        mostrar. Idempotente: volver a observar las mismas no cambia nada.
+        """
+        tags = []
+        with self._lock:
+            for keyword in keywords or []:
+                tag = self.tag(keyword)
+                if not tag:
+                    continue
+                tags.append(tag)
+                keyword = " ".join(str(keyword).split())
+                current = self._display.get(tag)
+                if current is None or _display_rank(keyword, tag) < _display_rank(current, tag):
+                    self._display[tag] = keyword
+                    self._dirty = True
+        if self._dirty and time.monotonic() - self._saved_at >= _SAVE_INTERVAL:
+            self.flush()
+        return list(dict.fromkeys(tags))
+
+    def display(self, tag: str) -> str:
+        """Forma de mostrar de una etiqueta (la propia etiqueta si no se ha visto)."""
+        return self._display.get(tag, tag)
+
+    def labels(self, tags: Iterable[str]) -> Dict[str, str]:
+        """Forma de mostrar de cada etiqueta (para los valores de una faceta)."""
+        return {tag: self.display(tag) for tag in tags}
+
+    def __len__(self) -> int:
+        return len(self._display)
+
+    def flush(self) -> None:
+        """Guarda el diccionario si ha cambiado (escritura atómica)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "tags": dict(sorted(self._display.items())),
+                "aliases": dict(sorted(self._aliases.items())),
+            }
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+# ==================================================================================
+#                           INSTANCIA GLOBAL
+# ==================================================================================
+
+keyword_dictionary = KeywordDictionary(os.path.join(BASE_DIR, settings.KEYWORD_DICTIONARY_PATH))
+
+
+def keyword_fields(keywords: Optional[Iterable[str]]) -> Dict[str, Any]:
+    """
+    Campos de etiquetas de un documento (ingesta y backfill).
+
+    Returns:
+        Dict[str, Any]: {"keyword_tags": [...]}
+    """
+    return {"keyword_tags": keyword_dictionary.observe(keywords)}
+
+
+# ==================================================================================
+#                           BENCHMARK
+# ==================================================================================
+
+def _variants(concept: str) -> List[str]:
+    """Variantes de escritura de un concepto como las que devuelve la IA."""
+    if concept.endswith("ón"):
+        plural = concept[:-2] + "ones"
+    elif concept[-1] in "aeiouáéó":
+        plural = concept + "s"
+    else:
+        plural = concept + "es"
+    forms = [concept, plural]
+    forms += [fold_accents(form, keep_enye=True) for form in forms]
+    forms += [form.capitalize() for form in forms] + [form.upper() for form in forms]
+    return list(dict.fromkeys(forms))
+
+
+def run_keyword_benchmark(documents: int, queries: int) -> Dict[str, Dict[str, float]]:
+    """
+    Compara keywords con keyword_tags en el motor de respaldo sobre un corpus
+    sintético con variantes de mayúsculas, tildes y plurales: número de
+    valores distintos, tamaño de facetDistribution y latencia p50 de un
+    filtro por concepto (keywords IN [variantes] frente a keyword_tags = tag).
+    """
+    import random
+    from services.fallback_search import FallbackSearchEngine
+    from services.meilisearch_service import build_synthetic_corpus
+
+    rng = random.Random(7)
+    concepts = ["contrato", "informe", "presupuesto", "universidad", "estudiante", "docente", "reglamento",
+                "evaluación", "proyecto", "investigación", "convocatoria", "resultado", "acta", "reunión",
+                "consejo", "facultad", "matrícula", "beca", "ley", "papel", "acción", "red", "actividad",
+                "título", "certificado", "solicitud", "factura", "nómina", "calendario", "examen"]
+    variants = {concept: _variants(concept) for concept in concepts}
+
+    corpus = build_synthetic_corpus(documents)
+    for document in corpus:
+        document["keywords"] = [rng.choice(variants[concept]) for concept in rng.sample(concepts, 6)]
+    dictionary = KeywordDictionary(os.devnull)
+    for document in corpus:
+        document["keyword_tags"] = dictionary.tags(document["keywords"])
+
+    engine = FallbackSearchEngine(":memory:", sync_interval=3600)
+    engine.index_documents(corpus)
+    engine._synced_at = time.time()  # Corpus cargado a mano: no sincronizar con el almacén
+
+    def _filter_p50(build_filter) -> float:
+        samples = []
+        for i in range(queries):
+            concept = concepts[i % len(concepts)]
+            start = time.perf_counter()
+            engine.search("", limit=20, filters=build_filter(concept))
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        return samples[len(samples) // 2]
+
+    def _quoted(values: List[str]) -> str:
+        return ", ".join(f'"{value}"' for value in values)
+
+    filters = {
+        "keywords": lambda concept: f"keywords IN [{_quoted(variants[concept])}]",
+        "keyword_tags": lambda concept: f"keyword_tags = {_quoted([dictionary.tag(concept)])}",
+    }
+
+    results: Dict[str, Dict[str, float]] = {}
+    for field, build_filter in filters.items():
+        distribution = engine.search("", limit=0, facets=[field])["facetDistribution"][field]
+        hits = engine.search("", limit=0, filters=build_filter("contrato"))["estimatedTotalHits"]
+        results[field] = {
+            "distinct_values": len(distribution),
+            "facet_bytes": len(json.dumps(distribution, ensure_ascii=False).encode("utf-8")),
+            "filter_terms": len(variants["contrato"]) if field == "keywords" else 1,
+            "hits": hits,
+            "filter_p50_ms": _filter_p50(build_filter),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Etiquetas canónicas frente a palabras clave libres")
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"🏷️  {args.documents} documentos, {args.queries} filtros")
+    for field, measures in run_keyword_benchmark(args.documents, args.queries).items():
+        print(f"   • {field:12} valores: {measures['distinct_values']:5} | "
+              f"facetDistribution: {measures['facet_bytes'] / 1024:6.1f} KB | "
+              f"términos del filtro: {measures['filter_terms']:2} ({measures['hits']} resultados) | "
+              f"filtro p50: {measures['filter_p50_ms']:.2f} ms")
@@ -0,0 +1,221 @@
+"""
+Proveedores de Modelos de Lenguaje - Abstracción sobre el Backend de IA
+
+Este módulo desacopla el servicio de extracción de metadatos del proveedor
+concreto de IA. gemini_service solo conoce la interfaz LLMProvider y el
+proveedor activo se elige por configuración (LLM_PROVIDER):
+
+- gemini: Google Gemini AI a través de google-generativeai (producción)
+- fake: servidor HTTP local y determinista (services.fake_llm_server)
+  para pruebas de carga y benchmarks sin red ni clave de API
+
+Los clientes se crean de forma perezosa en la primera llamada, de modo que
+importar el módulo no configura credenciales ni abre conexiones.
+
+
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+from config import settings
+
+
+# ==================================================================================
+#                           MODELOS DE RESPUESTA
+# ==================================================================================
+
+class LLMResponse(BaseModel):
+    """
+    Respuesta normalizada de un proveedor de IA.
+
+    Attributes:
+        text: Texto generado por el modelo
+        prompt_tokens: Tokens consumidos por el prompt (si el proveedor lo informa)
+        output_tokens: Tokens generados en la respuesta (si el proveedor lo informa)
+    """
+
+    text: str = Field(..., description="Texto generado por el modelo")
+    prompt_tokens: Optional[int] = Field(default=None, description="Tokens del prompt")
+    output_tokens: Optional[int] = Field(default=None, description="Tokens de la respuesta")
+
+
+class LLMProviderError(RuntimeError):
+    """Error devuelto por un proveedor de IA (HTTP, cuota, respuesta vacía...)."""
+
+
+# ==================================================================================
+#                           INTERFAZ DE PROVEEDOR
+# ==================================================================================
+
+class LLMProvider:
+    """
+    Interfaz mínima que debe implementar un proveedor de IA.
+
+    Attributes:
+        name: Identificador del proveedor ("gemini", "fake")
+        model_name: Nombre del modelo que se guarda en los metadatos (ai_model)
+    """
+
+    name: str = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def generate(self, prompt: str, timeout: float) -> LLMResponse:
+        """
+        Envía un prompt al modelo y devuelve su respuesta.
+
+        Args:
+            prompt: Prompt completo
+            timeout: Tiempo máximo de espera en segundos
+
+        Returns:
+            LLMResponse: Texto generado y uso de tokens
+
+        Raises:
+            LLMProviderError: Si el proveedor devuelve un error
+        """
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    """
+    Proveedor de Google Gemini AI.
+
+    La llamada a configure() y la creación del GenerativeModel se hacen en
+    el primer uso y no al importar el módulo.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model_name: str, api_key: Optional[str]):
+        super().__init__(model_name)
+        self._api_key = api_key
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    if not self._api_key:
+                        raise LLMProviderError("GEMINI_API_KEY no configurada para el proveedor 'gemini'")
+
+                    # Importación diferida: el SDK solo se carga si se usa Gemini
+                    from google.generativeai import GenerativeModel, configure
+
+                    configure(api_key=self._api_key)
+                    self._model = GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, prompt: str, timeout: float) -> LLMResponse:
+        response = self._get_model().generate_content(
+            prompt,
+            request_options={"timeout": timeout}
+        )
+
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            text=response.text,
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None),
+        )
+
+
+class FakeLLMProvider(LLMProvider):
+    """
+    Proveedor que llama al servidor de IA falso (services.fake_llm_server).
+
+    Habla un protocolo JSON mínimo: POST {base_url}/generate con
+    {"prompt": ...} y recibe {"text": ..., "usage": {...}}.
+    """
+
+    name = "fake"
+
+    def __init__(self, model_name: str, base_url: str):
+        super().__init__(model_name)
+        self._endpoint = base_url.rstrip("/") + "/generate"
+
+    def generate(self, prompt: str, timeout: float) -> LLMResponse:
+        request = urllib.request.Request(
+            self._endpoint,
+            data=json.dumps({"prompt": prompt, "model": self.model_name}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                payload = json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            raise LLMProviderError(f"Servidor de IA falso respondió {e.code}") from e
+
+        usage = payload.get("usage") or {}
+        return LLMResponse(
+            text=payload.get("text", ""),
+            prompt_tokens=usage.get("prompt_tokens"),
+            output_tokens=usage.get("output_tokens"),
+        )
+
+
+# ==================================================================================
+#                           SELECCIÓN DEL PROVEEDOR ACTIVO
+# ==================================================================================
+
+_provider: Optional[LLMProvider] = None
+_provider_lock = threading.Lock()
+
+
+def create_provider(name: str) -> LLMProvider:
+    """
+    Crea un proveedor por nombre usando la configuración de la aplicación.
+
+    Args:
+        name: "gemini" o "fake"
+
+    Returns:
+        LLMProvider: Instancia del proveedor
+
+    Raises:
+        ValueError: Si el proveedor no existe
+    """
+    if name == "gemini":
+        return GeminiProvider(settings.LLM_MODEL, settings.GEMINI_API_KEY)
+    if name == "fake":
+        return FakeLLMProvider(settings.LLM_MODEL, settings.FAKE_LLM_URL)
+    raise ValueError(f"Proveedor de IA desconocido: {name}")
+
+
+def get_llm_provider() -> LLMProvider:
+    """
+    Devuelve el proveedor de IA activo (LLM_PROVIDER), creándolo si hace falta.
+
+    Returns:
+        LLMProvider: Proveedor compartido por toda la aplicación
+    """
+    global _provider
+
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = create_provider(settings.LLM_PROVIDER)
+    return _provider
+
+
+def set_llm_provider(provider: Optional[LLMProvider]) -> None:
+    """
+    Sustituye el proveedor activo (benchmarks y pruebas de carga).
+
+    Args:
+        provider: Nuevo proveedor, o None para volver al configurado
+    """
+    global _provider
+    _provider = provider
@@ -0,0 +1,448 @@
+"""
+Extractor Local de Metadatos - Análisis Heurístico sin Conexión
+
+Este módulo extrae metadatos de documentos sin llamar a ningún servicio
+externo. Implementa heurísticas sencillas en Python puro para obtener los
+mismos campos que produce Gemini AI:
+
+- Título a partir del primer encabezado o la primera línea significativa
+- Palabras clave con puntuación tipo RAKE sobre una lista de stop words en español
+- Fecha normalizada a YYYY-MM-DD mediante expresiones regulares
+- Resumen extractivo con las frases más representativas del texto
+
+Usos dentro de la aplicación:
+- Resultado provisional inmediato mientras Gemini procesa en segundo plano
+- Fallback cuando la llamada a la IA falla o su respuesta no se puede parsear
+- Modo sin IA para importaciones masivas
+
+El extractor es determinista y rápido (miles de documentos por segundo),
+por lo que puede ejecutarse en el camino crítico de la subida.
+
+
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import Counter
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+# ==================================================================================
+#                           CONFIGURACIÓN DEL EXTRACTOR
+# ==================================================================================
+
+# Máximo de caracteres analizados por documento
+LOCAL_MAX_TEXT_LENGTH = 20000
+
+# Límites alineados con el prompt de Gemini
+MAX_KEYWORDS = 10
+MAX_SUMMARY_WORDS = 150
+MAX_SUMMARY_SENTENCES = 3
+MAX_TITLE_LENGTH = 120
+
+# Identificador del "modelo" que se guarda en los metadatos
+LOCAL_MODEL_NAME = "local-heuristic"
+
+# Stop words en español (artículos, preposiciones, pronombres, auxiliares...)
+SPANISH_STOP_WORDS = frozenset("""
+a al algo algunas algunos ante antes como con contra cual cuales cuando de del
+desde donde durante e el ella ellas ellos en entre era eran es esa esas ese eso
+esos esta estaba estado estan estas este esto estos fue fueron ha haber habia
+han hasta hay la las le les lo los mas me mi mis mucho muy nada ni no nos
+nosotros o otra otras otro otros para pero poco por porque que quien quienes se
+sea segun ser si sido sin sino sobre su sus tambien tan tanto te tiene tienen
+todo todos tu tus un una unas uno unos y ya yo él más también según está están
+había qué cuál cómo dónde éste ésta sí así cada puede pueden será serán dicho
+dicha dichos dichas mismo misma mismos mismas cual cuyo cuya cuyos cuyas
+""".split())
+
+
+def fold_accents(text: str, keep_enye: bool = False) -> str:
+    """
+    Elimina tildes y diéresis (descomposición NFKD sin marcas combinantes).
+
+    Normalización compartida por los índices y las etiquetas, para que un
+    mismo texto se compare igual en todos ellos. No cambia mayúsculas.
+
+    Args:
+        text: Texto a normalizar
+        keep_enye: Conservar la ñ (es otra letra, no una n acentuada)
+    """
+    if keep_enye:
+        text = text.replace("ñ", "\0").replace("Ñ", "\1")
+    text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    if keep_enye:
+        text = text.replace("\0", "ñ").replace("\1", "Ñ")
+    return text
+
+
+# Meses en español para normalizar fechas escritas en texto
+_SPANISH_MONTHS = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
+    "julio": 7, "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10,
+    "noviembre": 11, "diciembre": 12,
+}
+
+# Expresiones regulares precompiladas
+_WORD_RE = re.compile(r"[a-záéíóúüñ]+")  # Se aplica sobre texto en minúsculas
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+_PHRASE_TOKEN_RE = re.compile(r"[a-záéíóúüñ]+|[\n.,;:!?¡¿()\[\]{}\"'«»|/\\–—-]")
+_SENTENCE_RE = re.compile(r"[^.!?]+[.!?]*")
+_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+
+_MONTH_NAMES = "|".join(_SPANISH_MONTHS)
+_DATE_PATTERNS = [
+    # 2024-06-05 / 2024/06/05
+    ("ymd", re.compile(r"\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b")),
+    # 05/06/2024 / 05-06-2024 (formato día/mes/año)
+    ("dmy", re.compile(r"\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{4})\b")),
+    # 5 de junio de 2024 / 5 junio 2024
+    ("text_dmy", re.compile(
+        rf"\b(\d{{1,2}})\s+(?:de\s+)?({_MONTH_NAMES})\s+(?:de\s+|del\s+)?(\d{{4}})\b",
+        re.IGNORECASE,
+    )),
+    # junio de 2024
+    ("text_my", re.compile(rf"\b({_MONTH_NAMES})\s+(?:de\s+|del\s+)?(\d{{4}})\b", re.IGNORECASE)),
+]
+
+
+# ==================================================================================
+#                           FUNCIONES DE EXTRACCIÓN
+# ==================================================================================
+
+def _build_date(year: int, month: int, day: int) -> Optional[str]:
+    """
+    Construye una fecha ISO validando que exista y sea plausible.
+
+    Returns:
+        Optional[str]: Fecha en formato YYYY-MM-DD o None si no es válida
+    """
+    if not 1900 <= year <= 2100:
+        return None
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def extract_date(text: str) -> Optional[str]:
+    """
+    Busca la primera fecha reconocible en el texto y la normaliza a YYYY-MM-DD.
+
+    Reconoce fechas ISO, numéricas día/mes/año y fechas escritas en español
+    ("5 de junio de 2024", "junio de 2024").
+
+    Args:
+        text: Texto en el que buscar
+
+    Returns:
+        Optional[str]: Fecha normalizada o None si no se encuentra ninguna
+    """
+    # Toda fecha reconocida contiene un año de cuatro cifras: solo se evalúan
+    # los patrones completos en una ventana alrededor de cada año encontrado
+    for year_match in _YEAR_RE.finditer(text):
+        window = text[max(0, year_match.start() - 40):year_match.end() + 6]
+        candidate = _match_date(window)
+        if candidate:
+            return candidate
+
+    return None
+
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    """
+    Normaliza la fecha de unos metadatos (de Gemini o del extractor local)
+    a YYYY-MM-DD.
+
+    Acepta fechas ISO (también con hora), numéricas y escritas en español;
+    los marcadores como "Fecha no encontrada" o "No disponible" dan None.
+
+    Args:
+        value: Valor del campo date
+
+    Returns:
+        Optional[str]: Fecha normalizada o None si no es una fecha reconocible
+    """
+    if not value:
+        return None
+    value = str(value).strip()
+    iso = re.match(r"^(\d{4})-(\d{1,2})-(\d{1,2})", value)
+    if iso:
+        return _build_date(int(iso.group(1)), int(iso.group(2)), int(iso.group(3)))
+    return extract_date(value)
+
+
+def _match_date(window: str) -> Optional[str]:
+    """
+    Evalúa los patrones de fecha sobre un fragmento corto de texto.
+
+    Returns:
+        Optional[str]: Primera fecha válida del fragmento o None
+    """
+    best_position = None
+    best_date = None
+
+    for kind, pattern in _DATE_PATTERNS:
+        for match in pattern.finditer(window):
+            if best_position is not None and match.start() >= best_position:
+                break
+
+            groups = match.groups()
+            if kind == "ymd":
+                candidate = _build_date(int(groups[0]), int(groups[1]), int(groups[2]))
+            elif kind == "dmy":
+                candidate = _build_date(int(groups[2]), int(groups[1]), int(groups[0]))
+            elif kind == "text_dmy":
+                candidate = _build_date(int(groups[2]), _SPANISH_MONTHS[groups[1].lower()], int(groups[0]))
+            else:
+                candidate = _build_date(int(groups[1]), _SPANISH_MONTHS[groups[0].lower()], 1)
+
+            if candidate:
+                best_position = match.start()
+                best_date = candidate
+                break
+
+    return best_date
+
+
+def extract_title(text: str) -> Optional[str]:
+    """
+    Deriva un título del primer encabezado o de la primera línea significativa.
+
+    Args:
+        text: Texto del documento
+
+    Returns:
+        Optional[str]: Título encontrado o None si el texto está vacío
+    """
+    heading = _HEADING_RE.search(text)
+    if heading:
+        return heading.group(1).strip()[:MAX_TITLE_LENGTH]
+
+    for line in text.splitlines():
+        # Ignorar separadores de diapositivas/hojas y líneas sin letras
+        if line.lstrip().startswith("---"):
+            continue
+        line = line.strip(" \t-=*#_")
+        if not line or not _WORD_RE.search(line.lower()):
+            continue
+        if len(line) > MAX_TITLE_LENGTH:
+            line = line[:MAX_TITLE_LENGTH].rsplit(" ", 1)[0] + "..."
+        return line
+
+    return None
+
+
+def extract_keywords(text: str, max_keywords: int = MAX_KEYWORDS) -> List[str]:
+    """
+    Extrae palabras clave con una puntuación tipo RAKE.
+
+    El texto se divide en frases candidatas usando puntuación y stop words
+    como delimitadores. Cada palabra se puntúa como grado/frecuencia y cada
+    frase con la suma de sus palabras; las frases más largas de tres palabras
+    se descartan para evitar fragmentos de oraciones.
+
+    Args:
+        text: Texto del documento
+        max_keywords: Número máximo de palabras clave a devolver
+
+    Returns:
+        List[str]: Palabras clave ordenadas por relevancia
+    """
+    phrases: List[tuple] = []
+    current: List[str] = []
+    # Una sola pasada: las palabras y los signos de puntuación salen como tokens
+    for token in _PHRASE_TOKEN_RE.findall(text.lower()):
+        if len(token) < 3 or token in SPANISH_STOP_WORDS:
+            # Stop word, palabra corta o puntuación: cierra la frase candidata
+            if current:
+                phrases.append(tuple(current))
+                current = []
+        else:
+            current.append(token)
+    if current:
+        phrases.append(tuple(current))
+
+    if not phrases:
+        return []
+
+    frequency: Counter = Counter()
+    degree: Counter = Counter()
+    for phrase in phrases:
+        for word in phrase:
+            frequency[word] += 1
+            degree[word] += len(phrase)
+
+    word_score = {word: degree[word] / frequency[word] + frequency[word] for word in frequency}
+
+    phrase_scores: Dict[str, float] = {}
+    for phrase in phrases:
+        if len(phrase) > 3:
+            continue
+        key = " ".join(phrase)
+        if key not in phrase_scores:
+            phrase_scores[key] = sum(word_score[word] for word in phrase)
+
+    ranked = sorted(phrase_scores.items(), key=lambda item: (-item[1], item[0]))
+
+    keywords: List[str] = []
+    seen_words = set()
+    for phrase, _ in ranked:
+        words = phrase.split()
+        # Evitar repetir palabras ya cubiertas por una frase mejor puntuada
+        if all(word in seen_words for word in words):
+            continue
+        keywords.append(phrase)
+        seen_words.update(words)
+        if len(keywords) >= max_keywords:
+            break
+
+    return keywords
+
+
+def extract_summary(text: str, keywords: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Genera un resumen extractivo con las frases más representativas.
+
+    Las frases se puntúan por la frecuencia de sus palabras significativas
+    (normalizada por longitud) y se devuelven en su orden original.
+
+    Args:
+        text: Texto del documento
+        keywords: Palabras clave ya calculadas (reciben una bonificación)
+
+    Returns:
+        Optional[str]: Resumen o None si no hay frases utilizables
+    """
+    # Los encabezados markdown ya se usan como título: no forman parte del resumen
+    body = _HEADING_RE.sub("", text)
+    lowered = body.lower()
+    if len(lowered) != len(body):
+        # Algunos caracteres cambian de longitud al pasar a minúsculas
+        lowered = body = lowered
+
+    sentences: List[str] = []
+    tokenized: List[List[str]] = []
+    for match in _SENTENCE_RE.finditer(body):
+        start, end = match.span()
+        if end - start <= 20:
+            continue
+        sentences.append(match.group().strip())
+        tokenized.append([
+            w for w in _WORD_RE.findall(lowered, start, end)
+            if len(w) > 2 and w not in SPANISH_STOP_WORDS
+        ])
+
+    if not sentences:
+        return None
+
+    word_frequency = Counter(word for words in tokenized for word in words)
+    keyword_words = {word for keyword in (keywords or []) for word in keyword.split()}
+
+    scored = []
+    for position, (sentence, words) in enumerate(zip(sentences, tokenized)):
+        if not words:
+            continue
+        score = sum(word_frequency[w] + (2 if w in keyword_words else 0) for w in words) / len(words)
+        scored.append((score, position, sentence))
+
+    if not scored:
+        return None
+
+    top = sorted(scored, key=lambda item: (-item[0], item[1]))[:MAX_SUMMARY_SENTENCES]
+    summary = " ".join(sentence for _, _, sentence in sorted(top, key=lambda item: item[1]))
+
+    words = summary.split()
+    if len(words) > MAX_SUMMARY_WORDS:
+        summary = " ".join(words[:MAX_SUMMARY_WORDS]) + "..."
+
+    return summary
+
+
+# ==================================================================================
+#                           FUNCIÓN PRINCIPAL
+# ==================================================================================
+
+def extract_local_metadata(text_content: str) -> Dict[str, Any]:
+    """
+    Extrae título, resumen, palabras clave y fecha sin llamar a la IA.
+
+    Devuelve exactamente los mismos campos que _call_gemini_ai, por lo que
+    puede usarse indistintamente como resultado provisional o de fallback.
+
+    Args:
+        text_content: Texto extraído del documento
+
+    Returns:
+        Dict[str, Any]: Metadatos con las claves title, summary, keywords y date
+
+    Example:
+        metadata = extract_local_metadata("# Contrato de servicios\\nMadrid, 5 de junio de 2024...")
+        print(metadata["date"])  # "2024-06-05"
+    """
+    text = text_content[:LOCAL_MAX_TEXT_LENGTH]
+    keywords = extract_keywords(text)
+
+    return {
+        "title": extract_title(text) or "Título no encontrado",
+        "summary": extract_summary(text, keywords) or "Resumen no disponible",
+        "keywords": keywords,
+        "date": extract_date(text) or "Fecha no encontrada",
+    }
+
+
+# ==================================================================================
+#                           SCRIPT DE PRUEBAS Y BENCHMARK
+# ==================================================================================
+
+if __name__ == "__main__":
+    """
+    Prueba y benchmark del extractor local.
+
+    Ejecuta: python -m services.local_extractor
+    """
+    import random
+    import time
+
+    print("🧪 Probando extractor local de metadatos...")
+    print("=" * 50)
+
+    sample = (
+        "# Contrato de Prestación de Servicios Profesionales\n\n"
+        "En Santo Domingo, a 5 de junio de 2024, se firma el presente contrato de servicios "
+        "entre la empresa consultora y el cliente. El contrato establece las condiciones de "
+        "pago, la duración de los servicios profesionales y las obligaciones de confidencialidad.\n\n"
+        "La empresa consultora se compromete a entregar un informe mensual de avance. "
+        "El pago de los servicios se realizará dentro de los treinta días siguientes a la factura."
+    )
+    result = extract_local_metadata(sample)
+    print(f"   📝 Título: {result['title']}")
+    print(f"   📄 Resumen: {result['summary'][:100]}...")
+    print(f"   🏷️  Palabras clave: {result['keywords']}")
+    print(f"   📅 Fecha: {result['date']}")
+
+    # ===== BENCHMARK CON CORPUS SINTÉTICO =====
+    rng = random.Random(42)
+    vocabulary = [
+        "contrato", "informe", "servicios", "pago", "factura", "proyecto", "cliente",
+        "presupuesto", "reunión", "acuerdo", "confidencialidad", "auditoría", "empresa",
+        "departamento", "recursos", "humanos", "calidad", "entrega", "plazo", "anual",
+    ] + sorted(SPANISH_STOP_WORDS)[:40]
+
+    def _synthetic_document(size_chars: int) -> str:
+        words = []
+        while sum(len(w) + 1 for w in words) < size_chars:
+            sentence = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(8, 20)))
+            words.extend((sentence.capitalize() + ".").split())
+        return f"# Documento {rng.randint(1, 999)}\n{rng.randint(1, 28)} de marzo de 2024\n" + " ".join(words)
+
+    for size in (2_000, 8_000):
+        corpus = [_synthetic_document(size) for _ in range(500)]
+        start = time.perf_counter()
+        for document in corpus:
+            extract_local_metadata(document)
+        elapsed = time.perf_counter() - start
+        print(f"\n⏱️  {len(corpus)} documentos de ~{size} caracteres: "
+              f"{elapsed * 1000:.0f} ms -> {len(corpus) / elapsed:,.0f} docs/s")
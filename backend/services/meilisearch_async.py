@@ -0,0 +1,770 @@
+"""
+Cliente Asíncrono de Meilisearch - Búsquedas sin Bloquear el Event Loop
+
+El cliente oficial de Meilisearch (meilisearch.Client) es síncrono: llamarlo
+desde un endpoint async bloquea el event loop durante toda la petición HTTP,
+así que un worker solo atiende una búsqueda a la vez. Este módulo ofrece un
+cliente asyncio basado en httpx.AsyncClient para la ruta de búsqueda:
+
+- Pool de conexiones keep-alive compartido por todas las peticiones
+- Tamaño del pool y timeouts configurables (MEILISEARCH_POOL_*, MEILISEARCH_*_TIMEOUT_MS)
+- Mismas opciones de búsqueda que el cliente síncrono (build_search_options)
+- Sin initialize_meilisearch() por petición: el índice ya lo prepara el lifespan
+  (solo se repite en la llamada de prueba del circuito, antes de cerrarlo)
+- Caché de resultados con invalidación por escrituras (services.search_cache)
+- Varias búsquedas en una sola petición (multi-search) con errores aislados
+- Paginación por cursor para listados ordenados (services.search_cursor)
+- Circuit breaker: con Meilisearch caído responde el motor de respaldo
+  (services.fallback_search, SQLite FTS5)
+- Sugerencias por prefijo con atributos mínimos (respaldo de services.suggest_index)
+- Con particiones por año (INDEX_PARTITIONING_ENABLED) cada búsqueda se
+  reparte entre las particiones que el filtro no descarta en una sola
+  petición multi-search y se mezclan los resultados (services.index_partitions)
+
+El cliente síncrono se mantiene para las tareas de administración
+(creación y configuración del índice, escrituras, estadísticas).
+
+Benchmark (QPS por worker, antes y después):
+    python -m services.meilisearch_async --stub --concurrency 32 --requests 500
+
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+import httpx
+
+from config import settings
+from services.embeddings import embedding_pool
+from services.index_partitions import empty_search_result, merge_partition_results, partition_search_options
+from services.meilisearch_service import (
+    INDEX_NAME,
+    build_search_options,
+    compact_search_results,
+    index_partitions,
+    initialize_meilisearch,
+    parse_filter_expression,
+    resolve_semantic_ratio,
+)
+from services.search_cache import make_cache_key, search_cache
+from services.search_cursor import combine_filters, cursor_filter, decode_cursor, next_cursor, parse_cursor_sort
+from services.fallback_search import fallback_search
+from utils.circuit_breaker import HALF_OPEN, CircuitBreaker
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           CLIENTE ASÍNCRONO
+# ==================================================================================
+
+class MeilisearchUnavailable(RuntimeError):
+    """El circuito de Meilisearch está abierto: no se intenta la llamada."""
+
+
+class MeilisearchHTTPError(RuntimeError):
+    """Meilisearch respondió con un código de error (consulta inválida, índice inexistente...)."""
+
+    def __init__(self, message: str, status_code: int, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+
+class AsyncMeilisearchClient:
+    """
+    Cliente HTTP asíncrono mínimo para la API de búsqueda de Meilisearch.
+
+    Args:
+        base_url: URL del servidor (MEILISEARCH_HOST)
+        api_key: Clave de Meilisearch (opcional)
+        max_connections: Conexiones simultáneas máximas del pool
+        max_keepalive: Conexiones inactivas que se mantienen abiertas
+        connect_timeout: Timeout de conexión en segundos
+        request_timeout: Timeout de lectura/escritura en segundos
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        max_connections: int,
+        max_keepalive: int,
+        connect_timeout: float,
+        request_timeout: float,
+    ):
+        self._base_url = base_url.rstrip("/")
+        self._headers = {"Content-Type": "application/json"}
+        if api_key:
+            self._headers["Authorization"] = f"Bearer {api_key}"
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self._timeout = httpx.Timeout(request_timeout, connect=connect_timeout, pool=request_timeout)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Se crea en el primer uso, dentro del event loop que lo va a usar
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                headers=self._headers,
+                limits=self._limits,
+                timeout=self._timeout,
+            )
+        return self._client
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST a la API de Meilisearch con el manejo de errores común.
+
+        Raises:
+            MeilisearchHTTPError: Si Meilisearch responde con un código de error
+            RuntimeError: Si Meilisearch no responde o no responde a tiempo
+        """
+        try:
+            response = await self._get_client().post(path, json=payload)
+        except httpx.TimeoutException as e:
+            metrics.counter("meilisearch_async_errors_total", reason="timeout").inc()
+            raise RuntimeError(f"Meilisearch no respondió a tiempo: {type(e).__name__}") from e
+        except httpx.HTTPError as e:
+            metrics.counter("meilisearch_async_errors_total", reason=type(e).__name__).inc()
+            raise RuntimeError(f"Error de conexión con Meilisearch: {str(e)}") from e
+
+        if response.status_code >= 400:
+            metrics.counter("meilisearch_async_errors_total", reason=f"http_{response.status_code}").inc()
+            try:
+                error = response.json()
+            except ValueError:
+                error = {"message": response.text}
+            raise MeilisearchHTTPError(
+                f"Error en la búsqueda: {error.get('message', 'sin detalle')} "
+                f"(código: {error.get('code', response.status_code)})",
+                status_code=response.status_code,
+                code=error.get("code"),
+            )
+
+        return response.json()
+
+    async def search(self, index_uid: str, query: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ejecuta POST /indexes/{index_uid}/search.
+
+        Args:
+            index_uid: Índice en el que buscar
+            query: Texto de búsqueda
+            options: Opciones de búsqueda de Meilisearch (limit, filter, sort...)
+
+        Returns:
+            Dict[str, Any]: Respuesta de Meilisearch (hits, estimatedTotalHits...)
+
+        Raises:
+            RuntimeError: Si Meilisearch responde con error o no responde a tiempo
+        """
+        return await self._post(f"/indexes/{quote(index_uid, safe='')}/search", {"q": query, **options})
+
+    async def multi_search(self, queries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Ejecuta POST /multi-search: varias búsquedas en una sola petición.
+
+        Args:
+            queries: Consultas con indexUid, q y opciones de búsqueda
+
+        Returns:
+            List[Dict[str, Any]]: Un resultado por consulta, en el mismo orden
+
+        Raises:
+            RuntimeError: Si Meilisearch responde con error o no responde a tiempo
+                          (basta con que falle una consulta para que falle todo)
+        """
+        response = await self._post("/multi-search", {"queries": queries})
+        return response.get("results", [])
+
+    async def aclose(self) -> None:
+        """Cierra las conexiones del pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Cliente compartido por la ruta de búsqueda (se cierra en el lifespan de main.py)
+async_client = AsyncMeilisearchClient(
+    base_url=settings.MEILISEARCH_HOST,
+    api_key=settings.MEILISEARCH_MASTER_KEY,
+    max_connections=settings.MEILISEARCH_POOL_MAX_CONNECTIONS,
+    max_keepalive=settings.MEILISEARCH_POOL_MAX_KEEPALIVE,
+    connect_timeout=settings.MEILISEARCH_CONNECT_TIMEOUT_MS / 1000,
+    request_timeout=settings.MEILISEARCH_SEARCH_TIMEOUT_MS / 1000,
+)
+
+
+# Circuito de Meilisearch: tras varios fallos seguidos las búsquedas pasan al
+# motor de respaldo sin esperar timeouts (main.py lo abre si Meilisearch no arranca)
+meilisearch_circuit = CircuitBreaker(
+    "meilisearch",
+    failure_threshold=settings.MEILISEARCH_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.MEILISEARCH_CIRCUIT_RESET_SECONDS,
+)
+
+
+async def _call_meilisearch(call: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Ejecuta una llamada a Meilisearch a través del circuit breaker.
+
+    Los errores HTTP (consulta rechazada) no cuentan como caída del servicio
+    y una petición cancelada no cuenta como nada (solo libera la llamada de
+    prueba); cualquier otro error cuenta como fallo, para que la prueba del
+    estado half_open nunca quede sin resolver.
+
+    La llamada de prueba repite antes la inicialización (conexión, índice y
+    configuración): Meilisearch puede volver reiniciado sin el índice, y el
+    circuito solo se cierra si vuelve a estar listo.
+
+    Raises:
+        MeilisearchUnavailable: Si el circuito está abierto
+        RuntimeError: Si la llamada falla
+    """
+    probing = meilisearch_circuit.state == HALF_OPEN
+    if not meilisearch_circuit.allow_request():
+        raise MeilisearchUnavailable("Meilisearch no disponible (circuito abierto)")
+    try:
+        if probing:
+            await asyncio.to_thread(initialize_meilisearch, True)
+        result = await call()
+    except MeilisearchHTTPError:
+        meilisearch_circuit.record_success()
+        raise
+    except asyncio.CancelledError:
+        meilisearch_circuit.release_probe()
+        raise
+    except BaseException:
+        meilisearch_circuit.record_failure()
+        raise
+    meilisearch_circuit.record_success()
+    return result
+
+
+def _is_outage(error: BaseException) -> bool:
+    """Error por Meilisearch caído (y no por una consulta inválida)."""
+    return isinstance(error, RuntimeError) and not isinstance(error, MeilisearchHTTPError)
+
+
+async def _search_fallback(reason: str, **search: Any) -> Dict[str, Any]:
+    """Búsqueda en el motor de respaldo (SQLite FTS5) sin bloquear el event loop."""
+    metrics.counter("search_fallback_total", reason=reason).inc()
+    return await asyncio.to_thread(fallback_search.search, **search)
+
+
+async def _partitions(filters: Optional[str]) -> List[str]:
+    """
+    Particiones en las que buscar con un filtro (ya validado). La lista de
+    particiones solo se relee de Meilisearch, en un hilo, cuando ha caducado.
+
+    Raises:
+        RuntimeError: Si hay que releer la lista y Meilisearch no responde
+    """
+    if index_partitions.is_stale():
+        try:
+            await asyncio.to_thread(index_partitions.refresh)
+        except Exception as e:
+            if not index_partitions.indexes():
+                raise RuntimeError(f"No se pudo leer la lista de particiones: {e}") from e
+            # Con una lista anterior se sigue buscando en ella
+    return index_partitions.select(parse_filter_expression(filters))
+
+
+def _partition_queries(index_uids: List[str], query: str, options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Consultas de multi-search de una búsqueda repartida entre particiones."""
+    return [{"indexUid": index_uid, "q": query, **partition_search_options(options)} for index_uid in index_uids]
+
+
+async def _search_index(query: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Una búsqueda en el índice de documentos o, con INDEX_PARTITIONING_ENABLED,
+    en las particiones que el filtro no descarta (una sola petición
+    multi-search cuyos resultados se mezclan por ordenación o puntuación).
+
+    Raises:
+        RuntimeError: Si Meilisearch responde con error o no responde a tiempo
+    """
+    if not settings.INDEX_PARTITIONING_ENABLED:
+        return await async_client.search(INDEX_NAME, query, options)
+
+    index_uids = await _partitions(options.get("filter"))
+    if not index_uids:
+        return empty_search_result(query, options)
+    results = await async_client.multi_search(_partition_queries(index_uids, query, options))
+    return merge_partition_results(results, query, options)
+
+
+# ==================================================================================
+#                           FUNCIONES DE BÚSQUEDA
+# ==================================================================================
+
+async def _search(
+    query: str,
+    limit: int,
+    offset: int,
+    filters: Optional[str],
+    sort: Optional[List[str]],
+    facets: Optional[List[str]],
+    crop_length: Optional[int],
+    crop_attributes: Optional[List[str]],
+    compact: bool,
+    semantic_ratio: Optional[float] = None
+) -> Dict[str, Any]:
+    """Respuesta de Meilisearch (o del motor de respaldo) sin convertir al formato compacto."""
+    search_options = build_search_options(
+        limit, offset, filters, sort, facets, crop_length, crop_attributes, compact,
+        semantic_ratio=resolve_semantic_ratio(query, semantic_ratio),
+    )
+    # El motor de respaldo solo busca por palabras
+    search = {
+        "query": query, "limit": limit, "offset": offset, "filters": filters, "sort": sort, "facets": facets,
+        "crop_length": crop_length, "crop_attributes": crop_attributes, "ranking_score": compact,
+    }
+
+    if settings.SEARCH_ENGINE == "sqlite":
+        return await _search_fallback("engine", **search)
+
+    async def fetch() -> Dict[str, Any]:
+        # El vector de la consulta solo se calcula si la búsqueda no está en caché
+        options = await _with_query_vector(query, search_options)
+        return await _call_meilisearch(lambda: _search_index(query, options))
+
+    try:
+        if not settings.SEARCH_CACHE_ENABLED:
+            return await fetch()
+        return await search_cache.get_or_fetch(make_cache_key(query, search_options), fetch)
+    except RuntimeError as e:
+        if not settings.FALLBACK_SEARCH_ENABLED or not _is_outage(e):
+            raise
+        return await _search_fallback("circuit_open" if isinstance(e, MeilisearchUnavailable) else "error", **search)
+
+
+async def _with_query_vector(query: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Añade el vector de la consulta a las opciones de una búsqueda híbrida."""
+    if "hybrid" not in options:
+        return options
+    return {**options, "vector": await embedding_pool.embed_query(query)}
+
+
+async def search_documents_async(
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    filters: Optional[str] = None,
+    sort: Optional[List[str]] = None,
+    facets: Optional[List[str]] = None,
+    crop_length: Optional[int] = None,
+    crop_attributes: Optional[List[str]] = None,
+    compact: bool = False,
+    semantic_ratio: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Versión asíncrona de meilisearch_service.search_documents.
+
+    Acepta los mismos parámetros y devuelve la misma respuesta, pero no
+    bloquea el event loop mientras espera a Meilisearch. Con
+    SEARCH_CACHE_ENABLED los resultados pasan por la caché de búsquedas
+    (services.search_cache) y no deben mutarse.
+
+    Si Meilisearch no está disponible (circuito abierto o error de conexión)
+    y FALLBACK_SEARCH_ENABLED está activo, responde el motor de respaldo
+    (services.fallback_search) con la misma forma de respuesta.
+
+    Con compact=True cada resultado se reduce a id, título, fragmento
+    recortado y puntuación (compact_search_results).
+
+    Con la búsqueda híbrida activa (HYBRID_SEARCH_ENABLED) se combinan la
+    puntuación por palabras y la semántica con semantic_ratio (por defecto
+    HYBRID_SEMANTIC_RATIO); el vector de la consulta se calcula en el pool
+    de embeddings.
+
+    Raises:
+        RuntimeError: Si hay errores durante la búsqueda
+        ValueError: Si los parámetros son inválidos
+    """
+    results = await _search(query, limit, offset, filters, sort, facets, crop_length, crop_attributes, compact,
+                            semantic_ratio)
+    return compact_search_results(results, crop_attributes) if compact else results
+
+
+async def search_documents_cursor_async(
+    query: str,
+    limit: int = 20,
+    filters: Optional[str] = None,
+    sort: Optional[List[str]] = None,
+    cursor: Optional[str] = None,
+    facets: Optional[List[str]] = None,
+    crop_length: Optional[int] = None,
+    crop_attributes: Optional[List[str]] = None,
+    compact: bool = False,
+    semantic_ratio: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Búsqueda paginada por cursor (services.search_cursor).
+
+    Cada página cuesta lo mismo sin importar su profundidad: en lugar de un
+    offset se envía un filtro que continúa tras el último resultado de la
+    página anterior. Las facetas solo se calculan en la primera página
+    (en las siguientes describirían solo los resultados restantes).
+
+    Solo para listados ordenados (query vacía): con texto, o con búsqueda
+    híbrida, Meilisearch ordena primero por relevancia y la clave de
+    ordenación deja de ser monótona, así que el filtro de continuación se
+    saltaría resultados.
+
+    Args:
+        query: Texto de búsqueda (debe estar vacío)
+        limit: Resultados por página
+        filters: Filtros del usuario
+        sort: Un único criterio sobre CURSOR_SORT_FIELDS (por defecto created_at_ts:desc)
+        cursor: nextCursor de la página anterior (None para la primera)
+        facets: Facetas de la primera página
+        crop_length: Palabras de cada fragmento recortado
+        crop_attributes: Atributos a recortar (por defecto SEARCH_CROP_ATTRIBUTES)
+        compact: Resultados en formato compacto
+        semantic_ratio: No admitido (debe ser None)
+
+    Returns:
+        Dict[str, Any]: Respuesta de Meilisearch más nextCursor (None en la última página)
+
+    Raises:
+        ValueError: Si hay texto de búsqueda o peso semántico, o si la ordenación,
+                    los filtros o el cursor son inválidos
+        RuntimeError: Si hay errores durante la búsqueda
+    """
+    if query.strip() or semantic_ratio is not None:
+        raise ValueError("La paginación por cursor solo admite listados ordenados sin texto de búsqueda "
+                         "ni peso semántico; para buscar por texto usa la paginación por offset")
+    field, direction = parse_cursor_sort(sort)
+    previous = decode_cursor(cursor, query, filters, field, direction) if cursor else None
+
+    results = await _search(
+        query=query,
+        limit=limit,
+        offset=0,
+        filters=combine_filters(filters, cursor_filter(previous) if previous else None),
+        sort=[f"{field}:{direction}"],
+        facets=None if previous else facets,
+        crop_length=crop_length,
+        crop_attributes=crop_attributes,
+        compact=compact,
+        semantic_ratio=semantic_ratio,
+    )
+
+    # El cursor se calcula con los resultados completos (necesita el campo de
+    # ordenación); la respuesta es un diccionario nuevo: el resultado puede
+    # venir de la caché y no debe mutarse
+    cursor_value = next_cursor(results.get("hits", []), limit, field, direction, query, filters, previous)
+    if compact:
+        results = compact_search_results(results, crop_attributes)
+    return {**results, "nextCursor": cursor_value}
+
+
+def _fallback_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Parámetros de fallback_search.search a partir de una especificación de multi-search."""
+    return {
+        "query": spec.get("query", ""),
+        "limit": spec.get("limit", 20),
+        "offset": spec.get("offset", 0),
+        "filters": spec.get("filters"),
+        "sort": spec.get("sort"),
+        "facets": spec.get("facets"),
+        "crop_length": spec.get("crop_length"),
+        "crop_attributes": spec.get("crop_attributes"),
+        "ranking_score": spec.get("compact", False),
+    }
+
+
+async def multi_search_documents_async(searches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Ejecuta varias búsquedas en un único viaje a Meilisearch (API multi-search).
+
+    Los errores se aíslan por consulta: una especificación inválida (filtro
+    no permitido, ordenación desconocida...) se responde con su error sin
+    enviarse, y si Meilisearch rechaza el lote completo por culpa de una
+    consulta, las válidas se repiten por separado para que el resto de
+    resultados lleguen igualmente.
+
+    Args:
+        searches: Especificaciones con las claves de search_documents_async
+                  (query, limit, offset, filters, sort, facets, crop_length,
+                  crop_attributes, compact, semantic_ratio)
+
+    Returns:
+        List[Dict[str, Any]]: Un elemento por búsqueda, en el mismo orden:
+            - {"index": i, "result": {...}} si la búsqueda tuvo éxito
+            - {"index": i, "error": "..."} si falló
+    """
+    responses: List[Optional[Dict[str, Any]]] = [None] * len(searches)
+    prepared: List[tuple] = []  # (posición, texto, opciones) de las consultas válidas
+
+    # Validar cada consulta por separado: un error no invalida a las demás
+    for position, spec in enumerate(searches):
+        try:
+            options = build_search_options(
+                spec.get("limit", 20),
+                spec.get("offset", 0),
+                spec.get("filters"),
+                spec.get("sort"),
+                spec.get("facets"),
+                spec.get("crop_length"),
+                spec.get("crop_attributes"),
+                spec.get("compact", False),
+                resolve_semantic_ratio(spec.get("query", ""), spec.get("semantic_ratio")),
+            )
+        except ValueError as e:
+            responses[position] = {"index": position, "error": str(e)}
+            continue
+        prepared.append((position, spec.get("query", ""), options))
+
+    if prepared:
+        try:
+            if settings.SEARCH_ENGINE == "sqlite":
+                raise MeilisearchUnavailable("Motor configurado: sqlite")
+            # Vectores de las consultas híbridas (en paralelo, en el pool de embeddings)
+            prepared = [
+                (position, query, vector_options)
+                for (position, query, _), vector_options in zip(prepared, await asyncio.gather(
+                    *(_with_query_vector(query, options) for _, query, options in prepared)
+                ))
+            ]
+            if settings.INDEX_PARTITIONING_ENABLED:
+                results = await _call_meilisearch(lambda: _multi_search_partitions(prepared))
+            else:
+                results = await _call_meilisearch(lambda: async_client.multi_search([
+                    {"indexUid": INDEX_NAME, "q": query, **options} for _, query, options in prepared
+                ]))
+        except MeilisearchHTTPError:
+            # El lote se rechaza entero si una consulta es inválida: repetir
+            # cada una por separado para aislar el error
+            metrics.counter("meilisearch_multi_search_fallbacks_total").inc()
+            results = await asyncio.gather(
+                *(_call_meilisearch(lambda query=query, options=options: _search_index(query, options))
+                  for _, query, options in prepared),
+                return_exceptions=True,
+            )
+        except RuntimeError as e:
+            if settings.FALLBACK_SEARCH_ENABLED:
+                # Meilisearch no disponible: responder cada consulta con el motor de respaldo
+                results = await asyncio.gather(
+                    *(_search_fallback("multi_search", **_fallback_spec(searches[position]))
+                      for position, _, _ in prepared),
+                    return_exceptions=True,
+                )
+            else:
+                # Todas las consultas comparten el error
+                results = [e] * len(prepared)
+
+        for (position, _, _), result in zip(prepared, results):
+            if isinstance(result, BaseException):
+                responses[position] = {"index": position, "error": str(result)}
+            else:
+                result.pop("indexUid", None)
+                if searches[position].get("compact"):
+                    result = compact_search_results(result, searches[position].get("crop_attributes"))
+                responses[position] = {"index": position, "result": result}
+
+    metrics.counter("meilisearch_multi_search_queries_total").inc(len(searches))
+    return responses
+
+
+async def _multi_search_partitions(prepared: List[tuple]) -> List[Dict[str, Any]]:
+    """
+    Multi-search con particiones: las consultas de todas las búsquedas (una
+    por partición seleccionada) van en una sola petición y los resultados se
+    reagrupan y mezclan por búsqueda.
+
+    Raises:
+        RuntimeError: Si Meilisearch responde con error o no responde a tiempo
+    """
+    queries: List[Dict[str, Any]] = []
+    spans: List[tuple] = []  # (inicio, fin) de las consultas de cada búsqueda
+    for _, query, options in prepared:
+        index_uids = await _partitions(options.get("filter"))
+        spans.append((len(queries), len(queries) + len(index_uids)))
+        queries.extend(_partition_queries(index_uids, query, options))
+
+    results = await async_client.multi_search(queries) if queries else []
+    return [
+        merge_partition_results(results[start:end], query, options) if end > start
+        else empty_search_result(query, options)
+        for (start, end), (_, query, options) in zip(spans, prepared)
+    ]
+
+
+async def suggest_documents_async(prefix: str, limit: int = 8, filters: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Sugerencias de títulos mediante una búsqueda por prefijo en Meilisearch.
+
+    Respaldo de services.suggest_index mientras el índice de prefijos no está
+    cargado o no encuentra nada (Meilisearch tolera errores tipográficos):
+    solo busca en título y palabras clave, devuelve solo el título y no
+    calcula resaltado ni facetas. Es una ayuda de escritura, así que ante
+    cualquier error responde sin sugerencias.
+
+    Args:
+        prefix: Texto escrito hasta ahora
+        limit: Máximo de resultados
+        filters: Filtro ya validado (el de acceso del usuario, services.access_control)
+
+    Returns:
+        List[Dict[str, Any]]: Sugerencias {"text", "type", "count"}
+    """
+    if settings.SEARCH_ENGINE == "sqlite" or not prefix.strip():
+        return []
+
+    options = {
+        "limit": limit,
+        "attributesToRetrieve": ["title"],
+        "attributesToSearchOn": ["title", "keywords"],
+    }
+    if filters:
+        options["filter"] = filters
+
+    def fetch() -> Awaitable[Dict[str, Any]]:
+        return _call_meilisearch(lambda: _search_index(prefix, options))
+
+    try:
+        if settings.SEARCH_CACHE_ENABLED:
+            results = await search_cache.get_or_fetch(make_cache_key(prefix, options), fetch)
+        else:
+            results = await fetch()
+    except RuntimeError as e:
+        metrics.counter("suggest_meilisearch_errors_total", reason=type(e).__name__).inc()
+        return []
+
+    suggestions: Dict[str, Dict[str, Any]] = {}
+    for hit in results.get("hits", []):
+        title = str(hit.get("title") or "").strip()
+        if title:
+            suggestion = suggestions.setdefault(title.lower(), {"text": title, "type": "title", "count": 0})
+            suggestion["count"] += 1
+    return list(suggestions.values())
+
+
+# ==================================================================================
+#                           BENCHMARK DE QPS
+# ==================================================================================
+
+def _start_stub_server(latency_ms: float):
+    """
+    Servidor HTTP que imita POST /indexes/{uid}/search con una latencia fija.
+    Permite medir el efecto del cliente sin un Meilisearch real.
+    """
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(latency_ms / 1000)
+            data = json.dumps({
+                "hits": [], "query": body.get("q", ""), "processingTimeMs": int(latency_ms),
+                "limit": body.get("limit", 20), "offset": body.get("offset", 0), "estimatedTotalHits": 0,
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    class _StubServer(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024  # Evitar rechazos de conexión con concurrencia alta
+
+    server = _StubServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+async def run_search_benchmark(base_url: str, requests: int, concurrency: int) -> Dict[str, float]:
+    """
+    Mide las búsquedas por segundo de un único event loop (un worker) con
+    el cliente síncrono dentro de corrutinas (antes) y con el asíncrono (después).
+
+    Args:
+        base_url: URL de Meilisearch (o del servidor simulado)
+        requests: Búsquedas totales por modo
+        concurrency: Búsquedas simultáneas
+
+    Returns:
+        Dict[str, float]: QPS de cada modo y el factor de mejora
+    """
+    import time
+
+    from meilisearch import Client
+
+    options = build_search_options(limit=20)
+    queries = [f"contrato {i % 50}" for i in range(requests)]
+
+    sync_index = Client(base_url, settings.MEILISEARCH_MASTER_KEY or None).index(INDEX_NAME)
+    pooled = AsyncMeilisearchClient(
+        base_url=base_url,
+        api_key=settings.MEILISEARCH_MASTER_KEY,
+        max_connections=settings.MEILISEARCH_POOL_MAX_CONNECTIONS,
+        max_keepalive=settings.MEILISEARCH_POOL_MAX_KEEPALIVE,
+        connect_timeout=settings.MEILISEARCH_CONNECT_TIMEOUT_MS / 1000,
+        request_timeout=settings.MEILISEARCH_SEARCH_TIMEOUT_MS / 1000,
+    )
+
+    async def _blocking(query: str):
+        # Lo que hacía el endpoint: llamada síncrona dentro de una corrutina
+        return sync_index.search(query, dict(options))
+
+    async def _pooled(query: str):
+        return await pooled.search(INDEX_NAME, query, options)
+
+    async def _measure(search) -> float:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one(query: str):
+            async with semaphore:
+                await search(query)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(_one(query) for query in queries))
+        return requests / (time.perf_counter() - start)
+
+    blocking_qps = await _measure(_blocking)
+    pooled_qps = await _measure(_pooled)
+    await pooled.aclose()
+
+    return {"blocking_qps": blocking_qps, "pooled_qps": pooled_qps, "speedup": pooled_qps / blocking_qps}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="QPS de búsqueda por worker: cliente síncrono vs asíncrono")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--stub", action="store_true", help="Usar un Meilisearch simulado en lugar de MEILISEARCH_HOST")
+    parser.add_argument("--stub-latency-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    target_url = settings.MEILISEARCH_HOST
+    stub_server = None
+    if args.stub:
+        stub_server, target_url = _start_stub_server(args.stub_latency_ms)
+
+    print(f"🔍 {args.requests} búsquedas contra {target_url} (concurrencia {args.concurrency})")
+    results = asyncio.run(run_search_benchmark(target_url, args.requests, args.concurrency))
+    print(f"   • Cliente síncrono en el event loop: {results['blocking_qps']:.1f} QPS")
+    print(f"   • Cliente asíncrono con pool:        {results['pooled_qps']:.1f} QPS")
+    print(f"   • Mejora: x{results['speedup']:.1f}")
+
+    if stub_server is not None:
+        stub_server.shutdown()
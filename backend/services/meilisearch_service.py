@@ -6,8 +6,9 @@ rápido y tolerante a errores tipográficos. Se encarga de:
 
 - Inicialización y configuración del cliente Meilisearch
 - Creación y gestión de índices de búsqueda
-- Indexación de documentos y metadatos
+- Indexación de documentos y metadatos (sin bloqueo, con seguimiento de tareas)
 - Operaciones de búsqueda con filtros y facetas
+- Particiones por año opcionales (services.index_partitions)
 - Manejo robusto de errores de conectividad
 
 Características principales:
@@ -20,10 +21,27 @@ Características principales:
 
 """
 
-from typing import List, Dict, Any, Optional
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Set
 from meilisearch import Client
 from meilisearch.errors import MeilisearchError
-from config import settings
+from config import BASE_DIR, settings
+from services.index_partitions import (
+    IndexPartitions,
+    empty_search_result,
+    merge_partition_results,
+    partition_key_for_year,
+    partition_search_options,
+)
+from services.index_task_tracker import IndexTaskTracker
+from services.embeddings import EMBEDDER_NAME, document_embedding_text, embedding_pool
+from services.keyword_tags import keyword_dictionary
+from services.local_extractor import SPANISH_STOP_WORDS, normalize_date
+from services.metadata_store import load_metadata
+from utils.metrics import metrics
 
 # ==================================================================================
 #                           CONFIGURACIÓN GLOBAL
@@ -35,6 +53,52 @@ client: Optional[Client] = None
 # Nombre del índice principal para documentos
 INDEX_NAME = "documents"
 
+# Índice en el que se reconstruye el principal antes de intercambiarlos
+SHADOW_INDEX_NAME = f"{INDEX_NAME}_next"
+
+# Grupos de sinónimos por defecto: cada término equivale a los demás de su grupo
+# (se pueden sustituir con MEILISEARCH_SYNONYMS_FILE)
+DEFAULT_SYNONYM_GROUPS = [
+    ["contrato", "convenio", "acuerdo"],
+    ["informe", "reporte"],
+    ["presupuesto", "cotización"],
+    ["reglamento", "normativa", "norma"],
+    ["acta", "minuta"],
+    ["estudiante", "alumno"],
+    ["docente", "profesor"],
+    ["solicitud", "petición"],
+    ["circular", "comunicado"],
+]
+
+
+def load_synonyms() -> Dict[str, List[str]]:
+    """
+    Diccionario de sinónimos del índice en el formato de Meilisearch.
+    
+    Lee los grupos de MEILISEARCH_SYNONYMS_FILE (lista de listas en JSON) o
+    usa DEFAULT_SYNONYM_GROUPS, y los expande para que cada término apunte
+    a todos los demás de su grupo.
+    
+    Raises:
+        RuntimeError: Si el fichero configurado no existe o no es válido
+    """
+    groups = DEFAULT_SYNONYM_GROUPS
+    if settings.MEILISEARCH_SYNONYMS_FILE:
+        path = os.path.join(BASE_DIR, settings.MEILISEARCH_SYNONYMS_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as synonyms_file:
+                groups = json.load(synonyms_file)
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"No se pudo leer el fichero de sinónimos '{path}': {str(e)}") from e
+
+    synonyms: Dict[str, List[str]] = {}
+    for group in groups:
+        terms = [term.strip().lower() for term in group if term.strip()]
+        for term in terms:
+            related = synonyms.setdefault(term, [])
+            related.extend(other for other in terms if other != term and other not in related)
+    return synonyms
+
 # Configuración del índice de documentos
 INDEX_CONFIG = {
     "primaryKey": "id",                    # Campo único para cada documento
@@ -46,15 +110,27 @@ INDEX_CONFIG = {
         "text_content"                    # Contenido de texto (si está disponible)
     ],
     "filterableAttributes": [             # Campos que se pueden usar para filtrar
+        "id",                             # Identificador (desempate de la paginación por cursor)
         "file_extension",                 # Extensión del archivo (.pdf, .docx, etc.)
         "file_size_bytes",               # Tamaño del archivo en bytes
-        "date",                          # Fecha del documento
+        "date",                          # Fecha del documento (texto libre de la IA)
+        "date_ts",                       # Fecha del documento en milisegundos (rangos; null si se desconoce)
+        "date_year",                     # Año de la fecha del documento (faceta)
+        "date_month",                    # Mes (1-12) de la fecha del documento (faceta)
+        "date_known",                    # Si la fecha del documento es una fecha reconocible
         "created_at",                    # Fecha de indexación
-        "keywords"                       # Palabras clave (para filtros facetados)
+        "created_at_ts",                 # Fecha de indexación en milisegundos (paginación por cursor)
+        "keywords",                      # Palabras clave tal como las devuelve la IA
+        "keyword_tags",                  # Etiquetas canónicas de las palabras clave (faceta)
+        "duplicate_of",                  # Original del que es casi duplicado (duplicate_of NOT EXISTS los oculta)
+        "owner_uid",                     # Usuario que subió el documento (control de acceso)
+        "department"                     # Departamento del propietario (control de acceso)
     ],
     "sortableAttributes": [               # Campos por los que se puede ordenar
-        "date",                          # Fecha del documento
+        "date",                          # Fecha del documento (orden alfabético del texto)
+        "date_ts",                       # Fecha del documento normalizada (las desconocidas al final)
         "created_at",                    # Fecha de indexación
+        "created_at_ts",                 # Fecha de indexación en milisegundos
         "file_size_bytes",               # Tamaño del archivo
         "title"                          # Título alfabéticamente
     ],
@@ -63,20 +139,432 @@ INDEX_CONFIG = {
         "title", 
         "summary",
         "keywords",
+        "keyword_tags",
         "filename",
         "file_extension",
         "file_size_bytes",
         "date",
-        "created_at"
-    ]
+        "date_ts",
+        "created_at",
+        "created_at_ts"
+    ],
+    "stopWords": sorted(SPANISH_STOP_WORDS),  # Palabras vacías del español (no se indexan)
+    "synonyms": load_synonyms(),         # Términos equivalentes
+    "typoTolerance": {                   # Tolerancia a errores tipográficos
+        "enabled": True,
+        "minWordSizeForTypos": {
+            "oneTypo": 5,                # Un error a partir de 5 letras
+            "twoTypos": 9                # Dos errores a partir de 9 letras
+        }
+    },
+    "pagination": {                      # Límite de la paginación por offset
+        "maxTotalHits": settings.MEILISEARCH_MAX_TOTAL_HITS
+    }
 }
 
+if settings.HYBRID_SEARCH_ENABLED:
+    # Vectores calculados por la aplicación (services.embeddings) en el campo _vectors
+    INDEX_CONFIG["embedders"] = {
+        EMBEDDER_NAME: {"source": "userProvided", "dimensions": settings.EMBEDDING_DIMENSIONS}
+    }
+
+# Campos que se envían a Meilisearch: solo los que se buscan, filtran,
+# ordenan o muestran (el resto de metadatos queda en el almacén local)
+INDEXED_FIELDS = list(dict.fromkeys([
+    INDEX_CONFIG["primaryKey"],
+    *INDEX_CONFIG["searchableAttributes"],
+    *INDEX_CONFIG["filterableAttributes"],
+    *INDEX_CONFIG["sortableAttributes"],
+    *INDEX_CONFIG["displayedAttributes"],
+]))
+
+
+def date_fields(date_value: Optional[str]) -> Dict[str, Any]:
+    """
+    Campos tipados de la fecha de un documento, para filtrar por rangos,
+    ordenar y agrupar por año y mes en el motor.
+    
+    Args:
+        date_value: Campo date de los metadatos (ej: "2024-03-15" o "Fecha no encontrada")
+        
+    Returns:
+        Dict[str, Any]: date_ts (milisegundos UTC), date_year, date_month y
+                        date_known; los tres primeros son None si la fecha
+                        no es reconocible
+        
+    Example:
+        date_fields("15 de marzo de 2024")
+        # {"date_ts": 1710460800000, "date_year": 2024, "date_month": 3, "date_known": True}
+    """
+    normalized = normalize_date(date_value)
+    if normalized is None:
+        return {"date_ts": None, "date_year": None, "date_month": None, "date_known": False}
+    
+    parsed = datetime.strptime(normalized, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return {
+        "date_ts": int(parsed.timestamp() * 1000),
+        "date_year": parsed.year,
+        "date_month": parsed.month,
+        "date_known": True
+    }
+
+
+def created_at_fields(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Clave numérica de alta (created_at_ts, milisegundos UTC) para los
+    documentos subidos antes de que la subida la calculara.
+    
+    Se obtiene de created_at, upload_timestamp o processing_timestamp (las
+    marcas sin zona horaria se toman como UTC, como indica su sufijo "Z").
+    
+    Returns:
+        Dict[str, Any]: {"created_at_ts": ...}, o vacío si el documento ya la
+                        tiene o no hay ninguna marca de tiempo reconocible
+    """
+    if metadata.get("created_at_ts") is not None:
+        return {}
+    for field in ("created_at", "upload_timestamp", "processing_timestamp"):
+        value = metadata.get(field)
+        if not isinstance(value, str) or not value.strip():
+            continue
+        try:
+            parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            continue
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return {"created_at_ts": int(parsed.timestamp() * 1000)}
+    return {}
+
+
+def to_index_document(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Proyección de los metadatos completos de un documento sobre INDEXED_FIELDS.
+    
+    Campos como processing_time_estimate, unique_filename, ai_model o las
+    marcas de tiempo duplicadas no se usan en las búsquedas: enviarlos solo
+    agranda el índice. Los documentos guardados antes de la clave de alta
+    (created_at_ts), de los campos de fecha tipados o de las etiquetas
+    canónicas los reciben aquí (el backfill los persiste en el almacén).
+    """
+    document = {field: metadata[field] for field in INDEXED_FIELDS if field in metadata}
+    document.update(created_at_fields(metadata))
+    if "date_known" not in metadata:
+        document.update(date_fields(metadata.get("date")))
+    if "keyword_tags" not in metadata:
+        document["keyword_tags"] = keyword_dictionary.tags(metadata.get("keywords"))
+    if "_vectors" in metadata:
+        document["_vectors"] = metadata["_vectors"]
+    return document
+
+
+def partition_key(document: Dict[str, Any]) -> str:
+    """
+    Partición de un documento con INDEX_PARTITIONING_ENABLED: el año de su
+    fecha normalizada ("2024") o "undated" si no tiene fecha reconocible.
+    
+    Args:
+        document: Metadatos completos o documento del índice (to_index_document)
+    """
+    if "date_known" in document:
+        return partition_key_for_year(document.get("date_year"))
+    return partition_key_for_year(date_fields(document.get("date"))["date_year"])
+
+
+def prepare_index_documents(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Documentos listos para enviar a Meilisearch: proyectados con
+    to_index_document y, con HYBRID_SEARCH_ENABLED, con su vector.
+    
+    Los vectores que faltan se calculan todos juntos en el pool de procesos
+    de services.embeddings (los reintentos ya los llevan y no se recalculan).
+    
+    Raises:
+        RuntimeError: Si falla el cálculo de los embeddings
+    """
+    documents = [to_index_document(document) for document in documents]
+    if not settings.HYBRID_SEARCH_ENABLED:
+        return documents
+    
+    missing = [document for document in documents if "_vectors" not in document]
+    vectors = embedding_pool.embed([document_embedding_text(document) for document in missing])
+    for document, vector in zip(missing, vectors):
+        document["_vectors"] = {EMBEDDER_NAME: vector}
+    return documents
+
+
+# Ajustes cuyo orden no importa (Meilisearch los devuelve ordenados)
+_UNORDERED_SETTINGS = {"filterableAttributes", "sortableAttributes", "displayedAttributes", "stopWords", "synonyms"}
+
+# Ajustes de tipo diccionario que se reemplazan completos (no se comparan por subconjunto)
+_EXACT_KEY_SETTINGS = {"synonyms"}
+
+# Facetas devueltas por la búsqueda avanzada (deben ser filtrables)
+SEARCH_FACETS = ["file_extension", "keyword_tags", "date_year"]
+
+# Atributos que se pueden recortar: deben poder buscarse y devolverse
+CROPPABLE_ATTRIBUTES = [
+    attribute for attribute in INDEX_CONFIG["searchableAttributes"]
+    if attribute in INDEX_CONFIG["displayedAttributes"]
+]
+
+# Campos de un resultado compacto (además del fragmento y la puntuación)
+COMPACT_HIT_FIELDS = ["id", "title"]
+
+
+# ==================================================================================
+#                           VALIDACIÓN DE FILTROS, ORDENACIÓN Y FACETAS
+# ==================================================================================
+
+# Tokens de una expresión de filtro: cadenas entre comillas, operadores de
+# comparación, signos de puntuación y palabras (atributos, valores, palabras clave)
+_FILTER_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op>!=|>=|<=|=|>|<)
+      | (?P<punct>[()\[\],])
+      | (?P<word>[^\s()\[\],=!<>"']+)
+    )""", re.VERBOSE)
+
+_SORT_RE = re.compile(r"^([A-Za-z_][\w.]*):(asc|desc)$")
+
+_FILTER_KEYWORDS = {"AND", "OR", "NOT", "IN", "TO", "EXISTS", "IS", "NULL", "EMPTY"}
+
+
+class _FilterParser:
+    """
+    Analizador descendente de la sintaxis de filtros de Meilisearch.
+
+    Comprueba que cada atributo usado esté en filterableAttributes (para
+    rechazar la consulta con un mensaje claro antes de enviarla al motor) y
+    construye un árbol de la expresión con nodos en forma de tupla:
+
+    - ("or", [nodos]), ("and", [nodos]), ("not", nodo)
+    - ("cmp", atributo, operador, valor)
+    - ("range", atributo, desde, hasta)
+    - ("in", atributo, [valores])
+    - ("exists", atributo)
+    - ("is", atributo, "NULL" | "EMPTY")
+
+    El árbol lo usa el motor de búsqueda de respaldo (services.fallback_search).
+    """
+
+    def __init__(self, expression: str, allowed: List[str]):
+        self._allowed = allowed
+        self._tokens = self._tokenize(expression)
+        self._pos = 0
+
+    @staticmethod
+    def _tokenize(expression: str) -> List[tuple]:
+        tokens = []
+        pos = 0
+        while pos < len(expression):
+            if expression[pos:].strip() == "":
+                break
+            match = _FILTER_TOKEN_RE.match(expression, pos)
+            if not match:
+                raise ValueError(f"Filtro inválido cerca de: '{expression[pos:pos + 20]}'")
+            kind = match.lastgroup
+            tokens.append((kind, match.group(kind)))
+            pos = match.end()
+        return tokens
+
+    def _peek(self, offset: int = 0) -> Optional[tuple]:
+        index = self._pos + offset
+        return self._tokens[index] if index < len(self._tokens) else None
+
+    def _is_keyword(self, token: Optional[tuple], *keywords: str) -> bool:
+        return token is not None and token[0] == "word" and token[1].upper() in keywords
+
+    def _next(self) -> tuple:
+        token = self._peek()
+        if token is None:
+            raise ValueError("Filtro incompleto")
+        self._pos += 1
+        return token
+
+    def _expect(self, value: str) -> None:
+        token = self._next()
+        if token[1] != value and not self._is_keyword(token, value):
+            raise ValueError(f"Filtro inválido: se esperaba '{value}' y se encontró '{token[1]}'")
+
+    def _value(self) -> str:
+        token = self._next()
+        if token[0] not in ("string", "word") or self._is_keyword(token, *_FILTER_KEYWORDS):
+            raise ValueError(f"Filtro inválido: valor inesperado '{token[1]}'")
+        if token[0] == "string":
+            return re.sub(r"\\(.)", r"\1", token[1][1:-1])
+        return token[1]
+
+    def parse(self) -> Optional[tuple]:
+        if not self._tokens:
+            return None
+        node = self._or()
+        if self._peek() is not None:
+            raise ValueError(f"Filtro inválido: token inesperado '{self._peek()[1]}'")
+        return node
+
+    def _or(self) -> tuple:
+        nodes = [self._and()]
+        while self._is_keyword(self._peek(), "OR"):
+            self._pos += 1
+            nodes.append(self._and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def _and(self) -> tuple:
+        nodes = [self._not()]
+        while self._is_keyword(self._peek(), "AND"):
+            self._pos += 1
+            nodes.append(self._not())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def _not(self) -> tuple:
+        token = self._peek()
+        if self._is_keyword(token, "NOT"):
+            self._pos += 1
+            return ("not", self._not())
+        if token is not None and token[1] == "(":
+            self._pos += 1
+            node = self._or()
+            self._expect(")")
+            return node
+        return self._condition()
+
+    def _condition(self) -> tuple:
+        kind, attribute = self._next()
+        if kind == "string":
+            attribute = attribute[1:-1]
+        elif kind != "word" or attribute.upper() in _FILTER_KEYWORDS:
+            raise ValueError(f"Filtro inválido: se esperaba un atributo y se encontró '{attribute}'")
+        if attribute not in self._allowed:
+            raise ValueError(
+                f"El atributo '{attribute}' no es filtrable. "
+                f"Atributos permitidos: {', '.join(self._allowed)}"
+            )
+
+        token = self._peek()
+        if token is not None and token[0] == "op":
+            self._pos += 1
+            return ("cmp", attribute, token[1], self._value())
+
+        negated = self._is_keyword(token, "NOT")
+        if negated:
+            self._pos += 1
+            token = self._peek()
+
+        if self._is_keyword(token, "IN"):
+            self._pos += 1
+            self._expect("[")
+            values = [self._value()]
+            while self._peek() is not None and self._peek()[1] == ",":
+                self._pos += 1
+                values.append(self._value())
+            self._expect("]")
+            node = ("in", attribute, values)
+        elif self._is_keyword(token, "EXISTS"):
+            self._pos += 1
+            node = ("exists", attribute)
+        elif self._is_keyword(token, "IS") and not negated:
+            self._pos += 1
+            if self._is_keyword(self._peek(), "NOT"):
+                self._pos += 1
+                negated = True
+            token = self._next()
+            if not self._is_keyword(token, "NULL", "EMPTY"):
+                raise ValueError("Filtro inválido: se esperaba NULL o EMPTY después de IS")
+            node = ("is", attribute, token[1].upper())
+        elif not negated:
+            # Rango: atributo valor TO valor
+            low = self._value()
+            self._expect("TO")
+            node = ("range", attribute, low, self._value())
+        else:
+            raise ValueError(f"Filtro inválido en la condición sobre '{attribute}'")
+
+        return ("not", node) if negated else node
+
+
+def parse_filter_expression(filters: Optional[str]) -> Optional[tuple]:
+    """
+    Valida una expresión de filtro y devuelve su árbol (ver _FilterParser).
+    
+    Raises:
+        ValueError: Si la sintaxis es inválida o usa atributos no filtrables
+    """
+    if filters is None or not filters.strip():
+        return None
+    return _FilterParser(filters, INDEX_CONFIG["filterableAttributes"]).parse()
+
+
+def validate_filter_expression(filters: Optional[str]) -> Optional[str]:
+    """
+    Valida una expresión de filtro de Meilisearch.
+    
+    Admite comparaciones (=, !=, >, >=, <, <=), rangos (TO), IN, EXISTS,
+    IS NULL/EMPTY, NOT, AND, OR y paréntesis. Cada atributo usado debe estar
+    en filterableAttributes.
+    
+    Args:
+        filters: Expresión de filtro (ej: "file_extension = .pdf AND keyword_tags IN [contrato, legal]")
+        
+    Returns:
+        Optional[str]: La expresión sin espacios sobrantes, o None si está vacía
+        
+    Raises:
+        ValueError: Si la sintaxis es inválida o usa atributos no filtrables
+    """
+    if parse_filter_expression(filters) is None:
+        return None
+    return filters.strip()
+
+
+def validate_sort(sort: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    Valida los criterios de ordenación ("atributo:asc" o "atributo:desc").
+    
+    Raises:
+        ValueError: Si un criterio no tiene el formato esperado o el atributo
+                    no está en sortableAttributes
+    """
+    if not sort:
+        return None
+    allowed = INDEX_CONFIG["sortableAttributes"]
+    for criterion in sort:
+        match = _SORT_RE.match(criterion.strip())
+        if not match:
+            raise ValueError(f"Ordenación inválida '{criterion}': use 'atributo:asc' o 'atributo:desc'")
+        if match.group(1) not in allowed:
+            raise ValueError(
+                f"El atributo '{match.group(1)}' no es ordenable. "
+                f"Atributos permitidos: {', '.join(allowed)}"
+            )
+    return [criterion.strip() for criterion in sort]
+
+
+def validate_facets(facets: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    Valida las facetas solicitadas (deben estar en filterableAttributes).
+    
+    Raises:
+        ValueError: Si alguna faceta no es un atributo filtrable
+    """
+    if not facets:
+        return None
+    allowed = INDEX_CONFIG["filterableAttributes"]
+    invalid = [facet for facet in facets if facet not in allowed]
+    if invalid:
+        raise ValueError(
+            f"Facetas no disponibles: {', '.join(invalid)}. "
+            f"Atributos permitidos: {', '.join(allowed)}"
+        )
+    return list(dict.fromkeys(facets))
+
 
 # ==================================================================================
 #                           FUNCIONES DE INICIALIZACIÓN
 # ==================================================================================
 
-def initialize_meilisearch() -> None:
+def initialize_meilisearch(force: bool = False) -> None:
     """
     Inicializa el cliente global de Meilisearch y configura el índice de documentos.
     
@@ -86,6 +574,15 @@ def initialize_meilisearch() -> None:
     3. Crear el índice de documentos si no existe
     4. Configurar los atributos del índice (búsqueda, filtros, ordenación)
     
+    El cliente global solo se publica una vez verificada la conexión y, si
+    cualquier paso falla, vuelve a None: la siguiente llamada lo reintenta
+    en lugar de dar por bueno un índice sin crear o sin configurar.
+    
+    Args:
+        force: Repetir la verificación y la configuración aunque ya esté
+               inicializado (al volver Meilisearch tras una caída, que puede
+               haberlo reiniciado sin el índice o sin su configuración)
+    
     Raises:
         RuntimeError: Si no se puede conectar a Meilisearch o la configuración es inválida
         MeilisearchError: Si hay errores específicos de Meilisearch
@@ -93,13 +590,13 @@ def initialize_meilisearch() -> None:
     global client
     
     # Si ya está inicializado, no hacer nada
-    if client is not None:
+    if client is not None and not force:
         # print("🔍 Meilisearch ya está inicializado")
         return
 
     try:
         # ===== CREAR CLIENTE DE MEILISEARCH =====
-        client = Client(
+        new_client = Client(
             url=settings.MEILISEARCH_HOST,
             api_key=settings.MEILISEARCH_MASTER_KEY or None
         )
@@ -107,7 +604,7 @@ def initialize_meilisearch() -> None:
         # ===== VERIFICAR CONECTIVIDAD =====
         # Intentar obtener la lista de índices para verificar la conexión
         try:
-            indices_response = client.get_indexes()
+            indices_response = new_client.get_indexes()
         except Exception as exc:
             raise RuntimeError(
                 f"No se pudo conectar a Meilisearch en {settings.MEILISEARCH_HOST}. "
@@ -147,6 +644,9 @@ def initialize_meilisearch() -> None:
                 # Objeto con atributo uid
                 existing_index_names.append(getattr(index_info, "uid", ""))
 
+        # Conexión verificada: la configuración del índice usa el cliente global
+        client = new_client
+
         # ===== CREAR ÍNDICE SI NO EXISTE =====
         if INDEX_NAME not in existing_index_names:
             # print(f"🔧 Creando índice '{INDEX_NAME}'...")
@@ -170,55 +670,109 @@ def initialize_meilisearch() -> None:
             # print(f"📋 Índice '{INDEX_NAME}' ya existe, verificando configuración...")
             _configurar_indice()
 
+        # ===== PARTICIONES POR AÑO =====
+        # Cada partición existente se sincroniza por separado con INDEX_CONFIG
+        if settings.INDEX_PARTITIONING_ENABLED:
+            index_partitions.refresh()
+
         # print("✅ Meilisearch inicializado correctamente")
 
     except MeilisearchError as e:
         # Error específico de Meilisearch
+        client = None
         raise RuntimeError(
             f"Error de Meilisearch: {e.message if hasattr(e, 'message') else str(e)}. "
             f"Código: {e.code if hasattr(e, 'code') else 'desconocido'}"
         ) from e
     except Exception as e:
         # Error general
+        client = None
         raise RuntimeError(f"Error inesperado inicializando Meilisearch: {str(e)}") from e
 
 
-def _configurar_indice() -> None:
+def _setting_matches(live: Any, desired: Any, unordered: bool = False, exact_keys: bool = False) -> bool:
     """
-    Configura los atributos del índice de documentos.
+    Compara un ajuste deseado con el valor actual del índice.
     
-    Esta función auxiliar aplica toda la configuración necesaria al índice:
-    - Atributos en los que se puede buscar
-    - Atributos que se pueden usar para filtrar
-    - Atributos por los que se puede ordenar
-    - Atributos que se devuelven en los resultados
+    Los diccionarios se comparan solo en las claves que define la
+    configuración (Meilisearch devuelve además sus valores por defecto),
+    salvo con exact_keys (sinónimos: una clave de más también es un cambio).
+    Las listas sin orden significativo se comparan como conjuntos.
+    """
+    if isinstance(desired, dict):
+        if not isinstance(live, dict) or (exact_keys and set(live) != set(desired)):
+            return False
+        return all(_setting_matches(live.get(key), value, unordered) for key, value in desired.items())
+    if isinstance(desired, list) and unordered:
+        return isinstance(live, list) and sorted(map(str, live)) == sorted(map(str, desired))
+    return live == desired
+
+
+def index_settings_diff(live_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ajustes de INDEX_CONFIG que difieren de los del índice.
+    
+    Args:
+        live_settings: Respuesta de GET /indexes/{uid}/settings
+        
+    Returns:
+        Dict[str, Any]: Solo los ajustes que hay que actualizar (vacío si coinciden)
+    """
+    return {
+        key: value
+        for key, value in INDEX_CONFIG.items()
+        if key != "primaryKey"
+        and not _setting_matches(
+            live_settings.get(key), value,
+            unordered=key in _UNORDERED_SETTINGS,
+            exact_keys=key in _EXACT_KEY_SETTINGS,
+        )
+    }
+
+
+def _configurar_indice(index_uid: str = INDEX_NAME, strict: bool = False) -> List[str]:
+    """
+    Sincroniza la configuración del índice con INDEX_CONFIG.
+    
+    Lee una vez los ajustes actuales y, solo si alguno difiere, los envía
+    todos en una única llamada update_settings. Arrancar con la
+    configuración ya aplicada no genera ninguna tarea (cambiar atributos
+    puede obligar a Meilisearch a reindexar), así que es barato e
+    idempotente aunque se reinicien muchos workers.
+    
+    Cubre atributos de búsqueda, filtrado, ordenación y visualización,
+    palabras vacías, sinónimos, tolerancia a errores, paginación y, con
+    HYBRID_SEARCH_ENABLED, el embedder de vectores.
+    
+    Args:
+        index_uid: Índice a configurar (el principal o el de reconstrucción)
+        strict: Lanzar RuntimeError si falla en lugar de solo advertir
+        
+    Returns:
+        List[str]: Ajustes actualizados (vacía si ya coincidían)
     """
     if client is None:
         raise RuntimeError("Cliente de Meilisearch no inicializado")
     
-    index = client.index(INDEX_NAME)
+    index = client.index(index_uid)
     
     try:
-        # Configurar atributos de búsqueda
-        task = index.update_searchable_attributes(INDEX_CONFIG["searchableAttributes"])
-        client.wait_for_task(task.task_uid)
-        
-        # Configurar atributos filtrables
-        task = index.update_filterable_attributes(INDEX_CONFIG["filterableAttributes"])
-        client.wait_for_task(task.task_uid)
-        
-        # Configurar atributos ordenables
-        task = index.update_sortable_attributes(INDEX_CONFIG["sortableAttributes"])
-        client.wait_for_task(task.task_uid)
+        diff = index_settings_diff(index.get_settings())
+        if not diff:
+            return []
         
-        # Configurar atributos mostrados
-        task = index.update_displayed_attributes(INDEX_CONFIG["displayedAttributes"])
+        task = index.update_settings(diff)
         client.wait_for_task(task.task_uid)
+        metrics.counter("meilisearch_settings_updates_total").inc()
         
-        # print(f"✅ Configuración del índice '{INDEX_NAME}' actualizada")
+        # print(f"✅ Configuración del índice '{index_uid}' actualizada: {', '.join(diff)}")
+        return list(diff)
         
     except Exception as e:
+        if strict:
+            raise RuntimeError(f"No se pudo configurar el índice '{index_uid}': {str(e)}") from e
         print(f"⚠️  Advertencia: No se pudo configurar el índice completamente: {e}")
+        return []
 
 
 def get_client() -> Client:
@@ -239,11 +793,71 @@ def get_client() -> Client:
     return client
 
 
+def _get_initialized_client() -> Client:
+    """Cliente para el rastreador: inicializa Meilisearch si aún no lo está."""
+    initialize_meilisearch()
+    return get_client()
+
+
+# Rastreador de las tareas de escritura encoladas (se arranca en el lifespan de main.py)
+task_tracker = IndexTaskTracker(
+    client_getter=_get_initialized_client,
+    index_name=INDEX_NAME,
+    poll_interval=settings.INDEX_TASK_POLL_INTERVAL_MS / 1000,
+    poll_batch=settings.INDEX_TASK_POLL_BATCH,
+    max_retries=settings.INDEX_TASK_MAX_RETRIES,
+)
+
+# Particiones por año del índice (solo con INDEX_PARTITIONING_ENABLED)
+index_partitions = IndexPartitions(
+    base_index=INDEX_NAME,
+    client_getter=_get_initialized_client,
+    configure=_configurar_indice,
+    primary_key=INDEX_CONFIG["primaryKey"],
+    refresh_interval=settings.INDEX_PARTITION_REFRESH_SECONDS,
+)
+
+
+def partition_indexes() -> List[str]:
+    """Particiones existentes (relee la lista de Meilisearch si está caducada)."""
+    if index_partitions.is_stale():
+        index_partitions.refresh()
+    return index_partitions.indexes()
+
+
+def select_partitions(filters: Optional[str]) -> List[str]:
+    """
+    Particiones en las que buscar: las que el filtro (ya validado) no
+    descarta por sus condiciones sobre la fecha.
+    """
+    partition_indexes()
+    return index_partitions.select(parse_filter_expression(filters))
+
+
+def _wait_for_write(task_uid: int, description: str) -> None:
+    """
+    Espera a que termine una tarea de escritura (lectura de lo escrito).
+    
+    Raises:
+        RuntimeError: Si la tarea falla o no termina en INDEX_WAIT_TIMEOUT_MS
+    """
+    task = get_client().wait_for_task(task_uid, timeout_in_ms=settings.INDEX_WAIT_TIMEOUT_MS)
+    if task.status != "succeeded":
+        error = task.error or {}
+        raise RuntimeError(f"{description}: tarea {task_uid} terminó en estado '{task.status}' "
+                           f"({error.get('message', 'sin detalle')})")
+    task_tracker.notify_commit()
+
+
 # ==================================================================================
 #                           FUNCIONES DE INDEXACIÓN
 # ==================================================================================
 
-def add_documents(documents: List[Dict[str, Any]]) -> None:
+def add_documents(
+    documents: List[Dict[str, Any]],
+    wait: bool = False,
+    new_ids: Optional[Set[str]] = None
+) -> Optional[int]:
     """
     Añade o actualiza documentos en el índice de Meilisearch.
     
@@ -251,9 +865,22 @@ def add_documents(documents: List[Dict[str, Any]]) -> None:
     para que puedan ser encontrados mediante búsquedas. Si un documento
     con el mismo ID ya existe, será actualizado.
     
+    Por defecto solo encola la tarea y vuelve de inmediato: el rastreador
+    de tareas confirma su estado en segundo plano y reintenta si falla.
+    Con wait=True espera a que el documento sea buscable.
+    
+    Solo se envían los campos de INDEXED_FIELDS (to_index_document) y, con
+    la búsqueda híbrida, el vector de cada documento (prepare_index_documents).
+    
     Args:
         documents: Lista de diccionarios con los metadatos de los documentos.
                   Cada documento debe tener al menos un campo 'id' único.
+        wait: Esperar a que termine la indexación (lectura de lo escrito)
+        new_ids: IDs de documentos sin versión anterior (con particiones no
+                 se buscan copias suyas en otras particiones)
+        
+    Returns:
+        Optional[int]: task_uid de la tarea encolada (None si no hay documentos)
                   
     Ejemplo:
         documents = [
@@ -279,61 +906,418 @@ def add_documents(documents: List[Dict[str, Any]]) -> None:
     
     if not documents:
         # print("⚠️  No hay documentos para indexar")
-        return
+        return None
+    
+    try:
+        documents = prepare_index_documents(documents)
+    except RuntimeError as e:
+        task_tracker.record_enqueue_failure("add", documents, e)
+        raise
+    
+    if settings.INDEX_PARTITIONING_ENABLED:
+        return _add_to_partitions(documents, wait, new_ids or set())
     
     try:
         # Obtener el índice de documentos
         index = get_client().index(INDEX_NAME)
         
-        # Añadir documentos al índice
+        # Encolar los documentos (Meilisearch indexa de forma asíncrona)
         task = index.add_documents(documents)
-        
-        # Esperar a que se complete la indexación
-        # (Opcional: quitar esto para operación asíncrona)
-        get_client().wait_for_task(task.task_uid)
-        
-        # Mensaje de depuración - comentado para producción
-        # print(f"✅ {len(documents)} documento(s) indexado(s) en Meilisearch")
-        
     except MeilisearchError as e:
+        task_tracker.record_enqueue_failure("add", documents, e)
         raise RuntimeError(f"Error indexando documentos: {e.message if hasattr(e, 'message') else str(e)}") from e
     except Exception as e:
+        task_tracker.record_enqueue_failure("add", documents, e)
         raise RuntimeError(f"Error inesperado indexando documentos: {str(e)}") from e
+    
+    if wait:
+        _wait_for_write(task.task_uid, "Error indexando documentos")
+    else:
+        task_tracker.track(task.task_uid, "add", documents)
+    
+    # Mensaje de depuración - comentado para producción
+    # print(f"✅ {len(documents)} documento(s) encolado(s) en Meilisearch")
+    
+    return task.task_uid
+
+
+def _add_to_partitions(documents: List[Dict[str, Any]], wait: bool, new_ids: Set[str]) -> Optional[int]:
+    """
+    Escribe cada documento en la partición de su año (una tarea por partición).
+    
+    Un documento cuya fecha cambia pasa de partición: se borra de la que
+    deja (solo de ella, y solo si su alta en la nueva se pudo encolar) para
+    que no quede una copia antigua en los resultados. Los documentos sin
+    versión anterior (new_ids) no se buscan. Si no se pueden localizar, el
+    traslado queda registrado en el rastreador ("relocate") y se reintenta.
+    
+    Returns:
+        Optional[int]: task_uid de la última tarea de alta encolada
+        
+    Raises:
+        RuntimeError: Si alguna escritura no se pudo encolar (queda registrada para reintento)
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for document in documents:
+        groups.setdefault(partition_key(document), []).append(document)
+    groups = {index_partitions.index_uid(key): group for key, group in groups.items()}
+    
+    errors: List[RuntimeError] = []
+    task_uid = None
+    written: Dict[str, str] = {}  # id -> partición de los documentos encolados
+    for index_uid, group in groups.items():
+        try:
+            index_partitions.ensure(index_partitions.key(index_uid))
+            task = get_client().index(index_uid).add_documents(group)
+        except Exception as e:
+            task_tracker.record_enqueue_failure("add", group, e, index_uid=index_uid)
+            errors.append(RuntimeError(f"Error indexando documentos en '{index_uid}': {str(e)}"))
+            continue
+        if wait:
+            _wait_for_write(task.task_uid, f"Error indexando documentos en '{index_uid}'")
+        else:
+            task_tracker.track(task.task_uid, "add", group, index_uid=index_uid)
+        task_uid = task.task_uid
+        written.update((str(document["id"]), index_uid) for document in group)
+    
+    known = {document_id: index_uid for document_id, index_uid in written.items() if document_id not in new_ids}
+    if known:
+        try:
+            errors.extend(_remove_stale_copies(known, wait))
+        except Exception as e:
+            task_tracker.record_enqueue_failure("relocate", list(known), e)
+            errors.append(RuntimeError(f"Error localizando documentos en las particiones: {str(e)}"))
+    
+    if errors:
+        raise errors[0]
+    return task_uid
+
+
+def _remove_stale_copies(current: Dict[str, str], wait: bool) -> List[RuntimeError]:
+    """
+    Borra cada documento de las particiones en las que está salvo la suya
+    actual (current: id -> partición); devuelve los errores de borrado.
+    
+    Raises:
+        Exception: Si no se puede localizar en qué particiones están
+    """
+    located = _document_partitions(list(current))
+    moved: Dict[str, List[str]] = {}
+    for document_id, index_uid in current.items():
+        for previous in located.get(document_id, set()) - {index_uid}:
+            moved.setdefault(previous, []).append(document_id)
+    errors: List[RuntimeError] = []
+    for previous, document_ids in moved.items():
+        errors.extend(_delete_from_partitions(document_ids, [previous], wait))
+    return errors
+
+
+def _retry_relocation(document_ids: List[str], index_uid: Optional[str] = None) -> None:
+    """
+    Reintento de un traslado de partición (operación "relocate" del
+    rastreador): la partición actual de cada documento se toma de su
+    versión en el almacén de metadatos, no de la del intento fallido.
+    Los documentos eliminados se omiten (su baja los borra de todas).
+    
+    Raises:
+        Exception: Si no se pueden localizar (el rastreador lo vuelve a intentar)
+    """
+    current = {}
+    for document_id in document_ids:
+        metadata = load_metadata(document_id)
+        if metadata is not None:
+            current[document_id] = index_partitions.index_uid(partition_key(metadata))
+    if current:
+        # Los borrados que no se puedan encolar los registra _delete_from_partitions
+        _remove_stale_copies(current, wait=False)
+
+
+task_tracker.set_operation_handler("relocate", _retry_relocation)
 
 
-def delete_document(document_id: str) -> None:
+def _document_partitions(document_ids: List[str]) -> Dict[str, set]:
+    """
+    Particiones en las que está cada documento: las que lo contienen en
+    Meilisearch (una sola petición multi-search) más las que tienen un alta
+    suya sin confirmar.
+    
+    Returns:
+        Dict[str, set]: id del documento -> particiones
+    """
+    located = task_tracker.unconfirmed_indexes(set(document_ids), "add")
+    indexes = partition_indexes()
+    if not indexes:
+        return located
+    
+    id_filter = f"id IN [{', '.join(json.dumps(document_id) for document_id in document_ids)}]"
+    response = get_client().multi_search([
+        {"indexUid": index_uid, "q": "", "filter": id_filter, "attributesToRetrieve": ["id"],
+         "limit": len(document_ids)}
+        for index_uid in indexes
+    ])
+    for index_uid, result in zip(indexes, response["results"]):
+        for hit in result.get("hits", []):
+            located.setdefault(str(hit["id"]), set()).add(index_uid)
+    return located
+
+
+def _delete_from_partitions(document_ids: List[str], indexes: List[str], wait: bool) -> List[RuntimeError]:
+    """Borra documentos de varias particiones (una tarea por partición); devuelve los errores."""
+    errors: List[RuntimeError] = []
+    for index_uid in indexes:
+        try:
+            task = get_client().index(index_uid).delete_documents(document_ids)
+        except Exception as e:
+            task_tracker.record_enqueue_failure("delete", list(document_ids), e, index_uid=index_uid)
+            errors.append(RuntimeError(f"Error eliminando documentos de '{index_uid}': {str(e)}"))
+            continue
+        if wait:
+            _wait_for_write(task.task_uid, f"Error eliminando documentos de '{index_uid}'")
+        else:
+            task_tracker.track(task.task_uid, "delete", list(document_ids), index_uid=index_uid)
+    return errors
+
+
+def delete_document(document_id: str, wait: bool = False) -> Optional[int]:
     """
     Elimina un documento específico del índice.
     
+    Igual que add_documents, solo encola la tarea salvo que se pida wait=True.
+    
     Args:
         document_id: ID único del documento a eliminar
+        wait: Esperar a que la eliminación se aplique
+        
+    Returns:
+        Optional[int]: task_uid de la tarea encolada (None con particiones)
         
     Raises:
         RuntimeError: Si hay errores durante la eliminación
     """
     initialize_meilisearch()
     
+    if settings.INDEX_PARTITIONING_ENABLED:
+        return delete_documents([document_id], wait)
+    
     try:
         index = get_client().index(INDEX_NAME)
         task = index.delete_document(document_id)
-        get_client().wait_for_task(task.task_uid)
+    except Exception as e:
+        task_tracker.record_enqueue_failure("delete", [document_id], e)
+        raise RuntimeError(f"Error eliminando documento '{document_id}': {str(e)}") from e
+    
+    if wait:
+        _wait_for_write(task.task_uid, f"Error eliminando documento '{document_id}'")
+    else:
+        task_tracker.track(task.task_uid, "delete", [document_id])
+    
+    # print(f"✅ Documento '{document_id}' eliminado del índice")
+    
+    return task.task_uid
+
+
+def delete_documents(document_ids: List[str], wait: bool = False) -> Optional[int]:
+    """
+    Elimina varios documentos del índice con una sola tarea.
+    
+    Args:
+        document_ids: IDs de los documentos a eliminar
+        wait: Esperar a que la eliminación se aplique
         
-        # print(f"✅ Documento '{document_id}' eliminado del índice")
+    Returns:
+        Optional[int]: task_uid de la tarea encolada (None si no hay IDs o si
+                       hay particiones, con una tarea por partición)
         
+    Raises:
+        RuntimeError: Si hay errores durante la eliminación
+    """
+    initialize_meilisearch()
+    
+    if not document_ids:
+        return None
+    
+    if settings.INDEX_PARTITIONING_ENABLED:
+        # La partición de un documento borrado no se conoce: se borra de todas
+        errors = _delete_from_partitions(list(document_ids), partition_indexes(), wait)
+        if errors:
+            raise errors[0]
+        return None
+    
+    try:
+        index = get_client().index(INDEX_NAME)
+        task = index.delete_documents(document_ids)
     except Exception as e:
-        raise RuntimeError(f"Error eliminando documento '{document_id}': {str(e)}") from e
+        task_tracker.record_enqueue_failure("delete", list(document_ids), e)
+        raise RuntimeError(f"Error eliminando {len(document_ids)} documento(s): {str(e)}") from e
+    
+    if wait:
+        _wait_for_write(task.task_uid, "Error eliminando documentos")
+    else:
+        task_tracker.track(task.task_uid, "delete", list(document_ids))
+    
+    return task.task_uid
 
 
 # ==================================================================================
 #                           FUNCIONES DE BÚSQUEDA
 # ==================================================================================
 
+def validate_crop_attributes(attributes: Optional[List[str]]) -> List[str]:
+    """
+    Valida los atributos a recortar (por defecto SEARCH_CROP_ATTRIBUTES).
+    
+    Raises:
+        ValueError: Si algún atributo no se puede recortar
+    """
+    if attributes is None:
+        attributes = [attribute.strip() for attribute in settings.SEARCH_CROP_ATTRIBUTES.split(",") if attribute.strip()]
+    invalid = [attribute for attribute in attributes if attribute not in CROPPABLE_ATTRIBUTES]
+    if invalid:
+        raise ValueError(
+            f"Atributos no recortables: {', '.join(invalid)}. "
+            f"Atributos permitidos: {', '.join(CROPPABLE_ATTRIBUTES)}"
+        )
+    return list(dict.fromkeys(attributes))
+
+
+def build_search_options(
+    limit: int = 20,
+    offset: int = 0,
+    filters: Optional[str] = None,
+    sort: Optional[List[str]] = None,
+    facets: Optional[List[str]] = None,
+    crop_length: Optional[int] = None,
+    crop_attributes: Optional[List[str]] = None,
+    compact: bool = False,
+    semantic_ratio: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Valida los parámetros y construye las opciones de búsqueda de Meilisearch.
+    
+    Compartido por el cliente síncrono (search_documents) y el asíncrono
+    (services.meilisearch_async) para que ambos busquen exactamente igual.
+    Los filtros, la ordenación y las facetas se validan contra la
+    configuración del índice antes de enviarse al motor.
+    
+    Los atributos largos (summary) se recortan en el motor alrededor de los
+    términos encontrados (cropLength palabras) en lugar de resaltarse
+    completos. Con compact=True solo se recuperan los campos del formato
+    compacto (compact_search_results) y se pide la puntuación de ranking.
+    
+    Con semantic_ratio > 0 (resolve_semantic_ratio) la búsqueda es híbrida:
+    el vector de la consulta lo añade quien envía la búsqueda, para que la
+    clave de caché no dependa de él.
+    
+    Raises:
+        ValueError: Si los parámetros son inválidos
+    """
+    # Validar parámetros
+    if limit <= 0 or limit > 1000:
+        raise ValueError("El límite debe estar entre 1 y 1000")
+    if offset < 0:
+        raise ValueError("El offset no puede ser negativo")
+    
+    # Construir opciones de búsqueda
+    search_options = {
+        "limit": limit,
+        "offset": offset
+    }
+    
+    # Añadir filtros si se proporcionan
+    filters = validate_filter_expression(filters)
+    if filters:
+        search_options["filter"] = filters
+        
+    # Añadir ordenación si se proporciona
+    sort = validate_sort(sort)
+    if sort:
+        search_options["sort"] = sort
+    
+    # Añadir facetas si se solicitan (la respuesta incluye facetDistribution)
+    facets = validate_facets(facets)
+    if facets:
+        search_options["facets"] = facets
+        
+    # Recorte de los atributos largos alrededor de los términos encontrados
+    crop_attributes = validate_crop_attributes(crop_attributes)
+    if crop_length is not None and not 1 <= crop_length <= 200:
+        raise ValueError("La longitud de recorte debe estar entre 1 y 200 palabras")
+    if crop_attributes:
+        search_options["attributesToCrop"] = crop_attributes
+        search_options["cropLength"] = crop_length or settings.SEARCH_CROP_LENGTH
+        search_options["cropMarker"] = settings.SEARCH_CROP_MARKER
+    
+    # Configurar resaltado de términos
+    search_options["attributesToHighlight"] = list(dict.fromkeys(["title", *crop_attributes]))
+    search_options["highlightPreTag"] = "<mark>"
+    search_options["highlightPostTag"] = "</mark>"
+    
+    if compact:
+        # Solo lo que usa el formato compacto (y los campos de ordenación, que
+        # necesita la paginación por cursor)
+        sort_fields = [criterion.split(":", 1)[0] for criterion in sort or []]
+        search_options["attributesToRetrieve"] = list(dict.fromkeys(COMPACT_HIT_FIELDS + crop_attributes + sort_fields))
+        search_options["showRankingScore"] = True
+    
+    if semantic_ratio > 0:
+        search_options["hybrid"] = {"embedder": EMBEDDER_NAME, "semanticRatio": semantic_ratio}
+    
+    return search_options
+
+
+def resolve_semantic_ratio(query: str, semantic_ratio: Optional[float] = None) -> float:
+    """
+    Peso semántico efectivo de una búsqueda.
+    
+    Por defecto HYBRID_SEMANTIC_RATIO si la búsqueda híbrida está activa y
+    0 (solo palabras) si no. Las búsquedas sin texto nunca son híbridas.
+    
+    Raises:
+        ValueError: Si se pide peso semántico con la búsqueda híbrida desactivada
+    """
+    if semantic_ratio is not None and not 0.0 <= semantic_ratio <= 1.0:
+        raise ValueError("El peso semántico debe estar entre 0 y 1")
+    if not settings.HYBRID_SEARCH_ENABLED:
+        if semantic_ratio:
+            raise ValueError("La búsqueda híbrida no está activada (HYBRID_SEARCH_ENABLED)")
+        return 0.0
+    if not query.strip():
+        return 0.0
+    return settings.HYBRID_SEMANTIC_RATIO if semantic_ratio is None else semantic_ratio
+
+
+def compact_search_results(results: Dict[str, Any], crop_attributes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Convierte una respuesta de búsqueda al formato compacto.
+    
+    Cada resultado queda en {"id", "title", "snippet", "score"}: el título
+    resaltado, el fragmento recortado del primer atributo en el que aparecen
+    los términos (o del primero con contenido) y la puntuación de ranking.
+    Devuelve un diccionario nuevo: la respuesta original puede venir de la
+    caché de búsquedas y no se modifica.
+    """
+    crop_attributes = validate_crop_attributes(crop_attributes)
+    hits = []
+    for hit in results.get("hits", []):
+        formatted = hit.get("_formatted") or hit
+        snippets = [formatted.get(attribute) for attribute in crop_attributes if formatted.get(attribute)]
+        snippet = next((text for text in snippets if "<mark>" in str(text)), snippets[0] if snippets else "")
+        hits.append({
+            "id": hit.get("id"),
+            "title": formatted.get("title", hit.get("title", "")),
+            "snippet": " ".join(snippet) if isinstance(snippet, list) else snippet,
+            "score": hit.get("_rankingScore"),
+        })
+    return {**results, "hits": hits}
+
+
 def search_documents(
     query: str, 
     limit: int = 20,
     offset: int = 0,
     filters: Optional[str] = None,
-    sort: Optional[List[str]] = None
+    sort: Optional[List[str]] = None,
+    facets: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """
     Realiza una búsqueda en el índice de documentos.
@@ -351,6 +1335,7 @@ def search_documents(
         offset: Número de resultados a omitir (para paginación)
         filters: Filtros en formato de Meilisearch (ej: "file_extension = .pdf")
         sort: Lista de campos por los que ordenar (ej: ["date:desc", "title:asc"])
+        facets: Atributos de los que devolver la distribución de valores (ej: SEARCH_FACETS)
         
     Returns:
         dict: Respuesta de Meilisearch con los resultados de la búsqueda
@@ -360,6 +1345,7 @@ def search_documents(
               - limit: Límite aplicado
               - offset: Offset aplicado
               - estimatedTotalHits: Número estimado total de resultados
+              - facetDistribution: Conteo por valor de cada faceta (si se solicitan)
               
     Ejemplo:
         # Búsqueda simple
@@ -377,34 +1363,23 @@ def search_documents(
         RuntimeError: Si hay errores durante la búsqueda
         ValueError: Si los parámetros son inválidos
     """
-    # Validar parámetros
-    if limit <= 0 or limit > 1000:
-        raise ValueError("El límite debe estar entre 1 y 1000")
-    if offset < 0:
-        raise ValueError("El offset no puede ser negativo")
+    # Validar parámetros y construir opciones de búsqueda
+    search_options = build_search_options(limit, offset, filters, sort, facets)
     
     # Asegurar que el cliente está inicializado
     initialize_meilisearch()
     
     try:
-        # Construir opciones de búsqueda
-        search_options = {
-            "limit": limit,
-            "offset": offset
-        }
-        
-        # Añadir filtros si se proporcionan
-        if filters:
-            search_options["filter"] = filters
-            
-        # Añadir ordenación si se proporciona
-        if sort:
-            search_options["sort"] = sort
-            
-        # Configurar resaltado de términos
-        search_options["attributesToHighlight"] = ["title", "summary"]
-        search_options["highlightPreTag"] = "<mark>"
-        search_options["highlightPostTag"] = "</mark>"
+        if settings.INDEX_PARTITIONING_ENABLED:
+            # Una consulta por partición en una sola petición, mezcladas por puntuación
+            indexes = select_partitions(filters)
+            if not indexes:
+                return empty_search_result(query, search_options)
+            response = get_client().multi_search([
+                {"indexUid": index_uid, "q": query, **partition_search_options(search_options)}
+                for index_uid in indexes
+            ])
+            return merge_partition_results(response["results"], query, search_options)
         
         # Realizar búsqueda
         index = get_client().index(INDEX_NAME)
@@ -430,6 +1405,7 @@ def get_index_stats() -> Dict[str, Any]:
               - numberOfDocuments: Número total de documentos indexados
               - isIndexing: Si el índice está procesando documentos
               - fieldDistribution: Distribución de campos
+              - partitions: Documentos de cada partición (con INDEX_PARTITIONING_ENABLED)
               
     Raises:
         RuntimeError: Si hay errores obteniendo las estadísticas
@@ -437,6 +1413,15 @@ def get_index_stats() -> Dict[str, Any]:
     initialize_meilisearch()
     
     try:
+        if settings.INDEX_PARTITIONING_ENABLED:
+            partition_stats = {index_uid: get_client().index(index_uid).get_stats() for index_uid in partition_indexes()}
+            return {
+                "numberOfDocuments": sum(stats.number_of_documents for stats in partition_stats.values()),
+                "isIndexing": any(stats.is_indexing for stats in partition_stats.values()),
+                "index_name": INDEX_NAME,
+                "partitions": {index_uid: stats.number_of_documents for index_uid, stats in partition_stats.items()},
+            }
+        
         index = get_client().index(INDEX_NAME)
         stats = index.get_stats()
         
@@ -470,6 +1455,7 @@ def clear_index() -> None:
         index = get_client().index(INDEX_NAME)
         task = index.delete_all_documents()
         get_client().wait_for_task(task.task_uid)
+        task_tracker.notify_commit()
         
         print(f"⚠️  Todos los documentos han sido eliminados del índice '{INDEX_NAME}'")
         
@@ -482,7 +1468,9 @@ def reset_index() -> None:
     Elimina y recrea completamente el índice.
     
     ⚠️ ADVERTENCIA: Esta operación elimina todos los datos y configuraciones.
-    Solo usar durante desarrollo o para resolver problemas graves.
+    Solo usar durante desarrollo o para resolver problemas graves. Para
+    reconstruir el índice sin cortar las búsquedas, usar la reconstrucción
+    con índice sombra (services.index_rebuild).
     
     Raises:
         RuntimeError: Si hay errores durante la operación
@@ -511,6 +1499,7 @@ def reset_index() -> None:
         
         # Reconfigurar
         _configurar_indice()
+        task_tracker.notify_commit()
         
         print(f"✅ Índice '{INDEX_NAME}' recreado y configurado")
         
@@ -518,6 +1507,103 @@ def reset_index() -> None:
         raise RuntimeError(f"Error recreando el índice: {str(e)}") from e
 
 
+# ==================================================================================
+#                           BENCHMARK DEL ESQUEMA DEL ÍNDICE
+# ==================================================================================
+
+def build_synthetic_corpus(documents: int) -> List[Dict[str, Any]]:
+    """Metadatos completos (como los de upload_document) con texto en español."""
+    import random
+    
+    rng = random.Random(42)
+    vocabulary = [
+        "contrato", "servicios", "informe", "anual", "presupuesto", "universidad", "estudiante",
+        "docente", "reglamento", "evaluación", "proyecto", "investigación", "convocatoria",
+        "resultados", "acta", "reunión", "consejo", "facultad", "matrícula", "beca",
+    ]
+    stop_words = sorted(SPANISH_STOP_WORDS)
+    
+    def _sentence(words: int) -> str:
+        return " ".join(rng.choice(vocabulary) if rng.random() < 0.55 else rng.choice(stop_words)
+                        for _ in range(words))
+    
+    corpus = []
+    for i in range(documents):
+        corpus.append({
+            "id": f"bench_{i}",
+            "filename": f"documento_{i}.pdf",
+            "file_extension": ".pdf",
+            "file_size_bytes": rng.randint(10_000, 5_000_000),
+            "title": _sentence(8).capitalize(),
+            "summary": _sentence(120),
+            "keywords": rng.sample(vocabulary, 6),
+            "date": f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "created_at": "2024-06-05T22:00:00Z",
+            "created_at_ts": 1717624800000 + i,
+            "processing_timestamp": "2024-06-05T22:00:00Z",
+            "upload_timestamp": "2024-06-05T22:00:00Z",
+            "ai_model": "gemini-1.5-flash",
+            "enrichment_status": "complete",
+            "text_length": rng.randint(1_000, 100_000),
+            "storage_path": f"documents/2024/06/05/documento_{i}.pdf",
+            "media_type": "application/pdf",
+            "original_filename": f"documento_{i}.pdf",
+            "unique_filename": f"documento_{i}_20240605_220000_{i:08x}.pdf",
+            "file_hash": str(rng.getrandbits(63)),
+            "processing_time_estimate": rng.randint(5, 60),
+        })
+    return corpus
+
+
+def run_schema_benchmark(documents: int = 2000, queries: int = 300) -> Dict[str, Dict[str, float]]:
+    """
+    Compara el esquema anterior (sin palabras vacías ni sinónimos, todos los
+    campos) con el actual (INDEX_CONFIG y to_index_document) sobre un corpus
+    sintético: tamaño de la carga enviada, tamaño de los documentos en
+    Meilisearch y latencia p95 de búsqueda.
+    
+    Crea dos índices temporales que se eliminan al terminar.
+    """
+    import time
+    
+    initialize_meilisearch()
+    corpus = build_synthetic_corpus(documents)
+    query_words = ["contrato de servicios", "el informe anual de la facultad", "presupuesto para el proyecto",
+                   "acta de la reunión del consejo", "beca de investigación", "reglamento de evaluación"]
+    settings_body = {key: value for key, value in INDEX_CONFIG.items() if key != "primaryKey"}
+    
+    variants = {
+        "antes": ({**settings_body, "stopWords": [], "synonyms": {}}, corpus),
+        "después": (settings_body, [to_index_document(document) for document in corpus]),
+    }
+    
+    results: Dict[str, Dict[str, float]] = {}
+    for name, (index_settings, payload) in variants.items():
+        index_uid = f"{INDEX_NAME}_bench_{len(results)}"
+        client.wait_for_task(client.delete_index(index_uid).task_uid)
+        client.wait_for_task(client.create_index(index_uid, {"primaryKey": "id"}).task_uid)
+        index = client.index(index_uid)
+        client.wait_for_task(index.update_settings(index_settings).task_uid, timeout_in_ms=120000)
+        client.wait_for_task(index.add_documents(payload).task_uid, timeout_in_ms=600000)
+        
+        latencies = []
+        for i in range(queries):
+            start = time.perf_counter()
+            index.search(query_words[i % len(query_words)], {"limit": 20})
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        
+        stats = index.get_stats()
+        results[name] = {
+            "payload_bytes": len(json.dumps(payload, ensure_ascii=False).encode("utf-8")),
+            "document_db_bytes": getattr(stats, "raw_document_db_size", 0) or 0,
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        }
+        client.wait_for_task(client.delete_index(index_uid).task_uid)
+    
+    return results
+
+
 # ==================================================================================
 #                           SCRIPT DE PRUEBAS
 # ==================================================================================
@@ -528,7 +1614,25 @@ if __name__ == "__main__":
     
     Ejecuta este archivo directamente para probar la conexión:
     python meilisearch_service.py
+    
+    Benchmark del esquema del índice (tamaño y latencia p95, antes/después):
+    python -m services.meilisearch_service --schema-benchmark --documents 2000
     """
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Pruebas de Meilisearch")
+    parser.add_argument("--schema-benchmark", action="store_true", help="Comparar el esquema anterior con el actual")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+    
+    if args.schema_benchmark:
+        print(f"📐 Esquema del índice: {args.documents} documentos, {args.queries} búsquedas")
+        for variant, measures in run_schema_benchmark(args.documents, args.queries).items():
+            print(f"   • {variant:8} carga: {measures['payload_bytes'] / 1024:8.1f} KB | "
+                  f"documentos en Meilisearch: {measures['document_db_bytes'] / 1024:8.1f} KB | "
+                  f"p95: {measures['p95_ms']:.1f} ms")
+        raise SystemExit(0)
     
     print("🔍 Probando conexión con Meilisearch...")
     print("=" * 50)
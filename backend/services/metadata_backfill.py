@@ -0,0 +1,224 @@
+"""
+Backfill de Metadatos - Campos Derivados para Documentos ya Indexados
+
+Cuando la ingesta empieza a calcular un campo nuevo (por ejemplo, la fecha
+tipada date_ts / date_year / date_month / date_known, o la clave de alta
+created_at_ts de la paginación por cursor), los documentos
+subidos antes no lo tienen. Este trabajo recorre el almacén local de
+metadatos, aplica las transformaciones registradas y, para cada documento
+que cambia, guarda su JSON y lo reencola en el escritor del índice
+(services.index_writer), que lo envía a Meilisearch en lotes.
+
+- Idempotente: un documento que ya tiene los valores correctos no se toca
+- No pisa escrituras concurrentes: si el JSON cambió mientras se
+  procesaba (una subida o un enriquecimiento), se deja como está; la
+  ingesta ya calcula los campos
+- Se lanza en segundo plano desde POST /documents/index/backfill (solo
+  administradores) o desde la línea de comandos
+
+Uso:
+    from services.metadata_backfill import metadata_backfill
+
+    metadata_backfill.start(requested_by="admin_uid")
+    metadata_backfill.progress()   # documentos revisados, actualizados...
+
+Línea de comandos (--dry-run solo cuenta los documentos afectados):
+    python -m services.metadata_backfill --dry-run
+
+
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from services.index_writer import index_writer
+from services.keyword_tags import keyword_dictionary, keyword_fields
+from services.meilisearch_service import created_at_fields, date_fields
+from services.metadata_store import LOCAL_METADATA_DIR, iter_metadata_entries, save_metadata
+from utils.audit_logger import log_event
+from utils.metrics import metrics
+
+# Transformación: metadatos completos -> campos que deberían tener
+Transform = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+_MISSING = object()
+
+
+# ==================================================================================
+#                           TRABAJO DE BACKFILL
+# ==================================================================================
+
+class MetadataBackfill:
+    """
+    Aplica transformaciones registradas a todos los documentos del almacén.
+    """
+
+    def __init__(self):
+        self._transforms: Dict[str, Transform] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._progress: Dict[str, Any] = {"phase": "idle"}
+
+    def register(self, name: str, transform: Transform) -> None:
+        """Registra una transformación (los módulos que añaden campos registran la suya)."""
+        self._transforms[name] = transform
+
+    @property
+    def transforms(self) -> List[str]:
+        return list(self._transforms)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def progress(self) -> Dict[str, Any]:
+        """Estado del backfill en curso o del último."""
+        with self._lock:
+            progress = dict(self._progress)
+        if progress.get("started_at_ts"):
+            end = progress.get("finished_at_ts") or time.time()
+            progress["elapsed_seconds"] = round(end - progress["started_at_ts"], 1)
+        progress["running"] = self.is_running()
+        return progress
+
+    def _changes(self, metadata: Dict[str, Any], names: List[str]) -> Dict[str, Any]:
+        expected: Dict[str, Any] = {}
+        for name in names:
+            expected.update(self._transforms[name](metadata))
+        return {field: value for field, value in expected.items() if metadata.get(field, _MISSING) != value}
+
+    def run(self, names: Optional[List[str]] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Ejecuta el backfill en el hilo actual.
+
+        Args:
+            names: Transformaciones a aplicar (por defecto todas)
+            dry_run: Solo cuenta los documentos que cambiarían
+
+        Returns:
+            Dict[str, Any]: Documentos revisados, actualizados, omitidos y con error
+
+        Raises:
+            ValueError: Si alguna transformación no existe
+        """
+        names = names or self.transforms
+        unknown = [name for name in names if name not in self._transforms]
+        if unknown:
+            raise ValueError(f"Transformaciones desconocidas: {', '.join(unknown)}. "
+                             f"Disponibles: {', '.join(self.transforms)}")
+
+        counts = {"scanned": 0, "updated": 0, "skipped_concurrent": 0, "errors": 0}
+        for stem, mtime, metadata in iter_metadata_entries():
+            counts["scanned"] += 1
+            try:
+                changes = self._changes(metadata, names)
+                if not changes:
+                    continue
+                if dry_run:
+                    counts["updated"] += 1
+                    continue
+
+                json_path = LOCAL_METADATA_DIR / f"{stem}.json"
+                if json_path.stat().st_mtime != mtime:
+                    # Reescrito durante el recorrido: la versión nueva ya trae los campos
+                    counts["skipped_concurrent"] += 1
+                    continue
+
+                metadata.update(changes)
+                save_metadata(metadata, json_path.name)
+                if metadata.get("id"):
+                    index_writer.upsert(metadata)
+                counts["updated"] += 1
+            except Exception:
+                counts["errors"] += 1
+            finally:
+                with self._lock:
+                    self._progress.update(counts)
+
+        if not dry_run:
+            metrics.counter("metadata_backfill_updated_total").inc(counts["updated"])
+        return counts
+
+    def start(self, requested_by: Optional[str] = None, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Lanza el backfill en un hilo.
+
+        Returns:
+            Dict[str, Any]: Progreso inicial
+
+        Raises:
+            RuntimeError: Si ya hay un backfill en curso
+            ValueError: Si alguna transformación no existe
+        """
+        names = names or self.transforms
+        unknown = [name for name in names if name not in self._transforms]
+        if unknown:
+            raise ValueError(f"Transformaciones desconocidas: {', '.join(unknown)}. "
+                             f"Disponibles: {', '.join(self.transforms)}")
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise RuntimeError("Ya hay un backfill de metadatos en curso")
+            self._progress = {
+                "phase": "running",
+                "transforms": names,
+                "requested_by": requested_by,
+                "started_at": datetime.now().isoformat() + "Z",
+                "started_at_ts": time.time(),
+                "error": None,
+            }
+            self._thread = threading.Thread(target=self._run, args=(names, requested_by),
+                                            name="metadata-backfill", daemon=True)
+            self._thread.start()
+        return self.progress()
+
+    def _run(self, names: List[str], requested_by: Optional[str]) -> None:
+        try:
+            counts = self.run(names)
+            with self._lock:
+                self._progress.update(phase="completed", finished_at_ts=time.time())
+            log_event(requested_by or 'system', 'METADATA_BACKFILL_COMPLETED', {'transforms': names, **counts})
+        except Exception as e:
+            with self._lock:
+                self._progress.update(phase="failed", error=str(e), finished_at_ts=time.time())
+            log_event(requested_by or 'system', 'METADATA_BACKFILL_ERROR', {
+                'transforms': names,
+                'error': str(e),
+                'error_type': type(e).__name__
+            }, severity="WARNING")
+
+
+# ==================================================================================
+#                           INSTANCIA GLOBAL
+# ==================================================================================
+
+metadata_backfill = MetadataBackfill()
+
+# Clave de alta (created_at_ts) de los documentos anteriores a la paginación por cursor
+metadata_backfill.register("created_at_ts", created_at_fields)
+# Fecha tipada (date_ts, date_year, date_month, date_known) a partir del campo date
+metadata_backfill.register("date_fields", lambda metadata: date_fields(metadata.get("date")))
+# Etiquetas canónicas (keyword_tags) a partir de las palabras clave
+metadata_backfill.register("keyword_tags", lambda metadata: keyword_fields(metadata.get("keywords")))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill de campos derivados en el almacén de metadatos")
+    parser.add_argument("--transform", action="append", dest="transforms",
+                        help=f"Transformación a aplicar (por defecto todas: {', '.join(metadata_backfill.transforms)})")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta los documentos que cambiarían")
+    args = parser.parse_args()
+
+    results = metadata_backfill.run(args.transforms, dry_run=args.dry_run)
+    keyword_dictionary.flush()
+    if not args.dry_run:
+        # Envía las actualizaciones encoladas (lo que Meilisearch no acepte queda en el spool)
+        index_writer.stop()
+    print(f"🗂️  Documentos revisados: {results['scanned']} | "
+          f"{'a actualizar' if args.dry_run else 'actualizados'}: {results['updated']} | "
+          f"omitidos por escritura concurrente: {results['skipped_concurrent']} | errores: {results['errors']}")
@@ -0,0 +1,133 @@
+"""
+Almacén Local de Metadatos - Copia JSON de cada Documento Procesado
+
+Cada documento subido deja sus metadatos completos en un archivo JSON
+(meilisearch-data/indexes/documents/<nombre>.json). Esta copia es la fuente
+de verdad local del sistema:
+
+- Listado y estadísticas de documentos sin depender de Meilisearch
+- Descarga por ID (ruta en Firebase Storage)
+- Reconstrucción completa del índice de búsqueda (services.index_rebuild)
+- Motor de búsqueda de respaldo cuando Meilisearch no está disponible
+  (services.fallback_search)
+
+Ejemplo:
+    from services.metadata_store import save_metadata, iter_metadata
+
+    save_metadata(metadata, "contrato.pdf")
+    for document in iter_metadata():
+        ...
+
+
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# ==================================================================================
+#                           CONFIGURACIÓN
+# ==================================================================================
+
+# Directorio raíz del backend
+ROOT_DIR = Path(__file__).resolve().parents[1]  # .../backend
+
+# Directorio para almacenar metadatos localmente (backup y cache)
+LOCAL_METADATA_DIR = ROOT_DIR / ".." / "meilisearch-data" / "indexes" / "documents"
+LOCAL_METADATA_DIR.mkdir(parents=True, exist_ok=True)
+
+
+# ==================================================================================
+#                           LECTURA Y ESCRITURA
+# ==================================================================================
+
+def save_metadata(metadata: Dict[str, Any], filename: str) -> Path:
+    """
+    Guarda los metadatos de un documento.
+
+    Args:
+        metadata: Metadatos completos del documento
+        filename: Nombre original del archivo (el JSON usa su nombre sin extensión)
+
+    Returns:
+        Path: Ruta donde se guardaron los metadatos
+    """
+    json_path = LOCAL_METADATA_DIR / f"{Path(filename).stem}.json"
+
+    # Guardar metadatos con formato legible
+    with open(json_path, "w", encoding="utf-8") as file:
+        json.dump(metadata, file, ensure_ascii=False, indent=2)
+
+    return json_path
+
+
+def load_metadata(file_stem: str) -> Optional[Dict[str, Any]]:
+    """
+    Carga los metadatos de un documento por su nombre sin extensión.
+
+    Returns:
+        Optional[Dict[str, Any]]: Metadatos, o None si el documento no existe
+    """
+    json_path = LOCAL_METADATA_DIR / f"{file_stem}.json"
+    if not json_path.exists():
+        return None
+
+    with open(json_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def iter_metadata_entries(modified_since: Optional[float] = None) -> Iterator[Tuple[str, float, Dict[str, Any]]]:
+    """
+    Recorre los metadatos con el nombre y la fecha de modificación de su archivo.
+
+    Args:
+        modified_since: Si se indica, solo los archivos modificados desde ese
+                        instante (time.time())
+
+    Yields:
+        Tuple[str, float, Dict[str, Any]]: (nombre sin extensión, mtime, metadatos)
+    """
+    if not LOCAL_METADATA_DIR.exists():
+        return
+
+    for json_file in LOCAL_METADATA_DIR.glob("*.json"):
+        try:
+            mtime = json_file.stat().st_mtime
+            if modified_since is not None and mtime < modified_since:
+                continue
+            with open(json_file, "r", encoding="utf-8") as file:
+                metadata = json.load(file)
+        except (OSError, ValueError):
+            # Omitir archivos JSON corruptos o eliminados durante el recorrido
+            continue
+        yield json_file.stem, mtime, metadata
+
+
+def iter_metadata(modified_since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre los metadatos de todos los documentos (omite los JSON corruptos).
+
+    Args:
+        modified_since: Si se indica, solo los archivos modificados desde ese
+                        instante (time.time()), para ponerse al día tras una carga
+
+    Yields:
+        Dict[str, Any]: Metadatos de cada documento
+    """
+    for _, _, metadata in iter_metadata_entries(modified_since):
+        yield metadata
+
+
+def list_metadata() -> List[Dict[str, Any]]:
+    """Metadatos de todos los documentos, más recientes primero."""
+    documents = list(iter_metadata())
+    documents.sort(
+        key=lambda doc: doc.get("upload_timestamp", doc.get("processing_timestamp", "")),
+        reverse=True
+    )
+    return documents
+
+
+def count_metadata() -> int:
+    """Número de documentos en el almacén."""
+    return sum(1 for _ in LOCAL_METADATA_DIR.glob("*.json")) if LOCAL_METADATA_DIR.exists() else 0
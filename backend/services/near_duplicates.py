@@ -0,0 +1,330 @@
+"""
+Detección de Casi Duplicados en la Ingesta - MinHash/LSH sobre el Texto
+
+Un documento escaneado de nuevo o exportado otra vez a PDF no es idéntico
+byte a byte al original, pero su texto casi lo es. Antes de llamar a la IA
+se calcula la firma MinHash del texto extraído (normalizado, en grupos de
+_SHINGLE_WORDS palabras) y se busca en un índice LSH:
+
+- Si algún documento supera NEAR_DUPLICATE_THRESHOLD de similitud estimada,
+  el nuevo queda enlazado al original (campos duplicate_of y
+  duplicate_score, filtrables en las búsquedas)
+- Con NEAR_DUPLICATE_REUSE_METADATA se reutilizan además el título, el
+  resumen, las palabras clave y la fecha del original, sin llamada a IA
+
+El índice vive en SQLite (NEAR_DUPLICATE_DB_PATH): cada consulta son dos
+lecturas por índice (cubetas de las bandas y firmas de los candidatos), así
+que su coste apenas crece con el número de documentos y la memoria no
+depende de él. Solo contiene los documentos subidos desde que se activó la
+detección: el texto de los anteriores no se guarda.
+
+Uso:
+    from services.near_duplicates import near_duplicate_index
+
+    signature, duplicate = near_duplicate_index.check(text, exclude="doc_123")
+    # duplicate: {"id": "doc_045", "score": 0.93} o None
+    near_duplicate_index.add("doc_123", signature)
+
+Benchmark (latencia de la consulta y detección con el índice lleno):
+    python -m services.near_duplicates --documents 1000000
+
+
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import random
+import sqlite3
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import settings
+from services.index_writer import index_writer
+from services.similarity_index import MinHasher, normalize_words, stable_hash
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           CONFIGURACIÓN
+# ==================================================================================
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Palabras por shingle: con 3, cada palabra mal reconocida solo rompe 3 shingles
+# y dos textos distintos con el mismo vocabulario apenas comparten grupos
+_SHINGLE_WORDS = 3
+
+# Máximo de shingles por documento: se conservan los de menor hash (muestra
+# consistente entre documentos) para acotar el coste en textos largos
+_MAX_SHINGLES = 2000
+
+# 12 bandas de 5 filas: candidatos a partir de ~0.6 de similitud (por debajo del
+# umbral) y 12 filas de cubetas por documento en la base de datos
+_PERMUTATIONS = 60
+_BANDS = 12
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    doc INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL UNIQUE,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket INTEGER NOT NULL,
+    doc INTEGER NOT NULL,
+    PRIMARY KEY (bucket, doc)
+) WITHOUT ROWID;
+"""
+
+
+def text_shingles(text: str) -> Set[int]:
+    """Hashes de los grupos de _SHINGLE_WORDS palabras consecutivas del texto normalizado."""
+    words = normalize_words(text)
+    if len(words) < _SHINGLE_WORDS:
+        shingles = {stable_hash(" ".join(words))} if words else set()
+    else:
+        shingles = {
+            stable_hash(" ".join(words[i:i + _SHINGLE_WORDS]))
+            for i in range(len(words) - _SHINGLE_WORDS + 1)
+        }
+    if len(shingles) > _MAX_SHINGLES:
+        shingles = set(heapq.nsmallest(_MAX_SHINGLES, shingles))
+    return shingles
+
+
+# ==================================================================================
+#                           ÍNDICE LSH PERSISTENTE
+# ==================================================================================
+
+class NearDuplicateIndex:
+    """
+    Índice LSH de firmas de texto en SQLite.
+
+    Args:
+        db_path: Fichero de la base de datos (":memory:" para pruebas)
+        hasher: Generador de firmas y bandas
+        threshold: Similitud estimada mínima para considerar un casi duplicado
+    """
+
+    def __init__(self, db_path: str, hasher: MinHasher, threshold: float):
+        self._db_path = db_path
+        self._hasher = hasher
+        self._threshold = threshold
+        self._format = f">{hasher.permutations}Q"
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        metrics.gauge("near_duplicate_index_documents").set_function(self.document_count)
+
+    def _get_conn(self) -> sqlite3.Connection:
+        # Una única conexión compartida; los accesos se serializan con self._lock
+        if self._conn is None:
+            if self._db_path != ":memory:":
+                os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self._db_path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def document_count(self) -> int:
+        if self._conn is None:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """Firma MinHash del texto (None si no tiene palabras significativas)."""
+        shingles = text_shingles(text)
+        return self._hasher.signature(shingles) if shingles else None
+
+    # ===== CONSULTA =====
+
+    def find(self, signature: Tuple[int, ...], exclude: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Documento indexado más parecido por encima del umbral.
+
+        Returns:
+            Optional[Dict[str, Any]]: {"id", "score"} o None
+        """
+        keys = self._hasher.band_keys(signature)
+        with self._lock:
+            conn = self._get_conn()
+            rows = conn.execute(
+                "SELECT doc_id, signature FROM signatures WHERE doc IN "
+                f"(SELECT DISTINCT doc FROM buckets WHERE bucket IN ({','.join('?' * len(keys))}))",
+                keys,
+            ).fetchall()
+
+        best = None
+        for doc_id, blob in rows:
+            if doc_id == exclude:
+                continue
+            score = self._hasher.similarity(signature, struct.unpack(self._format, blob))
+            if score >= self._threshold and (best is None or score > best["score"]):
+                best = {"id": doc_id, "score": round(score, 3)}
+        return best
+
+    def check(self, text: str, exclude: Optional[str] = None) -> Tuple[Optional[Tuple[int, ...]], Optional[Dict[str, Any]]]:
+        """
+        Firma del texto y casi duplicado encontrado, si lo hay.
+
+        Args:
+            text: Texto extraído del documento
+            exclude: ID del propio documento (una nueva subida con el mismo nombre)
+
+        Returns:
+            Tuple: (firma o None, {"id", "score"} o None)
+        """
+        started = time.perf_counter()
+        signature = self.signature(text)
+        duplicate = self.find(signature, exclude) if signature is not None else None
+        metrics.histogram("near_duplicate_check_seconds").observe(time.perf_counter() - started)
+        return signature, duplicate
+
+    # ===== ACTUALIZACIÓN =====
+
+    def _insert(self, conn: sqlite3.Connection, document_id: str, signature: Tuple[int, ...]) -> None:
+        self._delete(conn, document_id)
+        doc = conn.execute(
+            "INSERT INTO signatures (doc_id, signature) VALUES (?, ?)",
+            (document_id, struct.pack(self._format, *signature)),
+        ).lastrowid
+        conn.executemany(
+            "INSERT OR IGNORE INTO buckets (bucket, doc) VALUES (?, ?)",
+            [(key, doc) for key in self._hasher.band_keys(signature)],
+        )
+
+    def _delete(self, conn: sqlite3.Connection, document_id: str) -> None:
+        row = conn.execute("SELECT doc, signature FROM signatures WHERE doc_id = ?", (document_id,)).fetchone()
+        if row is not None:
+            # Las cubetas se recalculan desde la firma: se borran por clave primaria
+            conn.executemany(
+                "DELETE FROM buckets WHERE bucket = ? AND doc = ?",
+                [(key, row[0]) for key in self._hasher.band_keys(struct.unpack(self._format, row[1]))],
+            )
+            conn.execute("DELETE FROM signatures WHERE doc = ?", (row[0],))
+
+    def add(self, document_id: str, signature: Tuple[int, ...]) -> None:
+        """Registra (o sustituye) la firma de un documento."""
+        with self._lock:
+            conn = self._get_conn()
+            with conn:
+                self._insert(conn, str(document_id), signature)
+
+    def add_many(self, entries: List[Tuple[str, Tuple[int, ...]]]) -> None:
+        """Registra varias firmas en una sola transacción (cargas masivas y benchmarks)."""
+        with self._lock:
+            conn = self._get_conn()
+            with conn:
+                for document_id, signature in entries:
+                    self._insert(conn, str(document_id), signature)
+
+    def remove(self, document_id: str) -> None:
+        with self._lock:
+            conn = self._get_conn()
+            with conn:
+                self._delete(conn, str(document_id))
+
+    def on_write(self, operation: str, payload: Any) -> None:
+        """Listener de services.index_writer: las bajas del índice también salen de aquí."""
+        if operation == "delete":
+            self.remove(payload)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# ==================================================================================
+#                           INSTANCIA GLOBAL
+# ==================================================================================
+
+near_duplicate_index = NearDuplicateIndex(
+    db_path=os.path.join(BASE_DIR, settings.NEAR_DUPLICATE_DB_PATH),
+    hasher=MinHasher(_PERMUTATIONS, _BANDS),
+    threshold=settings.NEAR_DUPLICATE_THRESHOLD,
+)
+index_writer.add_write_listener(near_duplicate_index.on_write)
+
+
+# ==================================================================================
+#                           BENCHMARK
+# ==================================================================================
+
+def _synthetic_text(rng: random.Random, vocabulary: List[str], words: int) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def _perturb(rng: random.Random, text: str, ratio: float) -> str:
+    """Copia "re-escaneada": sustituye una fracción de las palabras por ruido de OCR."""
+    words = text.split()
+    for i in rng.sample(range(len(words)), int(len(words) * ratio)):
+        words[i] = words[i][:-1] + "x"
+    return " ".join(words)
+
+
+def run_near_duplicate_benchmark(documents: int, sample: int, words: int) -> Dict[str, float]:
+    """
+    Llena un índice con `documents` firmas (aleatorias salvo `sample` textos
+    reales) y mide check() para copias con un 2% de palabras alteradas y para
+    textos nuevos: latencia, tasa de detección y falsos positivos.
+    """
+    import tempfile
+
+    rng = random.Random(42)
+    vocabulary = [f"palabra{i}" for i in range(5000)]
+    originals = [_synthetic_text(rng, vocabulary, words) for _ in range(sample)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = NearDuplicateIndex(os.path.join(directory, "bench.sqlite3"), MinHasher(_PERMUTATIONS, _BANDS),
+                                   settings.NEAR_DUPLICATE_THRESHOLD)
+        start = time.perf_counter()
+        index.add_many([(f"orig_{i}", index.signature(text)) for i, text in enumerate(originals)])
+        filler = documents - sample
+        for first in range(0, filler, 10000):
+            index.add_many([
+                (f"filler_{i}", tuple(rng.getrandbits(61) for _ in range(_PERMUTATIONS)))
+                for i in range(first, min(first + 10000, filler))
+            ])
+        load_seconds = time.perf_counter() - start
+
+        latencies, detected, false_positives = [], 0, 0
+        for i, text in enumerate(originals):
+            started = time.perf_counter()
+            _, duplicate = index.check(_perturb(rng, text, 0.02))
+            latencies.append((time.perf_counter() - started) * 1000)
+            detected += duplicate is not None and duplicate["id"] == f"orig_{i}"
+
+            _, duplicate = index.check(_synthetic_text(rng, vocabulary, words))
+            false_positives += duplicate is not None
+        index.close()
+
+    latencies.sort()
+    return {
+        "load_s": load_seconds,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "detection_rate": detected / sample,
+        "false_positive_rate": false_positives / sample,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark de la detección de casi duplicados")
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--words", type=int, default=400, help="Palabras de cada texto de prueba")
+    args = parser.parse_args()
+
+    results = run_near_duplicate_benchmark(args.documents, args.sample, args.words)
+    print(f"🔍 {args.documents} firmas en el índice (umbral {settings.NEAR_DUPLICATE_THRESHOLD}) "
+          f"— carga: {results['load_s']:.1f} s")
+    print(f"   • check() p50: {results['p50_ms']:.2f} ms | p95: {results['p95_ms']:.2f} ms")
+    print(f"   • Copias detectadas: {results['detection_rate']:.1%} | "
+          f"falsos positivos: {results['false_positive_rate']:.1%}")
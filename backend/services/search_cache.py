@@ -0,0 +1,212 @@
+"""
+Caché de Búsquedas - LRU/TTL con Invalidación por Escrituras
+
+Las mismas consultas ("contrato", "informe 2024") llegan una y otra vez desde
+la vista de búsqueda. Esta caché en memoria evita repetir la llamada a
+Meilisearch:
+
+- Clave: consulta normalizada (minúsculas, espacios colapsados) más todas las
+  opciones de búsqueda (filtros, orden, límite, offset...)
+- Expulsión LRU (SEARCH_CACHE_MAX_ENTRIES) y caducidad por TTL
+  (SEARCH_CACHE_TTL_SECONDS)
+- Contador de generación: se incrementa cada vez que una escritura se hace
+  visible en el índice (aviso de commit del rastreador de tareas). Las
+  entradas de generaciones anteriores nunca se sirven
+- Single-flight: las consultas idénticas concurrentes comparten una única
+  llamada a Meilisearch
+- Métricas: aciertos, fallos, consultas agrupadas y ratio de aciertos
+
+Los resultados se comparten entre peticiones: quien los use no debe mutarlos.
+
+Ejemplo:
+    from services.search_cache import search_cache, make_cache_key
+
+    key = make_cache_key("Contrato", {"limit": 20, "offset": 0})
+    results = await search_cache.get_or_fetch(key, lambda: client.search(...))
+
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from config import settings
+from services.meilisearch_service import task_tracker
+from utils.metrics import metrics
+
+class _LeaderCancelled(Exception):
+    """La petición que obtenía una clave fue cancelada: otra debe tomar el relevo."""
+
+
+# ==================================================================================
+#                           CLAVES DE CACHÉ
+# ==================================================================================
+
+def normalize_query(query: str) -> str:
+    """Normaliza una consulta: minúsculas y espacios colapsados."""
+    return " ".join(query.lower().split())
+
+
+def make_cache_key(query: str, options: Dict[str, Any]) -> str:
+    """
+    Construye la clave de caché de una búsqueda.
+
+    Args:
+        query: Texto de búsqueda
+        options: Opciones enviadas a Meilisearch (filter, sort, limit, offset...)
+
+    Returns:
+        str: Clave estable (las opciones se serializan con claves ordenadas)
+    """
+    return json.dumps([normalize_query(query), options], sort_keys=True, ensure_ascii=False, default=str)
+
+
+# ==================================================================================
+#                           CACHÉ
+# ==================================================================================
+
+class SearchCache:
+    """
+    Caché LRU con TTL, generación global y agrupación de consultas en vuelo.
+
+    Args:
+        max_entries: Número máximo de resultados guardados
+        ttl_seconds: Segundos que un resultado se considera válido
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[int, float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+        self._generation = 0
+        # La generación se incrementa desde el hilo del rastreador de tareas
+        self._generation_lock = threading.Lock()
+
+        self._hits = metrics.counter("search_cache_requests_total", result="hit")
+        self._misses = metrics.counter("search_cache_requests_total", result="miss")
+        self._coalesced = metrics.counter("search_cache_requests_total", result="coalesced")
+        metrics.gauge("search_cache_hit_ratio").set_function(self.hit_ratio)
+        metrics.gauge("search_cache_entries").set_function(lambda: len(self._entries))
+        metrics.gauge("search_cache_generation").set_function(lambda: self._generation)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def invalidate(self) -> None:
+        """
+        Incrementa la generación: todas las entradas actuales quedan obsoletas.
+        Seguro para llamarse desde cualquier hilo.
+        """
+        with self._generation_lock:
+            self._generation += 1
+
+    def clear(self) -> None:
+        """Elimina todas las entradas (y también invalida las consultas en vuelo)."""
+        self.invalidate()
+        self._entries.clear()
+
+    def hit_ratio(self) -> float:
+        """Fracción de peticiones servidas sin llamar a Meilisearch."""
+        served = self._hits.value + self._coalesced.value
+        total = served + self._misses.value
+        return served / total if total else 0.0
+
+    def _lookup(self, key: str, generation: int) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        entry_generation, expires_at, value = entry
+        if entry_generation != generation or expires_at < time.monotonic():
+            del self._entries[key]
+            return False, None
+
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: str, generation: int, value: Any) -> None:
+        self._entries[key] = (generation, time.monotonic() + self._ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Devuelve el resultado cacheado o lo obtiene con fetch().
+
+        Si otra petición ya está obteniendo la misma clave en la generación
+        actual, espera a su resultado en lugar de llamar de nuevo; si esa
+        petición se cancela, una de las que esperaban la obtiene. Un
+        resultado solo se guarda si la generación no cambió durante la
+        llamada (si hubo un commit, podría estar desactualizado).
+
+        Args:
+            key: Clave de make_cache_key
+            fetch: Corrutina que consulta Meilisearch
+
+        Returns:
+            Any: Resultado de la búsqueda (no debe mutarse)
+        """
+        generation = self._generation
+        inflight_key = (key, generation)
+
+        while True:
+            found, value = self._lookup(key, generation)
+            if found:
+                self._hits.inc()
+                return value
+
+            inflight = self._inflight.get(inflight_key)
+            if inflight is None:
+                break
+            try:
+                value = await asyncio.shield(inflight)
+            except _LeaderCancelled:
+                # La petición que la obtenía se canceló: volver a intentarlo
+                continue
+            self._coalesced.inc()
+            return value
+
+        self._misses.inc()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            # Solo se canceló esta petición: las que esperaban no deben fallar
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evitar el aviso de "excepción nunca recuperada" si nadie esperaba
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(inflight_key, None)
+
+        if self._generation == generation:
+            self._store(key, generation, value)
+        future.set_result(value)
+        return value
+
+
+# ==================================================================================
+#                           INSTANCIA GLOBAL
+# ==================================================================================
+
+search_cache = SearchCache(
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+)
+
+# Cada escritura confirmada en Meilisearch invalida los resultados cacheados
+task_tracker.add_commit_listener(search_cache.invalidate)
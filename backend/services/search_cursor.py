@@ -0,0 +1,197 @@
+"""
+Paginación por Cursor - Páginas de Coste Constante en Listados Ordenados
+
+La paginación por offset obliga a Meilisearch a recorrer y descartar todos los
+resultados anteriores: cuanto más profunda la página, más lenta, y nunca se
+pasa de maxTotalHits. Con un cursor cada página continúa donde terminó la
+anterior mediante un filtro sobre la clave de ordenación:
+
+    created_at_ts < <último valor> OR (created_at_ts = <último valor> AND id NOT IN [<ids ya vistos>])
+
+- El cursor es opaco para el cliente (JSON en base64 url-safe)
+- Solo se admiten claves numéricas (los filtros > y < de Meilisearch son numéricos)
+- Los empates se resuelven excluyendo los ids ya devueltos con el mismo valor;
+  un empate de más de MAX_CURSOR_TIE_IDS documentos no se puede paginar
+- El cursor lleva una huella de la consulta y los filtros: no se puede
+  reutilizar con otra búsqueda
+- Solo listados sin texto de búsqueda: con texto Meilisearch ordena antes
+  por relevancia y la clave deja de ser monótona entre resultados
+
+Ejemplo:
+    cursor = decode_cursor(token, query, filters)
+    filtro = cursor_filter(cursor)
+    ...
+    siguiente = next_cursor(hits, limit, "created_at_ts", "desc", query, filters, cursor)
+
+
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from services.search_cache import normalize_query
+
+# ==================================================================================
+#                           CONFIGURACIÓN
+# ==================================================================================
+
+# Claves de ordenación admitidas (numéricas, filtrables y ordenables en el índice)
+CURSOR_SORT_FIELDS = ["created_at_ts", "file_size_bytes"]
+
+# Ordenación por defecto de los listados paginados por cursor
+DEFAULT_CURSOR_SORT = "created_at_ts:desc"
+
+# Máximo de ids empatados que puede llevar un cursor (el filtro NOT IN crece
+# con cada página mientras dure el empate)
+MAX_CURSOR_TIE_IDS = 500
+
+
+# ==================================================================================
+#                           CODIFICACIÓN DEL CURSOR
+# ==================================================================================
+
+def _fingerprint(query: str, filters: Optional[str], field: str, direction: str) -> str:
+    """Huella de la búsqueda a la que pertenece un cursor."""
+    raw = json.dumps([normalize_query(query), (filters or "").strip(), field, direction], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def parse_cursor_sort(sort: Optional[List[str]]) -> tuple:
+    """
+    Obtiene (campo, dirección) de la ordenación de un listado por cursor.
+
+    Raises:
+        ValueError: Si hay más de un criterio o el campo no admite cursor
+    """
+    if not sort:
+        sort = [DEFAULT_CURSOR_SORT]
+    if len(sort) != 1:
+        raise ValueError("La paginación por cursor admite un único criterio de ordenación")
+
+    field, _, direction = sort[0].strip().partition(":")
+    if field not in CURSOR_SORT_FIELDS or direction not in ("asc", "desc"):
+        raise ValueError(
+            f"Ordenación no válida para paginación por cursor: '{sort[0]}'. "
+            f"Campos admitidos: {', '.join(CURSOR_SORT_FIELDS)} (asc o desc)"
+        )
+    return field, direction
+
+
+def encode_cursor(field: str, direction: str, value: Any, ids: List[str], fingerprint: str) -> str:
+    """Codifica un cursor como token opaco."""
+    payload = {"f": field, "d": direction, "v": value, "ids": ids, "h": fingerprint}
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+    token: str,
+    query: str,
+    filters: Optional[str],
+    field: str,
+    direction: str
+) -> Dict[str, Any]:
+    """
+    Decodifica y valida un cursor recibido del cliente.
+
+    Args:
+        token: Cursor devuelto en nextCursor
+        query, filters, field, direction: Búsqueda actual (debe coincidir con la del cursor)
+
+    Returns:
+        Dict[str, Any]: Cursor decodificado (f, d, v, ids, h)
+
+    Raises:
+        ValueError: Si el cursor está corrupto o pertenece a otra búsqueda
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor = json.loads(raw.decode("utf-8"))
+        value, ids = cursor["v"], cursor["ids"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Cursor de paginación inválido") from e
+
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or not isinstance(ids, list):
+        raise ValueError("Cursor de paginación inválido")
+    if len(ids) > MAX_CURSOR_TIE_IDS:
+        raise ValueError("Cursor de paginación inválido: demasiados ids empatados")
+    if cursor.get("h") != _fingerprint(query, filters, field, direction):
+        raise ValueError("El cursor pertenece a otra búsqueda (consulta, filtros u orden distintos)")
+    return cursor
+
+
+# ==================================================================================
+#                           FILTRO DE CONTINUACIÓN
+# ==================================================================================
+
+def _quote(value: str) -> str:
+    """Valor entre comillas para un filtro de Meilisearch."""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def cursor_filter(cursor: Dict[str, Any]) -> str:
+    """
+    Filtro que selecciona los resultados posteriores al cursor.
+
+    Returns:
+        str: Expresión de filtro de Meilisearch
+    """
+    field, value = cursor["f"], cursor["v"]
+    operator = "<" if cursor["d"] == "desc" else ">"
+    expression = f"{field} {operator} {value}"
+    if cursor["ids"]:
+        seen = ", ".join(_quote(doc_id) for doc_id in cursor["ids"])
+        expression += f" OR ({field} = {value} AND id NOT IN [{seen}])"
+    return f"({expression})"
+
+
+def combine_filters(filters: Optional[str], continuation: Optional[str]) -> Optional[str]:
+    """Combina los filtros del usuario con el filtro de continuación."""
+    if filters and continuation:
+        return f"({filters}) AND {continuation}"
+    return continuation or filters
+
+
+def next_cursor(
+    hits: List[Dict[str, Any]],
+    limit: int,
+    field: str,
+    direction: str,
+    query: str,
+    filters: Optional[str],
+    previous: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """
+    Cursor de la página siguiente, o None si no hay más resultados.
+
+    Guarda el valor de la clave del último resultado y los ids de todos los
+    resultados con ese mismo valor (incluidos los de páginas anteriores si
+    el empate continúa), para no repetirlos ni saltarse ninguno.
+
+    Raises:
+        ValueError: Si más de MAX_CURSOR_TIE_IDS resultados comparten el valor
+            de la clave (el filtro de continuación crecería sin límite)
+    """
+    if len(hits) < limit or not hits:
+        return None
+
+    last_value = hits[-1].get(field)
+    if last_value is None:
+        # Los documentos sin la clave quedan al final y no se pueden continuar
+        # (los antiguos la reciben del backfill de metadatos: transformación created_at_ts)
+        return None
+
+    ids = [str(hit["id"]) for hit in hits if hit.get(field) == last_value]
+    if previous is not None and previous["v"] == last_value:
+        ids = previous["ids"] + ids
+
+    if len(ids) > MAX_CURSOR_TIE_IDS:
+        raise ValueError(
+            f"Más de {MAX_CURSOR_TIE_IDS} documentos comparten {field} = {last_value}: "
+            f"no se pueden paginar por cursor con esta ordenación. "
+            f"Usa {DEFAULT_CURSOR_SORT} o la paginación por offset"
+        )
+
+    return encode_cursor(field, direction, last_value, ids, _fingerprint(query, filters, field, direction))
@@ -0,0 +1,471 @@
+"""
+Índice de Documentos Similares - MinHash/LSH con Vecinos Precalculados
+
+Para navegar de un documento a otros parecidos ("más como este") no se lanza
+una búsqueda en cada petición: cada documento tiene precalculada su lista de
+vecinos más similares, que se mantiene al día con cada escritura.
+
+- Firma MinHash (MINHASH_PERMUTATIONS valores) sobre las palabras clave
+  normalizadas y las palabras y pares de palabras del título y el resumen
+  (sin tildes ni palabras vacías): estima la similitud de Jaccard
+- LSH por bandas (MINHASH_BANDS): solo se comparan los documentos que
+  coinciden en alguna banda, no todos contra todos
+- Tabla de vecinos acotada (SIMILAR_MAX_NEIGHBORS por documento): la memoria
+  por documento no crece con el tamaño de la colección
+- Actualización incremental en cada escritura del índice (listener de
+  services.index_writer) y carga inicial desde el almacén de metadatos en
+  segundo plano
+
+Uso:
+    from services.similarity_index import similarity_index
+
+    similarity_index.neighbors("doc_123", limit=5)
+    # [{"id": "doc_456", "title": "...", "filename": "...", "score": 0.62}, ...]
+
+Benchmark (carga, consulta y recall frente a la comparación exhaustiva):
+    python -m services.similarity_index --documents 5000
+
+
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from config import settings
+from services.index_writer import index_writer
+from services.local_extractor import SPANISH_STOP_WORDS, fold_accents
+from services.metadata_store import iter_metadata
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           FIRMAS MINHASH
+# ==================================================================================
+
+# Primo de Mersenne para las permutaciones (a·x + b) mod p
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Campos de la ficha que se guarda por documento (para responder sin leer el almacén)
+_CARD_FIELDS = ("title", "filename", "file_extension", "owner_uid", "department")
+
+# Campos de la ficha que solo sirven para filtrar por acceso (no se devuelven)
+_ACCESS_FIELDS = ("owner_uid", "department")
+
+
+_STOP_WORDS = {fold_accents(word.lower()) for word in SPANISH_STOP_WORDS}
+
+
+def stable_hash(value: str) -> int:
+    """Hash de 63 bits estable entre procesos y ejecuciones (cabe en un INTEGER de SQLite)."""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big") >> 1
+
+
+def normalize_words(text: str) -> List[str]:
+    """Palabras del texto en minúsculas y sin tildes, sin palabras vacías ni letras sueltas."""
+    return [word for word in re.findall(r"\w+", fold_accents(text.lower())) if word not in _STOP_WORDS and len(word) > 1]
+
+
+def document_shingles(document: Dict[str, Any]) -> Set[int]:
+    """
+    Conjunto de características de un documento (hashes de 64 bits): cada
+    palabra clave, y cada palabra y par de palabras consecutivas del título
+    y el resumen.
+    """
+    shingles: Set[str] = set()
+
+    keywords = document.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    for keyword in keywords:
+        keyword = " ".join(re.findall(r"\w+", fold_accents(str(keyword).lower())))
+        if keyword:
+            shingles.add(f"k:{keyword}")
+
+    words = normalize_words(f"{document.get('title') or ''} {document.get('summary') or ''}")
+    shingles.update(f"w:{word}" for word in words)
+    shingles.update(f"b:{first} {second}" for first, second in zip(words, words[1:]))
+
+    return {stable_hash(shingle) for shingle in shingles}
+
+
+class MinHasher:
+    """
+    Firmas MinHash con permutaciones (a·x + b) mod p de semilla fija: la
+    misma firma en todos los procesos y arranques.
+
+    Args:
+        permutations: Valores de la firma
+        bands: Bandas LSH (deben dividir a permutations)
+    """
+
+    def __init__(self, permutations: int, bands: int):
+        if permutations % bands:
+            raise ValueError("MINHASH_BANDS debe dividir a MINHASH_PERMUTATIONS")
+        self.permutations = permutations
+        self.bands = bands
+        self.rows = permutations // bands
+        self._coefficients = [
+            (stable_hash(f"a{i}") % (_MERSENNE_PRIME - 1) + 1, stable_hash(f"b{i}") % _MERSENNE_PRIME)
+            for i in range(permutations)
+        ]
+
+    def signature(self, shingles: Set[int]) -> Tuple[int, ...]:
+        return tuple(
+            min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles)
+            for a, b in self._coefficients
+        )
+
+    def band_keys(self, signature: Tuple[int, ...]) -> List[int]:
+        """Claves LSH: un hash estable por banda (número de banda y sus filas)."""
+        return [
+            stable_hash(f"{band}:" + ",".join(map(str, signature[band * self.rows:(band + 1) * self.rows])))
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        """Similitud de Jaccard estimada: fracción de valores de la firma que coinciden."""
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+# ==================================================================================
+#                           ÍNDICE DE VECINOS
+# ==================================================================================
+
+class SimilarityIndex:
+    """
+    Tabla de vecinos precalculada sobre un índice MinHash/LSH.
+
+    Args:
+        hasher: Generador de firmas y bandas
+        max_neighbors: Vecinos que se guardan por documento
+        min_score: Similitud estimada mínima para ser vecino
+    """
+
+    def __init__(self, hasher: MinHasher, max_neighbors: int, min_score: float):
+        self._hasher = hasher
+        self._max_neighbors = max_neighbors
+        self._min_score = min_score
+        self._lock = threading.Lock()
+
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._cards: Dict[str, Dict[str, Any]] = {}
+        self._buckets: Dict[int, Set[str]] = defaultdict(set)
+        # id -> [(similitud, id del vecino)], de más a menos similar
+        self._neighbors: Dict[str, List[Tuple[float, str]]] = {}
+        # id -> documentos que lo tienen en su lista de vecinos
+        self._referenced_by: Dict[str, Set[str]] = defaultdict(set)
+
+        self._ready = False
+        self._written_during_load: Optional[Set[str]] = None
+        self._thread: Optional[threading.Thread] = None
+
+        metrics.gauge("similarity_index_documents").set_function(lambda: len(self._signatures))
+
+    @property
+    def ready(self) -> bool:
+        """La carga inicial ha terminado."""
+        return self._ready
+
+    def __contains__(self, document_id: str) -> bool:
+        return str(document_id) in self._signatures
+
+    # ===== CONSULTA =====
+
+    def _candidates(self, signature: Tuple[int, ...], exclude: Optional[str] = None) -> List[Tuple[float, str]]:
+        """Documentos que comparten alguna banda, con su similitud estimada (llamar con self._lock)."""
+        candidates: Set[str] = set()
+        for key in self._hasher.band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        candidates.discard(exclude)
+
+        scored = []
+        for candidate in candidates:
+            score = self._hasher.similarity(signature, self._signatures[candidate])
+            if score >= self._min_score:
+                scored.append((score, candidate))
+        return scored
+
+    @staticmethod
+    def _public(document_id: str, card: Dict[str, Any], score: float) -> Dict[str, Any]:
+        fields = {field: value for field, value in card.items() if field not in _ACCESS_FIELDS}
+        return {"id": document_id, **fields, "score": round(score, 3)}
+
+    def card(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Ficha guardada de un documento (incluye owner_uid y department), o None si no está."""
+        with self._lock:
+            card = self._cards.get(str(document_id))
+            return dict(card) if card is not None else None
+
+    def neighbors(
+        self,
+        document_id: str,
+        limit: int = 10,
+        visible: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Vecinos precalculados de un documento.
+
+        Args:
+            document_id: ID del documento
+            limit: Máximo de vecinos
+            visible: Filtro opcional sobre la ficha de cada vecino (control de acceso)
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Fichas con "score", de más a menos
+                                            similar; None si el documento no está
+        """
+        document_id = str(document_id)
+        with self._lock:
+            if document_id not in self._signatures:
+                return None
+            result = []
+            for score, neighbor in self._neighbors.get(document_id, []):
+                card = self._cards.get(neighbor, {})
+                if visible is None or visible(card):
+                    result.append(self._public(neighbor, card, score))
+                    if len(result) >= limit:
+                        break
+            return result
+
+    def query(self, document: Dict[str, Any], limit: int = 10, min_score: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Documentos indexados más parecidos a uno que puede no estar en el
+        índice (por ejemplo, uno que se está subiendo).
+
+        Args:
+            document: Metadatos del documento
+            limit: Máximo de resultados
+            min_score: Similitud mínima (por defecto la del índice)
+
+        Returns:
+            List[Dict[str, Any]]: Fichas con "score", de más a menos similar
+        """
+        shingles = document_shingles(document)
+        if not shingles:
+            return []
+        signature = self._hasher.signature(shingles)
+        threshold = self._min_score if min_score is None else min_score
+
+        with self._lock:
+            scored = [
+                (score, candidate)
+                for score, candidate in self._candidates(signature, exclude=str(document.get("id")))
+                if score >= threshold
+            ]
+            return [
+                self._public(candidate, self._cards.get(candidate, {}), score)
+                for score, candidate in heapq.nlargest(limit, scored)
+            ]
+
+    # ===== ACTUALIZACIÓN =====
+
+    def _set_neighbors(self, document_id: str, scored: List[Tuple[float, str]]) -> None:
+        for _, old in self._neighbors.get(document_id, []):
+            self._referenced_by[old].discard(document_id)
+        best = heapq.nlargest(self._max_neighbors, scored)
+        self._neighbors[document_id] = best
+        for _, neighbor in best:
+            self._referenced_by[neighbor].add(document_id)
+
+    def _offer_neighbor(self, document_id: str, score: float, neighbor: str) -> None:
+        """Añade un vecino a la lista de un documento si entra entre los mejores."""
+        current = [entry for entry in self._neighbors.get(document_id, []) if entry[1] != neighbor]
+        if len(current) >= self._max_neighbors and score <= current[-1][0]:
+            return
+        self._set_neighbors(document_id, current + [(score, neighbor)])
+
+    def _remove(self, document_id: str) -> Set[str]:
+        """Quita un documento; devuelve los que lo tenían como vecino (llamar con self._lock)."""
+        signature = self._signatures.pop(document_id, None)
+        if signature is None:
+            return set()
+        for key in self._hasher.band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(document_id)
+                if not bucket:
+                    del self._buckets[key]
+        self._set_neighbors(document_id, [])
+        del self._neighbors[document_id]
+        self._cards.pop(document_id, None)
+        return self._referenced_by.pop(document_id, set())
+
+    def _recompute(self, document_ids: Set[str]) -> None:
+        for document_id in document_ids:
+            if document_id in self._signatures:
+                self._set_neighbors(document_id, self._candidates(self._signatures[document_id], exclude=document_id))
+
+    def _add(self, document_id: str, document: Dict[str, Any], signature: Tuple[int, ...]) -> None:
+        """Inserta un documento y actualiza las listas de sus vecinos (llamar con self._lock)."""
+        affected = self._remove(document_id)
+
+        scored = self._candidates(signature, exclude=document_id)
+        self._signatures[document_id] = signature
+        self._cards[document_id] = {field: document[field] for field in _CARD_FIELDS if document.get(field)}
+        for key in self._hasher.band_keys(signature):
+            self._buckets[key].add(document_id)
+
+        self._set_neighbors(document_id, scored)
+        for score, neighbor in scored:
+            self._offer_neighbor(neighbor, score, document_id)
+
+        # Los que apuntaban a la versión anterior del documento recalculan su lista
+        self._recompute(affected - {document_id})
+
+    def upsert(self, document: Dict[str, Any]) -> None:
+        """Alta o actualización de un documento."""
+        document_id = str(document["id"])
+        shingles = document_shingles(document)
+        signature = self._hasher.signature(shingles) if shingles else None
+        with self._lock:
+            if self._written_during_load is not None:
+                self._written_during_load.add(document_id)
+            if signature is None:
+                self._recompute(self._remove(document_id))
+            else:
+                self._add(document_id, document, signature)
+
+    def delete(self, document_id: str) -> None:
+        """Baja de un documento: sus referencias se sustituyen por otros vecinos."""
+        document_id = str(document_id)
+        with self._lock:
+            if self._written_during_load is not None:
+                self._written_during_load.add(document_id)
+            self._recompute(self._remove(document_id))
+
+    def on_write(self, operation: str, payload: Any) -> None:
+        """Listener de services.index_writer: aplica cada alta o baja al índice."""
+        if operation == "upsert":
+            self.upsert(payload)
+        else:
+            self.delete(payload)
+
+    # ===== CARGA INICIAL =====
+
+    def load(self) -> int:
+        """
+        Carga el índice desde el almacén de metadatos (las escrituras que
+        llegan durante la carga prevalecen sobre lo leído).
+
+        Returns:
+            int: Documentos cargados
+        """
+        with self._lock:
+            self._written_during_load = set()
+
+        loaded = 0
+        for document in iter_metadata():
+            if not document.get("id"):
+                continue
+            document_id = str(document["id"])
+            shingles = document_shingles(document)
+            if not shingles:
+                continue
+            signature = self._hasher.signature(shingles)
+            with self._lock:
+                if document_id not in self._written_during_load:
+                    self._add(document_id, document, signature)
+                    loaded += 1
+
+        with self._lock:
+            self._written_during_load = None
+            self._ready = True
+        return loaded
+
+    def start(self) -> None:
+        """Carga el índice en un hilo para no retrasar el arranque (idempotente)."""
+        if self._ready or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._load_quietly, name="similarity-index-load", daemon=True)
+        self._thread.start()
+
+    def _load_quietly(self) -> None:
+        try:
+            self.load()
+        except Exception as e:
+            metrics.counter("similarity_index_load_errors_total", reason=type(e).__name__).inc()
+
+
+# ==================================================================================
+#                           INSTANCIA GLOBAL
+# ==================================================================================
+
+# Se carga en el lifespan de main.py y se mantiene al día con cada escritura
+similarity_index = SimilarityIndex(
+    hasher=MinHasher(settings.MINHASH_PERMUTATIONS, settings.MINHASH_BANDS),
+    max_neighbors=settings.SIMILAR_MAX_NEIGHBORS,
+    min_score=settings.SIMILAR_MIN_SCORE,
+)
+index_writer.add_write_listener(similarity_index.on_write)
+
+
+# ==================================================================================
+#                           BENCHMARK
+# ==================================================================================
+
+def run_similarity_benchmark(documents: int, sample: int) -> Dict[str, float]:
+    """
+    Carga un corpus sintético con variantes cercanas de algunos documentos y
+    mide la carga, la latencia de neighbors() y el recall de los vecinos
+    frente a la similitud de Jaccard exacta calculada por fuerza bruta.
+    """
+    from services.meilisearch_service import build_synthetic_corpus
+
+    corpus = build_synthetic_corpus(documents)
+    # Una de cada diez entradas es una copia ligeramente editada de la anterior
+    for i in range(1, len(corpus), 10):
+        corpus[i] = {**corpus[i - 1], "id": corpus[i]["id"], "title": corpus[i - 1]["title"] + " revisado"}
+
+    index = SimilarityIndex(MinHasher(settings.MINHASH_PERMUTATIONS, settings.MINHASH_BANDS),
+                            settings.SIMILAR_MAX_NEIGHBORS, settings.SIMILAR_MIN_SCORE)
+    start = time.perf_counter()
+    for document in corpus:
+        index.upsert(document)
+    load_seconds = time.perf_counter() - start
+
+    shingles = {str(document["id"]): document_shingles(document) for document in corpus}
+    latencies, hits, relevant = [], 0, 0
+    for document in corpus[:sample]:
+        document_id = str(document["id"])
+        start = time.perf_counter()
+        found = {neighbor["id"] for neighbor in index.neighbors(document_id, settings.SIMILAR_MAX_NEIGHBORS) or []}
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        exact = sorted(
+            ((len(shingles[document_id] & other) / len(shingles[document_id] | other), other_id)
+             for other_id, other in shingles.items() if other_id != document_id),
+            reverse=True,
+        )
+        expected = {other_id for score, other_id in exact[:settings.SIMILAR_MAX_NEIGHBORS] if score >= 0.5}
+        hits += len(found & expected)
+        relevant += len(expected)
+
+    latencies.sort()
+    return {
+        "load_s": load_seconds,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "recall_at_0_5": hits / relevant if relevant else 1.0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark del índice de documentos similares")
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--sample", type=int, default=200)
+    args = parser.parse_args()
+
+    results = run_similarity_benchmark(args.documents, args.sample)
+    print(f"🔍 {args.documents} documentos ({settings.MINHASH_PERMUTATIONS} permutaciones, "
+          f"{settings.MINHASH_BANDS} bandas) — carga: {results['load_s']:.2f} s")
+    print(f"   • neighbors() p50: {results['p50_ms']:.3f} ms | p95: {results['p95_ms']:.3f} ms")
+    print(f"   • Recall de los vecinos con Jaccard ≥ 0.5: {results['recall_at_0_5']:.1%}")
@@ -0,0 +1,378 @@
+"""
+Índice de Autocompletado - Sugerencias Mientras se Escribe
+
+Lanzar una búsqueda completa (con resaltado y facetas) en cada pulsación de
+tecla es demasiado caro. Este módulo mantiene en memoria un índice de
+prefijos sobre los títulos y las palabras clave de los documentos:
+
+- Arrays ordenados de claves normalizadas (minúsculas, sin tildes) y búsqueda
+  del rango de un prefijo con bisect: O(log n) más los resultados del rango
+- Las sugerencias presentes en varios documentos (las que más puntúan) van
+  en un array aparte que se recorre entero; en el de las de un solo
+  documento el recorrido se acota, así que los prefijos muy cortos siguen
+  respondiendo en menos de un milisegundo
+- Los títulos se indexan también desde cada palabra significativa, así
+  "facu" completa "Informe anual de la Facultad"
+- Actualización incremental en cada escritura del índice (listener de
+  services.index_writer): sin reconstrucciones completas
+- Carga inicial desde el almacén de metadatos en segundo plano; mientras no
+  está lista, la ruta /suggest usa una búsqueda por prefijo en Meilisearch
+  con atributos mínimos (services.meilisearch_async.suggest_documents_async)
+
+Uso:
+    from services.suggest_index import suggest_index
+
+    suggest_index.suggest("contr", limit=8)
+    # [{"text": "Contrato de servicios", "type": "title", "count": 1}, ...]
+
+Benchmark (latencia p50/p95 por prefijo):
+    python -m services.suggest_index --documents 20000
+
+
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from services.index_writer import index_writer
+from services.local_extractor import SPANISH_STOP_WORDS, fold_accents
+from services.metadata_store import iter_metadata
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           CONFIGURACIÓN
+# ==================================================================================
+
+# Tipos de sugerencia, en orden de preferencia ante el mismo número de documentos
+SUGGESTION_TYPES = ("keyword", "title")
+
+# Prefijos consultados recientemente (se vacía con cada escritura)
+_MEMO_MAX_ENTRIES = 2048
+
+# Claves revisadas como máximo entre las sugerencias de un solo documento:
+# acota la latencia de los prefijos muy cortos (que abarcan casi todo el índice)
+_MAX_SINGLE_SCAN = 512
+
+# Longitud máxima de un texto sugerido
+_MAX_TEXT_LENGTH = 200
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin tildes y con los espacios colapsados."""
+    return " ".join(fold_accents(text.lower()).split())
+
+
+def _search_keys(kind: str, normalized: str) -> List[str]:
+    """
+    Claves por las que se encuentra un texto: el texto completo y, en los
+    títulos, el resto del título desde cada palabra que no es vacía.
+    """
+    if kind != "title":
+        return [normalized]
+    keys = [normalized]
+    for match in re.finditer(r"\w+", normalized):
+        if match.start() > 0 and match.group() not in SPANISH_STOP_WORDS:
+            keys.append(normalized[match.start():])
+    return keys
+
+
+def _document_entries(document: Dict[str, Any]) -> Set[Tuple[str, str]]:
+    """Sugerencias (tipo, texto) que aporta un documento."""
+    entries: Set[Tuple[str, str]] = set()
+    title = str(document.get("title") or "").strip()
+    if title:
+        entries.add(("title", title[:_MAX_TEXT_LENGTH]))
+    keywords = document.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    for keyword in keywords:
+        keyword = str(keyword).strip()
+        if keyword:
+            entries.add(("keyword", keyword[:_MAX_TEXT_LENGTH]))
+    return entries
+
+
+# ==================================================================================
+#                           ÍNDICE DE PREFIJOS
+# ==================================================================================
+
+class SuggestIndex:
+    """
+    Índice de prefijos en memoria sobre títulos y palabras clave.
+
+    Cada sugerencia se identifica por (tipo, texto normalizado) y cuenta los
+    documentos que la contienen; las sugerencias se ordenan por ese número.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Claves de búsqueda ordenadas (clave normalizada, id de la sugerencia),
+        # separadas según la sugerencia esté en varios documentos o en uno solo
+        self._popular_keys: List[Tuple[str, Tuple[str, str]]] = []
+        self._single_keys: List[Tuple[str, Tuple[str, str]]] = []
+        # id de la sugerencia -> {"text", "type", "count"}
+        self._suggestions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # id de documento -> sugerencias que aporta
+        self._documents: Dict[str, Set[Tuple[str, str]]] = {}
+        self._memo: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        self._ready = False
+        # Documentos escritos durante la carga inicial (prevalecen sobre lo leído del almacén)
+        self._written_during_load: Optional[Set[str]] = None
+        self._thread: Optional[threading.Thread] = None
+
+        metrics.gauge("suggest_index_keys").set_function(lambda: len(self._popular_keys) + len(self._single_keys))
+
+    @property
+    def ready(self) -> bool:
+        """La carga inicial ha terminado."""
+        return self._ready
+
+    # ===== ACTUALIZACIÓN =====
+
+    @staticmethod
+    def _insert_keys(keys: List[Tuple[str, Tuple[str, str]]], entry: Tuple[str, str]) -> None:
+        for key in _search_keys(*entry):
+            bisect.insort(keys, (key, entry))
+
+    @staticmethod
+    def _remove_keys(keys: List[Tuple[str, Tuple[str, str]]], entry: Tuple[str, str]) -> None:
+        for key in _search_keys(*entry):
+            position = bisect.bisect_left(keys, (key, entry))
+            if position < len(keys) and keys[position] == (key, entry):
+                del keys[position]
+
+    def _add_entry(self, entry: Tuple[str, str], text: str) -> None:
+        suggestion = self._suggestions.get(entry)
+        if suggestion is None:
+            self._suggestions[entry] = {"text": text, "type": entry[0], "count": 1}
+            self._insert_keys(self._single_keys, entry)
+            return
+        suggestion["count"] += 1
+        if suggestion["count"] == 2:
+            self._remove_keys(self._single_keys, entry)
+            self._insert_keys(self._popular_keys, entry)
+
+    def _remove_entry(self, entry: Tuple[str, str]) -> None:
+        suggestion = self._suggestions.get(entry)
+        if suggestion is None:
+            return
+        suggestion["count"] -= 1
+        if suggestion["count"] == 1:
+            self._remove_keys(self._popular_keys, entry)
+            self._insert_keys(self._single_keys, entry)
+        elif suggestion["count"] == 0:
+            del self._suggestions[entry]
+            self._remove_keys(self._single_keys, entry)
+
+    def _replace_document(self, document_id: str, entries: Dict[Tuple[str, str], str]) -> None:
+        """Sustituye las sugerencias de un documento (llamar con self._lock)."""
+        previous = self._documents.pop(document_id, set())
+        for entry in previous - entries.keys():
+            self._remove_entry(entry)
+        for entry, text in entries.items():
+            if entry not in previous:
+                self._add_entry(entry, text)
+        if entries:
+            self._documents[document_id] = set(entries)
+        self._memo.clear()
+
+    def upsert(self, document: Dict[str, Any]) -> None:
+        """Alta o actualización de las sugerencias de un documento."""
+        document_id = str(document["id"])
+        entries = {(kind, normalize_text(text)): text for kind, text in _document_entries(document)}
+        with self._lock:
+            if self._written_during_load is not None:
+                self._written_during_load.add(document_id)
+            self._replace_document(document_id, entries)
+
+    def delete(self, document_id: str) -> None:
+        """Baja de las sugerencias de un documento."""
+        document_id = str(document_id)
+        with self._lock:
+            if self._written_during_load is not None:
+                self._written_during_load.add(document_id)
+            self._replace_document(document_id, {})
+
+    def on_write(self, operation: str, payload: Any) -> None:
+        """Listener de services.index_writer: aplica cada alta o baja al índice."""
+        if operation == "upsert":
+            self.upsert(payload)
+        else:
+            self.delete(payload)
+
+    # ===== CARGA INICIAL =====
+
+    def load(self) -> int:
+        """
+        Carga el índice desde el almacén de metadatos.
+
+        Las escrituras que llegan durante la carga prevalecen sobre lo leído.
+
+        Returns:
+            int: Documentos cargados
+        """
+        with self._lock:
+            self._written_during_load = set()
+
+        loaded = 0
+        for document in iter_metadata():
+            if not document.get("id"):
+                continue
+            document_id = str(document["id"])
+            entries = {(kind, normalize_text(text)): text for kind, text in _document_entries(document)}
+            with self._lock:
+                if document_id not in self._written_during_load:
+                    self._replace_document(document_id, entries)
+                    loaded += 1
+
+        with self._lock:
+            self._written_during_load = None
+            self._ready = True
+        return loaded
+
+    def start(self) -> None:
+        """Carga el índice en un hilo para no retrasar el arranque (idempotente)."""
+        if self._ready or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._load_quietly, name="suggest-index-load", daemon=True)
+        self._thread.start()
+
+    def _load_quietly(self) -> None:
+        try:
+            self.load()
+        except Exception as e:
+            # Sin índice local /suggest sigue respondiendo a través de Meilisearch
+            metrics.counter("suggest_index_load_errors_total", reason=type(e).__name__).inc()
+
+    # ===== CONSULTA =====
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """
+        Sugerencias que empiezan por el prefijo (en el texto completo o, en
+        los títulos, desde cualquier palabra significativa).
+
+        El orden es exacto entre las sugerencias de varios documentos; si no
+        llegan al límite se completan con las de un solo documento (revisando
+        como mucho _MAX_SINGLE_SCAN claves del rango).
+
+        Args:
+            prefix: Texto escrito hasta ahora
+            limit: Máximo de sugerencias
+
+        Returns:
+            List[Dict[str, Any]]: Sugerencias {"text", "type", "count"}, las
+                                  que aparecen en más documentos primero
+        """
+        normalized = normalize_text(prefix)
+        if not normalized:
+            return []
+
+        memo_key = (normalized, limit)
+        with self._lock:
+            cached = self._memo.get(memo_key)
+            if cached is not None:
+                return [dict(suggestion) for suggestion in cached]
+
+            ranked = self._ranked_matches(self._popular_keys, normalized, limit)
+            if len(ranked) < limit:
+                ranked += self._ranked_matches(self._single_keys, normalized, limit - len(ranked),
+                                               max_scan=_MAX_SINGLE_SCAN)
+            result = [dict(suggestion) for suggestion in ranked]
+
+            if len(self._memo) >= _MEMO_MAX_ENTRIES:
+                self._memo.clear()
+            self._memo[memo_key] = result
+
+        return [dict(suggestion) for suggestion in result]
+
+    def _ranked_matches(
+        self,
+        keys: List[Tuple[str, Tuple[str, str]]],
+        prefix: str,
+        limit: int,
+        max_scan: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Mejores sugerencias del rango del prefijo en un array de claves (llamar con self._lock)."""
+        matches: Set[Tuple[str, str]] = set()
+        position = bisect.bisect_left(keys, (prefix,))
+        end = len(keys) if max_scan is None else min(len(keys), position + max_scan)
+        while position < end and keys[position][0].startswith(prefix):
+            matches.add(keys[position][1])
+            position += 1
+
+        return heapq.nsmallest(
+            limit,
+            (self._suggestions[entry] for entry in matches),
+            key=lambda suggestion: (
+                -suggestion["count"],
+                SUGGESTION_TYPES.index(suggestion["type"]),
+                len(suggestion["text"]),
+                suggestion["text"].lower(),
+            ),
+        )
+
+
+# ==================================================================================
+#                           INSTANCIA GLOBAL
+# ==================================================================================
+
+# Se carga en el lifespan de main.py y se mantiene al día con cada escritura
+suggest_index = SuggestIndex()
+index_writer.add_write_listener(suggest_index.on_write)
+
+
+# ==================================================================================
+#                           BENCHMARK
+# ==================================================================================
+
+def run_suggest_benchmark(documents: int, queries: int) -> Dict[str, float]:
+    """
+    Carga un corpus sintético y mide la latencia de suggest() con prefijos
+    de 1 a 6 caracteres (sin memo, como si cada prefijo fuera nuevo).
+    """
+    from services.meilisearch_service import build_synthetic_corpus
+
+    index = SuggestIndex()
+    corpus = build_synthetic_corpus(documents)
+    start = time.perf_counter()
+    for document in corpus:
+        index.upsert(document)
+    load_seconds = time.perf_counter() - start
+
+    words = sorted({word for document in corpus for word in normalize_text(document["title"]).split()})
+    prefixes = [words[i % len(words)][:1 + i % 6] for i in range(queries)]
+
+    samples = []
+    for prefix in prefixes:
+        index._memo.clear()
+        start = time.perf_counter()
+        index.suggest(prefix, limit=8)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+
+    return {
+        "load_s": load_seconds,
+        "keys": len(index._popular_keys) + len(index._single_keys),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[int(len(samples) * 0.95) - 1],
+        "max_ms": samples[-1],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark del índice de autocompletado")
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = run_suggest_benchmark(args.documents, args.queries)
+    print(f"🔍 {args.documents} documentos, {results['keys']} claves (carga: {results['load_s']:.2f} s)")
+    print(f"   • p50: {results['p50_ms']:.3f} ms | p95: {results['p95_ms']:.3f} ms | máx: {results['max_ms']:.3f} ms")
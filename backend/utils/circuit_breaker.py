@@ -0,0 +1,140 @@
+"""
+Circuit Breaker - Corte Rápido de Llamadas a un Servicio Caído
+
+Cuando un servicio externo (Meilisearch) deja de responder, cada petición
+espera a su timeout antes de fallar. El circuit breaker cuenta los fallos
+consecutivos y, al superar un umbral, "abre el circuito": las llamadas
+siguientes se desvían de inmediato (por ejemplo, al motor de respaldo) sin
+intentar contactar con el servicio.
+
+Estados:
+- closed: funcionamiento normal, se cuentan los fallos consecutivos
+- open: el servicio se considera caído hasta que pasa reset_timeout
+- half_open: pasado reset_timeout se deja pasar una llamada de prueba;
+  si funciona el circuito se cierra y si falla vuelve a abrirse. Una
+  prueba que no registra resultado en reset_timeout se da por perdida y
+  se permite otra
+
+Ejemplo:
+    from utils.circuit_breaker import CircuitBreaker
+
+    breaker = CircuitBreaker("meilisearch", failure_threshold=5, reset_timeout=30)
+    if breaker.allow_request():
+        try:
+            result = call()
+            breaker.record_success()
+        except ConnectionError:
+            breaker.record_failure()
+
+
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from utils.metrics import metrics
+
+# ==================================================================================
+#                           CIRCUIT BREAKER
+# ==================================================================================
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Valor numérico de cada estado para la métrica circuit_breaker_state
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por conteo de fallos consecutivos.
+
+    Args:
+        name: Nombre del servicio protegido (etiqueta de las métricas)
+        failure_threshold: Fallos consecutivos que abren el circuito
+        reset_timeout: Segundos que el circuito permanece abierto antes de probar
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+
+        metrics.gauge("circuit_breaker_state", breaker=name).set_function(lambda: _STATE_VALUES[self.state])
+
+    @property
+    def state(self) -> str:
+        """Estado actual (un circuito abierto pasa a half_open al vencer reset_timeout)."""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self._reset_timeout:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            elif (self._state == HALF_OPEN and self._probe_in_flight
+                  and now - self._probe_started_at >= self._reset_timeout):
+                # La prueba no registró resultado: se permite otra
+                self._probe_in_flight = False
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Indica si se debe intentar la llamada al servicio.
+
+        En half_open solo se permite una llamada de prueba a la vez.
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == OPEN:
+            return False
+        with self._lock:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            self._probe_started_at = time.monotonic()
+            return True
+
+    def release_probe(self) -> None:
+        """
+        Libera la llamada de prueba sin registrar resultado (por ejemplo, si
+        la petición se canceló antes de saber si el servicio responde).
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        """Registra una llamada correcta: cierra el circuito."""
+        with self._lock:
+            if self._state != CLOSED:
+                metrics.counter("circuit_breaker_transitions_total", breaker=self._name, to=CLOSED).inc()
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Registra un fallo: abre el circuito al llegar al umbral o si falla la prueba."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self._failure_threshold:
+                self._open()
+
+    def trip(self) -> None:
+        """Abre el circuito de inmediato (por ejemplo, si el servicio no arranca)."""
+        with self._lock:
+            self._open()
+
+    def _open(self) -> None:
+        if self._state != OPEN:
+            metrics.counter("circuit_breaker_transitions_total", breaker=self._name, to=OPEN).inc()
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
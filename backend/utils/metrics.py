@@ -0,0 +1,257 @@
+"""
+Métricas de la Aplicación - Contadores, Gauges e Histogramas en Memoria
+
+Este módulo proporciona un registro de métricas ligero y sin dependencias
+externas para instrumentar los servicios del backend. Las métricas se
+exponen en el endpoint GET /metrics en formato de texto de Prometheus
+(o JSON con ?format=json).
+
+Tipos de métricas:
+- Counter: valores acumulados (llamadas, errores, tokens consumidos)
+- Gauge: valores instantáneos (retraso de indexación, tamaño de colas)
+- Histogram: distribuciones (latencias) con buckets fijos y una ventana
+  de muestras recientes para estimar percentiles (p50, p95...)
+
+Todas las métricas admiten etiquetas (por ejemplo, el modelo de IA) y son
+seguras para usarse desde varios hilos.
+
+Ejemplo:
+    from utils.metrics import metrics
+
+    metrics.counter("ai_calls_total", model="gemini-1.5-flash").inc()
+    metrics.histogram("ai_call_latency_seconds", model="gemini-1.5-flash").observe(0.82)
+
+
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# ==================================================================================
+#                           CONFIGURACIÓN
+# ==================================================================================
+
+# Buckets por defecto para latencias (segundos)
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Buckets para proporciones entre 0 y 1
+RATIO_BUCKETS = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+
+# Muestras recientes que conserva cada histograma para calcular percentiles
+RECENT_SAMPLES = 1024
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+# ==================================================================================
+#                           TIPOS DE MÉTRICAS
+# ==================================================================================
+
+class Counter:
+    """Contador monótono creciente."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Gauge:
+    """
+    Valor instantáneo. Puede fijarse explícitamente o calcularse con una
+    función en el momento de exportar (set_function); si la función falla
+    el valor es None y la muestra no se exporta.
+    """
+
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    @property
+    def value(self) -> Optional[float]:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return None
+        return self._value
+
+
+class Histogram:
+    """
+    Distribución con buckets acumulados y ventana de muestras recientes.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._bucket_counts = [0] * len(self.buckets)
+        self._count = 0
+        self._sum = 0.0
+        self._recent: Deque[float] = deque(maxlen=RECENT_SAMPLES)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._count += 1
+            self._sum += value
+            self._recent.append(value)
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    self._bucket_counts[index] += 1
+                    break
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Percentil de las muestras recientes (None si aún no hay muestras).
+
+        Args:
+            fraction: Percentil entre 0 y 1 (0.95 = p95)
+        """
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+        return samples[index]
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative = []
+            running = 0
+            for upper_bound, bucket_count in zip(self.buckets, self._bucket_counts):
+                running += bucket_count
+                cumulative.append((upper_bound, running))
+            count, total = self._count, self._sum
+        return {
+            "count": count,
+            "sum": total,
+            "buckets": cumulative,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+# ==================================================================================
+#                           REGISTRO DE MÉTRICAS
+# ==================================================================================
+
+class MetricsRegistry:
+    """
+    Registro de métricas indexado por nombre y etiquetas.
+
+    Las métricas se crean en el primer acceso; llamadas posteriores con el
+    mismo nombre y etiquetas devuelven la misma instancia.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Dict[LabelKey, Any]] = {}
+        self._types: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _label_key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def _get_or_create(self, kind: str, name: str, labels: Dict[str, Any], factory: Callable[[], Any]):
+        key = self._label_key(labels)
+        series = self._metrics.get(name)
+        if series is not None and key in series:
+            return series[key]
+
+        with self._lock:
+            registered_kind = self._types.setdefault(name, kind)
+            if registered_kind != kind:
+                raise ValueError(f"La métrica '{name}' ya está registrada como {registered_kind}")
+            series = self._metrics.setdefault(name, {})
+            if key not in series:
+                series[key] = factory()
+            return series[key]
+
+    def counter(self, name: str, **labels: Any) -> Counter:
+        return self._get_or_create("counter", name, labels, Counter)
+
+    def gauge(self, name: str, **labels: Any) -> Gauge:
+        return self._get_or_create("gauge", name, labels, Gauge)
+
+    def histogram(
+        self,
+        name: str,
+        buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+        **labels: Any,
+    ) -> Histogram:
+        return self._get_or_create("histogram", name, labels, lambda: Histogram(buckets))
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Devuelve todas las métricas en un diccionario serializable a JSON.
+        """
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for name, series in sorted(self._metrics.items()):
+            entries = []
+            for key, metric in list(series.items()):
+                entry: Dict[str, Any] = {"labels": dict(key), "type": self._types[name]}
+                if isinstance(metric, Histogram):
+                    entry.update(metric.snapshot())
+                else:
+                    entry["value"] = metric.value
+                entries.append(entry)
+            result[name] = entries
+        return result
+
+    def render_prometheus(self) -> str:
+        """
+        Exporta todas las métricas en formato de texto de Prometheus.
+        """
+        lines: List[str] = []
+
+        def _format_labels(labels: Dict[str, str], extra: Optional[Dict[str, str]] = None) -> str:
+            merged = {**labels, **(extra or {})}
+            if not merged:
+                return ""
+            escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                       for k, v in merged.items())
+            return "{" + ",".join(escaped) + "}"
+
+        for name, series in sorted(self._metrics.items()):
+            kind = self._types[name]
+            lines.append(f"# TYPE {name} {kind}")
+            for key, metric in list(series.items()):
+                labels = dict(key)
+                if isinstance(metric, Histogram):
+                    snap = metric.snapshot()
+                    for upper_bound, cumulative in snap["buckets"]:
+                        lines.append(f"{name}_bucket{_format_labels(labels, {'le': repr(upper_bound)})} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {snap['count']}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {snap['sum']}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {snap['count']}")
+                else:
+                    value = metric.value
+                    if value is not None:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Registro global compartido por toda la aplicación
+metrics = MetricsRegistry()
@@ -2,8 +2,9 @@
  * Componente de Búsqueda de Documentos - Interfaz de Búsqueda Avanzada
  * 
  * Este componente proporciona una interfaz completa para buscar documentos
- * en el sistema. Utiliza tanto búsqueda local en metadatos como integración
- * con Meilisearch para búsquedas semánticas avanzadas.
+ * en el sistema. La búsqueda, los filtros, la ordenación y las facetas se
+ * resuelven en Meilisearch (POST /documents/search); las facetas devueltas
+ * permiten refinar los resultados por palabra clave y año.
  */
 
 import React, { useState, useEffect, useCallback } from "react";
@@ -42,6 +43,34 @@ import {
   Clock
 } from "lucide-react";
 
+// Extensiones de cada tipo del selector (filtro file_extension del índice)
+const TYPE_EXTENSIONS = {
+  pdf: [".pdf"],
+  doc: [".doc", ".docx"],
+  xls: [".xls", ".xlsx"],
+  ppt: [".ppt", ".pptx"],
+};
+
+// Ordenación de cada opción del selector (sin ordenación: relevancia)
+const SORT_OPTIONS = {
+  relevance: undefined,
+  date: ["date_ts:desc"],
+  name: ["title:asc"],
+};
+
+// Facetas que se muestran para refinar la búsqueda
+const FACETS = ["file_extension", "keyword_tags", "date_year"];
+
+const FACET_TITLES = {
+  file_extension: "Tipo de archivo",
+  keyword_tags: "Palabras clave",
+  date_year: "Año",
+};
+
+const SEARCH_LIMIT = 50;
+const FACET_VALUES_SHOWN = 10;
+const EMPTY_FACETS = { distribution: {}, labels: {}, total: 0 };
+
 export default function SearchDocuments() {
   const [query, setQuery] = useState("");
   const [results, setResults] = useState([]);
@@ -49,9 +78,26 @@ export default function SearchDocuments() {
   const [error, setError] = useState("");
   const [filters, setFilters] = useState({
     type: "all",
-    sortBy: "relevance"
+    sortBy: "relevance",
+    tags: [],
+    year: null
   });
+  const [facets, setFacets] = useState(EMPTY_FACETS);
   const [searchHistory, setSearchHistory] = useState([]);
+  const [suggestions, setSuggestions] = useState([]);
+
+  // Autocompletado: petición ligera con un debounce corto
+  const debounceSuggest = useCallback(
+    debounce(async (prefix) => {
+      try {
+        const { data } = await documentsAPI.suggest(prefix);
+        setSuggestions(data.suggestions || []);
+      } catch {
+        setSuggestions([]);
+      }
+    }, 150),
+    []
+  );
 
   // Debounce search
   const debounceSearch = useCallback(
@@ -66,10 +112,13 @@ export default function SearchDocuments() {
   useEffect(() => {
     if (query) {
       debounceSearch(query);
+      debounceSuggest(query);
     } else {
       setResults([]);
+      setSuggestions([]);
+      setFacets(EMPTY_FACETS);
     }
-  }, [query, debounceSearch]);
+  }, [query, debounceSearch, debounceSuggest]);
 
   const handleSearch = async (searchQuery = query) => {
     const q = searchQuery.trim().toLowerCase();
@@ -79,32 +128,21 @@ export default function SearchDocuments() {
     setError("");
     
     try {
-      const { data } = await documentsAPI.list();
-      const docs = data.documents || [];
-      
-      let filtered = docs.filter((d) =>
-        [
-          d.filename || d.file_name,
-          d.title,
-          d.summary,
-          ...(d.keywords || []),
-        ]
-          .join(" ")
-          .toLowerCase()
-          .includes(q)
-      );
-
-      // Apply filters
-      if (filters.type !== "all") {
-        filtered = filtered.filter(d => d.type === filters.type);
-      }
-
-      // Sort results
-      if (filters.sortBy === "date") {
-        filtered.sort((a, b) => new Date(b.date) - new Date(a.date));
-      }
+      // Filtros, ordenación y facetas los resuelve Meilisearch en el servidor
+      const { data } = await documentsAPI.searchAdvanced({
+        query: q,
+        limit: SEARCH_LIMIT,
+        filters: buildFilterExpression(filters),
+        sort: SORT_OPTIONS[filters.sortBy],
+        facets: FACETS,
+      });
 
-      setResults(filtered);
+      setResults(data.hits || []);
+      setFacets({
+        distribution: data.facetDistribution || {},
+        labels: data.facetLabels || {},
+        total: data.estimatedTotalHits ?? data.totalHits ?? (data.hits || []).length,
+      });
       
       // Add to search history
       if (!searchHistory.includes(q)) {
@@ -113,11 +151,32 @@ export default function SearchDocuments() {
     } catch (err) {
       setError(err.response?.data?.detail || err.message);
       setResults([]);
+      setFacets(EMPTY_FACETS);
     } finally {
       setLoading(false);
     }
   };
 
+  // Activa o desactiva un valor de faceta como filtro (etiquetas: varias; año: uno)
+  const toggleFacet = (attribute, value) => {
+    setFilters(prev => {
+      if (attribute === "keyword_tags") {
+        const tags = prev.tags.includes(value)
+          ? prev.tags.filter(tag => tag !== value)
+          : [...prev.tags, value];
+        return { ...prev, tags };
+      }
+      if (attribute === "date_year") {
+        return { ...prev, year: prev.year === value ? null : value };
+      }
+      return prev;
+    });
+  };
+
+  const isFacetActive = (attribute, value) =>
+    (attribute === "keyword_tags" && filters.tags.includes(value)) ||
+    (attribute === "date_year" && filters.year === value);
+
   const handleDownload = async (id, filename) => {
     try {
       const resp = await documentsAPI.download(id);
@@ -176,8 +235,14 @@ export default function SearchDocuments() {
                 value={query}
                 onChange={(e) => setQuery(e.target.value)}
                 className="pl-10 pr-4"
+                list="search-suggestions"
                 onKeyDown={(e) => e.key === "Enter" && handleSearch()}
               />
+              <datalist id="search-suggestions">
+                {suggestions.map((suggestion) => (
+                  <option key={`${suggestion.type}:${suggestion.text}`} value={suggestion.text} />
+                ))}
+              </datalist>
               {loading && (
                 <Loader2 className="absolute right-3 top-3 h-4 w-4 animate-spin text-muted-foreground" />
               )}
@@ -261,6 +326,44 @@ export default function SearchDocuments() {
         </Alert>
       )}
 
+      {/* Facets */}
+      {query && !loading && results.length > 0 && (
+        <Card>
+          <CardHeader>
+            <CardTitle className="flex items-center gap-2 text-base">
+              <Filter className="h-4 w-4" />
+              Refinar resultados
+            </CardTitle>
+          </CardHeader>
+          <CardContent className="space-y-4">
+            {FACETS.filter(attribute => Object.keys(facets.distribution[attribute] || {}).length > 0)
+              .map(attribute => (
+                <div key={attribute} className="space-y-2">
+                  <p className="text-sm font-medium">{FACET_TITLES[attribute]}</p>
+                  <div className="flex flex-wrap gap-2">
+                    {Object.entries(facets.distribution[attribute])
+                      .sort(([, a], [, b]) => b - a)
+                      .slice(0, FACET_VALUES_SHOWN)
+                      .map(([value, count]) => {
+                        const clickable = attribute !== "file_extension";
+                        return (
+                          <Badge
+                            key={value}
+                            variant={isFacetActive(attribute, value) ? "default" : "outline"}
+                            className={cn(clickable && "cursor-pointer")}
+                            onClick={clickable ? () => toggleFacet(attribute, value) : undefined}
+                          >
+                            {facets.labels[attribute]?.[value] || value} ({count})
+                          </Badge>
+                        );
+                      })}
+                  </div>
+                </div>
+              ))}
+          </CardContent>
+        </Card>
+      )}
+
       {/* Results */}
       {query && !loading && (
         <Card>
@@ -269,7 +372,7 @@ export default function SearchDocuments() {
               <FileText className="h-5 w-5" />
               Resultados de búsqueda
               {results.length > 0 && (
-                <Badge variant="secondary">{results.length} encontrados</Badge>
+                <Badge variant="secondary">{facets.total} encontrados</Badge>
               )}
             </CardTitle>
             {results.length > 0 && (
@@ -322,7 +425,7 @@ export default function SearchDocuments() {
                           </TableCell>
                           <TableCell>
                             <Badge variant="outline">
-                              {doc.type || 'Desconocido'}
+                              {doc.file_extension || 'Desconocido'}
                             </Badge>
                           </TableCell>
                           <TableCell className="text-right">
@@ -361,7 +464,7 @@ export default function SearchDocuments() {
                               </div>
                             </div>
                             <Badge variant="outline" className="shrink-0">
-                              {doc.type || 'Desconocido'}
+                              {doc.file_extension || 'Desconocido'}
                             </Badge>
                           </div>
                           
@@ -426,6 +529,24 @@ export default function SearchDocuments() {
   );
 }
 
+// Expresión de filtro de Meilisearch a partir de los filtros de la interfaz
+function buildFilterExpression({ type, tags, year }) {
+  const conditions = [];
+  if (type !== "all") {
+    conditions.push(`file_extension IN [${TYPE_EXTENSIONS[type].map(quote).join(", ")}]`);
+  }
+  tags.forEach(tag => conditions.push(`keyword_tags = ${quote(tag)}`));
+  if (year) {
+    conditions.push(`date_year = ${year}`);
+  }
+  return conditions.length ? conditions.join(" AND ") : undefined;
+}
+
+// Valor entre comillas para una expresión de filtro
+function quote(value) {
+  return `"${String(value).replace(/["\\]/g, "\\$&")}"`;
+}
+
 // Utility function for debounce
 function debounce(func, wait) {
   let timeout;
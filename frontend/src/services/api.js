@@ -260,6 +260,34 @@ export const documentsAPI = {
   search: (query) => 
     api.get(`/documents/search?query=${encodeURIComponent(query)}`),
   
+  /**
+   * Búsqueda avanzada: filtros, ordenación y facetas resueltos en Meilisearch
+   * 
+   * @param {Object} params - { query, limit, offset, filters, sort, facets }
+   * @returns {Promise<Object>} Resultados con facetDistribution
+   */
+  searchAdvanced: (params) => 
+    api.post("/documents/search", params),
+  
+  /**
+   * Ejecuta varias búsquedas en una sola petición
+   * 
+   * @param {Array<Object>} queries - Búsquedas con el formato de searchAdvanced
+   * @returns {Promise<Object>} { results: [{ index, result } | { index, error }] }
+   */
+  multiSearch: (queries) => 
+    api.post("/documents/multi-search", { queries }),
+  
+  /**
+   * Sugerencias de autocompletado (títulos y palabras clave) mientras se escribe
+   * 
+   * @param {string} q - Texto escrito hasta ahora
+   * @param {number} limit - Máximo de sugerencias
+   * @returns {Promise<Object>} { query, suggestions: [{ text, type, count }], source }
+   */
+  suggest: (q, limit = 8) => 
+    api.get("/documents/suggest", { params: { q, limit } }),
+  
   /**
    * Lista todos los documentos (metadatos JSON locales)
    * 